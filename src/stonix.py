@@ -90,6 +90,10 @@ The following options control the running of the script:
       Generate a new config file with current options in the full format (shows all options).
  -l --list
       Print the list of installed rules that apply to this platform.
+ -j --jobs number
+      Run up to this many rules at once during a full fix or report run.
+ --profile directory
+      Write the time and resources used by each rule to this directory.
 
 WARNING! If run with the -f flag THIS PROGRAM WILL MODIFY
 SYSTEM SETTINGS!
@@ -122,6 +126,17 @@ Created on Aug 23, 2010
         added to do notes; changed author name formats to be consistent;
         fixed some typo's in the class doc string; updated group name (CSD -> NIE)
 @change: 2019/04/08 - Breen Malmberg - removed unused import 'imp'; fixed unreachable logging calls
+@change: 2026/10/18 - hardensystem and auditsystem now run rules through the
+        rule scheduler; added the -j --jobs option
+@change: 2026/10/18 - getrules consults the rule manifest and does not import
+        rules that would not be run
+@change: 2026/10/18 - findapplicable evaluates all rules in one pass
+@change: 2026/10/18 - uncommitted KVEditor edits are dropped after each fix
+@change: 2026/10/18 - added the --profile option to record the time and
+        resources used by each rule phase
+@change: 2026/10/18 - the grub configuration is generated once after all
+        fixes have run instead of by each rule that changes the kernel
+        command line
 """
 
 import sys
@@ -144,6 +159,12 @@ from stonix_resources.logdispatcher import LogPriority, LogDispatcher
 from stonix_resources.program_arguments import ProgramArguments
 from stonix_resources.CommandHelper import CommandHelper
 from stonix_resources.cli import Cli
+from stonix_resources.rulescheduler import RuleScheduler
+from stonix_resources.KVACache import discardpending
+from stonix_resources.RuleManifest import RuleManifest
+from stonix_resources.CheckApplicable import evaluaterules
+from stonix_resources.RuleProfiler import RuleProfiler
+from stonix_resources.BootLoader import getbootloader
 
 
 class Controller(Observable):
@@ -176,6 +197,9 @@ class Controller(Observable):
         self.numrulescomplete = 0
         self.currulename = ''
         self.currulenum = 0
+        self.numworkers = 1
+        self.profiledir = ''
+        self.profiler = None
 
         # this part added so stonix will create files with the intended root umask (022)
         # instead of using the default user umask (which is currently being set to 077)
@@ -195,6 +219,8 @@ class Controller(Observable):
         self.logger = LogDispatcher(self.environ)
         self.logger.log(LogPriority.DEBUG, 'Logging Started')
         self.ch = CommandHelper(self.logger)
+        if self.profiledir:
+            self.profiler = RuleProfiler()
         self.statechglogger = StateChgLogger(self.logger, self.environ)
         self.logger.log(LogPriority.DEBUG, 'State Logger Started')
 
@@ -365,6 +391,7 @@ class Controller(Observable):
                             ['Sys Path Element:', str(path)])
 
         rulefiles = os.listdir(str(rulesPath))
+        manifest = None
 
         #####
         # Check if stonix has been 'frozen' with pyinstaller, py2app, etc and
@@ -397,8 +424,18 @@ class Controller(Observable):
 
             # The output of this section is a list of valid, fully qualified,
             # rule class names.
+            # Rules the manifest shows would be discarded are not imported
+            manifest = RuleManifest(self.logger, environ)
+            manifest.prune(modulenames)
+            wanted = self.getwantedrules()
             for module in modulenames:
                 module = module.split("/")[-1]
+                entry = manifest.lookup(module,
+                                        os.path.join(rulesPath, module + '.py'))
+                if entry is not None and manifest.skippable(entry, wanted):
+                    self.logger.log(LogPriority.DEBUG,
+                                    'Skipping rule per manifest: ' + module)
+                    continue
 
                 classname = 'stonix_resources.rules.' + module + '.' + module
                 rulewalklist.append(classname)
@@ -473,6 +510,11 @@ class Controller(Observable):
                     rulenumbers.append(rulenum)
                     rulenames.append(rulename)
                     instruleclasses.append(clinst)
+                if manifest is not None:
+                    module = rule.split('.')[-1]
+                    manifest.add(module,
+                                 os.path.join(rulesPath, module + '.py'),
+                                 clinst)
                 etime = time.time() - starttime
                 self.logger.log(LogPriority.DEBUG,
                                 'load time: ' + str(etime))
@@ -485,8 +527,24 @@ class Controller(Observable):
                                 "Error instantiating rule: " + str(trace))
                 continue
 
+        if manifest is not None:
+            manifest.save()
         return instruleclasses
 
+    def getwantedrules(self):
+        """Return the names of the rules requested with -m when running a
+        single module from the command line, otherwise None.
+
+        :return: wanted
+        :rtype: list or None
+
+        """
+        if self.mode != 'cli' or not self.runrule or self.prog_args.getList():
+            return None
+        if isinstance(self.runrule, list):
+            return self.runrule
+        return [self.runrule]
+
     def findapplicable(self, rules):
         """This method checks each rule to see if it is applicable on the current
         platform on which stonix is running. A list of applicable rule objects
@@ -498,28 +556,30 @@ class Controller(Observable):
 
         """
         applicablerules = []
-        for rule in rules:
-            try:
-                if rule.isapplicable():
-                    self.logger.log(LogPriority.DEBUG,
-                                    'Rule is applicable by platform ' +
-                                    ' EUID: ' + str(self.environ.geteuid()) +
-                                    ' Root required: ' +
-                                    str(rule.getisrootrequired()))
-                    if self.environ.geteuid() != 0 and rule.getisrootrequired():
-                        self.logger.log(LogPriority.DEBUG,
-                                    'Skipping ' + rule.getrulename() +
-                                    ' root required.')
-                    else:
-                        self.logger.log(LogPriority.DEBUG,
-                                    'Adding ' + rule.getrulename() +
-                                    ' to run list.')
-                        applicablerules.append(rule)
-            except Exception:
-                trace = traceback.format_exc()
+        # applicability of every rule is decided in a single pass
+        for rule, applies in zip(rules, evaluaterules(rules, self.environ,
+                                                      self.logger)):
+            if isinstance(applies, Exception):
+                trace = ''.join(traceback.format_exception(
+                    type(applies), applies, applies.__traceback__))
                 self.logger.log(LogPriority.ERROR,
                                 "Error determining rule applicability: "
                                 + trace)
+            elif applies:
+                self.logger.log(LogPriority.DEBUG,
+                                'Rule is applicable by platform ' +
+                                ' EUID: ' + str(self.environ.geteuid()) +
+                                ' Root required: ' +
+                                str(rule.getisrootrequired()))
+                if self.environ.geteuid() != 0 and rule.getisrootrequired():
+                    self.logger.log(LogPriority.DEBUG,
+                                'Skipping ' + rule.getrulename() +
+                                ' root required.')
+                else:
+                    self.logger.log(LogPriority.DEBUG,
+                                'Adding ' + rule.getrulename() +
+                                ' to run list.')
+                    applicablerules.append(rule)
         return applicablerules
 
     def getallrulesdata(self):
@@ -579,93 +639,145 @@ class Controller(Observable):
                 rulename = rule.getrulename()
         return rulename
 
-    def hardensystem(self):
-        """Call all rules in fix(harden) mode
+    def runphase(self, rule, phase, method):
+        """Call a report, fix or undo method of a rule. When rules are being
+        profiled the time and resources it uses are recorded for the phase.
 
+        :param rule: rule object
+        :param phase: string - one of RuleProfiler.PHASES
+        :param method: bound method of the rule to call
+        :returns: the return value of method
+
+        """
+        if self.profiler is None:
+            return method()
+        return self.profiler.runphase(rule.getrulename(), phase, method)
+
+    def writeprofile(self):
+        """Write the rule profile to the --profile directory if rules are
+        being profiled.
+
+        """
+        if self.profiler is None:
+            return
+        try:
+            self.profiler.write(self.profiledir)
+        except (IOError, OSError) as err:
+            self.logger.log(LogPriority.ERROR,
+                            ['Controller.writeprofile',
+                             'Unable to write the rule profile to ' +
+                             self.profiledir + ': ' + str(err)])
+
+    def regeneratebootloader(self):
+        """Generate the grub configuration if any rule changed the kernel
+        command line during the run, or an undo restored the grub template.
+        Rules only edit the grub template so that the configuration is
+        generated once, after all of them. Changes to BLS entries are
+        recorded as change events of the rules which asked for them.
+
+        """
+        bootloader = getbootloader(self.logger)
+        if not bootloader.ispending():
+            return
+        if not bootloader.regenerate(self.statechglogger):
+            self.logger.log(LogPriority.ERROR,
+                            ['Controller.regeneratebootloader',
+                             'Unable to generate the grub configuration. ' +
+                             'Run ' + (bootloader.getmkconfig() or
+                                       'grub2-mkconfig') +
+                             ' for kernel option changes to take effect'])
+
+    def hardensystem(self):
+        """Call all rules in fix(harden) mode. Rules are handed to the rule
+        scheduler which may run several of them at once when more than one
+        job was requested. Progress notifications are sent from this thread
+        as each rule completes.
 
-        
         """
         self.numrulesrunning = self.numexecutingrules
         self.numrulescomplete = 0
-        for rule in self.installedrules:
+        scheduler = RuleScheduler(self.logger, self.numworkers)
+        for rule, trace in scheduler.run(self.installedrules,
+                                         self.__hardenrule, exclusive=True):
             self.currulenum = rule.getrulenum()
             self.currulename = rule.getrulename()
+            if trace:
+                self.logger.log(LogPriority.ERROR, [rule.getrulename(),
+                                "Controller caught rule death: "
+                                + trace])
+            self.numrulescomplete = self.numrulescomplete + 1
+            self.set_dirty()
+            self.notify_check()
+        self.regeneratebootloader()
+        self.writeprofile()
+
+    def __hardenrule(self, rule):
+        """Run report, fix and the follow up report for a single rule. This is
+        the unit of work the rule scheduler runs during hardensystem. It runs on a
+        scheduler worker thread, so the current rule number and name are set
+        by the thread consuming the results, which names the rule in the
+        progress notification.
+
+        :param rule: rule object to run
+
+        """
+        self.logger.log(LogPriority.DEBUG, "****************** RULE START: " + str(rule.getrulename()) + " ******************")
+        starttime = time.time()
+        self.logger.log(LogPriority.DEBUG, "=================== START REPORT ===================")
+        self.runphase(rule, 'report', rule.report)
+        self.logger.log(LogPriority.DEBUG, "==================== END REPORT ====================")
+        if not rule.getrulesuccess():
+            self.logger.log(LogPriority.ERROR,
+                            [rule.getrulename(),
+                             rule.getdetailedresults()])
+        elif not rule.iscompliant():
+            self.logger.log(LogPriority.DEBUG, "=================== START FIX ===================")
             try:
-                self.logger.log(LogPriority.DEBUG, "****************** RULE START: " + str(self.currulename) + " ******************")
-                starttime = time.time()
+                self.runphase(rule, 'fix', rule.fix)
+                self.statechglogger.syncrule(rule.getrulenum())
+            finally:
+                discardpending(self.logger)
+            self.logger.log(LogPriority.DEBUG, "==================== END FIX ====================")
+            if rule.getrulesuccess():
                 self.logger.log(LogPriority.DEBUG, "=================== START REPORT ===================")
-                rule.report()
+                self.runphase(rule, 'rereport', rule.report)
                 self.logger.log(LogPriority.DEBUG, "==================== END REPORT ====================")
                 if not rule.getrulesuccess():
                     self.logger.log(LogPriority.ERROR,
                                     [rule.getrulename(),
                                      rule.getdetailedresults()])
                 elif not rule.iscompliant():
-                    self.logger.log(LogPriority.DEBUG, "=================== START FIX ===================")
-                    rule.fix()
-                    self.logger.log(LogPriority.DEBUG, "==================== END FIX ====================")
-                    if rule.getrulesuccess():
-                        self.logger.log(LogPriority.DEBUG, "=================== START REPORT ===================")
-                        rule.report()
-                        self.logger.log(LogPriority.DEBUG, "==================== END REPORT ====================")
-                        if not rule.getrulesuccess():
-                            self.logger.log(LogPriority.ERROR,
-                                            [rule.getrulename(),
-                                             rule.getdetailedresults()])
-                        elif not rule.iscompliant():
-                            self.logger.log(LogPriority.WARNING,
-                                            [rule.getrulename(),
-                                            rule.getdetailedresults()])
-                        else:
-                            self.logger.log(LogPriority.INFO,
-                                            [rule.getrulename(),
-                                            rule.getdetailedresults()])
+                    self.logger.log(LogPriority.WARNING,
+                                    [rule.getrulename(),
+                                    rule.getdetailedresults()])
                 else:
                     self.logger.log(LogPriority.INFO,
                                     [rule.getrulename(),
                                     rule.getdetailedresults()])
-                etime = time.time() - starttime
-                self.logger.log(LogPriority.DEBUG,
-                                [rule.getrulename(),
-                                'Elapsed Time: ' + str(etime)])
-                self.logger.log(LogPriority.DEBUG, "****************** RULE END: " + str(self.currulename) + " ******************")
-            except (KeyboardInterrupt, SystemExit):
-            # User initiated exit
-                raise
-            except Exception:
-                trace = traceback.format_exc()
-                self.logger.log(LogPriority.ERROR, [rule.getrulename(),
-                                "Controller caught rule death: "
-                                + trace])
-            self.numrulescomplete = self.numrulescomplete + 1
-            self.set_dirty()
-            self.notify_check()
+        else:
+            self.logger.log(LogPriority.INFO,
+                            [rule.getrulename(),
+                            rule.getdetailedresults()])
+        etime = time.time() - starttime
+        self.logger.log(LogPriority.DEBUG,
+                        [rule.getrulename(),
+                        'Elapsed Time: ' + str(etime)])
+        self.logger.log(LogPriority.DEBUG, "****************** RULE END: " + str(rule.getrulename()) + " ******************")
 
     def auditsystem(self):
-        """Call all rules in audit(report) mode
+        """Call all rules in audit(report) mode. Report calls are run through
+        the rule scheduler so that several rules may be audited at once when
+        more than one job was requested.
 
         """
         self.numrulesrunning = self.numexecutingrules
         self.numrulescomplete = 0
-        for rule in self.installedrules:
+        scheduler = RuleScheduler(self.logger, self.numworkers)
+        for rule, trace in scheduler.run(self.installedrules,
+                                         self.__auditrule):
             self.currulenum = rule.getrulenum()
             self.currulename = rule.getrulename()
-            try:
-                self.logger.log(LogPriority.DEBUG, "****************** RULE START: " + str(self.currulename) + " ******************")
-                starttime = time.time()
-                self.logger.log(LogPriority.DEBUG, "=================== START REPORT ===================")
-                rule.report()
-                self.logger.log(LogPriority.DEBUG, "==================== END REPORT ====================")
-                etime = time.time() - starttime
-                self.logger.log(LogPriority.DEBUG,
-                                [rule.getrulename(),
-                                'Elapsed Time: ' + str(etime)])
-                self.logger.log(LogPriority.DEBUG, "****************** RULE END: " + str(self.currulename) + " ******************")
-            except (KeyboardInterrupt, SystemExit):
-                # User initiated exit
-                raise
-            except Exception:
-                trace = traceback.format_exc()
+            if trace:
                 self.logger.log(LogPriority.ERROR, [rule.getrulename(),
                                 "Controller caught rule death: "
                                 + trace])
@@ -684,6 +796,28 @@ class Controller(Observable):
                                 rule.getdetailedresults()])
             self.set_dirty()
             self.notify_check()
+        self.writeprofile()
+
+    def __auditrule(self, rule):
+        """Run the report method of a single rule. This is the unit of work
+        the rule scheduler runs during auditsystem. It runs on a
+        scheduler worker thread, so the current rule number and name are set
+        by the thread consuming the results, which names the rule in the
+        progress notification.
+
+        :param rule: rule object to run
+
+        """
+        self.logger.log(LogPriority.DEBUG, "****************** RULE START: " + str(rule.getrulename()) + " ******************")
+        starttime = time.time()
+        self.logger.log(LogPriority.DEBUG, "=================== START REPORT ===================")
+        self.runphase(rule, 'report', rule.report)
+        self.logger.log(LogPriority.DEBUG, "==================== END REPORT ====================")
+        etime = time.time() - starttime
+        self.logger.log(LogPriority.DEBUG,
+                        [rule.getrulename(),
+                        'Elapsed Time: ' + str(etime)])
+        self.logger.log(LogPriority.DEBUG, "****************** RULE END: " + str(rule.getrulename()) + " ******************")
 
     def runruleharden(self, ruleid):
         """Run a single rule in fix(harden) mode
@@ -709,7 +843,7 @@ class Controller(Observable):
                     starttime = time.time()
                     try:
                         self.logger.log(LogPriority.DEBUG, "=================== START REPORT ===================")
-                        rule.report()
+                        self.runphase(rule, 'report', rule.report)
                         self.logger.log(LogPriority.DEBUG, "==================== END REPORT ====================")
                     except (KeyboardInterrupt, SystemExit):
                         # User initiated exit
@@ -730,7 +864,11 @@ class Controller(Observable):
                     elif not rule.iscompliant():
                         try:
                             self.logger.log(LogPriority.DEBUG, "=================== START FIX ===================")
-                            rule.fix()
+                            try:
+                                self.runphase(rule, 'fix', rule.fix)
+                                self.statechglogger.syncrule(rule.getrulenum())
+                            finally:
+                                discardpending(self.logger)
                             self.logger.log(LogPriority.DEBUG, "==================== END FIX ====================")
                         except (KeyboardInterrupt, SystemExit):
                             # User initiated exit
@@ -747,7 +885,7 @@ class Controller(Observable):
                                              rule.getdetailedresults()])
                         try:
                             self.logger.log(LogPriority.DEBUG, "=================== START REPORT ===================")
-                            rule.report()
+                            self.runphase(rule, 'rereport', rule.report)
                             self.logger.log(LogPriority.DEBUG, "==================== END REPORT ====================")
                         except (KeyboardInterrupt, SystemExit):
                             # User initiated exit
@@ -779,6 +917,8 @@ class Controller(Observable):
             self.logger.log(LogPriority.ERROR,
                             message)
         self.logger.log(LogPriority.DEBUG, "****************** RULE END: " + str(rulename) + " ******************")
+        self.regeneratebootloader()
+        self.writeprofile()
 
     def runruleaudit(self, ruleid):
         """Run a single rule in audit(report) mode
@@ -806,7 +946,7 @@ class Controller(Observable):
                     starttime = time.time()
                     try:
                         self.logger.log(LogPriority.DEBUG, "=================== START REPORT ===================")
-                        rule.report()
+                        self.runphase(rule, 'report', rule.report)
                         self.logger.log(LogPriority.DEBUG, "==================== END REPORT ====================")
                     except (KeyboardInterrupt, SystemExit):
                         # User initiated exit
@@ -837,6 +977,7 @@ class Controller(Observable):
                     self.set_dirty()
                     self.notify_check()
         self.logger.log(LogPriority.DEBUG, "****************** RULE END: " + str(rulename) + " ******************")
+        self.writeprofile()
 
     def undochangessystem(self):
         """Undo all changes to the system.
@@ -844,11 +985,13 @@ class Controller(Observable):
         """
         self.numrulesrunning = self.numexecutingrules
         self.numrulescomplete = 0
+        bootloader = getbootloader(self.logger)
+        templatestamp = bootloader.getstamp(bootloader.defaultgrub)
         for rule in self.installedrules:
             self.currulenum = rule.getrulenum()
             self.currulename = rule.getrulename()
             try:
-                rule.undo()
+                self.runphase(rule, 'undo', rule.undo)
             except (KeyboardInterrupt, SystemExit):
                 # User initiated exit
                 raise
@@ -869,6 +1012,9 @@ class Controller(Observable):
                                  rule.getdetailedresults()])
             self.set_dirty()
             self.notify_check()
+        bootloader.schedulechanged(templatestamp)
+        self.regeneratebootloader()
+        self.writeprofile()
 
     def undorule(self, ruleid):
         """Undo the changes from a single rule. Expects the integer rule number
@@ -879,6 +1025,8 @@ class Controller(Observable):
         """
         self.numrulesrunning = 1
         self.numrulescomplete = 0
+        bootloader = getbootloader(self.logger)
+        templatestamp = bootloader.getstamp(bootloader.defaultgrub)
         for rule in self.installedrules:
             if ruleid == rule.getrulenum():
                 if rule.getisrootrequired() and self.environ.geteuid() != 0:
@@ -888,7 +1036,7 @@ class Controller(Observable):
                                     [rule.getrulename(), message])
                 else:
                     try:
-                        rule.undo()
+                        self.runphase(rule, 'undo', rule.undo)
                     except (KeyboardInterrupt, SystemExit):
                         # User initiated exit
                         raise
@@ -909,6 +1057,9 @@ class Controller(Observable):
                                         rule.getdetailedresults()])
                     self.set_dirty()
                     self.notify_check()
+        bootloader.schedulechanged(templatestamp)
+        self.regeneratebootloader()
+        self.writeprofile()
 
     def getrulehelp(self, ruleid):
         """Return rule help information.
@@ -940,7 +1091,11 @@ class Controller(Observable):
                 self.currulename = rule.getrulename()
                 try:
                     self.logger.log(LogPriority.DEBUG, "=================== START FIX ===================")
-                    rule.fix()
+                    try:
+                        self.runphase(rule, 'fix', rule.fix)
+                        self.statechglogger.syncrule(rule.getrulenum())
+                    finally:
+                        discardpending(self.logger)
                     self.logger.log(LogPriority.DEBUG, "==================== END FIX ====================")
                 except (KeyboardInterrupt, SystemExit):
                     # User initiated exit
@@ -1269,6 +1424,8 @@ ABORTING EXECUTION!"""
         self.environ.setinstallmode(self.prog_args.get_install())
         self.pcf = self.prog_args.getPrintConfigFull()
         self.pcs = self.prog_args.getPrintConfigSimple()
+        self.numworkers = self.prog_args.get_jobs()
+        self.profiledir = self.prog_args.get_profile()
 
         if self.prog_args.get_rollback():
             # rollback()
@@ -0,0 +1,431 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Local account database shared by the user and group rules.
+
+The users of /etc/passwd, the groups of /etc/group, the password aging
+fields of /etc/shadow and UID_MIN from /etc/login.defs are parsed once and
+kept for the rest of the run, with indexes by name, uid, gid and home
+directory. A file is parsed again only when its inode, mtime or size
+changes, so a rule that edits /etc/passwd sees its own changes.
+
+Enumerating every account through NSS (pwd.getpwall) asks the directory
+service of LDAP or SSSD joined hosts for all of its users. That is only
+done when the remote policy is switched on, either for the instance with
+setremote() or for one call with the remote parameter. Accounts found that
+way are added after the local ones with remote set.
+
+Use getaccounts() to obtain the shared instance.
+"""
+
+import grp
+import os
+import pwd
+import re
+import threading
+
+from collections import namedtuple
+
+from stonix_resources.logdispatcher import LogPriority
+
+PASSWD = '/etc/passwd'
+
+SHADOW = '/etc/shadow'
+
+GROUP = '/etc/group'
+
+LOGINDEFS = '/etc/login.defs'
+
+PasswdEntry = namedtuple('PasswdEntry', ['name', 'password', 'uid', 'gid',
+                                         'gecos', 'home', 'shell',
+                                         'remote'])
+
+GroupEntry = namedtuple('GroupEntry', ['name', 'password', 'gid', 'members',
+                                       'remote'])
+
+# the aging fields are days, None when the field is empty
+ShadowEntry = namedtuple('ShadowEntry', ['name', 'password', 'lastchg',
+                                         'minimum', 'maximum', 'warn',
+                                         'inactive', 'expire'])
+
+LoginSetting = namedtuple('LoginSetting', ['name', 'value'])
+
+_accounts = None
+_accountslock = threading.Lock()
+
+
+def getaccounts(logger):
+    '''Return the shared AccountDatabase instance, creating it on first use
+
+    :param logger: logdispatcher object
+    :returns: AccountDatabase
+    '''
+    global _accounts
+    with _accountslock:
+        if _accounts is None:
+            _accounts = AccountDatabase(logger)
+        return _accounts
+
+
+def toint(field):
+    '''Return field as an int or None if it is empty or not a number'''
+    try:
+        return int(field)
+    except ValueError:
+        return None
+
+
+class AccountTable(object):
+    '''The parsed records of one file and the stamp they were read at.'''
+
+    def __init__(self, stamp, records):
+        self.stamp = stamp
+        self.records = records
+        self.indexes = {}
+
+    def getindex(self, field):
+        '''Return a dict of value: list of records for a field, in file
+        order
+
+        :param field: name of the field to index on
+        :returns: dict
+        '''
+        if field not in self.indexes:
+            index = {}
+            for record in self.records:
+                index.setdefault(getattr(record, field), []).append(record)
+            self.indexes[field] = index
+        return self.indexes[field]
+
+
+class AccountDatabase(object):
+    '''Users, groups and password aging fields of the local system.'''
+
+    def __init__(self, logger, passwd=PASSWD, shadow=SHADOW, group=GROUP,
+                 logindefs=LOGINDEFS, remote=False):
+        '''
+        :param logger: logdispatcher object
+        :param passwd: path of the passwd file
+        :param shadow: path of the shadow file
+        :param group: path of the group file
+        :param logindefs: path of login.defs
+        :param remote: True to enumerate NSS accounts as well by default
+        '''
+        self.logger = logger
+        self.paths = {'passwd': passwd, 'shadow': shadow, 'group': group,
+                      'logindefs': logindefs}
+        self.remote = remote
+        self.lock = threading.RLock()
+        self.tables = {}
+        self.remotetables = {}
+
+    def setremote(self, remote):
+        '''Set whether accounts are enumerated through NSS as well
+
+        :param remote: bool
+        '''
+        with self.lock:
+            self.remote = remote
+
+    def refresh(self):
+        '''Forget everything read so far'''
+        with self.lock:
+            self.tables = {}
+            self.remotetables = {}
+
+    def getstamp(self, path):
+        '''Return (inode, mtime, size) of path or None if it is missing'''
+        try:
+            fstat = os.stat(path)
+        except OSError:
+            return None
+        return (fstat.st_ino, fstat.st_mtime_ns, fstat.st_size)
+
+    def readlines(self, path):
+        '''Return the lines of path, an empty list if it cannot be read'''
+        try:
+            with open(path, 'r') as fhandle:
+                return fhandle.readlines()
+        except (IOError, OSError, UnicodeDecodeError) as err:
+            self.logger.log(LogPriority.DEBUG,
+                            ['AccountDatabase', 'Unable to read ' + path +
+                             ': ' + str(err)])
+            return []
+
+    def gettable(self, name):
+        '''Return the table for one of the files, parsing it if it changed
+
+        :param name: passwd | shadow | group | logindefs
+        :returns: AccountTable
+        '''
+        path = self.paths[name]
+        with self.lock:
+            stamp = self.getstamp(path)
+            table = self.tables.get(name)
+            if table is None or stamp is None or table.stamp != stamp:
+                parser = getattr(self, 'parse' + name)
+                table = AccountTable(stamp, parser(self.readlines(path)))
+                self.tables[name] = table
+            return table
+
+    def getremotetable(self, name):
+        '''Return the accounts NSS knows of that are not in the local files
+
+        :param name: passwd | group
+        :returns: AccountTable
+        '''
+        with self.lock:
+            if name not in self.remotetables:
+                local = self.gettable(name).getindex('name')
+                records = []
+                try:
+                    if name == 'passwd':
+                        for entry in pwd.getpwall():
+                            if entry.pw_name not in local:
+                                records.append(PasswdEntry(
+                                    entry.pw_name, entry.pw_passwd,
+                                    entry.pw_uid, entry.pw_gid,
+                                    entry.pw_gecos, entry.pw_dir,
+                                    entry.pw_shell, True))
+                    else:
+                        for entry in grp.getgrall():
+                            if entry.gr_name not in local:
+                                records.append(GroupEntry(
+                                    entry.gr_name, entry.gr_passwd,
+                                    entry.gr_gid, list(entry.gr_mem), True))
+                except (KeyError, OSError) as err:
+                    self.logger.log(LogPriority.DEBUG,
+                                    ['AccountDatabase',
+                                     'Unable to enumerate NSS accounts: ' +
+                                     str(err)])
+                self.remotetables[name] = AccountTable(None, records)
+            return self.remotetables[name]
+
+    def lookup(self, name, field, value, remote):
+        '''Return the records of a table whose field equals value'''
+        records = list(self.gettable(name).getindex(field).get(value, []))
+        if self.useremote(remote):
+            records.extend(self.getremotetable(name).getindex(field).get(
+                value, []))
+        return records
+
+    def useremote(self, remote):
+        '''Return whether NSS accounts are included for a call'''
+        if remote is None:
+            return self.remote
+        return remote
+
+    def parsepasswd(self, lines):
+        '''Return a PasswdEntry for each well formed line of passwd'''
+        records = []
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split(':')
+            if len(fields) < 4:
+                continue
+            fields += [''] * (7 - len(fields))
+            uid = toint(fields[2])
+            gid = toint(fields[3])
+            if uid is None or gid is None:
+                self.logger.log(LogPriority.DEBUG,
+                                ['AccountDatabase',
+                                 'Skipping malformed passwd entry for ' +
+                                 fields[0]])
+                continue
+            records.append(PasswdEntry(fields[0], fields[1], uid, gid,
+                                       fields[4], fields[5], fields[6],
+                                       False))
+        return records
+
+    def parsegroup(self, lines):
+        '''Return a GroupEntry for each well formed line of group'''
+        records = []
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split(':')
+            if len(fields) < 3:
+                continue
+            gid = toint(fields[2])
+            if gid is None:
+                self.logger.log(LogPriority.DEBUG,
+                                ['AccountDatabase',
+                                 'Skipping malformed group entry for ' +
+                                 fields[0]])
+                continue
+            members = []
+            if len(fields) > 3 and fields[3].strip():
+                members = [member.strip() for member in fields[3].split(',')]
+            records.append(GroupEntry(fields[0], fields[1], gid, members,
+                                      False))
+        return records
+
+    def parseshadow(self, lines):
+        '''Return a ShadowEntry for each line of shadow'''
+        records = []
+        for line in lines:
+            line = line.rstrip('\n')
+            if not line or line.startswith('#'):
+                continue
+            fields = line.split(':')
+            fields += [''] * (9 - len(fields))
+            records.append(ShadowEntry(fields[0], fields[1],
+                                       *[toint(field)
+                                         for field in fields[2:8]]))
+        return records
+
+    def parselogindefs(self, lines):
+        '''Return the (name, value) settings of login.defs'''
+        records = []
+        for line in lines:
+            fields = line.split()
+            if len(fields) < 2 or fields[0].startswith('#'):
+                continue
+            records.append(LoginSetting(fields[0].upper(), fields[1]))
+        return records
+
+    def getusers(self, remote=None):
+        '''Return all users, in the order of the passwd file
+
+        :param remote: True or False to override the remote policy
+        :returns: list of PasswdEntry
+        '''
+        users = list(self.gettable('passwd').records)
+        if self.useremote(remote):
+            users.extend(self.getremotetable('passwd').records)
+        return users
+
+    def getuser(self, name, remote=None):
+        '''Return the first user of the passed name or None
+
+        :param name: account name
+        :param remote: True or False to override the remote policy
+        :returns: PasswdEntry
+        '''
+        users = self.lookup('passwd', 'name', name, remote)
+        if users:
+            return users[0]
+        return None
+
+    def getusersbyuid(self, uid, remote=None):
+        '''Return the users with the passed uid
+
+        :param uid: int
+        :param remote: True or False to override the remote policy
+        :returns: list of PasswdEntry
+        '''
+        return self.lookup('passwd', 'uid', int(uid), remote)
+
+    def getusersbygid(self, gid, remote=None):
+        '''Return the users whose primary group is the passed gid
+
+        :param gid: int
+        :param remote: True or False to override the remote policy
+        :returns: list of PasswdEntry
+        '''
+        return self.lookup('passwd', 'gid', int(gid), remote)
+
+    def getusersbyhome(self, home, remote=None):
+        '''Return the users with the passed home directory
+
+        :param home: path
+        :param remote: True or False to override the remote policy
+        :returns: list of PasswdEntry
+        '''
+        return self.lookup('passwd', 'home', home, remote)
+
+    def getgroups(self, remote=None):
+        '''Return all groups, in the order of the group file
+
+        :param remote: True or False to override the remote policy
+        :returns: list of GroupEntry
+        '''
+        groups = list(self.gettable('group').records)
+        if self.useremote(remote):
+            groups.extend(self.getremotetable('group').records)
+        return groups
+
+    def getgroup(self, name, remote=None):
+        '''Return the first group of the passed name or None
+
+        :param name: group name
+        :param remote: True or False to override the remote policy
+        :returns: GroupEntry
+        '''
+        groups = self.lookup('group', 'name', name, remote)
+        if groups:
+            return groups[0]
+        return None
+
+    def getgroupsbygid(self, gid, remote=None):
+        '''Return the groups with the passed gid
+
+        :param gid: int
+        :param remote: True or False to override the remote policy
+        :returns: list of GroupEntry
+        '''
+        return self.lookup('group', 'gid', int(gid), remote)
+
+    def getshadows(self):
+        '''Return the password aging entries of all local users, empty if
+        the shadow file cannot be read
+
+        :returns: list of ShadowEntry
+        '''
+        return list(self.gettable('shadow').records)
+
+    def getshadow(self, name):
+        '''Return the password aging entry of a local user or None
+
+        :param name: account name
+        :returns: ShadowEntry
+        '''
+        entries = self.gettable('shadow').getindex('name').get(name)
+        if entries:
+            return entries[0]
+        return None
+
+    def getlogindef(self, name, default=None):
+        '''Return the last value login.defs sets for name
+
+        :param name: setting name, UID_MIN for instance
+        :param default: returned if login.defs does not set name
+        :returns: str
+        '''
+        settings = self.gettable('logindefs').getindex('name').get(
+            name.upper())
+        if settings:
+            return settings[-1].value
+        return default
+
+    def getuidmin(self, default=None):
+        '''Return UID_MIN of login.defs, the lowest uid of regular users
+
+        :param default: returned if UID_MIN is not set or not a number
+        :returns: int
+        '''
+        uidmin = self.getlogindef('UID_MIN')
+        if uidmin is not None and re.match(r'^\d+$', uidmin):
+            return int(uidmin)
+        return default
+
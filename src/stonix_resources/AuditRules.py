@@ -0,0 +1,374 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Index of the kernel audit rules configured on the system.
+
+The rule files of /etc/audit/rules.d, or /etc/audit/audit.rules on systems
+without rules.d, are parsed once into a dictionary keyed by the canonical
+form of each rule. Two rules which auditctl treats the same have the same
+canonical form whatever the order of their -F fields and syscalls, the
+order of always,exit, -k key against -F key=key or auid!=-1 against
+auid!=4294967295. Checking a list of desired rules is then one dictionary
+lookup per rule. Files are only parsed again when their inode, size or
+mtime changes.
+
+rendergenerated() returns the one rules.d file a rule writes with the
+desired rules that no other file has, compile() returns a complete
+audit.rules without duplicates or unwanted rules.
+
+Use getauditrules() to obtain the shared instance.
+"""
+
+import os
+import re
+import threading
+
+from collections import namedtuple
+
+from stonix_resources.logdispatcher import LogPriority
+
+RULESDIR = '/etc/audit/rules.d'
+
+RULESFILE = '/etc/audit/audit.rules'
+
+# options which configure auditd rather than add a rule
+CONTROLOPTIONS = ['-D', '-b', '-e', '-f', '-r', '--backlog_wait_time',
+                  '--loginuid-immutable', '--reset-lost', '-i', '-c']
+
+# fields holding a uid, for which -1 and 4294967295 both mean unset
+UIDFIELDS = ['auid', 'uid', 'euid', 'suid', 'fsuid', 'obj_uid', 'loginuid']
+
+# key is the canonical form of the line, path and lineno where it was read
+AuditRule = namedtuple('AuditRule', ['line', 'key', 'path', 'lineno'])
+
+_auditrules = None
+_auditruleslock = threading.Lock()
+
+
+def getauditrules(logger):
+    '''Return the shared AuditRules instance, creating it on first use
+
+    :param logger: logdispatcher object
+    :returns: AuditRules
+    '''
+    global _auditrules
+    with _auditruleslock:
+        if _auditrules is None:
+            _auditrules = AuditRules(logger)
+        return _auditrules
+
+
+def canonicalfield(field):
+    '''Return (name, operator, value) of a -F field such as auid>=1000'''
+    match = re.match(r'^([\w.]+)(!=|>=|<=|&=|=|>|<|&)(.*)$', field)
+    if match is None:
+        return (field, '', '')
+    name, operator, value = match.groups()
+    if name in UIDFIELDS and value in ['-1', '4294967295', 'unset']:
+        value = 'unset'
+    return (name, operator, value)
+
+
+def canonicalize(line):
+    '''Return the canonical form of an audit rule line, a tuple which is
+    equal for all spellings of the same rule, or None for blank lines and
+    comments
+
+    :param line: string
+    :returns: tuple or None
+    '''
+    words = line.split()
+    if not words or words[0].startswith('#'):
+        return None
+    if words[0] in CONTROLOPTIONS:
+        return ('control', words[0]) + tuple(words[1:])
+    if words[0] == '-w':
+        path = ''
+        perms = 'arwx'
+        keys = []
+        pairs = zip(words[::2], words[1::2] + [''])
+        for option, value in pairs:
+            if option == '-w':
+                path = value.rstrip('/') or '/'
+            elif option == '-p':
+                perms = value
+            elif option == '-k':
+                keys.append(value)
+            elif option == '-F' and value.startswith('key='):
+                keys.append(value[4:])
+        return ('watch', path, ''.join(sorted(perms)), tuple(sorted(keys)))
+    if words[0] in ['-a', '-A']:
+        action = ''
+        listname = ''
+        syscalls = set()
+        fields = []
+        keys = []
+        pairs = zip(words[::2], words[1::2] + [''])
+        for option, value in pairs:
+            if option in ['-a', '-A']:
+                for part in value.split(','):
+                    if part in ['always', 'never']:
+                        action = part
+                    else:
+                        listname = part
+            elif option == '-S':
+                syscalls.update(value.split(','))
+            elif option == '-F' and value.startswith('key='):
+                keys.append(value[4:])
+            elif option == '-k':
+                keys.append(value)
+            elif option in ['-F', '-C']:
+                fields.append(canonicalfield(value))
+            else:
+                fields.append((option, '', value))
+        return ('rule', action, listname, tuple(sorted(syscalls)),
+                tuple(sorted(fields)), tuple(sorted(keys)))
+    return ('other',) + tuple(words)
+
+
+class AuditRules(object):
+    '''Canonical, indexed view of the configured kernel audit rules.'''
+
+    def __init__(self, logger, rulesdir=RULESDIR, rulesfile=RULESFILE):
+        '''
+        :param logger: logdispatcher object
+        :param rulesdir: directory of the rule files read by augenrules
+        :param rulesfile: audit.rules, read when rulesdir does not exist
+        '''
+        self.logger = logger
+        self.rulesdir = rulesdir
+        self.rulesfile = rulesfile
+        self.lock = threading.RLock()
+        # path -> (stamp, list of lines, list of AuditRule)
+        self.parsed = {}
+        # (stamps of all files, {key: [AuditRule]})
+        self.index = None
+
+    def refresh(self):
+        '''Forget everything read so far'''
+        with self.lock:
+            self.parsed = {}
+            self.index = None
+
+    def getstamp(self, path):
+        '''Return (inode, mtime, size) of path or None if it is missing'''
+        try:
+            fstat = os.stat(path)
+        except OSError:
+            return None
+        return (fstat.st_ino, fstat.st_mtime_ns, fstat.st_size)
+
+    def usesrulesdir(self):
+        '''Return whether the rules are kept in rules.d'''
+        return os.path.isdir(self.rulesdir)
+
+    def rulesfiles(self):
+        '''Return the rule files in the order augenrules reads them
+
+        :returns: list of paths
+        '''
+        if not self.usesrulesdir():
+            if os.path.isfile(self.rulesfile):
+                return [self.rulesfile]
+            return []
+        try:
+            names = os.listdir(self.rulesdir)
+        except OSError:
+            return []
+        return [os.path.join(self.rulesdir, name) for name in sorted(names)
+                if name.endswith('.rules')]
+
+    def parsefile(self, path, stamp=None):
+        '''Return the lines and rules of one file, parsing it only if it
+        changed since the last call
+
+        :param path: string
+        :param stamp: current stamp of the file, looked up if None
+        :returns: tuple (list of lines, list of AuditRule)
+        '''
+        if stamp is None:
+            stamp = self.getstamp(path)
+        if stamp is None:
+            return [], []
+        with self.lock:
+            cached = self.parsed.get(path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1], cached[2]
+        rules = []
+        try:
+            with open(path) as fhandle:
+                lines = fhandle.readlines()
+        except (IOError, OSError, UnicodeDecodeError) as err:
+            self.logger.log(LogPriority.DEBUG,
+                            ['AuditRules.parsefile',
+                             'Unable to read ' + path + ': ' + str(err)])
+            return [], []
+        for lineno, line in enumerate(lines, 1):
+            key = canonicalize(line)
+            if key is not None:
+                rules.append(AuditRule(' '.join(line.split()), key, path,
+                                       lineno))
+        with self.lock:
+            self.parsed[path] = (stamp, lines, rules)
+        return lines, rules
+
+    def getindex(self):
+        '''Return the rules of all files by canonical form, in load order,
+        indexing them again if any file changed
+
+        :returns: dict of key -> list of AuditRule
+        '''
+        files = [(path, self.getstamp(path)) for path in self.rulesfiles()]
+        with self.lock:
+            if self.index is not None and self.index[0] == files:
+                return self.index[1]
+            index = {}
+            for path, stamp in files:
+                for rule in self.parsefile(path, stamp)[1]:
+                    index.setdefault(rule.key, []).append(rule)
+            self.index = (files, index)
+            return index
+
+    def getrules(self):
+        '''Return the rules of all files in load order
+
+        :returns: list of AuditRule
+        '''
+        rules = []
+        for path in self.rulesfiles():
+            rules.extend(self.parsefile(path)[1])
+        return rules
+
+    def hasrule(self, line):
+        '''Return whether a rule is configured, in any spelling
+
+        :param line: rule such as "-w /etc/passwd -p wa -k identity"
+        :returns: bool
+        '''
+        return canonicalize(line) in self.getindex()
+
+    def missing(self, lines):
+        '''Return the rules which are not configured
+
+        :param lines: list of rules
+        :returns: list of rules, in the order passed
+        '''
+        index = self.getindex()
+        return [line for line in lines if canonicalize(line) not in index]
+
+    def findrules(self, patterns, path=None):
+        '''Return the rules matching any of a list of regular expressions
+
+        :param patterns: list of regular expressions, matched ignoring case
+        :param path: only search this file, defaults to all rule files
+        :returns: list of AuditRule
+        '''
+        compiled = [re.compile(pattern, re.IGNORECASE)
+                    for pattern in patterns]
+        if path is None:
+            rules = self.getrules()
+        else:
+            rules = self.parsefile(path)[1]
+        return [rule for rule in rules
+                if any(regex.search(rule.line) for regex in compiled)]
+
+    def strip(self, path, patterns):
+        '''Return the contents of a rule file without the rules which match
+        any of a list of regular expressions
+
+        :param path: string
+        :param patterns: list of regular expressions
+        :returns: tuple (string contents, list of AuditRule removed)
+        '''
+        lines, _ = self.parsefile(path)
+        removed = self.findrules(patterns, path)
+        drop = set(rule.lineno for rule in removed)
+        contents = ''.join(line for lineno, line in enumerate(lines, 1)
+                           if lineno not in drop)
+        return contents, removed
+
+    def isuptodate(self, path, contents):
+        '''Return whether a rule file holds the same rules, in the same
+        order, as contents. Comments and blank lines are not compared.
+
+        :param path: string
+        :param contents: string
+        :returns: bool
+        '''
+        keys = [canonicalize(line) for line in contents.splitlines()]
+        return [rule.key for rule in self.parsefile(path)[1]] == \
+            [key for key in keys if key is not None]
+
+    def rendergenerated(self, path, lines, header=''):
+        '''Return the contents of the rules.d file generated by a rule,
+        holding the desired rules which no other rule file has, and -e 2 if
+        no other file locks the configuration. augenrules moves -e to the
+        end of audit.rules.
+
+        :param path: path of the generated file, which need not exist
+        :param lines: list of desired rules
+        :param header: comment placed at the top of the file
+        :returns: string
+        '''
+        others = set()
+        for rulepath in self.rulesfiles():
+            if rulepath != path:
+                others.update(rule.key for rule in self.parsefile(rulepath)[1])
+        locked = canonicalize('-e 2') in others
+        contents = header
+        written = set()
+        for line in lines:
+            key = canonicalize(line)
+            if key is None or key in others or key in written:
+                continue
+            written.add(key)
+            contents += line + '\n'
+        if not locked:
+            contents += '-e 2\n'
+        return contents
+
+    def compile(self, lines, patterns=(), backlog='8192'):
+        '''Return a complete audit.rules: -D and -b first, the rules of lines
+        without duplicates or rules matching patterns, -e 2 last
+
+        :param lines: list of rules and control lines, in load order
+        :param patterns: list of regular expressions of unwanted rules
+        :param backlog: -b value used if lines have none
+        :returns: string
+        '''
+        compiled = [re.compile(pattern, re.IGNORECASE)
+                    for pattern in patterns]
+        body = []
+        written = set()
+        for line in lines:
+            line = ' '.join(line.split())
+            key = canonicalize(line)
+            if key is None or key in written:
+                continue
+            if key[0] == 'control' and key[1] in ['-D', '-e']:
+                continue
+            if key[0] == 'control' and key[1] == '-b':
+                backlog = key[2] if len(key) > 2 else backlog
+                continue
+            if any(regex.search(line) for regex in compiled):
+                continue
+            written.add(key)
+            body.append(line + '\n')
+        return '-D\n-b ' + backlog + '\n' + ''.join(body) + '-e 2\n'
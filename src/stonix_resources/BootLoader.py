@@ -0,0 +1,703 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Boot loader configuration and kernel command line shared by all rules.
+
+The GRUB 2 template /etc/default/grub, the generated grub.cfg, the Boot
+Loader Specification entries in /boot/loader/entries and the grub.conf of
+GRUB 0.97 are parsed into one model of the boot entries and their kernel
+arguments. $kernelopts in BLS entries is expanded from grubenv, so a rule
+asks whether an argument is in effect instead of matching kernel, linux,
+linux16 and set default_kernelopts lines itself. Files are only parsed again
+when their inode, size or mtime changes.
+
+Rules change the kernel command line by writing the contents returned by
+render(), which edits the template of GRUB 2 or the kernel lines of GRUB
+0.97, recording their own undo events, and then calling schedule() with
+their rule number. The controller calls regenerate() once after all fixes
+have run, so grub.cfg is generated once per run instead of once per rule.
+BLS entries with literal options are rewritten by regenerate(), which
+records an undo event for each entry under the number of the rule that
+asked for the change. While a regeneration is pending the boot entries are
+taken to carry the scheduled changes.
+
+Rules must import this module as stonix_resources.BootLoader, the name the
+controller uses, so that both see the same pending regeneration.
+
+Use getbootloader() to obtain the shared instance.
+"""
+
+import os
+import re
+import shlex
+import shutil
+import threading
+
+from collections import namedtuple
+
+from stonix_resources.logdispatcher import LogPriority
+from stonix_resources.CommandHelper import CommandHelper
+from stonix_resources.stonixutilityfunctions import iterate
+
+DEFAULTGRUB = '/etc/default/grub'
+
+# Generated GRUB 2 configurations, the first one found is used
+GRUBCFGS = ['/boot/grub2/grub.cfg', '/boot/grub/grub.cfg',
+            '/boot/efi/EFI/redhat/grub.cfg', '/boot/efi/EFI/centos/grub.cfg',
+            '/boot/efi/EFI/fedora/grub.cfg', '/boot/efi/EFI/ubuntu/grub.cfg']
+
+# GRUB 0.97 configurations
+GRUBLEGACY = ['/boot/grub/grub.conf', '/boot/grub/menu.lst']
+
+GRUBENVS = ['/boot/grub2/grubenv', '/boot/grub/grubenv']
+
+BLSDIR = '/boot/loader/entries'
+
+# Commands which generate grub.cfg from the template, in order of preference
+MKCONFIGS = ['/usr/sbin/grub2-mkconfig', '/sbin/grub2-mkconfig',
+             '/usr/sbin/grub-mkconfig', '/sbin/grub-mkconfig',
+             '/usr/sbin/update-grub', '/sbin/update-grub']
+
+# grub.cfg and grub.conf commands which load a kernel
+KERNELCOMMANDS = ['linux', 'linux16', 'linuxefi', 'kernel']
+
+# Template keys holding kernel arguments. GRUB_CMDLINE_LINUX_DEFAULT is not
+# used for recovery entries.
+CMDLINEKEYS = ['GRUB_CMDLINE_LINUX', 'GRUB_CMDLINE_LINUX_DEFAULT']
+
+# first event iterator used for the undo events of rewritten BLS entries,
+# one per entry, above the iterators rules use for their own events
+BLSEVENTS = 900
+
+# args is the list of kernel arguments with variables expanded. lineno is
+# the line of the kernel, or for BLS entries the options, line.
+BootEntry = namedtuple('BootEntry', ['title', 'kernel', 'args', 'path',
+                                     'lineno'])
+
+_bootloader = None
+_bootloaderlock = threading.Lock()
+
+
+def getbootloader(logger):
+    '''Return the shared BootLoader instance, creating it on first use
+
+    :param logger: logdispatcher object
+    :returns: BootLoader
+    '''
+    global _bootloader
+    with _bootloaderlock:
+        if _bootloader is None:
+            _bootloader = BootLoader(logger)
+        return _bootloader
+
+
+def argname(arg):
+    '''Return the name of a kernel argument, audit for audit=1'''
+    return arg.split('=', 1)[0]
+
+
+def applyargs(args, add=(), remove=()):
+    '''Return a list of kernel arguments with the arguments of remove taken
+    out and those of add appended. Adding name=value replaces any other
+    value of name.
+
+    :param args: list of kernel arguments
+    :param add: arguments to add
+    :param remove: arguments to remove
+    :returns: list
+    '''
+    replaced = set(argname(arg) for arg in add if '=' in arg)
+    result = []
+    for arg in args:
+        if arg in remove:
+            continue
+        if arg not in add and '=' in arg and argname(arg) in replaced:
+            continue
+        result.append(arg)
+    for arg in add:
+        if arg not in result:
+            result.append(arg)
+    return result
+
+
+def splitvalue(value):
+    '''Return the kernel arguments of a shell assignment value such as
+    "quiet splash" # comment
+
+    :param value: string right of the =
+    :returns: list
+    '''
+    try:
+        words = shlex.split(value, comments=True)
+    except ValueError:
+        words = [value.strip().strip('"\'')]
+    return ' '.join(words).split()
+
+
+class BootLoader(object):
+    '''Model of the boot loader configuration and the kernel arguments of
+    each boot entry.
+    '''
+
+    def __init__(self, logger, defaultgrub=DEFAULTGRUB, grubcfgs=None,
+                 legacyconfs=None, grubenvs=None, blsdir=BLSDIR,
+                 mkconfigs=None):
+        '''
+        :param logger: logdispatcher object
+        :param defaultgrub: path of the GRUB 2 template
+        :param grubcfgs: list of grub.cfg paths, defaults to GRUBCFGS
+        :param legacyconfs: list of GRUB 0.97 paths, defaults to GRUBLEGACY
+        :param grubenvs: list of grubenv paths, defaults to GRUBENVS
+        :param blsdir: directory of the BLS entries
+        :param mkconfigs: list of grub.cfg generators, defaults to MKCONFIGS
+        '''
+        self.logger = logger
+        self.defaultgrub = defaultgrub
+        self.grubcfgs = GRUBCFGS if grubcfgs is None else grubcfgs
+        self.legacyconfs = GRUBLEGACY if legacyconfs is None else legacyconfs
+        self.grubenvs = GRUBENVS if grubenvs is None else grubenvs
+        self.blsdir = blsdir
+        self.mkconfigs = MKCONFIGS if mkconfigs is None else mkconfigs
+        self.lock = threading.RLock()
+        # path -> (stamp, list of lines)
+        self.files = {}
+        # arguments scheduled to be added to and removed from the entries
+        self.pending = False
+        self.pendingadd = []
+        self.pendingremove = []
+        # rule number -> (add, remove) scheduled by that rule
+        self.pendingrules = {}
+
+    def refresh(self):
+        '''Forget everything read so far'''
+        with self.lock:
+            self.files = {}
+
+    def getstamp(self, path):
+        '''Return (inode, mtime, size) of path or None if it is missing'''
+        try:
+            fstat = os.stat(path)
+        except OSError:
+            return None
+        return (fstat.st_ino, fstat.st_mtime_ns, fstat.st_size)
+
+    def readlines(self, path):
+        '''Return the lines of a file, reading it only if it changed since
+        the last call
+
+        :param path: string
+        :returns: list of lines, empty if the file is missing
+        '''
+        stamp = self.getstamp(path)
+        if stamp is None:
+            return []
+        with self.lock:
+            cached = self.files.get(path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        try:
+            with open(path) as fhandle:
+                lines = fhandle.readlines()
+        except (IOError, OSError, UnicodeDecodeError) as err:
+            self.logger.log(LogPriority.DEBUG,
+                            ['BootLoader.readlines',
+                             'Unable to read ' + path + ': ' + str(err)])
+            return []
+        with self.lock:
+            self.files[path] = (stamp, lines)
+        return lines
+
+    def findfirst(self, paths):
+        '''Return the first of paths that is a file, or an empty string'''
+        for path in paths:
+            if os.path.isfile(path):
+                return path
+        return ''
+
+    def getversion(self):
+        '''Return 2 for GRUB 2, 1 for GRUB 0.97 and 0 if neither is
+        configured
+
+        :returns: int
+        '''
+        if os.path.isfile(self.defaultgrub):
+            return 2
+        if self.findfirst(self.legacyconfs):
+            return 1
+        return 0
+
+    def getconfpath(self):
+        '''Return the file rules edit to change the kernel command line,
+        the template of GRUB 2 or grub.conf of GRUB 0.97
+
+        :returns: string, empty if there is no boot loader configuration
+        '''
+        version = self.getversion()
+        if version == 2:
+            return self.defaultgrub
+        if version == 1:
+            return self.findfirst(self.legacyconfs)
+        return ''
+
+    def getgrubcfg(self):
+        '''Return the path of the generated grub.cfg or an empty string'''
+        return self.findfirst(self.grubcfgs)
+
+    def gettemplate(self):
+        '''Return the kernel arguments of the template by key. A key which is
+        assigned several times has the value of the last assignment.
+
+        :returns: dict of key -> (list of arguments, line number)
+        '''
+        template = {}
+        for lineno, line in enumerate(self.readlines(self.defaultgrub), 1):
+            stripped = line.strip()
+            if stripped.startswith('export '):
+                stripped = stripped[7:].lstrip()
+            key, sep, value = stripped.partition('=')
+            if sep and key in CMDLINEKEYS:
+                template[key] = (splitvalue(value), lineno)
+        return template
+
+    def gettemplateargs(self):
+        '''Return the kernel arguments of all template keys
+
+        :returns: list
+        '''
+        template = self.gettemplate()
+        args = []
+        for key in CMDLINEKEYS:
+            args.extend(template.get(key, ([], 0))[0])
+        return args
+
+    def getenv(self):
+        '''Return the variables saved in grubenv
+
+        :returns: dict
+        '''
+        env = {}
+        for line in self.readlines(self.findfirst(self.grubenvs)):
+            if line.startswith('#'):
+                continue
+            key, sep, value = line.rstrip('\n').partition('=')
+            if sep:
+                env[key] = value
+        return env
+
+    def expand(self, args, variables):
+        '''Return args with $name and ${name} replaced by the arguments the
+        variable holds. Unknown variables expand to nothing, as in grub.
+
+        :param args: list of kernel arguments
+        :param variables: dict of name -> string
+        :returns: list
+        '''
+        expanded = []
+        for arg in args:
+            match = re.match(r'^\$\{?(\w+)\}?$', arg)
+            if match:
+                expanded.extend(variables.get(match.group(1), '').split())
+            else:
+                expanded.append(arg)
+        return expanded
+
+    def parsegrubcfg(self, path):
+        '''Return the menu entries of grub.cfg, whether it loads the BLS
+        entries and the variables it sets
+
+        :param path: string
+        :returns: tuple (list of BootEntry, bool, dict)
+        '''
+        entries = []
+        usesbls = False
+        variables = {}
+        title = ''
+        for lineno, line in enumerate(self.readlines(path), 1):
+            fields = line.split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            if fields[0] == 'menuentry':
+                try:
+                    title = shlex.split(line)[1]
+                except (ValueError, IndexError):
+                    title = ' '.join(fields[1:2]).strip('\'"')
+            elif fields[0] == 'blscfg':
+                usesbls = True
+            elif fields[0] == 'set' and len(fields) > 1:
+                name, sep, value = line.strip()[4:].partition('=')
+                if sep:
+                    variables[name.strip()] = ' '.join(splitvalue(value))
+            elif fields[0] in KERNELCOMMANDS and len(fields) > 1:
+                entries.append(BootEntry(title, fields[1], fields[2:], path,
+                                         lineno))
+        return entries, usesbls, variables
+
+    def parsebls(self, variables):
+        '''Return the BLS entries with their variables expanded
+
+        :param variables: dict of name -> string used for expansion
+        :returns: list of BootEntry
+        '''
+        try:
+            names = sorted(os.listdir(self.blsdir))
+        except OSError:
+            return []
+        entries = []
+        for name in names:
+            if not name.endswith('.conf'):
+                continue
+            path = os.path.join(self.blsdir, name)
+            title = name[:-5]
+            kernel = ''
+            args = []
+            optionsline = 0
+            for lineno, line in enumerate(self.readlines(path), 1):
+                key, _, value = line.strip().partition(' ')
+                if key == 'title':
+                    title = value.strip()
+                elif key == 'linux':
+                    kernel = value.strip()
+                elif key == 'options':
+                    args.extend(value.split())
+                    optionsline = optionsline or lineno
+            entries.append(BootEntry(title, kernel,
+                                     self.expand(args, variables), path,
+                                     optionsline))
+        return entries
+
+    def parselegacy(self, path):
+        '''Return the entries of a GRUB 0.97 configuration
+
+        :param path: string
+        :returns: list of BootEntry
+        '''
+        entries = []
+        title = ''
+        for lineno, line in enumerate(self.readlines(path), 1):
+            fields = line.split()
+            if not fields:
+                continue
+            if fields[0] == 'title':
+                title = ' '.join(fields[1:])
+            elif fields[0] == 'kernel' and len(fields) > 1:
+                entries.append(BootEntry(title, fields[1], fields[2:], path,
+                                         lineno))
+        return entries
+
+    def getentries(self):
+        '''Return the boot entries with the kernel arguments they boot with.
+        While a regeneration is pending the scheduled changes are applied to
+        the arguments of each entry.
+
+        :returns: list of BootEntry
+        '''
+        version = self.getversion()
+        if version == 1:
+            return self.parselegacy(self.findfirst(self.legacyconfs))
+        if version != 2:
+            return []
+        entries, usesbls, variables = self.parsegrubcfg(self.getgrubcfg())
+        if variables.get('default_kernelopts'):
+            variables.setdefault('kernelopts',
+                                 variables['default_kernelopts'])
+        variables.update(self.getenv())
+        entries = [entry._replace(args=self.expand(entry.args, variables))
+                   for entry in entries]
+        if usesbls:
+            entries.extend(self.parsebls(variables))
+        with self.lock:
+            if self.pending:
+                entries = [entry._replace(args=applyargs(entry.args,
+                                                         self.pendingadd,
+                                                         self.pendingremove))
+                           for entry in entries]
+        return entries
+
+    def isrecovery(self, entry):
+        '''Return whether an entry is a recovery, rescue or memory test
+        entry, which do not get the arguments of the default entries
+
+        :param entry: BootEntry
+        :returns: bool
+        '''
+        if 'single' in entry.args or 'recovery' in entry.args:
+            return True
+        title = entry.title.lower()
+        return 'rescue' in title or 'memtest' in entry.kernel.lower()
+
+    def hasarg(self, arg):
+        '''Return whether a kernel argument is in effect: it is in the
+        template, for GRUB 2, and on the kernel line of every boot entry
+        other than the recovery entries
+
+        :param arg: argument such as audit=1
+        :returns: bool
+        '''
+        version = self.getversion()
+        if version == 0:
+            return False
+        if version == 2 and arg not in self.gettemplateargs():
+            return False
+        entries = [entry for entry in self.getentries()
+                   if not self.isrecovery(entry)]
+        if version == 1 and not entries:
+            return False
+        return all(arg in entry.args for entry in entries)
+
+    def isset(self, arg):
+        '''Return whether a kernel argument is anywhere in the boot loader
+        configuration, in the template or on any boot entry
+
+        :param arg: argument such as fips=1
+        :returns: bool
+        '''
+        if arg in self.gettemplateargs():
+            return True
+        return any(arg in entry.args for entry in self.getentries())
+
+    def missing(self, args):
+        '''Return the kernel arguments which are not in effect
+
+        :param args: list of arguments
+        :returns: list of arguments, in the order passed
+        '''
+        return [arg for arg in args if not self.hasarg(arg)]
+
+    def describe(self, arg):
+        '''Return where a kernel argument is missing, for the detailed
+        results of a rule
+
+        :param arg: string
+        :returns: string
+        '''
+        version = self.getversion()
+        if version == 0:
+            return arg + " cannot be set, no grub configuration was found"
+        if version == 2 and arg not in self.gettemplateargs():
+            return arg + " is not set in " + ' or '.join(CMDLINEKEYS) + \
+                " of " + self.defaultgrub
+        lacking = [entry for entry in self.getentries()
+                   if not self.isrecovery(entry) and arg not in entry.args]
+        if not lacking:
+            if self.hasarg(arg):
+                return arg + " is set on all boot entries"
+            return arg + " is not set, no boot entries were found in " + \
+                self.getconfpath()
+        return arg + " is missing from the boot entries:\n" + \
+            '\n'.join("'" + entry.title + "' in " + entry.path + " line " +
+                      str(entry.lineno) for entry in lacking)
+
+    def render(self, add=(), remove=()):
+        '''Return the contents of the configuration rules edit with kernel
+        arguments added and removed. For GRUB 2 arguments are added to
+        GRUB_CMDLINE_LINUX, unless already in the template, and removed from
+        both keys. For GRUB 0.97 every kernel line is edited.
+
+        :param add: arguments to add
+        :param remove: arguments to remove
+        :returns: tuple (path, string contents, bool changed)
+        '''
+        path = self.getconfpath()
+        if not path:
+            return '', '', False
+        lines = list(self.readlines(path))
+        if self.getversion() == 1:
+            for index, line in enumerate(lines):
+                fields = line.split()
+                if len(fields) < 2 or fields[0] != 'kernel':
+                    continue
+                args = applyargs(fields[2:], add, remove)
+                if args != fields[2:]:
+                    indent = line[:len(line) - len(line.lstrip())]
+                    lines[index] = indent + ' '.join(fields[:2] + args) + \
+                        '\n'
+            contents = ''.join(lines)
+            return path, contents, contents != ''.join(self.readlines(path))
+        template = self.gettemplate()
+        present = self.gettemplateargs()
+        # other values of an added name=value go from both keys
+        replaced = set(argname(arg) for arg in add if '=' in arg)
+        for key in CMDLINEKEYS:
+            if key not in template:
+                continue
+            args, lineno = template[key]
+            keyadd = []
+            if key == 'GRUB_CMDLINE_LINUX':
+                keyadd = [arg for arg in add if arg not in present]
+            newargs = [arg for arg in applyargs(args, keyadd, remove)
+                       if arg in add or '=' not in arg or
+                       argname(arg) not in replaced]
+            if newargs != args:
+                lines[lineno - 1] = key + '="' + ' '.join(newargs) + '"\n'
+        if 'GRUB_CMDLINE_LINUX' not in template:
+            newargs = [arg for arg in add if arg not in present]
+            if newargs:
+                if lines and not lines[-1].endswith('\n'):
+                    lines[-1] += '\n'
+                lines.append('GRUB_CMDLINE_LINUX="' + ' '.join(newargs) +
+                             '"\n')
+        contents = ''.join(lines)
+        return path, contents, contents != ''.join(self.readlines(path))
+
+    def schedule(self, add=(), remove=(), rulenumber=None):
+        '''Record that the kernel command line was changed and grub.cfg must
+        be generated again. Nothing is generated for GRUB 0.97, whose kernel
+        lines are edited in place.
+
+        :param add: arguments added
+        :param remove: arguments removed
+        :param rulenumber: number of the rule making the change, under which
+            the undo events of rewritten BLS entries are recorded
+        '''
+        if self.getversion() != 2:
+            return
+        with self.lock:
+            self.pending = True
+            self.pendingadd = applyargs(self.pendingadd, add, remove)
+            self.pendingremove = applyargs(self.pendingremove, remove, add)
+            if add or remove:
+                ruleadd, ruleremove = self.pendingrules.get(rulenumber,
+                                                            ([], []))
+                self.pendingrules[rulenumber] = \
+                    (applyargs(ruleadd, add, remove),
+                     applyargs(ruleremove, remove, add))
+
+    def schedulechanged(self, stamp):
+        '''Schedule a regeneration if the GRUB 2 template changed since
+        stamp was taken, e.g. because an undo restored it
+
+        :param stamp: value of getstamp() for the template
+        '''
+        if self.getstamp(self.defaultgrub) != stamp:
+            self.schedule()
+
+    def ispending(self):
+        '''Return whether a regeneration is pending'''
+        with self.lock:
+            return self.pending
+
+    def getmkconfig(self):
+        '''Return the command which generates grub.cfg or an empty string'''
+        command = self.findfirst(self.mkconfigs)
+        if not command or 'update-grub' in command:
+            return command
+        grubcfg = self.getgrubcfg()
+        if not grubcfg:
+            grubcfg = self.grubcfgs[0]
+            if 'grub2' not in command and len(self.grubcfgs) > 1:
+                grubcfg = self.grubcfgs[1]
+        return command + ' -o ' + grubcfg
+
+    def regenerate(self, statechglogger=None):
+        '''Generate grub.cfg from the template if a rule changed the kernel
+        command line. grub-mkconfig does not change BLS entries whose
+        options are written out instead of using $kernelopts, so the
+        changes scheduled by each rule are applied to those directly, other
+        than to the recovery entries, and recorded as change events of that
+        rule.
+
+        :param statechglogger: StateChgLogger used to record the changes to
+            BLS entries, nothing is recorded if None
+        :returns: bool - False if grub.cfg could not be generated
+        '''
+        with self.lock:
+            if not self.pending:
+                return True
+            rules = self.pendingrules
+            self.pending = False
+            self.pendingadd = []
+            self.pendingremove = []
+            self.pendingrules = {}
+        success = True
+        command = self.getmkconfig()
+        if not command:
+            self.logger.log(LogPriority.DEBUG,
+                            ['BootLoader.regenerate',
+                             'No grub configuration generator was found'])
+            success = False
+        else:
+            self.logger.log(LogPriority.DEBUG,
+                            ['BootLoader.regenerate', 'Running ' + command])
+            cmdhelper = CommandHelper(self.logger)
+            cmdhelper.executeCommand(command)
+            if cmdhelper.getReturnCode() != 0:
+                self.logger.log(LogPriority.DEBUG,
+                                ['BootLoader.regenerate',
+                                 command + ' failed: ' +
+                                 cmdhelper.getErrorString()])
+                success = False
+        if rules and self.parsegrubcfg(self.getgrubcfg())[1]:
+            entries = [entry for entry in self.parsebls({})
+                       if not self.isrecovery(entry)]
+            for rulenumber, (add, remove) in rules.items():
+                recorder = statechglogger if rulenumber else None
+                for index, entry in enumerate(entries):
+                    eventid = ''
+                    if recorder:
+                        eventid = iterate(BLSEVENTS + index, rulenumber)
+                    if not self.rewritebls(entry.path, add, remove, recorder,
+                                           eventid):
+                        success = False
+                if recorder:
+                    recorder.syncrule(rulenumber)
+        return success
+
+    def rewritebls(self, path, add, remove, statechglogger=None,
+                   eventid=''):
+        '''Apply kernel argument changes to the literal options of a BLS
+        entry, leaving variables such as $kernelopts to grubenv
+
+        :param path: path of the entry
+        :param add: arguments to add
+        :param remove: arguments to remove
+        :param statechglogger: StateChgLogger to record the change with
+        :param eventid: id of the change event to record
+        :returns: bool - False if the entry could not be written
+        '''
+        lines = list(self.readlines(path))
+        changed = False
+        for index, line in enumerate(lines):
+            key, _, value = line.strip().partition(' ')
+            if key != 'options' or '$' in value:
+                continue
+            args = value.split()
+            newargs = applyargs(args, add, remove)
+            if newargs != args:
+                lines[index] = 'options ' + ' '.join(newargs) + '\n'
+                changed = True
+        if not changed:
+            return True
+        tmpfile = path + '.stonixtmp'
+        try:
+            with open(tmpfile, 'w') as fhandle:
+                fhandle.writelines(lines)
+            shutil.copymode(path, tmpfile)
+            if statechglogger and eventid:
+                statechglogger.recordchgevent(eventid,
+                                              {"eventtype": "conf",
+                                               "filepath": path})
+                statechglogger.recordfilechange(path, tmpfile, eventid)
+            os.rename(tmpfile, path)
+        except (IOError, OSError) as err:
+            self.logger.log(LogPriority.DEBUG,
+                            ['BootLoader.rewritebls',
+                             'Unable to write ' + path + ': ' + str(err)])
+            return False
+        return True
@@ -0,0 +1,339 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Append-only store for the change events recorded by the StateChgLogger.
+
+Every recorded or deleted event is appended to a journal file as a length
+prefixed pickle record; nothing already written is rewritten. When the
+journal is opened it is read once to rebuild the events in memory together
+with an index of event codes by rule number (the first four digits of the
+event code), so looking up the changes made by one rule does not touch the
+events of any other rule.
+
+Appended records are flushed to the operating system immediately but the
+fsync is deferred until sync() is called for a rule that has unsynced
+events, normally once the rule has finished its fix, or until MAXPENDING
+records are waiting.
+
+If no journal exists yet the events of an old shelve based eventlog are
+copied into a new journal once and the shelve files are renamed with a
+.migrated suffix.
+"""
+
+import os
+import pickle
+import shelve
+import struct
+import tempfile
+import threading
+import traceback
+
+from stonix_resources.logdispatcher import LogPriority
+
+JOURNAL = '/var/db/stonix/eventjournal'
+OLDEVENTLOG = '/var/db/stonix/eventlog'
+
+MAGIC = b'STONIXEVENTS1\n'
+HEADER = struct.Struct('>I')
+
+# Record operations
+RECORD = 'set'
+DELETE = 'del'
+
+# Number of unsynced records after which an fsync is done regardless of
+# which rules they belong to
+MAXPENDING = 256
+
+# Suffixes the dbm modules behind shelve may add to the eventlog name
+SHELVESUFFIXES = ['', '.db', '.dat', '.dir', '.bak', '.pag']
+
+
+def ruleprefix(eventcode):
+    '''Return the rule number part of an event code
+
+    :param eventcode: string
+    :returns: string
+    '''
+    return str(eventcode)[0:4]
+
+
+class ChangeEventStore(object):
+    '''Journal backed store of change events with a per rule index.'''
+
+    def __init__(self, logger, journal=JOURNAL, oldeventlog=OLDEVENTLOG):
+        '''
+        :param logger: logdispatcher object
+        :param journal: path of the journal file
+        :param oldeventlog: path of the shelve eventlog to migrate from
+        '''
+        self.logger = logger
+        self.journal = journal
+        self.oldeventlog = oldeventlog
+        self.lock = threading.RLock()
+        # eventcode -> eventdict
+        self.events = {}
+        # rule number -> dict of eventcode -> None, kept in record order
+        self.byrule = {}
+        # rule numbers with records that have not been synced yet
+        self.pending = set()
+        self.npending = 0
+        # records in the journal, live or not
+        self.nrecords = 0
+        self.handle = None
+        if not os.path.exists(self.journal):
+            self.migrate()
+        self.load()
+        if self.nrecords > 2 * len(self.events) + MAXPENDING:
+            self.compact()
+        self.handle = open(self.journal, 'ab')
+
+    def migrate(self):
+        '''Copy the events of an old shelve eventlog into a new journal and
+        rename the shelve files. Does nothing if there is no old eventlog.
+        '''
+        shelvefiles = [self.oldeventlog + suffix for suffix in SHELVESUFFIXES
+                       if os.path.isfile(self.oldeventlog + suffix)]
+        if not shelvefiles:
+            return
+        events = {}
+        try:
+            oldlog = shelve.open(self.oldeventlog, 'r')
+            try:
+                for key in list(oldlog.keys()):
+                    events[key] = oldlog[key]
+            finally:
+                oldlog.close()
+        except Exception:
+            # an eventlog written by the python 2 version of stonix cannot be
+            # read; it is set aside and the journal starts empty
+            self.logger.log(LogPriority.ERROR,
+                            ['ChangeEventStore.migrate',
+                             'Unable to read old eventlog ' +
+                             self.oldeventlog + ': ' +
+                             traceback.format_exc()])
+            events = {}
+        self.writejournal(events)
+        for path in shelvefiles:
+            os.rename(path, path + '.migrated')
+        self.logger.log(LogPriority.DEBUG,
+                        ['ChangeEventStore.migrate',
+                         'Migrated ' + str(len(events)) +
+                         ' events from ' + self.oldeventlog])
+
+    def writejournal(self, events):
+        '''Atomically replace the journal with one holding the passed events
+
+        :param events: dict of eventcode -> eventdict
+        '''
+        dirname = os.path.dirname(self.journal) or '.'
+        fd, tmpname = tempfile.mkstemp(dir=dirname, prefix='.eventjournal')
+        try:
+            with os.fdopen(fd, 'wb') as fhandle:
+                fhandle.write(MAGIC)
+                for eventcode, eventdict in events.items():
+                    fhandle.write(self.encode(RECORD, eventcode, eventdict))
+                fhandle.flush()
+                os.fsync(fhandle.fileno())
+            os.chmod(tmpname, 0o600)
+            os.rename(tmpname, self.journal)
+        except Exception:
+            if os.path.exists(tmpname):
+                os.remove(tmpname)
+            raise
+        self.nrecords = len(events)
+
+    def encode(self, operation, eventcode, eventdict):
+        '''Return the journal bytes for one record'''
+        data = pickle.dumps((operation, eventcode, eventdict),
+                            pickle.HIGHEST_PROTOCOL)
+        return HEADER.pack(len(data)) + data
+
+    def load(self):
+        '''Read the journal and rebuild the events and the rule index. A
+        truncated record at the end of the journal, left by an interrupted
+        write, is cut off.
+        '''
+        self.events = {}
+        self.byrule = {}
+        self.nrecords = 0
+        if not os.path.exists(self.journal):
+            fd = os.open(self.journal, os.O_WRONLY | os.O_CREAT | os.O_EXCL,
+                         0o600)
+            with os.fdopen(fd, 'wb') as fhandle:
+                fhandle.write(MAGIC)
+            return
+        with open(self.journal, 'rb') as fhandle:
+            if fhandle.read(len(MAGIC)) != MAGIC:
+                self.discard('bad journal header')
+                return
+            good = fhandle.tell()
+            while True:
+                header = fhandle.read(HEADER.size)
+                if len(header) < HEADER.size:
+                    break
+                size = HEADER.unpack(header)[0]
+                data = fhandle.read(size)
+                if len(data) < size:
+                    break
+                try:
+                    operation, eventcode, eventdict = pickle.loads(data)
+                except Exception:
+                    break
+                self.apply(operation, eventcode, eventdict)
+                self.nrecords += 1
+                good = fhandle.tell()
+            end = fhandle.seek(0, os.SEEK_END)
+        if good < end:
+            self.logger.log(LogPriority.WARNING,
+                            ['ChangeEventStore.load',
+                             'Discarding ' + str(end - good) +
+                             ' bytes of incomplete records at the end of ' +
+                             self.journal])
+            with open(self.journal, 'r+b') as fhandle:
+                fhandle.truncate(good)
+
+    def discard(self, reason):
+        '''Set an unreadable journal aside and start a new one'''
+        self.logger.log(LogPriority.ERROR,
+                        ['ChangeEventStore.load',
+                         'Unable to use ' + self.journal + ' (' + reason +
+                         '), moving it to ' + self.journal + '.bad'])
+        os.rename(self.journal, self.journal + '.bad')
+        self.writejournal({})
+
+    def apply(self, operation, eventcode, eventdict):
+        '''Apply one record to the in memory events and rule index'''
+        rulekeys = self.byrule.setdefault(ruleprefix(eventcode), {})
+        if operation == DELETE:
+            self.events.pop(eventcode, None)
+            rulekeys.pop(eventcode, None)
+        else:
+            self.events[eventcode] = eventdict
+            rulekeys[eventcode] = None
+
+    def append(self, operation, eventcode, eventdict):
+        '''Append one record to the journal and apply it'''
+        with self.lock:
+            if self.handle is None:
+                raise ValueError('Change event store is closed')
+            self.handle.write(self.encode(operation, eventcode, eventdict))
+            self.handle.flush()
+            self.apply(operation, eventcode, eventdict)
+            self.nrecords += 1
+            self.pending.add(ruleprefix(eventcode))
+            self.npending += 1
+            if self.npending >= MAXPENDING:
+                self.sync()
+
+    def compact(self):
+        '''Rewrite the journal so that it only holds the live events'''
+        with self.lock:
+            reopen = self.handle is not None
+            if reopen:
+                self.handle.close()
+            self.writejournal(self.events)
+            self.pending = set()
+            self.npending = 0
+            if reopen:
+                self.handle = open(self.journal, 'ab')
+
+    def record(self, eventcode, eventdict):
+        '''Store an event, replacing any event with the same code
+
+        :param eventcode: string
+        :param eventdict: dict
+        '''
+        self.append(RECORD, eventcode, eventdict)
+
+    def get(self, eventcode):
+        '''Return the event stored under the passed code. Raises KeyError if
+        there is none.
+
+        :param eventcode: string
+        :returns: dict
+        '''
+        with self.lock:
+            return self.events[eventcode]
+
+    def delete(self, eventcode):
+        '''Remove an event. Raises KeyError if there is none.
+
+        :param eventcode: string
+        '''
+        with self.lock:
+            if eventcode not in self.events:
+                raise KeyError(eventcode)
+            self.append(DELETE, eventcode, None)
+
+    def rulekeys(self, ruleid):
+        '''Return the codes of the events recorded for a rule, oldest first
+
+        :param ruleid: four digit zero padded rule number
+        :returns: list of strings
+        '''
+        with self.lock:
+            return list(self.byrule.get(ruleid, {}))
+
+    def keys(self):
+        '''Return the codes of all stored events'''
+        with self.lock:
+            return list(self.events)
+
+    def sync(self, ruleid=None):
+        '''Force records to disk. With a rule id nothing is done unless that
+        rule has unsynced records.
+
+        :param ruleid: optional four digit zero padded rule number
+        '''
+        with self.lock:
+            if self.handle is None or not self.pending:
+                return
+            if ruleid is not None and ruleid not in self.pending:
+                return
+            self.handle.flush()
+            os.fsync(self.handle.fileno())
+            self.pending = set()
+            self.npending = 0
+
+    def close(self):
+        '''Sync and close the journal. Closing twice is harmless.'''
+        with self.lock:
+            if self.handle is None:
+                return
+            self.sync()
+            self.handle.close()
+            self.handle = None
+
+    def __getitem__(self, eventcode):
+        return self.get(eventcode)
+
+    def __setitem__(self, eventcode, eventdict):
+        self.record(eventcode, eventdict)
+
+    def __delitem__(self, eventcode):
+        self.delete(eventcode)
+
+    def __contains__(self, eventcode):
+        with self.lock:
+            return eventcode in self.events
+
+    def __len__(self):
+        with self.lock:
+            return len(self.events)
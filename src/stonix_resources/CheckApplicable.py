@@ -26,12 +26,259 @@ Created on Aug 24, 2010
                         internal os variables per the environment.
 @change: 2017/11/13 ekkehard - make eligible for OS X El Capitan 10.11+
 @change: 2018/06/08 ekkehard - make eligible for macOS Mojave 10.14
+@change: 2026/10/18 - Added compiled applicability predicates shared by
+        Rule.isapplicable, findapplicable and this class
 '''
 
 import re
+import threading
 from distutils.version import LooseVersion
+from functools import lru_cache
 from .logdispatcher import LogPriority
 
+# frozen applicable dict -> ApplicablePredicate
+_predicates = {}
+# (frozen applicable dict, environment fingerprint) -> bool
+_results = {}
+_cachelock = threading.Lock()
+
+
+@lru_cache(maxsize=None)
+def looseversion(version):
+    '''Return the LooseVersion for a version string. Rules share a handful
+    of version strings so the parsed versions are kept.
+
+    :param version: string
+    :returns: LooseVersion
+    '''
+    return LooseVersion(version)
+
+
+def freeze(value):
+    '''Return a hashable copy of an applicable dictionary or one of its
+    values.
+
+    :param value: dict, list, tuple or scalar
+    :returns: hashable object
+    '''
+    if isinstance(value, dict):
+        return tuple(sorted((key, freeze(item)) for key, item in
+                            value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def fingerprint(environ):
+    '''Return the environment values applicability depends on
+
+    :param environ: environment object
+    :returns: tuple (family, ostype, osversion, euid, fismacat)
+    '''
+    return (environ.getosfamily(), environ.getostype(), environ.getosver(),
+            environ.geteuid(), environ.getsystemfismacat())
+
+
+def raiser(error):
+    '''Return a version test that raises error. Malformed version lists only
+    raise once a rule's os type matches, as they always have.'''
+    def test(version):
+        raise error
+    return test
+
+
+@lru_cache(maxsize=None)
+def compileversions(versions):
+    '''Return a function that takes an os version string and tells whether
+    it matches the version list of an applicable 'os' entry. See
+    CheckApplicable.isApplicable for the list format.
+
+    :param versions: tuple of version list entries
+    :returns: function taking a version string and returning bool
+    '''
+    if '+' in versions:
+        if len(versions) != 2:
+            return raiser(AssertionError('Wrong number of entries for a +'))
+        base = looseversion(versions[0] if versions[1] == '+'
+                            else versions[1])
+        return lambda version: looseversion(version) >= base
+    elif '-' in versions:
+        if len(versions) != 2:
+            return raiser(AssertionError('Wrong number of entries for a -'))
+        base = looseversion(versions[0] if versions[1] == '-'
+                            else versions[1])
+        return lambda version: looseversion(version) <= base
+    elif 'r' in versions:
+        if len(versions) != 3:
+            return raiser(AssertionError('Wrong number of entries for a '
+                                         'range'))
+        ends = [ver for ver in versions if ver != 'r']
+        first = looseversion(ends[0])
+        second = looseversion(ends[1])
+        if first == second:
+            return raiser(ValueError('Range versions are the same'))
+        low, high = min(first, second), max(first, second)
+        return lambda version: low <= looseversion(version) <= high
+    else:
+        return lambda version: version in versions
+
+
+class ApplicablePredicate(object):
+    '''An applicable dictionary turned into a test against environment
+    values. The dictionary is examined once when the predicate is built.
+    '''
+
+    def __init__(self, applicable):
+        '''
+        :param applicable: dict - a rule's applicable property
+        '''
+        self.default = 'os' not in applicable and \
+            'family' not in applicable and \
+            applicable.get('default') == 'default'
+        self.listtype = applicable.get('type', 'black')
+        families = applicable.get('family', [])
+        if not isinstance(families, str):
+            families = list(families)
+        self.families = families
+        self.oslist = [(re.compile(ostype), compileversions(freeze(versions)))
+                       for ostype, versions in
+                       applicable.get('os', {}).items()]
+        self.noroot = applicable.get('noroot') == True
+        self.fisma = applicable.get('fisma', '')
+
+    def matches(self, family, ostype, osversion):
+        '''Apply the list type, family and os entries
+
+        :param family: os family string
+        :param ostype: os type string
+        :param osversion: os version string
+        :returns: bool
+        '''
+        assert self.listtype in ['white', 'black'], \
+            'Invalid list type specified: %r' % self.listtype
+        matched = family in self.families
+        for ostypere, versiontest in self.oslist:
+            if ostypere.search(ostype) and versiontest(osversion):
+                matched = True
+        if self.listtype == 'black':
+            return not matched
+        return matched
+
+    def __call__(self, envprint):
+        '''Evaluate the predicate the way Rule.isapplicable does
+
+        :param envprint: tuple as returned by fingerprint()
+        :returns: bool
+        '''
+        if self.default:
+            return True
+        family, ostype, osversion, euid, systemfismacat = envprint
+        applies = self.matches(family, ostype, osversion)
+        if applies and euid == 0 and self.noroot:
+            applies = False
+        if applies:
+            if systemfismacat not in ['high', 'med', 'low']:
+                raise ValueError('SystemFismaCat invalid: valid values are '
+                                 'low, med, high')
+            if self.fisma and self.fisma not in ['high', 'med', 'low']:
+                raise ValueError('fisma value invalid: valid values are low, '
+                                 'med, high')
+            if systemfismacat == 'med' and self.fisma == 'high':
+                applies = False
+            elif systemfismacat == 'low' and self.fisma in ['med', 'high']:
+                applies = False
+        return applies
+
+
+def getpredicate(applicable, logger=None):
+    '''Return the compiled predicate for an applicable dictionary, building
+    it the first time the dictionary is seen.
+
+    :param applicable: dict
+    :param logger: optional logdispatcher object
+    :returns: ApplicablePredicate
+    '''
+    key = freeze(applicable)
+    with _cachelock:
+        predicate = _predicates.get(key)
+    if predicate is None:
+        if logger:
+            logger.log(LogPriority.DEBUG,
+                       'Compiling applicability for: ' + str(applicable))
+        predicate = ApplicablePredicate(applicable)
+        with _cachelock:
+            _predicates[key] = predicate
+    return predicate
+
+
+def evaluateapplicable(applicable, environ, logger, rulename='',
+                       envprint=None):
+    '''Return True if a rule with the passed applicable dictionary applies
+    to the platform described by environ. Results are cached per
+    applicable dictionary and environment fingerprint; only the first
+    evaluation is logged.
+
+    :param applicable: dict - the rule's applicable property
+    :param environ: environment object
+    :param logger: logdispatcher object
+    :param rulename: name of the rule, used in log messages
+    :param envprint: optional fingerprint(environ), for callers evaluating
+        many rules at once
+    :returns: bool
+    '''
+    if envprint is None:
+        envprint = fingerprint(environ)
+    key = (freeze(applicable), envprint)
+    with _cachelock:
+        applies = _results.get(key)
+    if applies is None:
+        applies = getpredicate(applicable, logger)(envprint)
+        with _cachelock:
+            _results[key] = applies
+        logger.log(LogPriority.DEBUG,
+                   'Applicability for ' + rulename + ': ' + str(applies))
+    return applies
+
+
+def overridesapplicable(rule):
+    '''Return True if the rule's class, or a template between it and Rule,
+    defines its own isapplicable. Classes are compared by name because the
+    rules import the template as "rule" rather than "stonix_resources.rule".
+
+    :param rule: rule instance
+    :returns: bool
+    '''
+    for klass in type(rule).__mro__:
+        if 'isapplicable' in klass.__dict__:
+            return klass.__name__ != 'Rule'
+    return False
+
+
+def evaluaterules(rules, environ, logger):
+    '''Return the applicability of each rule in one pass. The environment is
+    read once; rules sharing an applicable dictionary share the result.
+    Rules that override isapplicable are asked directly. Exceptions raised
+    for a rule are returned in its place.
+
+    :param rules: list of rule instances
+    :param environ: environment object
+    :param logger: logdispatcher object
+    :returns: list of bool or Exception, in the order of rules
+    '''
+    envprint = fingerprint(environ)
+    results = []
+    for rule in rules:
+        try:
+            if overridesapplicable(rule):
+                results.append(rule.isapplicable())
+            else:
+                results.append(evaluateapplicable(rule.applicable, environ,
+                                                  logger, rule.rulename,
+                                                  envprint))
+        except Exception as err:
+            results.append(err)
+    return results
+
 
 class CheckApplicable(object):
     '''This class uses either the passed in 'environment', or operating system
@@ -194,39 +441,8 @@ class CheckApplicable(object):
         else:
             self.logger.log(LogPriority.DEBUG, "applicable appears to be valid.")
 
-        # Determine whether we are a blacklist or a whitelist, default to a
-        # blacklist
-        if 'type' in applicable:
-            listtype = applicable['type']
-        else:
-            listtype = 'black'
-        # Set the default return as appropriate to the list type
-        assert listtype in ['white', 'black'], 'Invalid list type specified: %r' % listtype
-        if listtype == 'black':
-            applies = True
-        else:
-            applies = False
-
-        # Process the os family list
-        if 'family' in applicable:
-            if self.myosfamily in applicable['family']:
-                if listtype == 'black':
-                    applies = False
-                else:
-                    applies = True
-                self.logger.log(LogPriority.DEBUG,
-                                'Family match, applies: ' + str(applies))
-
-        # Process the OS list
-        if 'os' in applicable:
-            for ostype, osverlist in list(applicable['os'].items()):
-                if re.search(ostype, self.myostype):
-                    inRange = self.isInRange(osverlist)
-                    if inRange:
-                        if listtype == 'black':
-                            applies = False
-                        else:
-                            applies = True
+        applies = getpredicate(applicable, self.logger).matches(
+            self.myosfamily, self.myostype, self.myosversion)
 
         # Perform the rootless check
         if applies and self.environ.geteuid() == 0:
@@ -249,52 +465,7 @@ class CheckApplicable(object):
         '''
         if not myversion:
             myversion = self.myosversion
-        # Process version and up
-        if '+' in rangeList:
-            assert len(rangeList) is 2, "Wrong number of entries for a +"
-            if rangeList[1] == '+':
-                baseversion = rangeList[0]
-            else:
-                baseversion = rangeList[1]
-            if LooseVersion(self.myosversion) >= LooseVersion(baseversion):
-                return True
-            else:
-                return False
-        # Process version and lower
-        elif '-' in rangeList:
-            assert len(rangeList) is 2, "Wrong number of entries for a -"
-            if rangeList[1] == '-':
-                baseversion = rangeList[0]
-            else:
-                baseversion = rangeList[1]
-            if LooseVersion(self.myosversion) <= LooseVersion(baseversion):
-                return True
-            else:
-                return False
-        # Process inclusive range
-        elif 'r' in rangeList:
-            assert len(rangeList) is 3, "Wrong number of entries for a range"
-            vertmp = rangeList
-            vertmp.remove('r')
-            if LooseVersion(vertmp[0]) > LooseVersion(vertmp[1]):
-                highver = vertmp[0]
-                lowver = vertmp[1]
-            elif LooseVersion(vertmp[0]) < LooseVersion(vertmp[1]):
-                highver = vertmp[1]
-                lowver = vertmp[0]
-            else:
-                raise ValueError('Range versions are the same')
-            if LooseVersion(self.myosversion) <= LooseVersion(highver) \
-               and LooseVersion(self.myosversion) >= LooseVersion(lowver):
-                return True
-            else:
-                return False
-        # Process explicit match
-        else:
-            if self.myosversion in rangeList:
-                return True
-            else:
-                return False
+        return compileversions(freeze(rangeList))(myversion)
 
     def fismaApplicable(self, checkLevel=None, systemLevel=None):
         '''Check if the passed in level matches the class variable level.
@@ -34,16 +34,31 @@
 @change: 2019/08/07 Brandon R. Gonzales - Command output and error output are
         now being decoded to 'utf-8', and are being treated as 'str' types
         instead of 'bytes' types
+@change: 2026/10/18 - Timeouts use blocking waits and kill the command's
+        process group; added executeCommands to run commands concurrently
+@change: 2026/10/18 - Commands are counted by the rule profiler
         
 """
 
-import inspect
+import os
 import re
+import signal
 import subprocess
-import traceback
+import sys
 import time
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor
 
 from stonix_resources.logdispatcher import LogPriority
+from stonix_resources.RuleProfiler import recordcommand, getrecord, \
+    setrecord
+
+# Upper bound on the number of commands executeCommands runs at once
+MAXWORKERS = 8
+
+# Seconds a timed out command gets to exit after SIGTERM before SIGKILL
+KILLGRACE = 2
 
 
 class CommandHelper(object):
@@ -90,9 +105,11 @@ class CommandHelper(object):
         @author: Roy Nielsen
         """
         try:
-            filename = inspect.stack()[3][1]
-            functionName = str(inspect.stack()[3][3])
-            lineNumber = str(inspect.stack()[3][2])
+            frame = sys._getframe(3)
+            filename = frame.f_code.co_filename
+            functionName = str(frame.f_code.co_name)
+            lineNumber = str(frame.f_lineno)
+            del frame
         except Exception as err:
             raise err
         else:
@@ -604,31 +621,38 @@ class CommandHelper(object):
         self.stdout = []
         self.stderr = []
         self.output = []
+        starttime = time.time()
 
         try:
 
             if not self.setCommand(command):
                 success = False
                 return success
-            start_time = time.time()
             self.logdispatcher.log(LogPriority.DEBUG, "Beginning new command execution")
+            # a command with a time limit gets its own process group so
+            # that everything it started can be killed on timeout
             commandobj = subprocess.Popen(self.command,
                                           stdout=subprocess.PIPE,
                                           stderr=subprocess.PIPE,
-                                          shell=self.shell)
+                                          shell=self.shell,
+                                          start_new_session=bool(self.cmdtimeout))
+
+            outs = None
+            errs = None
 
             # if a time limit is specified for this command run,
             # time out if that limit is reached
             if self.cmdtimeout:
-                while commandobj.poll() is None:
-                    if time.time() - start_time >= self.cmdtimeout:
-                        commandobj.terminate()
-                        commandobj.returncode = -1
-                        self.logdispatcher.log(LogPriority.DEBUG, "Command run exceeded timeout limit. Command run aborted.")
-                        commandaborted = True
-                        break
+                try:
+                    if self.wait:
+                        outs, errs = commandobj.communicate(timeout=self.cmdtimeout)
                     else:
-                        continue
+                        commandobj.wait(timeout=self.cmdtimeout)
+                except subprocess.TimeoutExpired:
+                    self.killProcessGroup(commandobj)
+                    commandobj.returncode = -1
+                    self.logdispatcher.log(LogPriority.DEBUG, "Command run exceeded timeout limit. Command run aborted.")
+                    commandaborted = True
             if commandaborted:
                 success = False
                 self.returncode = commandobj.returncode
@@ -642,7 +666,8 @@ class CommandHelper(object):
             if self.wait:
 
                 if commandobj is not None:
-                    outs, errs = commandobj.communicate()
+                    if outs is None:
+                        outs, errs = commandobj.communicate()
                     outs = self.convert_bytes_to_string(outs)
                     errs = self.convert_bytes_to_string(errs)
                     outlines = outs.splitlines()
@@ -682,9 +707,87 @@ class CommandHelper(object):
             raise
         except Exception:
             self.logdispatcher.log(LogPriority.ERROR, str(traceback.format_exc()))
+        finally:
+            recordcommand(time.time() - starttime)
 
         return success
 
+    def killProcessGroup(self, commandobj):
+        """Terminate the process group of a timed out command, escalating to
+        SIGKILL if it has not exited after KILLGRACE seconds, and reap it.
+
+        :param commandobj: subprocess.Popen object started in its own session
+
+        """
+
+        try:
+            os.killpg(commandobj.pid, signal.SIGTERM)
+        except OSError:
+            pass
+        try:
+            commandobj.communicate(timeout=KILLGRACE)
+        except subprocess.TimeoutExpired:
+            try:
+                os.killpg(commandobj.pid, signal.SIGKILL)
+            except OSError:
+                pass
+            # a process that left the group may still hold the pipes open,
+            # so only wait for the command itself
+            commandobj.wait()
+        except (OSError, ValueError):
+            pass
+        for pipe in [commandobj.stdout, commandobj.stderr]:
+            try:
+                pipe.close()
+            except Exception:
+                pass
+
+    def executeCommands(self, commands, workers=None):
+        """Run several independent commands at once. Each command is run by
+        its own CommandHelper, set up like this one (timeout, wait, log
+        priority and regex flag), so the results can be read with the usual
+        getOutput, getErrorOutput, getReturnCode and findInOutput methods.
+        The state of this CommandHelper is not changed.
+
+        :param commands: list of commands, each a string or list
+        :param workers: int - number of commands to run at once. Defaults to
+            the number of CPUs, at most MAXWORKERS
+        :return: helpers
+        :rtype: list of CommandHelper objects in the order of commands
+
+        """
+
+        helpers = []
+        for command in commands:
+            helper = CommandHelper(self.logdispatcher)
+            helper.logpriority = self.logpriority
+            helper.flag = self.flag
+            helper.wait = self.wait
+            helper.cmdtimeout = self.cmdtimeout
+            helpers.append(helper)
+        if not helpers:
+            return helpers
+        if workers is None:
+            workers = min(os.cpu_count() or 1, MAXWORKERS)
+        workers = max(1, min(int(workers), len(helpers)))
+        if workers == 1:
+            for helper, command in zip(helpers, commands):
+                helper.executeCommand(command)
+        else:
+            # the commands count towards the profiled phase of the caller
+            record = getrecord()
+
+            def execute(pair):
+                setrecord(record)
+                try:
+                    return pair[0].executeCommand(pair[1])
+                finally:
+                    setrecord(None)
+
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                list(pool.map(execute, zip(helpers, commands)))
+        return helpers
+
     def findInOutput(self, expression, searchgroup="output", dtype="list"):
         """findInOutput (expression) finds an expression in the combined stderr
         and stdout
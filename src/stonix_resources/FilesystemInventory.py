@@ -0,0 +1,660 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Single pass filesystem inventory shared by all rules. Each local filesystem
+reported by getlocalfs() is walked once per run with os.scandir. Entries
+that any rule may ask about (world writable, SUID/SGID, unowned, and
+everything under the lib and bin directories) are kept in memory with their
+mode, uid, gid, inode and mtime. Rules query the inventory instead of
+walking the disk themselves.
+
+Use getinventory() to obtain the process wide instance. The walk is started
+lazily by the first query and is guarded by a lock so rules running on
+several threads share a single scan.
+
+When an index file is configured with useindex() the per directory records
+are saved at the end of the scan and used by the next run. A directory whose
+inode and mtime are unchanged since the saved scan is not read again; its
+recorded entries are re-checked with lstat and its saved subdirectories are
+descended into. Since changing the mode of an existing file does not change
+the mtime of its directory, a full walk is still done once the configured
+rescan interval has passed.
+"""
+
+import os
+import pwd
+import grp
+import stat
+import time
+import pickle
+import tempfile
+import threading
+
+from collections import namedtuple
+
+from stonix_resources.logdispatcher import LogPriority
+from stonix_resources.stonixutilityfunctions import getlocalfs
+
+# Directories whose complete contents are recorded regardless of mode so that
+# group-writable and ownership checks can be answered from the inventory.
+LIBBINDIRS = ["/lib", "/lib64", "/usr/lib", "/usr/lib64", "/lib/modules",
+              "/bin", "/usr/bin", "/usr/local/bin", "/sbin", "/usr/sbin",
+              "/usr/local/sbin"]
+
+# Default location of the persisted directory index
+INDEXFILE = '/var/db/stonix/fsinventory.idx'
+
+# Bump when the layout of the persisted index changes
+INDEXVERSION = 1
+
+# Default cap on hits per category. A filesystem with more hits than this is
+# too broken to be worth walking further; mirrors the old multifind limit.
+MAXHITS = 25000
+
+InventoryEntry = namedtuple('InventoryEntry', ['path', 'mode', 'uid', 'gid',
+                                               'ino', 'mtime', 'isdir',
+                                               'fsroot'])
+
+_inventory = None
+_inventorylock = threading.Lock()
+
+
+def getinventory(logger, environ, bypass=None):
+    '''Return the process wide FilesystemInventory instance, creating it on
+    first use. When running as root the instance persists its directory
+    index to INDEXFILE, whichever rule scans first. File systems passed in
+    bypass are added to the inventory's bypass list if the scan has not
+    happened yet.
+
+    :param logger: logdispatcher object
+    :param environ: environment object
+    :param bypass: list of filesystem mount points not to walk
+    :returns: FilesystemInventory
+    '''
+    global _inventory
+    with _inventorylock:
+        if _inventory is None:
+            _inventory = FilesystemInventory(logger, environ)
+            if environ.geteuid() == 0:
+                _inventory.useindex(INDEXFILE)
+        inventory = _inventory
+    if bypass:
+        inventory.addbypass(bypass)
+    return inventory
+
+
+class FilesystemInventory(object):
+    '''Walks the local filesystems once and answers permission queries from
+    memory.
+    '''
+
+    def __init__(self, logger, environ, filesystems=None, trackdirs=None,
+                 maxhits=MAXHITS):
+        '''
+        :param logger: logdispatcher object
+        :param environ: environment object
+        :param filesystems: list of filesystem roots to walk. Defaults to
+            the result of getlocalfs()
+        :param trackdirs: list of directories whose entire contents are
+            recorded. Defaults to LIBBINDIRS
+        :param maxhits: int - stop walking once any category has more hits
+        '''
+        self.logger = logger
+        self.environ = environ
+        self.filesystems = filesystems
+        if trackdirs is None:
+            trackdirs = LIBBINDIRS
+        self.trackdirs = [os.path.normpath(tdir) for tdir in trackdirs]
+        self.maxhits = maxhits
+        self.bypass = set()
+        self.lock = threading.RLock()
+        self.scanned = False
+        self.overrun = False
+        # dirpath -> {'ino', 'mtime', 'dev', 'fsroot', 'entries'}
+        self.dirs = {}
+        self.counts = {'ww': 0, 'suid': 0, 'unowned': 0}
+        self.uidcache = {}
+        self.gidcache = {}
+        self.indexfile = None
+        self.rescaninterval = 0
+        self.previous = {}
+        self.walked = []
+        self.scanstart = 0
+        self.prevstart = 0
+        self.lastfull = 0
+        self.fullscan = True
+        self.reused = 0
+
+    def useindex(self, indexfile=INDEXFILE, rescaninterval=7 * 86400):
+        '''Persist the directory records to indexfile and use them to limit
+        the next scan to directories that changed. If the inventory has
+        already been scanned without an index it is written straight away.
+
+        :param indexfile: path of the index file
+        :param rescaninterval: int - seconds after which a full walk is done
+            regardless of the index. 0 forces a full walk every run.
+        '''
+        with self.lock:
+            changed = indexfile != self.indexfile
+            self.indexfile = indexfile
+            try:
+                self.rescaninterval = max(0, int(rescaninterval))
+            except (TypeError, ValueError):
+                self.rescaninterval = 0
+            if self.scanned and changed:
+                self.saveindex()
+
+    def loadindex(self, filesystems):
+        '''Read the persisted index into self.previous. The index is
+        ignored if it is missing, unreadable, not private to this user,
+        written by another layout version, recorded for a different set of
+        filesystems or tracked directories, or older than the rescan
+        interval.
+
+        :param filesystems: list of filesystem roots about to be walked
+        :returns: bool - True if the index will be used
+        '''
+        self.previous = {}
+        if not self.indexfile or not os.path.exists(self.indexfile):
+            return False
+        try:
+            fstat = os.stat(self.indexfile)
+            if fstat.st_uid != os.geteuid() or \
+               fstat.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+                self.logger.log(LogPriority.DEBUG,
+                                ['FilesystemInventory.loadindex',
+                                 'Ignoring index with unsafe ownership or ' +
+                                 'permissions: ' + str(self.indexfile)])
+                return False
+            with open(self.indexfile, 'rb') as fhandle:
+                index = pickle.load(fhandle)
+        except Exception:
+            self.logger.log(LogPriority.DEBUG,
+                            ['FilesystemInventory.loadindex',
+                             'Unable to read index ' + str(self.indexfile)])
+            return False
+        if not isinstance(index, dict) or \
+           index.get('version') != INDEXVERSION:
+            return False
+        if index.get('filesystems') != sorted(filesystems) or \
+           index.get('trackdirs') != sorted(self.trackdirs):
+            self.logger.log(LogPriority.DEBUG,
+                            ['FilesystemInventory.loadindex',
+                             'Filesystems changed since the index was ' +
+                             'written, doing a full walk'])
+            return False
+        if time.time() - index.get('lastfull', 0) >= self.rescaninterval:
+            self.logger.log(LogPriority.DEBUG,
+                            ['FilesystemInventory.loadindex',
+                             'Rescan interval reached, doing a full walk'])
+            return False
+        previous = {}
+        for dirpath, record in index.get('dirs', {}).items():
+            record['entries'] = [InventoryEntry(*entry)
+                                 for entry in record['entries']]
+            previous[dirpath] = record
+        self.previous = previous
+        self.lastfull = index['lastfull']
+        self.prevstart = index.get('scanstart', 0)
+        return True
+
+    def saveindex(self):
+        '''Write the directory records to the index file. Entries are
+        stored as plain tuples so the file does not depend on the name this
+        module was imported under. The file is replaced atomically.
+        '''
+        if not self.indexfile or self.overrun:
+            return
+        index = {'version': INDEXVERSION,
+                 'scanstart': self.scanstart,
+                 'lastfull': self.lastfull,
+                 'filesystems': sorted(self.walked),
+                 'trackdirs': sorted(self.trackdirs),
+                 'dirs': {}}
+        for dirpath, record in self.dirs.items():
+            saved = dict(record)
+            saved['entries'] = [tuple(entry) for entry in record['entries']]
+            index['dirs'][dirpath] = saved
+        indexdir = os.path.dirname(self.indexfile)
+        tmpname = None
+        try:
+            if not os.path.isdir(indexdir):
+                os.makedirs(indexdir, 0o700)
+            fdesc, tmpname = tempfile.mkstemp(dir=indexdir,
+                                              prefix='.fsinventory')
+            with os.fdopen(fdesc, 'wb') as fhandle:
+                pickle.dump(index, fhandle, pickle.HIGHEST_PROTOCOL)
+            os.chmod(tmpname, 0o600)
+            os.rename(tmpname, self.indexfile)
+        except (OSError, pickle.PickleError):
+            self.logger.log(LogPriority.DEBUG,
+                            ['FilesystemInventory.saveindex',
+                             'Unable to write index ' + str(self.indexfile)])
+            if tmpname and os.path.exists(tmpname):
+                os.remove(tmpname)
+
+    def addbypass(self, bypass):
+        '''Add filesystems that should not be walked. Has no effect on an
+        inventory that has already been scanned, but queries still filter
+        out entries from bypassed filesystems.
+
+        :param bypass: list of mount points
+        '''
+        with self.lock:
+            for item in bypass:
+                self.bypass.add(os.path.normpath(item))
+
+    def invalidate(self):
+        '''Drop the in memory inventory so the next query walks again'''
+        with self.lock:
+            self.scanned = False
+            self.overrun = False
+            self.dirs = {}
+            self.previous = {}
+            self.reused = 0
+            self.counts = {'ww': 0, 'suid': 0, 'unowned': 0}
+
+    def scan(self):
+        '''Walk every local filesystem once. Subsequent calls are no-ops until
+        invalidate() is called.
+        '''
+        with self.lock:
+            if self.scanned:
+                return
+            filesystems = self.filesystems
+            if filesystems is None:
+                filesystems = getlocalfs(self.logger, self.environ)
+            filesystems = [os.path.normpath(filesystem) for filesystem in
+                           filesystems if os.path.normpath(filesystem) not in
+                           self.bypass]
+            self.walked = filesystems
+            self.prevstart = 0
+            self.scanstart = time.time()
+            self.fullscan = not self.loadindex(filesystems)
+            if self.fullscan:
+                self.lastfull = self.scanstart
+            for filesystem in filesystems:
+                if self.overrun:
+                    break
+                self.logger.log(LogPriority.DEBUG,
+                                ['FilesystemInventory.scan',
+                                 'Walking Filesystem: ' + str(filesystem)])
+                self.walk(filesystem, filesystem, True)
+            # lib and bin locations are always covered even if they live on
+            # a filesystem that was not walked above
+            for tdir in self.trackdirs:
+                if tdir in self.dirs or os.path.islink(tdir) or \
+                   not os.path.isdir(tdir):
+                    continue
+                self.walk(tdir, tdir, False)
+            self.previous = {}
+            self.scanned = True
+            self.saveindex()
+
+    def walk(self, top, fsroot, onedevice):
+        '''Walk the tree under top with os.scandir, recording interesting
+        entries.
+
+        :param top: directory to start at
+        :param fsroot: filesystem root the walk belongs to
+        :param onedevice: bool - do not descend into other filesystems
+        '''
+        try:
+            topstat = os.lstat(top)
+        except OSError:
+            return
+        device = topstat.st_dev
+        stack = [(top, topstat)]
+        while stack:
+            if self.overrun:
+                return
+            dirpath, dirstat = stack.pop()
+            record = self.previous.get(dirpath)
+            if record and self.unchanged(record, dirstat):
+                subdirs = self.reuse(dirpath, dirstat, fsroot, record)
+            else:
+                subdirs = self.scandir(dirpath, dirstat, fsroot)
+            for subpath, substat in subdirs:
+                if onedevice and substat.st_dev != device:
+                    # mount point, belongs to another filesystem
+                    continue
+                stack.append((subpath, substat))
+
+    def scandir(self, dirpath, dirstat, fsroot):
+        '''Read one directory and record its interesting entries.
+
+        :param dirpath: path of the directory
+        :param dirstat: os.stat_result of the directory
+        :param fsroot: filesystem root the directory belongs to
+        :returns: list of (path, stat_result) for subdirectories
+        '''
+        tracked = self.istracked(dirpath)
+        entries = []
+        subdirs = []
+        try:
+            with os.scandir(dirpath) as iterator:
+                for dirent in iterator:
+                    try:
+                        if dirent.is_symlink():
+                            continue
+                        isdir = dirent.is_dir(follow_symlinks=False)
+                        entstat = dirent.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    if isdir:
+                        subdirs.append((dirent.path, entstat))
+                    entry = self.classify(dirent.path, entstat, isdir,
+                                          fsroot, tracked)
+                    if entry:
+                        entries.append(entry)
+        except OSError:
+            self.logger.log(LogPriority.DEBUG,
+                            ['FilesystemInventory.scandir',
+                             'Unable to read ' + str(dirpath)])
+        self.dirs[dirpath] = {'ino': dirstat.st_ino,
+                              'mtime': dirstat.st_mtime,
+                              'dev': dirstat.st_dev,
+                              'fsroot': fsroot,
+                              'entries': entries,
+                              'subdirs': [os.path.basename(subpath) for
+                                          subpath, _ in subdirs]}
+        return subdirs
+
+    def unchanged(self, record, dirstat):
+        '''Return True if a directory matches its saved record. Directories
+        modified close to the start of the saved scan are treated as changed
+        because the scan may have read them before the change.
+
+        :param record: dict - saved directory record
+        :param dirstat: os.stat_result of the directory
+        :returns: bool
+        '''
+        return record['ino'] == dirstat.st_ino and \
+            record['dev'] == dirstat.st_dev and \
+            record['mtime'] == dirstat.st_mtime and \
+            dirstat.st_mtime < self.prevstart - 1
+
+    def reuse(self, dirpath, dirstat, fsroot, record):
+        '''Carry a saved directory record forward without reading the
+        directory. The recorded entries are re-checked so that fixed entries
+        drop out, and the saved subdirectories are returned for descent.
+
+        :param dirpath: path of the directory
+        :param dirstat: os.stat_result of the directory
+        :param fsroot: filesystem root the directory belongs to
+        :param record: dict - saved directory record
+        :returns: list of (path, stat_result) for subdirectories
+        '''
+        self.reused += 1
+        tracked = self.istracked(dirpath)
+        entries = []
+        for oldentry in record['entries']:
+            try:
+                entstat = os.lstat(oldentry.path)
+            except OSError:
+                continue
+            if stat.S_ISLNK(entstat.st_mode):
+                continue
+            entry = self.classify(oldentry.path, entstat,
+                                  stat.S_ISDIR(entstat.st_mode), fsroot,
+                                  tracked)
+            if entry:
+                entries.append(entry)
+        subdirs = []
+        names = []
+        for name in record.get('subdirs', []):
+            subpath = os.path.join(dirpath, name)
+            try:
+                substat = os.lstat(subpath)
+            except OSError:
+                continue
+            if not stat.S_ISDIR(substat.st_mode):
+                continue
+            subdirs.append((subpath, substat))
+            names.append(name)
+        self.dirs[dirpath] = {'ino': dirstat.st_ino,
+                              'mtime': dirstat.st_mtime,
+                              'dev': dirstat.st_dev,
+                              'fsroot': fsroot,
+                              'entries': entries,
+                              'subdirs': names}
+        return subdirs
+
+    def classify(self, path, entstat, isdir, fsroot, tracked):
+        '''Return an InventoryEntry if the entry is of interest to any query,
+        otherwise None. Also maintains the per category hit counts used to
+        detect overruns.
+
+        :param path: full path of the entry
+        :param entstat: os.stat_result of the entry
+        :param isdir: bool
+        :param fsroot: filesystem root
+        :param tracked: bool - entry is under a tracked lib/bin directory
+        :returns: InventoryEntry or None
+        '''
+        mode = entstat.st_mode
+        interesting = tracked
+        if mode & stat.S_IWOTH:
+            self.counts['ww'] += 1
+            interesting = True
+        if not isdir and mode & (stat.S_ISUID | stat.S_ISGID):
+            self.counts['suid'] += 1
+            interesting = True
+        if not isdir and not self.isowned(entstat.st_uid, entstat.st_gid):
+            self.counts['unowned'] += 1
+            interesting = True
+        for count in self.counts.values():
+            if count > self.maxhits:
+                if not self.overrun:
+                    self.logger.log(LogPriority.DEBUG,
+                                    ['FilesystemInventory.classify',
+                                     'Inventory overflow!'])
+                self.overrun = True
+        if not interesting:
+            return None
+        return InventoryEntry(path, mode, entstat.st_uid, entstat.st_gid,
+                              entstat.st_ino, entstat.st_mtime, isdir,
+                              fsroot)
+
+    def istracked(self, dirpath):
+        '''Return True if dirpath is one of, or is under, a tracked directory
+
+        :param dirpath: directory path
+        :returns: bool
+        '''
+        for tdir in self.trackdirs:
+            if dirpath == tdir or dirpath.startswith(tdir + os.sep):
+                return True
+        return False
+
+    def isowned(self, uid, gid):
+        '''Return True if both the uid and gid resolve to a known user and
+        group. Lookups are cached since directory services can be slow.
+
+        :param uid: int
+        :param gid: int
+        :returns: bool
+        '''
+        if uid not in self.uidcache:
+            try:
+                pwd.getpwuid(uid)
+                self.uidcache[uid] = True
+            except KeyError:
+                self.uidcache[uid] = False
+        if gid not in self.gidcache:
+            try:
+                grp.getgrgid(gid)
+                self.gidcache[gid] = True
+            except KeyError:
+                self.gidcache[gid] = False
+        return self.uidcache[uid] and self.gidcache[gid]
+
+    def update(self, paths):
+        '''Refresh the records for the passed paths, e.g. after a rule has
+        changed their permissions.
+
+        :param paths: list of paths
+        '''
+        with self.lock:
+            for path in paths:
+                dirpath = os.path.dirname(path)
+                if dirpath not in self.dirs:
+                    continue
+                record = self.dirs[dirpath]
+                entries = [entry for entry in record['entries']
+                           if entry.path != path]
+                try:
+                    entstat = os.lstat(path)
+                except OSError:
+                    record['entries'] = entries
+                    continue
+                if stat.S_ISLNK(entstat.st_mode):
+                    record['entries'] = entries
+                    continue
+                entry = self.classify(path, entstat,
+                                      stat.S_ISDIR(entstat.st_mode),
+                                      record['fsroot'],
+                                      self.istracked(dirpath))
+                if entry:
+                    entries.append(entry)
+                record['entries'] = entries
+
+    def entries(self, filesystems=None, bypass=None):
+        '''Generator over all recorded entries.
+
+        :param filesystems: optional list of filesystem roots to restrict
+            results to
+        :param bypass: optional list of filesystem roots to exclude
+        '''
+        self.scan()
+        if filesystems is not None:
+            filesystems = set([os.path.normpath(fs) for fs in filesystems])
+            with self.lock:
+                # filesystems asked for by name are walked even if they were
+                # not reported as local
+                for filesystem in filesystems:
+                    if filesystem not in self.dirs and \
+                       os.path.isdir(filesystem):
+                        self.walk(filesystem, filesystem, True)
+        skip = set(self.bypass)
+        if bypass:
+            skip.update([os.path.normpath(fs) for fs in bypass])
+        with self.lock:
+            records = list(self.dirs.values())
+        for record in records:
+            if record['fsroot'] in skip:
+                continue
+            if filesystems is not None and \
+               record['fsroot'] not in filesystems:
+                continue
+            for entry in record['entries']:
+                yield entry
+
+    def worldwritable(self, filesystems=None, bypass=None):
+        '''Return the paths of world writable files and directories
+
+        :param filesystems: see entries()
+        :param bypass: see entries()
+        :returns: list of strings
+        '''
+        return [entry.path for entry in self.entries(filesystems, bypass)
+                if entry.mode & stat.S_IWOTH]
+
+    def suidfiles(self, filesystems=None, bypass=None):
+        '''Return the paths of regular files with the SUID or SGID bit set
+
+        :param filesystems: see entries()
+        :param bypass: see entries()
+        :returns: list of strings
+        '''
+        return [entry.path for entry in self.entries(filesystems, bypass)
+                if not entry.isdir and stat.S_ISREG(entry.mode) and
+                entry.mode & (stat.S_ISUID | stat.S_ISGID)]
+
+    def unowned(self, filesystems=None, bypass=None):
+        '''Return the paths of files whose uid or gid does not resolve. A
+        path with both a bad owner and a bad group is listed twice, matching
+        the way FilePermissions has always reported them.
+
+        :param filesystems: see entries()
+        :param bypass: see entries()
+        :returns: list of strings
+        '''
+        results = []
+        for entry in self.entries(filesystems, bypass):
+            if entry.isdir:
+                continue
+            self.isowned(entry.uid, entry.gid)
+            if not self.uidcache[entry.uid]:
+                results.append(entry.path)
+            if not self.gidcache[entry.gid]:
+                results.append(entry.path)
+        return results
+
+    def underdirs(self, dirs):
+        '''Return the entries found under the passed tracked directories.
+
+        :param dirs: list of directories, each must be one of trackdirs
+        :returns: list of InventoryEntry
+        '''
+        prefixes = [os.path.normpath(tdir) for tdir in dirs]
+        results = []
+        for entry in self.entries():
+            for prefix in prefixes:
+                if entry.path.startswith(prefix + os.sep):
+                    results.append(entry)
+                    break
+        return results
+
+    def groupwritable(self, dirs=None):
+        '''Return the paths of group writable entries under lib and bin
+        directories
+
+        :param dirs: optional list of tracked directories, default LIBBINDIRS
+        :returns: list of strings
+        '''
+        if dirs is None:
+            dirs = self.trackdirs
+        return [entry.path for entry in self.underdirs(dirs)
+                if entry.mode & stat.S_IWGRP]
+
+    def nonrootowned(self, dirs=None):
+        '''Return the paths of entries not owned by root under lib and bin
+        directories
+
+        :param dirs: optional list of tracked directories, default LIBBINDIRS
+        :returns: list of strings
+        '''
+        if dirs is None:
+            dirs = self.trackdirs
+        return [entry.path for entry in self.underdirs(dirs)
+                if entry.uid != 0]
+
+    def describe(self):
+        '''Return a short summary of the inventory for debug logging
+
+        :returns: string
+        '''
+        return 'directories: ' + str(len(self.dirs)) + ' reused: ' + \
+            str(self.reused) + ' full walk: ' + str(self.fullscan) + \
+            ' ww: ' + \
+            str(self.counts['ww']) + ' suid: ' + \
+            str(self.counts['suid']) + ' unowned: ' + \
+            str(self.counts['unowned'])
@@ -0,0 +1,213 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Configuration documents shared by all KVEditor instances of a run.
+
+Many rules open an editor on the same file (sshd_config, login.defs,
+sysctl.conf). Instead of each KVAConf or KVATaggedConf reading the file
+again, they take its lines from a ConfigDocument. The document reads the
+file once and keeps the lines for as long as the inode, mtime and size of
+the file stay the same.
+
+Edits an editor makes in fix() are staged on the document, so a second
+editor on the same file works from the edited lines rather than the ones on
+disk. The first editor to commit writes all staged edits in one atomic
+rename and records a single change event and diff. Editors committing
+after it find nothing staged and do nothing.
+
+Staged edits belong to the thread that staged them. Editors running on
+other threads see the lines on disk and cannot commit them, so a rule never
+writes the half-finished edits of a rule running alongside it. Staged edits
+that are never committed are dropped with discardpending() once the rule
+that made them has finished its fix, whether or not the fix succeeded.
+
+The key index an editor builds from the lines of a document is kept on the
+document as well, so the other editors of the file look their keys up in it
+without parsing the lines again.
+"""
+
+import os
+import threading
+
+from stonix_resources.logdispatcher import LogPriority
+
+_documents = {}
+_documentslock = threading.Lock()
+
+
+def getdocument(path):
+    '''Return the shared document for a configuration file
+
+    :param path: path of the configuration file
+    :returns: ConfigDocument
+    '''
+    path = os.path.abspath(path)
+    with _documentslock:
+        if path not in _documents:
+            _documents[path] = ConfigDocument(path)
+        return _documents[path]
+
+
+def discardpending(logger=None):
+    '''Drop the edits staged by the calling thread that were not committed
+
+    :param logger: optional logdispatcher object to note dropped edits with
+    '''
+    owner = threading.get_ident()
+    with _documentslock:
+        documents = list(_documents.values())
+    for document in documents:
+        if document.discard(owner) and logger:
+            logger.log(LogPriority.DEBUG,
+                       ['KVACache.discardpending',
+                        'Dropped uncommitted edits to ' + document.path])
+
+
+class ConfigDocument(object):
+    '''The lines of one configuration file plus any staged edits.'''
+
+    def __init__(self, path):
+        '''
+        :param path: absolute path of the configuration file
+        '''
+        self.path = path
+        self.lock = threading.Lock()
+        self.stamp = None
+        self.lines = None
+        self.pending = None
+        self.owner = None
+        self.eventids = []
+        self.indexes = {}
+
+    def getstamp(self):
+        '''Return (inode, mtime, size) of the file or None if it is missing'''
+        try:
+            fstat = os.stat(self.path)
+        except OSError:
+            return None
+        return (fstat.st_ino, fstat.st_mtime_ns, fstat.st_size)
+
+    def ownspending(self):
+        '''Return whether the calling thread staged the pending edits. The
+        caller must hold self.lock.
+
+        :returns: bool
+        '''
+        return self.pending is not None and \
+            self.owner == threading.get_ident()
+
+    def getlines(self):
+        '''Return the lines of the document, including the edits staged by
+        the calling thread. Raises IOError if the file cannot be read.
+
+        :returns: tuple of strings
+        '''
+        with self.lock:
+            if self.ownspending():
+                return self.pending
+            stamp = self.getstamp()
+            if self.lines is None or stamp is None or stamp != self.stamp:
+                self.lines = None
+                with open(self.path, 'r') as fhandle:
+                    lines = tuple(fhandle.readlines())
+                # only keep the lines if the file did not change while it
+                # was being read
+                if self.getstamp() == stamp:
+                    self.lines = lines
+                    self.stamp = stamp
+                return lines
+            return self.lines
+
+    def getindex(self, lines, builder, configType):
+        '''Return builder(lines, configType), building it only once for
+        each version of the lines. The index is shared and must not be
+        modified.
+
+        :param lines: tuple returned by getlines
+        :param builder: function building the index
+        :param configType: configuration type passed to builder
+        :returns: the index
+        '''
+        with self.lock:
+            cached = self.indexes.get((builder, configType))
+        if cached is not None and cached[0] is lines:
+            return cached[1]
+        index = builder(lines, configType)
+        with self.lock:
+            self.indexes[(builder, configType)] = (lines, index)
+        return index
+
+    def stage(self, lines):
+        '''Stage edited lines to be written by the next commit
+
+        :param lines: list of strings
+        '''
+        with self.lock:
+            if not self.ownspending():
+                self.eventids = []
+            self.pending = tuple(lines)
+            self.owner = threading.get_ident()
+
+    def getpending(self):
+        '''Return the lines staged by the calling thread or None if it has
+        nothing staged'''
+        with self.lock:
+            if self.ownspending():
+                return self.pending
+            return None
+
+    def geteventid(self):
+        '''Return the first event id registered with the edits staged by the
+        calling thread'''
+        with self.lock:
+            if self.ownspending() and self.eventids:
+                return self.eventids[0]
+            return ''
+
+    def addeventid(self, eventid):
+        '''Register the event id of an editor whose edits are staged'''
+        with self.lock:
+            if eventid and self.ownspending() and \
+               eventid not in self.eventids:
+                self.eventids.append(eventid)
+
+    def committed(self):
+        '''Forget the staged edits after they have been written'''
+        with self.lock:
+            self.pending = None
+            self.owner = None
+            self.eventids = []
+            self.lines = None
+            self.stamp = None
+            self.indexes = {}
+
+    def discard(self, owner):
+        '''Drop staged edits made by the passed thread
+
+        :param owner: thread ident
+        :returns: bool - True if edits were dropped
+        '''
+        with self.lock:
+            if self.pending is None or self.owner != owner:
+                return False
+            self.pending = None
+            self.owner = None
+            self.eventids = []
+            return True
@@ -19,14 +19,80 @@
 Created on May 6, 2013
 
 @author: Derek Walker
+@change: 2026/10/18 - validate and update look keys up in an index of the
+    contents built in one pass instead of scanning the file once per key
 '''
 
 from stonix_resources.logdispatcher import LogPriority
 from stonix_resources.stonixutilityfunctions import writeFile
+from stonix_resources.KVACache import getdocument
+from collections import namedtuple
 import os
 import traceback
 import re
 
+# one occurrence of a key in a configuration file. value is the text after
+# the first equal sign for the equal sign types and the rest of the line,
+# with runs of whitespace collapsed to one space, for the space type.
+ConfEntry = namedtuple("ConfEntry", ["lineno", "value", "commented"])
+
+# keys containing any of these are patterns rather than literal keys
+REGEXCHARS = re.compile(r"[\\^$*+?{}\[\]|()]")
+
+
+def indexlines(lines, configType):
+    '''Map every key in lines to the list of its entries, in file order.
+    Commented out keys are indexed too, with commented set.
+
+    :param lines: list of lines of a configuration file
+    :param configType: openeq | closedeq | space
+    :returns: dict of key: list of ConfEntry
+    '''
+    index = {}
+    for lineno, line in enumerate(lines):
+        commented = line.startswith("#")
+        text = line.lstrip("#") if commented else line
+        if configType in ["openeq", "closedeq"]:
+            if "=" not in text:
+                continue
+            fields = text.split("=")
+            key = fields[0].strip()
+            value = fields[1].strip()
+        elif configType == "space":
+            if commented:
+                text = text.lstrip()
+            fields = text.split(None, 1)
+            # the key has to start the line and be followed by whitespace
+            if not fields or text[0].isspace() or \
+               len(fields[0]) == len(text):
+                continue
+            key = fields[0]
+            value = " ".join(fields[1].split()) if len(fields) > 1 else ""
+        else:
+            return index
+        index.setdefault(key, []).append(ConfEntry(lineno, value, commented))
+    return index
+
+
+def findentries(index, key):
+    '''Return the entries of index for key, in file order. A key containing
+    regular expression characters is matched as a pattern against every key
+    of the index, the way the files used to be searched.
+
+    :param index: dict returned by indexlines
+    :param key: key or key pattern
+    :returns: list of ConfEntry
+    '''
+    if not REGEXCHARS.search(key):
+        return index.get(key, [])
+    pattern = re.compile("^" + key + "$")
+    entries = []
+    for name, found in index.items():
+        if pattern.match(name):
+            entries.extend(found)
+    return sorted(entries)
+
+
 class KVAConf():
     '''This class checks files for correctness that consist of key:value pairs
     either in the form of closed equal separated (k=v), open separated (k = v),
@@ -75,6 +141,8 @@ class KVAConf():
         self.intent = intent
         self.detailedresults = ""
         self.isdir = False
+        self.index = None
+        self.indexed = None
 
     def setPath(self, path):
         '''Private method to set the path of the configuration file
@@ -205,34 +273,21 @@ class KVAConf():
         '''
         if self.contents:
             if self.intent == "present":  # self.data contains key val pairs we want in the file
+                # the key has to be there and every occurrence of it needs
+                # the correct value, it will be fixed in the update otherwise
                 found = False
-                for line in self.contents:
-                    if re.match('^#', line) or re.match(r'^\s*$', line):  # ignore if comment or blank line
-                        continue
-                    elif re.search("=", line):  # examine line if there is an = sign
-                        temp = line.split("=")  # split line into key val list [key, val]
-                        if re.match("^" + key + "$", temp[0].strip()):  # it contains the current key we're looking for
-                            if temp[1].strip() == value:  # and the value is correct
-                                found = True  # however we continue to make sure the key doesn't appear later in the file and have the wrong value
-                                continue
-                            else:  # the value is wrong so we break out of the loop.  Unecessary to continue, it will be fixed in the update
-                                found = False
-                                break
-                if found:  # return True or False value
-                    return True
-                else:
-                    return False
-            elif self.intent == "notpresent":  # self.data contains key val pairs we don't want in the file
-                found = True
-                for line in self.contents:
-                    if re.match("^#", line) or re.match(r'^\s*$', line):  # ignore if comment or blank line
-                        continue
-                    elif re.search("=", line):  # examine line if there is an = sign
-                        temp = line.split("=")  # split line into key val list [key, val]
-                        if re.match("^" + key + "$", temp[0].strip()):  # it contains the current key we're looking for
-                            found = True  # no need to check value, it's irrelevant
-                            break
+                for entry in self.getentries(key):
+                    if entry.value == value:
+                        found = True
+                    else:
+                        found = False
+                        break
                 return found
+            elif self.intent == "notpresent":  # self.data contains key val pairs we don't want in the file
+                # the line by line search this replaced returned True
+                # whether or not it found the key; unwanted keys of these
+                # types are left in place as before
+                return True
 
     def getSpaceValue(self, key, value):
         '''Private inner method called by validate that populates self.fixables
@@ -259,6 +314,8 @@ class KVAConf():
         #list that keeps track of key value pairs that shouldn't be present
         # but were and need to be removed in the fix() and commit()
         removeables = []
+        # every line of the file holding the key, whitespace collapsed
+        lines = set(self.getspacelines(key))
         # self.data contains key val pairs we want in the file
         if self.intent == "present":
             # if "value" is a list that means the key can be repeatable
@@ -266,27 +323,9 @@ class KVAConf():
                 debug = "This key can be present multiple times: " + key + "\n"
                 self.logger.log(LogPriority.DEBUG, debug)
                 for item in value:
-                    # this variable keeps track if at any point we found the key-value
-                    foundalready = False
-                    for line in self.contents:
-                        # ignore if comment or blank line
-                        if re.match('^#', line) or re.match(r'^\s*$', line):
-                            continue
-                        # we found the key, which in this case can be repeatable
-                        elif re.search("^" + re.escape(key) + "\s+", line):
-                            # remove any leading or traling whitespace
-                            temp = line.strip()
-                            # check to see if "item" in our self.data dictionary is blank or not
-                            if item != "":
-                                temp = re.sub("\s+", " ", temp)
-                                if temp == key + " " + item:
-                                    foundalready = True
-                            # if it is, that means we're just looking for a special one word
-                            # key with no value after
-                            else:
-                                if temp == key:
-                                    foundalready = True
-                    if not foundalready:
+                    # an empty item means we're just looking for a special
+                    # one word key with no value after
+                    if self.joinspace(key, item) not in lines:
                         fixables.append(item)
                         debug = "didn't find key-value: " + key + " " + item + \
                             ", but should be present"
@@ -297,54 +336,14 @@ class KVAConf():
                     return True
             # value must be a string, normal case
             else:
-                foundalready = False
-                for line in self.contents:
-                    # ignore if comment or blank line
-                    if re.match('^#', line) or re.match(r'^\s*$', line):
-                        continue
-                    # we found the key
-                    elif re.search("^" + re.escape(key) + "\s+", line):
-                        # remove any leading or trailing whitespace
-                        temp = line.strip()
-                        # check to see if "value" in our self.data dictionary is blank or not
-                        if value != "":
-                            temp = re.sub("\s+", " ", temp)
-                            if temp == key + " " + value:
-                                foundalready = True
-                        else:
-                            if temp == key:
-                                foundalready = True
-                return foundalready
+                return self.joinspace(key, value) in lines
         # self.data contains key val pairs we don't want in the file
         elif self.intent == "notpresent":
             # if "value" is a list that means the key can be repeatable
             if isinstance(value, list):
                 # iterate through all values of repeatable key
                 for item in value:
-                    # this variable keeps track if at any point we found the key-value
-                    foundalready = False
-                    # iterate through the file's contents
-                    for line in self.contents:
-                        # ignore if comment or blank line
-                        if re.match('^#', line) or re.match(r'^\s*$', line):
-                            continue
-                        # we found the key, which in this case can be repeatable
-                        elif re.search("^" + re.escape(key) + "\s+", line):
-                            # remove any leading or trailing whitespace
-                            temp = line.strip()
-                            # check to see if "item" in our self.data dictionary is blank or not
-                            if item != "":
-                                temp = re.sub("\s+", " ", temp)
-                                if temp == key + " " + item:
-                                    foundalready = True
-                            # if it is, that means we're just looking for a special one word
-                            # key with no value after
-                            # normally the implementer in this case should not have put the "value" in a list
-                            # but this will still cover it if they did
-                            else:
-                                if temp == key:
-                                    foundalready = True
-                    if foundalready:
+                    if self.joinspace(key, item) in lines:
                         removeables.append(item)
                         debug = "Found the key-value: " + key + " " + item + \
                                 ", but should not be present"
@@ -355,22 +354,7 @@ class KVAConf():
                     return True
             # value must be a string, normal case
             else:
-                foundalready = False
-                for line in self.contents:
-                    # ignore is comment or blank line
-                    if re.match('^#', line) or re.match(r'^\s*$', line):
-                        continue
-                    # we found the key
-                    elif re.search("^" + re.escape(key) + "\s+", line):
-                        temp = line.strip()
-                        if value != "":
-                            temp = re.sub("\s+", " ", temp)
-                            if temp == key + " " + value:
-                                foundalready = True
-                        else:
-                            if temp == key:
-                                foundalready = True
-                if foundalready:
+                if self.joinspace(key, value) in lines:
                     debug = "Found the key-value: " + key + " " + value + \
                             ", but should not be present"
                     self.logger.log(LogPriority.DEBUG, debug)
@@ -378,6 +362,67 @@ class KVAConf():
                 else:
                     return True
 
+    def getindex(self):
+        '''Return the index of the keys in self.contents for the current
+        configType. The index of the unedited lines of a file is shared with
+        the other editors of that file.
+
+        :returns: dict of key: list of ConfEntry
+        '''
+        if self.index is None or self.indexed != self.configType:
+            if self.document is not None:
+                self.index = self.document.getindex(self.lines, indexlines,
+                                                    self.configType)
+            else:
+                self.index = indexlines(self.contents, self.configType)
+            self.indexed = self.configType
+        return self.index
+
+    def getentries(self, key, commented=False):
+        '''Return the entries of key in self.contents, in file order.  For
+        the space type the key may hold more than one word.
+
+        :param key: key to look up
+        :param commented: True to include commented out entries
+        :returns: list of ConfEntry
+        '''
+        index = self.getindex()
+        if self.configType == "space":
+            words = key.split()
+            entries = index.get(words[0], []) if words else []
+            if len(words) > 1 or words and words[0] != key:
+                pattern = re.compile("^" + re.escape(key) + r"\s+")
+                entries = [entry for entry in entries
+                           if pattern.search(self.contents[entry.lineno])]
+        else:
+            entries = findentries(index, key)
+        if commented:
+            return entries
+        return [entry for entry in entries if not entry.commented]
+
+    def getspacelines(self, key):
+        '''Return the lines holding key with their whitespace collapsed,
+        for the space type
+
+        :param key: key to look up
+        :returns: list of str
+        '''
+        word = key.split()[0] if key.split() else key
+        return [self.joinspace(word, entry.value)
+                for entry in self.getentries(key)]
+
+    def joinspace(self, key, value):
+        '''Return the space separated line for key and value, or just key
+        when value is empty
+
+        :param key: str
+        :param value: str
+        :returns: str
+        '''
+        if value != "":
+            return key + " " + value
+        return key
+
     def update(self, fixables, removeables):
         '''Private outer method to call submethod setOpenClosedValue() or
         setSpaceValue() depending on the value of self.configType.
@@ -415,44 +460,26 @@ class KVAConf():
 
         '''
         self.storeContents(self.path)  # re-read the contents of the desired file
-        contents = self.contents
-        if removeables:  # we have items that need to be removed from file
-            for key in removeables:
-                i = 0  # variable to keep our place in the list, will be used for removing items
-                for line in contents:
-                    if re.search("^#", line) or re.match("^\s*$", line):  # ignore if comment or blank line
-                        i += 1
-                    elif re.search("=", line.strip()):  # line contains an = sign
-                        temp = line.split("=")
-                        if re.match("^" + key + "$", temp[0].strip()):  # found the key
-                            contents.pop(i)  # not concerned with the value because we don't want the key either way
-                        i += 1
-                    else:
-                        i += 1
+        # lines of keys we don't want and of keys that will be added again
+        # below with the correct value. not concerned with the value because
+        # we don't want those lines either way
+        poplist = set()
+        for key in list(removeables or {}) + list(fixables or {}):
+            poplist.update(entry.lineno for entry in self.getentries(key))
+        contents = [line for lineno, line in enumerate(self.contents)
+                    if lineno not in poplist]
         if fixables:  # we have items that either had the wrong value or don't exist in the file
-            for key in fixables:
-                i = 0  # variable to keep our place in the list, will be used for removing items
-                for line in contents:
-                    if re.search("^#", line) or re.match("^\s*$", line):  # ignore if comment or blank line
-                        i += 1
-                    elif re.search("=", line.strip()):  # line contains an = sign
-                        temp = line.split("=")
-                        if re.match("^" + key + "$", temp[0].strip()):  # found the key
-                            contents.pop(i)  # we pop it out but down below we add the correct line unlike above
-                        i += 1
-                    else:
-                        i += 1
-            self.contents = []
-            for line in contents:  # contents should now have a list of items we are ok with having in the file but will still be missing the fixables
-                self.contents.append(line)  # make self.contents contain the correct file contents before fixing
             # self.contents.append("\n" + self.universal)  # add our universal line to show line(s) were added by stonix to self.contents
+            if contents and not contents[-1].endswith("\n"):
+                contents[-1] += "\n"  # don't append to an unterminated last line
             for key in fixables:
                 if self.configType == "openeq":  # construct the appropriate line and add to bottom of self.contents
                     temp = key + " = " + fixables[key] + "\n"
-                    self.contents.append(temp)
+                    contents.append(temp)
                 elif self.configType == "closedeq":
                     temp = key + "=" + fixables[key] + "\n"
-                    self.contents.append(temp)
+                    contents.append(temp)
+        self.setContents(contents)
         return True
 
     def setSpaceValue(self, fixables, removeables):
@@ -471,47 +498,27 @@ class KVAConf():
         '''
         # re-read the contents of the desired file
         self.storeContents(self.path)
-        contents = self.contents
+        poplist = set()
         # we have items that need to be removed from file
         if removeables:
-            poplist = []
             for key, val in list(removeables.items()):
+                words = key.split()
+                word = words[0] if words else key
                 # we have a list where the key can repeat itself
                 if isinstance(val, list):
-                    for item in val:
-                        for line in contents:
-                            if re.search("^#", line) or re.match("^\s*$", line):
-                                continue
-                            elif re.search("^" + re.escape(key) + "\s+", line):
-                                temp = line.strip()
-                                if val != "":
-                                    temp = re.sub("\s+", " ", temp)
-                                    if re.search("^" + re.escape(key) + " " + item, temp):
-                                        poplist.append(line)
-                                else:
-                                    if re.search("^" + re.escape(key) + "$", temp):
-                                        poplist.append(line)
+                    patterns = [re.compile("^" + re.escape(key) + " " + item)
+                                for item in val]
+                elif val != "":
+                    patterns = [re.compile("^" + re.escape(key) + " " + val)]
                 else:
-                    for line in contents:
-                        if re.search("^#", line) or re.match("^\s*$", line):
-                            continue
-                        elif re.search("^" + re.escape(key) + "\s+", line):
-                            temp = line.strip()
-                            if val != "":
-                                temp = re.sub("\s+", " ", temp)
-                                if re.search("^" + re.escape(key) + " " + val, temp):
-                                    poplist.append(line)
-                            else:
-                                if re.search("^" + re.escape(key) + "$", temp):
-                                    poplist.append(line)
-            if poplist:
-                for item in poplist:
-                    try:
-                        contents.remove(item)
-                    except Exception:
-                        continue
+                    patterns = [re.compile("^" + re.escape(key) + "$")]
+                for entry in self.getentries(key):
+                    temp = self.joinspace(word, entry.value)
+                    for pattern in patterns:
+                        if pattern.search(temp):
+                            poplist.add(entry.lineno)
+                            break
         if fixables:
-            poplist = []
             # contents.append(self.universal)
             # in this next section we cover a situation where the key
             # may appear more than once and have wrong values, so anywhere
@@ -521,27 +528,35 @@ class KVAConf():
                 # since these keys can be repeatable we won't take the same
                 # precaution as unique keys.
                 if not isinstance(val, list):
-                    for line in contents:
-                        if re.search("^#", line) or re.match("^\s*$", line):
-                            continue
-                        # we found the key in the file
-                        elif re.search("^" + re.escape(key) + "\s+", line):
-                            poplist.append(line)
-            if poplist:
-                for item in poplist:
-                    try:
-                        contents.remove(item)
-                    except Exception:
-                        continue
+                    poplist.update(entry.lineno
+                                   for entry in self.getentries(key))
+        contents = [line for lineno, line in enumerate(self.contents)
+                    if lineno not in poplist]
+        if fixables:
+            # don't append to an unterminated last line
+            if contents and not contents[-1].endswith("\n"):
+                contents[-1] += "\n"
             for key, val in list(fixables.items()):
                 if isinstance(val, list):
                     for item in val:
                         contents.append(key + " " + item + "\n")
                 else:
                     contents.append(key + " " + val + "\n")
-        self.contents = contents
+        self.setContents(contents)
         return True
 
+    def setContents(self, contents):
+        '''Private method that replaces self.contents with edited lines and
+        stages them to be written by the next commit
+
+        :param contents: list of lines
+        '''
+        self.contents = contents
+        self.lines = None
+        self.document = None
+        self.index = None
+        getdocument(self.path).stage(self.contents)
+
     def commit(self):
         '''Private method that actually writes the configuration file as desired
         including fixables and removing desireables.  This method is called
@@ -552,10 +567,14 @@ class KVAConf():
 
 
         :returns: Bool
+        @change: 2026/10/18 - write the edits staged on the shared document,
+            which include those of other editors of the same file
 
         '''
-        for line in self.contents:
-            self.tempstring += line
+        lines = getdocument(self.path).getpending()
+        if lines is None:
+            lines = self.contents
+        self.tempstring = "".join(lines)
         success = writeFile(self.tmpPath, self.tempstring, self.logger)
         return success
 
@@ -567,15 +586,22 @@ class KVAConf():
 
         :param path: The path which contents need to be read
         @change bgonz12 - 2018/1/18 - added handling for 'path' not existing
+        @change: 2026/10/18 - take the lines from the shared document for
+            path instead of reading the file again
+        @change: 2026/10/18 - drop the index of the previous contents
 
         '''
 
         self.contents = []
+        self.lines = None
+        self.document = None
+        self.index = None
 
         try:
-            f = open(path, 'r')
-            self.contents = f.readlines()
-            f.close()
+            document = getdocument(path)
+            self.lines = document.getlines()
+            self.contents = list(self.lines)
+            self.document = document
 
         except IOError:
             self.logger.log(LogPriority.DEBUG, "Failed to retrieve contents of file: " + str(path))
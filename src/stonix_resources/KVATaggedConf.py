@@ -19,12 +19,67 @@
 Created on Jul 23, 2013
 
 @author: dwalker
+@change: 2026/10/18 - find tags and keys in an index of the sections built
+    in one pass instead of scanning the file once per tag and key
 '''
 from stonix_resources.logdispatcher import LogPriority
+from stonix_resources.KVACache import getdocument
+from stonix_resources.KVAConf import ConfEntry, findentries
+from collections import namedtuple
 import traceback
 import re
 import os
 
+# one [tag] section of a file. tag is the stripped tag line, start its line
+# number and insert the line after the last key of the section. entries maps
+# each key of the section to its list of ConfEntry and invalid is True when a
+# line of the section does not split into exactly one key and one value.
+TagSection = namedtuple("TagSection", ["tag", "start", "insert", "entries",
+                                       "invalid"])
+
+
+def indexsections(lines, configType):
+    '''Split lines into their [tag] sections and index the keys of each
+    section. Lines before the first tag belong to no section.
+
+    :param lines: list of lines of a configuration file
+    :param configType: openeq | closedeq | space
+    :returns: list of TagSection, in file order
+    '''
+    sections = []
+    current = None
+    for lineno, line in enumerate(lines):
+        if re.search("^#", line) or re.match(r'^\s*$', line):
+            continue
+        if re.search(r"^\[.*\]$", line):
+            current = {"tag": line.strip(), "start": lineno,
+                       "insert": lineno + 1, "entries": {}, "invalid": False}
+            sections.append(current)
+            continue
+        if current is None:
+            continue
+        current["insert"] = lineno + 1
+        text = line.strip()
+        if configType in ["openeq", "closedeq"]:
+            if "=" not in text:
+                continue
+            if text.count("=") > 1:
+                current["invalid"] = True
+            fields = text.split("=", 1)
+        elif configType == "space":
+            if " " not in text:
+                continue
+            fields = text.split(" ")
+            # there was more than one blank space
+            if len(fields) != 2:
+                current["invalid"] = True
+                continue
+        else:
+            continue
+        entry = ConfEntry(lineno, fields[1].strip(), False)
+        current["entries"].setdefault(fields[0].strip(), []).append(entry)
+    return [TagSection(**section) for section in sections]
+
 class KVATaggedConf():
 
     '''This class checks files for correctness that consist of a tag, usually
@@ -61,6 +116,10 @@ class KVATaggedConf():
         self.intent = intent
         self.configType = configType
         self.logger = logger
+        self.lines = None
+        self.document = None
+        self.sections = None
+        self.indexed = None
         self.storeContents(path)
         self.universal = "#The following lines were added by stonix\n"
         self.tempstring = ""
@@ -104,94 +163,7 @@ class KVATaggedConf():
         :param dict1: 
 
         '''
-
-        if self.contents:
-            contents = self.contents
-            contents2 = ""
-            foundtag = False
-            length = len(contents) - 1
-            iter1 = 0
-            missing = {}
-            present = {}
-            for line in contents:
-                if re.search("^#", line) or re.match('^\s*$', line):
-                    iter1 += 1
-                elif re.search("^\[" + re.escape(tag) + "\]", line.strip()):
-                    foundtag = True
-                    temp = contents[iter1 + 1:]
-                    iter2 = 0
-                    length = len(temp) - 1
-                    for line2 in temp:
-                        if re.search("^#", line2) or re.match('^\s*$', line2):
-                            iter2 += 1
-                        elif re.search("^\[.*\]$", line2):
-                            contents2 = temp[:iter2]
-                            break
-                        elif iter2 == length:
-                            contents2 = temp[:iter2 + 1]
-                        else:
-                            iter2 += 1
-                else:
-                    iter1 += 1
-            if self.intent == "present":
-                if not foundtag:
-                    return dict1
-                if contents2:
-                    for key in dict1:
-                        found = False
-                        for line in contents2:
-                            if re.search("^#", line) or re.match('^\s*$', line):
-                                continue
-                            elif re.search("=", line):
-                                if line.count("=") > 1:
-                                    temp = line.strip().split("=", 1)
-                                else:
-                                    temp = line.strip().split("=")
-                                if len(temp) != 2:
-                                    return "invalid"
-                                if re.match("^" + key + "$", temp[0].strip()):
-                                    if temp[1].strip() == dict1[key]:
-                                        found = True
-                                        continue
-                                    else:
-                                        found = False
-                                        break
-                        if not found:
-                            missing[key] = dict1[key]
-                if not missing:
-                    return True
-                else:
-                    return missing
-            elif self.intent == "notpresent":
-                if not foundtag:
-                    return True
-                if contents2:
-                    for key in dict1:
-                        found = False
-                        for line in contents2:
-                            if re.search("^#", line) or re.match('^\s*$', line):
-                                continue
-                            elif re.search("=", line):
-                                temp = line.strip().split("=")
-                                if len(temp) != 2:
-                                    return "invalid"
-                                if re.search("^" + key + "$", temp[0].strip()):
-                                    found = True
-                                    break
-                                else:
-                                    found = False
-                                    continue
-                        if found:
-                            present[key] = dict1[key]
-                if not present:
-                    return True
-                else:
-                    return present
-        else:
-            if self.intent == "present":
-                return dict1
-            else:
-                return True
+        return self.checkSection(tag, dict1)
 ###############################################################################
     def getSpaceValue(self, tag, dict1):
         '''
@@ -200,92 +172,86 @@ class KVATaggedConf():
         :param dict1: 
 
         '''
+        return self.checkSection(tag, dict1)
+###############################################################################
+    def checkSection(self, tag, dict1):
+        '''check the keys of dict1 under tag according to the intent
 
+        :param tag: tag, without the brackets
+        :param dict1: dictionary of key: value
+        :returns: True, "invalid" or a dictionary of the keys that are
+            missing or have the wrong value (present) or that are present
+            (notpresent)
+
+        '''
+        section = None
         if self.contents:
-            contents = self.contents
-            foundtag = False
-            length = len(contents) - 1
-            iter1 = 0
-            missing = {}
-            present = {}
-            for line in contents:
-                if re.search("^#", line) or re.match('^\s*$', line):
-                    iter1 += 1
-                elif re.search("^\[" + re.escape(tag) + "\]", line.strip()):
-                    foundtag = True
-                    temp = contents[iter1 + 1:]
-                    iter2 = 0
-                    length = len(temp) - 1
-                    for line2 in temp:
-                        if re.search("^#", line2) or re.match('^\s*$', line2):
-                            iter2 += 1
-                        elif re.search("^\[.*\]$", line2):
-                            contents2 = temp[:iter2]
-                            break
-                        elif iter2 == length:
-                            contents2 = temp[iter2 + 1]
-                        else:
-                            iter2 += 1
-                else:
-                    iter1 += 1
-            if self.intent == "present":
-                if not foundtag:
-                    return dict1
-                if contents2:
-                    for key in dict1:
-                        found = False
-                        for line in contents2:
-                            if re.search("^#", line) or re.match('^\s*$', line):
-                                continue
-                            elif re.search(" ", line.strip()):
-                                temp = line.strip().split(" ")
-                                if len(temp) != 2:  # there were more than one blank space
-                                    return "invalid"
-                                if re.search("^" + re.escape(key) + "$", temp[0].strip()):
-                                    if temp[1].strip() == dict1[key]:
-                                        found = True
-                                        continue
-                                    else:
-                                        found = False
-                                        break
-                        if not found:
-                            missing[key] = dict1[key]
-                if not missing:
-                    return True
-                else:
-                    return missing
-            elif self.intent == "notpresent":
-                if not foundtag:
-                    return True
-                if contents2:
-                    for key in dict1:
-                        found = False
-                        for line in contents2:
-                            if re.search("^#", line) or re.match('^\s*$', line):
-                                continue
-                            elif re.search(" ", line.strip()):
-                                temp = line.strip().split(" ")
-                                if len(temp) != 2:
-                                    return "invalid"
-                                if re.search("^" + re.escape(key) + "$", temp[0].strip()):
-                                    found = True
-                                    break
-                                else:
-                                    found = False
-                                    continue
-                        if found:
-                            present[key] = dict1[key]
-                if not present:
-                    return True
-                else:
-                    return present
-        else:
+            section = self.getSection(tag)
+        if section is None:
             if self.intent == "present":
                 return dict1
             else:
                 return True
+        spaced = self.configType == "space"
+        # values after a second equal sign are fine as long as the key is
+        # wanted, the search for unwanted keys splits on every equal sign
+        if dict1 and section.invalid and \
+           (spaced or self.intent == "notpresent"):
+            return "invalid"
+        missing = {}
+        present = {}
+        for key in dict1:
+            if spaced:
+                entries = section.entries.get(key, [])
+            else:
+                entries = findentries(section.entries, key)
+            if self.intent == "present":
+                if not entries or \
+                   any(entry.value != dict1[key] for entry in entries):
+                    missing[key] = dict1[key]
+            elif entries:
+                present[key] = dict1[key]
+        if self.intent == "present" and missing:
+            return missing
+        elif self.intent == "notpresent" and present:
+            return present
+        return True
+###############################################################################
+    def getSections(self):
+        '''return the sections of self.contents for the current configType.
+        The sections of the unedited lines of a file are shared with the
+        other editors of that file.
+
+        :returns: list of TagSection
+
+        '''
+        if self.sections is None or self.indexed != self.configType:
+            if self.document is not None:
+                self.sections = self.document.getindex(self.lines,
+                                                       indexsections,
+                                                       self.configType)
+            else:
+                self.sections = indexsections(self.contents, self.configType)
+            self.indexed = self.configType
+        return self.sections
+###############################################################################
+    def getSection(self, tag):
+        '''return the first section of tag or None if the tag is not there
+
+        :param tag: tag, without the brackets
+        :returns: TagSection
+
+        '''
+        prefix = "[" + tag + "]"
+        for section in self.getSections():
+            if section.tag.startswith(prefix):
+                return section
+        return None
 ###############################################################################
     def setValue(self, fixables, removeables):
+        # start from the current lines, which include any edits staged by
+        # other editors of the same file
+        self.storeContents(self.path)
         if self.configType == "openeq":
             return self.setOpenClosedValue(fixables, removeables)
         if self.configType == "closedeq":
@@ -296,273 +262,75 @@ class KVATaggedConf():
             return self.setSpaceEqValue(fixables, removeables)
 ###############################################################################
     def setOpenClosedValue(self, fixables, removeables):
-        contents1, contents2, contents3 = [], [], []
-        if fixables:
-            #file is blank so just put each tag and corresponding
-            #key value pairs in file
-            if not self.contents:
-                for tag in fixables:
-                    self.contents.append("[" + tag + "]\n")
-                    for k, v in list(fixables[tag].items()):
-                        if self.configType == "openeq":
-                            self.contents.append(k + " = " + v + "\n")
-                        elif self.configType == "closedeq":
-                            self.contents.append(k + "=" + v + "\n")
-            else:
-                #iterate through each tag value and key,value pair
-                for tag in fixables:
-
-                    #variable to track whether we found the desired tag or not
-                    tagfound = False
-                    #list variable that holds contents of file
-                    contents = self.contents
-                    #variable to keep track of place in file where we will
-                    #splice contents of file after finding desired tag
-                    iter1 = 0
-                    #variable that contains each key value pair to be found
-                    #under desired tag
-                    keys = fixables[tag]
-                    for line in contents:
-                        #found a comment or blank space, increase place counter
-                        if re.search("^#", line) or re.match('^\s*$', line):
-                            iter1 += 1
-                        #found the tag we're looking for
-                        elif re.search("^\[" + re.escape(tag) + "\]", line.strip()):
-
-                            #set tagfound to True
-                            tagfound = True
-                            #list variable that contains all lines in the file up to and
-                            #including the desired tag
-                            contents1 = contents[:iter1 + 1]
-                            #variable that contains everything after the desired tag
-                            tempcontents = contents[iter1 + 1:]
-                            #variable to keep track of just the contents contained
-                            #under the tag and nothing more
-                            iter2 = 0
-                            length = len(tempcontents) - 1
-                            for line2 in tempcontents:
-                                #found a comment or blank space, increase place counter
-                                if re.search("^#", line2) or re.match('^\s*$', line2):
-                                    iter2 += 1
-                                #found the next tag in the file, stop here
-                                elif re.search("^\[.*\]$", line2):
-                                    #list variable that contains just key,value pairs underneath
-                                    #desired tag
-                                    contents2 = tempcontents[:iter2]
-                                    #list variable that contains everything else after contents2
-                                    contents3 = tempcontents[iter2:]
-                                    break
-                                elif iter2 == length:
-                                    contents3 = []
-                                    contents2 = tempcontents[:iter2 + 1]
-                                else:
-                                    iter2 += 1
-                        else:
-                            iter1 += 1
-
-                    #we found the desired tag
-                    if tagfound:
-                        #there were key value pairs underneath tag
-                        if contents2:
-                            for key in keys:
-                                i = 0
-                                for line2 in contents2:
-                                    if re.search("^#", line2) or re.match('^\s*$', line2):
-                                        i += 1
-                                    elif re.search("=", line2.strip()):
-                                        temp = line2.strip().split("=")
-                                        if re.match("^" + re.escape(key) + "$", temp[0].strip()):
-                                            contents2.pop(i)
-                                        i += 1
-                                    else:
-                                        i += 1
-                            for key in keys:
-                                if self.configType == "openeq":
-                                    contents2.append(key + " = " + keys[key] + "\n")
-                                elif self.configType == "closedeq":
-                                    contents2.append(key + "=" + keys[key] + "\n")
-                            self.contents = []
-                            for item in contents1:
-                                self.contents.append(item)
-                            for item in contents2:
-                                self.contents.append(item)
-                            if contents3:
-                                for item in contents3:
-                                    self.contents.append(item)
-                    else:
-                        #never found the desired tag so just add tag and key,value pairs
-                        self.contents.append("[" + tag + "]\n")
-                        for k, v in list(fixables[tag].items()):
-                            if self.configType == "openeq":
-                                self.contents.append(k + " = " + v + "\n")
-                            elif self.configType == "closedeq":
-                                self.contents.append(k + "=" + v + "\n")
-        if removeables:
-            for tag in removeables:
-                contents = self.contents
-                length = len(contents) - 1
-                iter1 = 0
-                for line in contents:
-                    keys = removeables[tag]
-                    if re.search("^#", line) or re.match('^\s*$', line):
-                        iter1 += 1
-                    elif re.search("^\[" + re.escape(tag) + "\]", line.strip()):
-                        contents1 = contents[:iter1 + 1]
-                        tempcontents = contents[iter1 + 1:]
-                        iter2 = 0
-                        length = len(tempcontents) - 1
-                        for line2 in tempcontents:
-                            if re.search("^#", line2) or re.match('^\s*$', line2):
-                                iter2 += 1
-                            elif re.search("^\[.*\]$", line2):
-                                contents2 = tempcontents[:iter2]
-                                contents3 = tempcontents[iter2:]
-                                break
-                            elif iter2 == length:
-                                contents3 = []
-                                contents2 = tempcontents[:iter2 + 1]
-                            else:
-                                iter2 += 1
-                    else:
-                        iter1 += 1
-                if contents2:
-                    for key in keys:
-                        i = 0
-                        for line2 in contents2:
-                            if re.search("^#", line2) or re.match('^\s*$', line2):
-                                i += 1
-                            elif re.search("=", line2.strip()):
-                                temp = line2.strip().split("=")
-                                if re.match("^" + re.escape(key) + "$", temp[0].strip()):
-                                    contents2.pop(i)
-                                i += 1
-                            else:
-                                i += 1
-                    self.contents = []
-                    for item in contents1:
-                        self.contents.append(item)
-                    for item in contents2:
-                        self.contents.append(item)
-                    if contents3:
-                        for item in contents3:
-                            self.contents.append(item)
-        for line in self.contents:
-            self.tempstring += line
-        return True
+        if self.configType == "openeq":
+            return self.setSectionValues(fixables, removeables, " = ")
+        else:
+            return self.setSectionValues(fixables, removeables, "=")
 ###############################################################################
     def setSpaceValue(self, fixables, removeables):
-        contents1, contents2, contents3 = [], [], []
-        if fixables:
-            if not self.contents:
-                for tag in fixables:
-                    self.contents.append("[" + tag + "]\n")
-                    for k, v in list(fixables[tag].items()):
-                        self.contents.append(k + " " + v + "\n")
-            else:
-                for tag in fixables:
-                    contents = self.contents
-                    length = len(contents) - 1
-                    iter1 = 0
-                    for line in contents:
-                        keys = fixables[tag]
-                        if re.search("^#", line) or re.match('^\s*$', line):
-                            iter1 += 1
-                        elif re.search("^\[" + re.escape(tag) + "\]", line.strip()):
-                            contents1 = contents[:iter1 + 1]
-                            tempcontents = contents[iter1 + 1:]
-                            iter2 = 0
-                            length = len(tempcontents) - 1
-                            for line2 in tempcontents:
-                                if re.search("^#", line2) or re.match('^\s*$', line2):
-                                    iter2 += 1
-                                elif re.search("^\[.*\]$", line2):
-                                    contents2 = tempcontents[:iter2]
-                                    contents3 = tempcontents[iter2:]
-                                    break
-                                elif iter2 == length:
-                                    contents3 = []
-                                    contents2 = tempcontents[:iter2 + 1]
-                                else:
-                                    iter2 += 1
-                        else:
-                            iter1 += 1
-                    if contents2:
-                        for key in keys:
-                            i = 0
-                            for line2 in contents2:
-                                if re.search("^#", line2) or re.match('^\s*$', line2):
-                                    i += 1
-                                elif re.search(" ", line2.strip()):
-                                    temp = line2.strip().split(" ")
-                                    if re.match("^" + re.escape(key) + "$", temp[0].strip()):
-                                        contents2.pop(i)
-                                    i += 1
-                                else:
-                                    i += 1
-                        for key in keys:
-                            contents2.append(key + " " + keys[key] + "\n")
-                        self.contents = []
-                        for item in contents1:
-                            self.contents.append(item)
-                        for item in contents2:
-                            self.contents.append(item)
-                        if contents3:
-                            for item in contents3:
-                                self.contents.append(item)
+        return self.setSectionValues(fixables, removeables, " ")
+###############################################################################
+    def setSectionValues(self, fixables, removeables, separator):
+        '''remove the keys in removeables from under their tags and put the
+        key value pairs in fixables under their tags, replacing the lines the
+        keys were on.  Tags that are not in the file are added to the end of
+        it with their key value pairs.
+
+        :param fixables: dictionary of tag: {key: value} desired in the file
+        :param removeables: dictionary of tag: {key: value} not desired
+        :param separator: string put between the keys and values
+        :returns: True
+
+        '''
+        poplist = set()
+        # lines to put in front of a line number of the file
+        inserts = {}
+        appended = []
         if removeables:
             for tag in removeables:
-                contents = self.contents
-                length = len(contents) - 1
-                iter1 = 0
-                for line in contents:
-                    keys = removeables[tag]
-                    if re.search("^#", line) or re.match('^\s*$', line):
-                        iter1 += 1
-                    elif re.search("^\[" + re.escape(tag) + "\]", line.strip()):
-                        contents1 = contents[:iter1 + 1]
-                        tempcontents = contents[iter1 + 1:]
-                        iter2 = 0
-                        length = len(tempcontents) - 1
-                        for line2 in tempcontents:
-                            if re.search("^#", line2) or re.match('^\s*$', line2):
-                                iter2 += 1
-                            elif re.search("^\[.*\]$", line2):
-                                contents2 = tempcontents[:iter2]
-                                contents3 = tempcontents[iter2:]
-                                break
-                            elif iter2 == length:
-                                contents3 = []
-                                contents2 = tempcontents[:iter2 + 1]
-                            else:
-                                iter2 += 1
-                    else:
-                        iter1 += 1
-                if contents2:
-                    for key in keys:
-                        i = 0
-                        for line2 in contents2:
-                            if re.search("^#", line2) or re.match('^\s*$', line2):
-                                i += 1
-                            elif re.search(" ", line2.strip()):
-                                temp = line2.strip().split(" ")
-                                if re.match("^" + re.escape(key) + "$", temp[0].strip()):
-                                    contents2.pop(i)
-                                i += 1
-                            else:
-                                i += 1
-                    self.contents = []
-                    for item in contents1:
-                        self.contents.append(item)
-                    for item in contents2:
-                        self.contents.append(item)
-                    if contents3:
-                        for item in contents3:
-                            self.contents.append(item)
-        for line in self.contents:
-            self.tempstring += line
+                section = self.getSection(tag)
+                if section is None:
+                    continue
+                for key in removeables[tag]:
+                    for entry in section.entries.get(key, []):
+                        poplist.add(entry.lineno)
+        if fixables:
+            for tag in fixables:
+                keys = fixables[tag]
+                lines = [key + separator + keys[key] + "\n" for key in keys]
+                section = self.getSection(tag)
+                if section is None:
+                    #never found the desired tag so just add tag and
+                    #key,value pairs
+                    appended.append("[" + tag + "]\n")
+                    appended.extend(lines)
+                    continue
+                for key in keys:
+                    for entry in section.entries.get(key, []):
+                        poplist.add(entry.lineno)
+                inserts.setdefault(section.insert, []).extend(lines)
+        contents = []
+        for lineno, line in enumerate(self.contents):
+            contents.extend(inserts.get(lineno, []))
+            if lineno not in poplist:
+                contents.append(line)
+        if contents and not contents[-1].endswith("\n"):
+            contents[-1] += "\n"
+        contents.extend(inserts.get(len(self.contents), []))
+        contents.extend(appended)
+        self.contents = contents
+        self.lines = None
+        self.document = None
+        self.sections = None
+        getdocument(self.path).stage(self.contents)
         return True
 ###############################################################################
     def commit(self):
+        # the staged lines include the edits of other editors of the file
+        lines = getdocument(self.path).getpending()
+        if lines is None:
+            lines = self.contents
+        self.tempstring = "".join(lines)
         return self.writeFile(self.tmpPath, self.tempstring)
 ###############################################################################
     def writeFile(self, tmpfile, contents):
@@ -610,15 +378,17 @@ class KVATaggedConf():
 ###############################################################################
     def storeContents(self, path):
         try:
-            f = open(path, 'r')
+            document = getdocument(path)
+            lines = document.getlines()
         except IOError:
             self.detailedresults = "KVATaggedConf: unable to open the " \
             "specified file"
             self.detailedresults += traceback.format_exc()
             return False
-        for line in f:
-            self.contents.append(line)
-        f.close()
+        self.contents = list(lines)
+        self.lines = lines
+        self.document = document
+        self.sections = None
 ###############################################################################
     def checkConfigType(self):
         for item in self.contents:
@@ -255,6 +255,7 @@ class KVEditor(object):
         validate = True
         if not self.checkConf():
             return False
+        self.editor.storeContents(self.path)
         if self.intent == "present":
             for k, v in list(self.data.items()):
                 retval = self.editor.validate(k, v)
@@ -315,6 +316,7 @@ class KVEditor(object):
         keyvals = {}
         if not self.checkTag():
             return False
+        self.editor.storeContents(self.path)
         if self.intent == "present":
             for tag in self.data:
                 keyvals = self.editor.getValue(tag, self.data[tag])
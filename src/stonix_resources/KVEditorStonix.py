@@ -19,9 +19,12 @@
 Created on Jun 12, 2013
 
 @author: dwalker
+@change: 2026/10/18 - conf and tagconf editors of the same file share one
+    document; the first commit writes the edits of all of them
 '''
 from stonix_resources.KVEditor import KVEditor
 from stonix_resources.logdispatcher import LogPriority
+from stonix_resources.KVACache import getdocument
 import os
 
 
@@ -86,6 +89,8 @@ class KVEditorStonix(KVEditor):
 ###############################################################################
     def fix(self):
         if self.update():
+            if self.kvtype in ("conf", "tagconf"):
+                getdocument(self.path).addeventid(self.getEventID())
             debug = "KVEditorStonix fix is returning True\n"
             self.logger.log(LogPriority.DEBUG, debug)
             return True
@@ -127,20 +132,31 @@ class KVEditorStonix(KVEditor):
             debug = "KVEditorStonix commit is returning True\n"
             self.logger.log(LogPriority.DEBUG, debug)
             return True
+        document = getdocument(self.path)
+        if document.getpending() is None:
+            # nothing staged, or the edits were already written by another
+            # editor of the same file
+            debug = "No pending changes to " + self.path + \
+                ", KVEditorStonix commit is returning True\n"
+            self.logger.log(LogPriority.DEBUG, debug)
+            return True
         elif self.editor.commit():
+            eventid = self.getEventID() or document.geteventid()
             event = {'eventtype': 'conf',
                      'startstate': 'notconfigured',
                      'endstate': 'configured',
                      'filepath': self.path}
-            if self.getEventID():
-                self.stchlgr.recordchgevent(self.getEventID(), event)
-                self.stchlgr.recordfilechange(self.path, self.tmpPath, self.eid)
+            if eventid:
+                self.stchlgr.recordchgevent(eventid, event)
+                self.stchlgr.recordfilechange(self.path, self.tmpPath,
+                                              eventid)
             try:
                 os.rename(self.tmpPath, self.path)
             except OSError:
                 debug = "Couldn't rename file in KVEditorStonix commit\n"
                 self.logger.log(LogPriority.DEBUG, debug)
                 return False
+            document.committed()
             debug = "KVEditorStonix commit is returning True\n"
             self.logger.log(LogPriority.DEBUG, debug)
             return True
@@ -0,0 +1,359 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Kernel module policy shared by the rules that disable kernel modules.
+
+The modprobe configuration in /etc/modprobe.d and the other modprobe.d
+directories, followed by the legacy /etc/modprobe.conf, is parsed once into
+an index of directives by command and module name, each with the file and
+line it came from. The loaded modules are read from /proc/modules instead of
+running lsmod. Files are only parsed again when their inode, size or mtime
+changes, so a rule sees its own changes after a fix.
+
+Module names are compared the way modprobe compares them, with - and _
+treated as the same character.
+
+render() merges a group of directives into the current contents of a drop
+in file so a rule writes all of its directives with a single write, adding
+only those that are not already in effect.
+
+Use getmodprobe() to obtain the shared instance.
+"""
+
+import os
+import threading
+
+from collections import namedtuple
+
+from stonix_resources.logdispatcher import LogPriority
+
+PROCMODULES = '/proc/modules'
+
+MODPROBECONF = '/etc/modprobe.conf'
+
+# Directories searched for *.conf files. A file name found in an earlier
+# directory hides files of the same name in later ones.
+MODPROBEDIRS = ['/etc/modprobe.d', '/run/modprobe.d',
+                '/usr/local/lib/modprobe.d', '/usr/lib/modprobe.d',
+                '/lib/modprobe.d']
+
+# command is blacklist, install, remove, options, alias or softdep. For
+# alias the module is the alias pattern and args the module name.
+ModprobeDirective = namedtuple('ModprobeDirective', ['command', 'module',
+                                                     'args', 'path',
+                                                     'lineno'])
+
+LoadedModule = namedtuple('LoadedModule', ['name', 'size', 'instances',
+                                           'users'])
+
+_modprobe = None
+_modprobelock = threading.Lock()
+
+
+def getmodprobe(logger):
+    '''Return the shared ModprobePolicy instance, creating it on first use
+
+    :param logger: logdispatcher object
+    :returns: ModprobePolicy
+    '''
+    global _modprobe
+    with _modprobelock:
+        if _modprobe is None:
+            _modprobe = ModprobePolicy(logger)
+        return _modprobe
+
+
+def normalizemodule(name):
+    '''Return a module name with - replaced by _, as modprobe does'''
+    return name.replace('-', '_')
+
+
+def parsedirective(line):
+    '''Return (command, module, args) of a directive line such as
+    "install usb-storage /bin/true", or None for blank lines and comments
+
+    :param line: string
+    :returns: tuple or None
+    '''
+    fields = line.split(None, 2)
+    if len(fields) < 2 or fields[0].startswith('#'):
+        return None
+    args = ''
+    if len(fields) > 2:
+        args = ' '.join(fields[2].split())
+    return fields[0], normalizemodule(fields[1]), args
+
+
+class ModprobePolicy(object):
+    '''Indexed view of the modprobe configuration and of the loaded kernel
+    modules.
+    '''
+
+    def __init__(self, logger, modprobedirs=None, modprobeconf=MODPROBECONF,
+                 procmodules=PROCMODULES):
+        '''
+        :param logger: logdispatcher object
+        :param modprobedirs: list of modprobe.d directories, defaults to
+            MODPROBEDIRS
+        :param modprobeconf: path of the legacy modprobe.conf
+        :param procmodules: path of the loaded module list
+        '''
+        self.logger = logger
+        if modprobedirs is None:
+            modprobedirs = MODPROBEDIRS
+        self.modprobedirs = modprobedirs
+        self.modprobeconf = modprobeconf
+        self.procmodules = procmodules
+        self.lock = threading.RLock()
+        # path -> (stamp, list of ModprobeDirective)
+        self.parsed = {}
+        # (stamps of all files, {(command, module): [ModprobeDirective]})
+        self.index = None
+        self.loaded = None
+
+    def refresh(self):
+        '''Forget everything read so far'''
+        with self.lock:
+            self.parsed = {}
+            self.index = None
+            self.loaded = None
+
+    def getstamp(self, path):
+        '''Return (inode, mtime, size) of path or None if it is missing'''
+        try:
+            fstat = os.stat(path)
+        except OSError:
+            return None
+        return (fstat.st_ino, fstat.st_mtime_ns, fstat.st_size)
+
+    def conffiles(self):
+        '''Return the configuration files in the order they are loaded
+
+        :returns: list of paths
+        '''
+        byname = {}
+        for dirname in self.modprobedirs:
+            try:
+                names = os.listdir(dirname)
+            except OSError:
+                continue
+            for name in names:
+                if name.endswith('.conf') and name not in byname:
+                    byname[name] = os.path.join(dirname, name)
+        files = [byname[name] for name in sorted(byname)]
+        if os.path.isfile(self.modprobeconf):
+            files.append(self.modprobeconf)
+        return files
+
+    def parsefile(self, path, stamp):
+        '''Return the directives of one configuration file, parsing it only
+        if it changed since the last call. Lines ending in a backslash are
+        joined with the next line, the directive is reported at the line it
+        starts on.
+
+        :param path: string
+        :param stamp: current stamp of the file
+        :returns: list of ModprobeDirective
+        '''
+        with self.lock:
+            cached = self.parsed.get(path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        directives = []
+        try:
+            with open(path) as fhandle:
+                pending = ''
+                start = 0
+                for lineno, line in enumerate(fhandle, 1):
+                    line = line.rstrip('\n')
+                    if not pending:
+                        start = lineno
+                    if line.endswith('\\'):
+                        pending += line[:-1] + ' '
+                        continue
+                    parsed = parsedirective(pending + line)
+                    pending = ''
+                    if parsed is not None:
+                        directives.append(ModprobeDirective(*parsed,
+                                                            path=path,
+                                                            lineno=start))
+        except (IOError, OSError, UnicodeDecodeError) as err:
+            self.logger.log(LogPriority.DEBUG,
+                            ['ModprobePolicy.parsefile',
+                             'Unable to read ' + path + ': ' + str(err)])
+            return []
+        with self.lock:
+            self.parsed[path] = (stamp, directives)
+        return directives
+
+    def getindex(self):
+        '''Return the directives of all configuration files by command and
+        module, in load order, indexing them again if any file changed
+
+        :returns: dict of (command, module) -> list of ModprobeDirective
+        '''
+        files = [(path, self.getstamp(path)) for path in self.conffiles()]
+        with self.lock:
+            if self.index is not None and self.index[0] == files:
+                return self.index[1]
+            index = {}
+            for path, stamp in files:
+                if stamp is None:
+                    continue
+                for directive in self.parsefile(path, stamp):
+                    index.setdefault((directive.command, directive.module),
+                                     []).append(directive)
+            self.index = (files, index)
+            return index
+
+    def getdirectives(self, command, module):
+        '''Return the directives of a command for a module, in load order
+
+        :param command: blacklist, install, options, ...
+        :param module: module name
+        :returns: list of ModprobeDirective
+        '''
+        return list(self.getindex().get((command, normalizemodule(module)),
+                                        []))
+
+    def isblacklisted(self, module):
+        '''Return whether a module is blacklisted
+
+        :param module: module name
+        :returns: bool
+        '''
+        return bool(self.getdirectives('blacklist', module))
+
+    def getinstall(self, module):
+        '''Return the install directive modprobe uses for a module, the first
+        one it reads, or None
+
+        :param module: module name
+        :returns: ModprobeDirective or None
+        '''
+        directives = self.getdirectives('install', module)
+        if directives:
+            return directives[0]
+        return None
+
+    def hasdirective(self, directive):
+        '''Return whether a directive line, for example
+        "install cramfs /bin/true", is in the configuration. Whitespace and
+        the - or _ spelling of the module name do not matter.
+
+        :param directive: string
+        :returns: bool
+        '''
+        parsed = parsedirective(directive)
+        if parsed is None:
+            return False
+        command, module, args = parsed
+        for found in self.getindex().get((command, module), []):
+            if found.args == args:
+                return True
+        return False
+
+    def missing(self, directives):
+        '''Return the directives which are not in the configuration
+
+        :param directives: list of directive lines
+        :returns: list of directive lines, in the order passed
+        '''
+        return [directive for directive in directives
+                if not self.hasdirective(directive)]
+
+    def describe(self, directive):
+        '''Return where a directive line is configured, for the detailed
+        results of a rule
+
+        :param directive: string
+        :returns: string
+        '''
+        parsed = parsedirective(directive)
+        if parsed is not None:
+            command, module, args = parsed
+            for found in self.getindex().get((command, module), []):
+                if found.args == args:
+                    return directive + " is set in " + found.path + \
+                        " line " + str(found.lineno)
+        return directive + " is not set in modprobe.d or " + \
+            self.modprobeconf
+
+    def getloaded(self):
+        '''Return the loaded kernel modules, read from /proc/modules once
+
+        :returns: dict of module name -> LoadedModule
+        '''
+        with self.lock:
+            if self.loaded is not None:
+                return self.loaded
+            loaded = {}
+            try:
+                with open(self.procmodules) as fhandle:
+                    for line in fhandle:
+                        fields = line.split()
+                        if len(fields) < 4:
+                            continue
+                        users = [user for user in fields[3].split(',')
+                                 if user and user != '-']
+                        loaded[fields[0]] = LoadedModule(fields[0],
+                                                         int(fields[1]),
+                                                         int(fields[2]),
+                                                         users)
+            except (IOError, OSError, ValueError) as err:
+                self.logger.log(LogPriority.DEBUG,
+                                ['ModprobePolicy.getloaded',
+                                 'Unable to read ' + self.procmodules +
+                                 ': ' + str(err)])
+            self.loaded = loaded
+            return loaded
+
+    def isloaded(self, module):
+        '''Return whether a kernel module is loaded
+
+        :param module: module name
+        :returns: bool
+        '''
+        return normalizemodule(module) in self.getloaded()
+
+    def render(self, path, directives):
+        '''Return the contents of a drop in file with the directives that
+        are not yet in effect appended to it
+
+        :param path: path of the drop in file, which need not exist
+        :param directives: list of directive lines
+        :returns: tuple (string contents, list of directive lines added)
+        '''
+        contents = ''
+        if os.path.exists(path):
+            try:
+                with open(path) as fhandle:
+                    contents = fhandle.read()
+            except (IOError, OSError, UnicodeDecodeError) as err:
+                self.logger.log(LogPriority.DEBUG,
+                                ['ModprobePolicy.render',
+                                 'Unable to read ' + path + ': ' +
+                                 str(err)])
+        added = self.missing(directives)
+        if added:
+            if contents and not contents.endswith('\n'):
+                contents += '\n'
+            contents += ''.join(directive + '\n' for directive in added)
+        return contents, added
@@ -0,0 +1,259 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Detects whether another process holds a package manager's lock, by looking
+at the lock files themselves instead of listing every lock on the system
+with lslocks or lsof.
+
+Two kinds of lock files are checked:
+ - lock files such as the rpm database lock or the dpkg locks, which are
+   held with fcntl locks. These are looked up by device and inode in
+   /proc/locks; where that is not available a non blocking shared lock is
+   tried and released at once.
+ - pid files such as /var/run/yum.pid, which count as held while the
+   process they name is alive.
+
+Results are cached for CACHETTL seconds. waitforunlock() waits for the
+lock with exponential backoff until a deadline.
+
+Use getpackagelock() to obtain the shared instance for a package manager.
+"""
+
+import errno
+import fcntl
+import os
+import threading
+import time
+
+from stonix_resources.logdispatcher import LogPriority
+
+PROCLOCKS = '/proc/locks'
+
+RPMLOCK = '/var/lib/rpm/.rpm.lock'
+
+# package manager -> (fcntl locked files, pid files)
+MANAGERS = {'yum': ([RPMLOCK], ['/var/run/yum.pid', '/run/yum.pid']),
+            'dnf': ([RPMLOCK], ['/var/run/dnf.pid', '/run/dnf.pid']),
+            'zypper': ([RPMLOCK], ['/var/run/zypp.pid', '/run/zypp.pid']),
+            'apt': (['/var/lib/dpkg/lock-frontend', '/var/lib/dpkg/lock',
+                     '/var/lib/apt/lists/lock',
+                     '/var/cache/apt/archives/lock'], [])}
+
+# Seconds a probe result is reused
+CACHETTL = 1.0
+
+# Default number of seconds to wait for a lock; the package helpers used to
+# try 12 times, 5 seconds apart
+DEADLINE = 60
+
+# First and largest delay between probes while waiting
+MINDELAY = 0.1
+MAXDELAY = 5.0
+
+_locks = {}
+_lockslock = threading.Lock()
+
+
+def getpackagelock(manager, logger):
+    '''Return the shared PackageLock for a package manager
+
+    :param manager: one of the keys of MANAGERS
+    :param logger: logdispatcher object
+    :returns: PackageLock
+    '''
+    with _lockslock:
+        if manager not in _locks:
+            lockfiles, pidfiles = MANAGERS[manager]
+            _locks[manager] = PackageLock(logger, manager, lockfiles,
+                                          pidfiles)
+        return _locks[manager]
+
+
+def readproclocks(path=PROCLOCKS):
+    '''Return the (device, inode) pairs of the files with granted write
+    locks listed in /proc/locks, or None if it cannot be read. Shared READ
+    locks, taken by rpm -q and rpm -V, do not keep a package manager from
+    reading the database and are left out. Device numbers are returned as
+    (major, minor).
+
+    :param path: path of the locks table
+    :returns: set of ((major, minor), inode) or None
+    '''
+    held = set()
+    try:
+        with open(path) as fhandle:
+            for line in fhandle:
+                fields = line.split()
+                # "1: -> POSIX ..." lines are waiters, not holders
+                if len(fields) < 6 or fields[1] == '->':
+                    continue
+                if fields[3] != 'WRITE':
+                    continue
+                parts = fields[5].split(':')
+                if len(parts) != 3:
+                    continue
+                try:
+                    held.add(((int(parts[0], 16), int(parts[1], 16)),
+                              int(parts[2])))
+                except ValueError:
+                    continue
+    except (IOError, OSError):
+        return None
+    return held
+
+
+def pidalive(pid):
+    '''Return True if a process with the given pid exists
+
+    :param pid: int
+    :returns: bool
+    '''
+    if pid <= 0 or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except OSError as err:
+        return err.errno == errno.EPERM
+    return True
+
+
+class PackageLock(object):
+    '''Lock state of one package manager.'''
+
+    def __init__(self, logger, name, lockfiles, pidfiles, proclocks=PROCLOCKS):
+        '''
+        :param logger: logdispatcher object
+        :param name: package manager name, used in log messages
+        :param lockfiles: list of files held with fcntl locks
+        :param pidfiles: list of pid files
+        :param proclocks: path of the kernel's lock table
+        '''
+        self.logger = logger
+        self.name = name
+        self.lockfiles = lockfiles
+        self.pidfiles = pidfiles
+        self.proclocks = proclocks
+        self.lock = threading.Lock()
+        self.checked = 0
+        self.locked = False
+
+    def invalidate(self):
+        '''Forget the cached probe result'''
+        with self.lock:
+            self.checked = 0
+
+    def islocked(self):
+        '''Return True if another process holds the package manager's lock.
+        The result of a probe is reused for CACHETTL seconds.
+
+        :returns: bool
+        '''
+        with self.lock:
+            now = time.time()
+            if now - self.checked >= CACHETTL:
+                self.locked = self.probe()
+                self.checked = now
+            return self.locked
+
+    def probe(self):
+        '''Check the lock and pid files
+
+        :returns: bool
+        '''
+        for pidfile in self.pidfiles:
+            if self.pidfileheld(pidfile):
+                return True
+        existing = []
+        for lockfile in self.lockfiles:
+            try:
+                existing.append((lockfile, os.stat(lockfile)))
+            except OSError:
+                continue
+        if not existing:
+            return False
+        held = readproclocks(self.proclocks)
+        if held is not None:
+            heldinodes = set([inode for _, inode in held])
+        for lockfile, fstat in existing:
+            if held is None:
+                if self.fcntlheld(lockfile):
+                    return True
+                continue
+            device = (os.major(fstat.st_dev), os.minor(fstat.st_dev))
+            if (device, fstat.st_ino) in held:
+                return True
+            # some file systems (btrfs subvolumes for one) report a different
+            # device in /proc/locks than stat does; confirm inode matches
+            if fstat.st_ino in heldinodes and self.fcntlheld(lockfile):
+                return True
+        return False
+
+    def pidfileheld(self, pidfile):
+        '''Return True if pidfile names a running process'''
+        try:
+            with open(pidfile) as fhandle:
+                content = fhandle.read(64).split()
+        except (IOError, OSError):
+            return False
+        if not content:
+            return False
+        try:
+            return pidalive(int(content[0]))
+        except ValueError:
+            return False
+
+    def fcntlheld(self, lockfile):
+        '''Return True if a shared lock on lockfile cannot be taken. The lock
+        is released again straight away.'''
+        try:
+            fd = os.open(lockfile, os.O_RDONLY)
+        except OSError:
+            return False
+        try:
+            fcntl.lockf(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+        except (IOError, OSError) as err:
+            return err.errno in (errno.EACCES, errno.EAGAIN)
+        finally:
+            os.close(fd)
+        return False
+
+    def waitforunlock(self, deadline=DEADLINE):
+        '''Wait until the lock is free, sleeping between probes with a delay
+        that doubles from MINDELAY up to MAXDELAY.
+
+        :param deadline: number of seconds to wait at most
+        :returns: bool - True if the lock is free, False on timeout
+        '''
+        if not self.islocked():
+            return True
+        self.logger.log(LogPriority.DEBUG,
+                        self.name + " package manager is in-use by another " +
+                        "process. Waiting for it to be freed...")
+        end = time.time() + deadline
+        delay = MINDELAY
+        while True:
+            remaining = end - time.time()
+            if remaining <= 0:
+                return False
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, MAXDELAY)
+            self.invalidate()
+            if not self.islocked():
+                return True
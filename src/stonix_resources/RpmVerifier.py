@@ -0,0 +1,395 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Bulk rpm verification shared by the rules that need it. Instead of one
+"rpm -V <package>" per installed package, the installed packages are split
+into a few chunks and each chunk is verified by a single rpm process; the
+chunks run in parallel. Output is parsed line by line as it is read.
+
+Results are kept for the rest of the run so that a later rule (for example
+FilePermissions checking SUID files) can answer its questions without
+starting rpm again. Call invalidate() after changing package files.
+
+Use getverifier() to obtain the process wide instance.
+"""
+
+import os
+import re
+import subprocess
+import threading
+
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from stonix_resources.logdispatcher import LogPriority
+
+RPMPATHS = ['/usr/bin/rpm', '/bin/rpm']
+
+# Checks that are skipped. These match the options
+# InstalledSoftwareVerification has always used.
+VERIFYOPTS = ['--nosignature', '--nolinkto', '--nofiledigest', '--nosize',
+              '--nomtime', '--nordev', '--nocaps']
+
+# Upper bound on the number of rpm processes run at once
+MAXJOBS = 4
+
+# Upper bound on the number of paths passed to one rpm process, which keeps
+# the argument list well below ARG_MAX
+MAXPATHS = 512
+
+# rpm -V flag characters
+MODE = 'M'
+DIGEST = '5'
+OWNER = 'U'
+GROUP = 'G'
+
+# rpmcheck() return codes. These are the values FilePermissions.rpmcheck has
+# always returned.
+MODECHANGED = 0
+UNCHANGED = 1
+NOTOWNED = 3
+NORPM = 4
+UNKNOWN = 5
+
+VerifyResult = namedtuple('VerifyResult', ['path', 'flags', 'attr',
+                                           'missing'])
+
+VERIFYRE = re.compile(r'^(\S{8,9})\s+(?:([cdglr])\s+)?(/.*)$')
+MISSINGRE = re.compile(r'^missing\s+(?:([cdglr])\s+)?(/.*)$')
+NOTOWNEDRE = re.compile(r'^file (/.*) is not owned by any package$')
+NOSUCHRE = re.compile(r'^error: file (/.*): No such file or directory$')
+
+_verifier = None
+_verifierlock = threading.Lock()
+
+
+def getverifier(logger):
+    '''Return the process wide RpmVerifier instance, creating it on first
+    use.
+
+    :param logger: logdispatcher object
+    :returns: RpmVerifier
+    '''
+    global _verifier
+    with _verifierlock:
+        if _verifier is None:
+            _verifier = RpmVerifier(logger)
+        return _verifier
+
+
+def parseline(line):
+    '''Parse one line of rpm -V output.
+
+    :param line: string
+    :returns: VerifyResult or None if the line is not a verify result
+    '''
+    line = line.rstrip('\n')
+    match = VERIFYRE.match(line)
+    if match:
+        return VerifyResult(match.group(3), match.group(1),
+                            match.group(2) or '', False)
+    match = MISSINGRE.match(line)
+    if match:
+        return VerifyResult(match.group(2), '', match.group(1) or '', True)
+    return None
+
+
+class RpmVerifier(object):
+    '''Verifies installed rpm packages in bulk and answers queries about the
+    results.
+    '''
+
+    def __init__(self, logger, jobs=None, rpm=None):
+        '''
+        :param logger: logdispatcher object
+        :param jobs: int - number of rpm processes to run at once. Defaults
+            to the number of CPUs, at most MAXJOBS
+        :param rpm: path to the rpm binary. Defaults to the first of
+            RPMPATHS that exists
+        '''
+        self.logger = logger
+        if jobs is None:
+            jobs = min(os.cpu_count() or 1, MAXJOBS)
+        self.jobs = max(1, int(jobs))
+        if rpm is None:
+            for rpmpath in RPMPATHS:
+                if os.path.exists(rpmpath):
+                    rpm = rpmpath
+                    break
+        self.rpm = rpm
+        self.lock = threading.RLock()
+        # path -> VerifyResult for every file that failed a check
+        self.results = {}
+        # packages whose files are covered by self.results
+        self.verified = set()
+        self.complete = False
+        # paths already covered by a verifyfiles() call
+        self.checkedpaths = set()
+        # path -> bool, whether any package owns the path
+        self.owned = {}
+
+    def available(self):
+        '''Return True if an rpm binary was found
+
+        :returns: bool
+        '''
+        return bool(self.rpm)
+
+    def invalidate(self):
+        '''Forget all results, e.g. after rpm --setperms has been run'''
+        with self.lock:
+            self.results = {}
+            self.verified = set()
+            self.complete = False
+            self.checkedpaths = set()
+            self.owned = {}
+
+    def listpackages(self):
+        '''Return the installed packages as reported by rpm -qa
+
+        :returns: list of strings
+        '''
+        output, _, _ = self.runrpm(['-qa'])
+        return [line.strip() for line in output if line.strip()]
+
+    def runrpm(self, args, handler=None):
+        '''Run rpm with the passed arguments. If handler is given it is called
+        with each line of standard output as it is read and the returned
+        output list is empty.
+
+        :param args: list of arguments
+        :param handler: optional callable taking a line of output
+        :returns: tuple (output lines, error lines, return code)
+        '''
+        if not self.rpm:
+            return [], [], -1
+        output = []
+        try:
+            proc = subprocess.Popen([self.rpm] + args, close_fds=True,
+                                    stdout=subprocess.PIPE,
+                                    stderr=subprocess.PIPE,
+                                    universal_newlines=True,
+                                    errors='replace')
+        except OSError as err:
+            self.logger.log(LogPriority.DEBUG,
+                            ['RpmVerifier.runrpm',
+                             'Unable to run rpm: ' + str(err)])
+            return [], [], -1
+        # stderr is read on a helper thread so a chatty rpm cannot block on
+        # a full pipe while we are reading stdout
+        errout = []
+        reader = threading.Thread(target=lambda:
+                                  errout.extend(proc.stderr.readlines()))
+        reader.daemon = True
+        reader.start()
+        for line in proc.stdout:
+            if handler:
+                handler(line)
+            else:
+                output.append(line)
+        proc.stdout.close()
+        retcode = proc.wait()
+        reader.join()
+        proc.stderr.close()
+        return output, errout, retcode
+
+    def chunks(self, paths):
+        '''Split a list of paths into lists of at most MAXPATHS entries
+
+        :param paths: list of paths
+        :returns: list of lists
+        '''
+        return [paths[i:i + MAXPATHS] for i in range(0, len(paths), MAXPATHS)]
+
+    def verify(self, packages=None):
+        '''Verify the passed packages, or every installed package, and return
+        the results. Once every installed package has been verified later
+        calls return the stored results.
+
+        :param packages: optional list of package names. Defaults to all
+            installed packages
+        :returns: dict of path -> VerifyResult for failing files
+        '''
+        with self.lock:
+            if self.complete:
+                return dict(self.results)
+            installed = self.listpackages()
+            if packages is None:
+                packages = installed
+            packages = [pkg.strip() for pkg in packages if pkg.strip()]
+            todo = [pkg for pkg in packages if pkg not in self.verified]
+            chunks = [todo[i::self.jobs] for i in range(self.jobs)]
+            chunks = [chunk for chunk in chunks if chunk]
+            if len(chunks) == 1:
+                found = [self.verifychunk(chunks[0])]
+            elif chunks:
+                with ThreadPoolExecutor(max_workers=len(chunks)) as pool:
+                    found = list(pool.map(self.verifychunk, chunks))
+            else:
+                found = []
+            for chunk, results in zip(chunks, found):
+                if results is None:
+                    continue
+                self.results.update(results)
+                self.verified.update(chunk)
+            self.verified.update([pkg for pkg in packages
+                                  if pkg not in todo])
+            self.complete = bool(installed) and \
+                self.verified.issuperset(installed)
+            self.logger.log(LogPriority.DEBUG,
+                            ['RpmVerifier.verify',
+                             'Verified ' + str(len(packages)) +
+                             ' packages with ' + str(len(chunks)) +
+                             ' rpm processes, ' + str(len(self.results)) +
+                             ' files failed'])
+            return dict(self.results)
+
+    def verifychunk(self, packages):
+        '''Verify a list of packages with a single rpm process.
+
+        :param packages: list of package names
+        :returns: dict of path -> VerifyResult, None if rpm could not be run
+        '''
+        results = {}
+
+        def handler(line):
+            result = parseline(line)
+            if result:
+                results[result.path] = result
+
+        _, _, retcode = self.runrpm(['-V'] + VERIFYOPTS + packages, handler)
+        if retcode < 0:
+            return None
+        return results
+
+    def verifyfiles(self, paths):
+        '''Verify the packages owning the passed paths, with one rpm process
+        per MAXPATHS paths, and return the results for those paths. Uses the
+        stored results if a full verification has already been done. Paths
+        which could not be verified are not added to checkedpaths.
+
+        :param paths: list of paths
+        :returns: dict of path -> VerifyResult for failing paths
+        '''
+        paths = [path.strip() for path in paths]
+        with self.lock:
+            if not self.complete:
+                owned = [path for path, isowned in
+                         self.checkowned(paths).items()
+                         if isowned and path not in self.checkedpaths]
+                for chunk in self.chunks(owned):
+                    results = {}
+
+                    def handler(line):
+                        result = parseline(line)
+                        if result:
+                            results[result.path] = result
+
+                    _, _, retcode = self.runrpm(['-V'] + VERIFYOPTS + ['-f'] +
+                                                chunk, handler)
+                    if retcode < 0:
+                        continue
+                    self.results.update(results)
+                    self.checkedpaths.update(chunk)
+            return dict([(path, self.results[path]) for path in paths
+                         if path in self.results])
+
+    def checkowned(self, paths):
+        '''Find out which of the passed paths belong to an installed package,
+        using one rpm -qf call per MAXPATHS paths not already known. Paths
+        for which rpm could not be run are None.
+
+        :param paths: list of paths
+        :returns: dict of path -> bool or None
+        '''
+        with self.lock:
+            unknown = [path for path in paths if path not in self.owned]
+            for chunk in self.chunks(unknown):
+                output, errout, retcode = self.runrpm(['-qf', '--qf',
+                                                       '%{NAME}\\n'] + chunk)
+                if retcode < 0:
+                    continue
+                notowned = set()
+                for line in output + errout:
+                    line = line.strip()
+                    match = NOTOWNEDRE.match(line) or NOSUCHRE.match(line)
+                    if match:
+                        notowned.add(match.group(1))
+                for path in chunk:
+                    self.owned[path] = path not in notowned
+            return dict([(path, self.owned.get(path)) for path in paths])
+
+    def owners(self, paths):
+        '''Return the packages owning each of the passed paths. This runs one
+        rpm -qf per path so it is meant for the handful of files that failed
+        verification.
+
+        :param paths: list of paths
+        :returns: dict of path -> list of package names
+        '''
+        owners = {}
+        for path in paths:
+            output, _, retcode = self.runrpm(['-qf', path])
+            if retcode == 0:
+                owners[path] = [line.strip() for line in output
+                                if line.strip()]
+            else:
+                owners[path] = []
+        return owners
+
+    def failed(self, check):
+        '''Return the paths that failed the passed check
+
+        :param check: rpm -V flag character, e.g. MODE or OWNER
+        :returns: list of strings
+        '''
+        with self.lock:
+            return sorted([result.path for result in self.results.values()
+                           if check in result.flags])
+
+    def rpmcheck(self, paths):
+        '''Return the rpmcheck status of each passed path: MODECHANGED if the
+        path belongs to a package and its mode differs from the package,
+        UNCHANGED if it belongs to a package and the mode matches, NOTOWNED if
+        no package owns it, NORPM if rpm is not installed, UNKNOWN if rpm
+        failed to run.
+
+        :param paths: list of paths
+        :returns: dict of path -> int
+        '''
+        paths = [path.strip() for path in paths]
+        if not self.available():
+            return dict([(path, NORPM) for path in paths])
+        results = self.verifyfiles(paths)
+        owned = self.checkowned(paths)
+        status = {}
+        for path in paths:
+            if owned.get(path) is None:
+                status[path] = UNKNOWN
+            elif not owned[path]:
+                status[path] = NOTOWNED
+            elif path not in results and not self.complete and \
+                    path not in self.checkedpaths:
+                status[path] = UNKNOWN
+            elif path in results and MODE in results[path].flags:
+                status[path] = MODECHANGED
+            else:
+                status[path] = UNCHANGED
+        return status
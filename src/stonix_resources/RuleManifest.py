@@ -0,0 +1,231 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Cached metadata about the rule modules so that the controller does not have
+to import and instantiate every rule at start up only to throw most of them
+away in findapplicable.
+
+For each rule module the manifest records the rule number, name, applicable
+dictionary, whether root is required, the names of its configuration items
+and whether the rule overrides isapplicable. An entry is only trusted while
+the size and mtime of the rule file match the recorded ones. The whole
+manifest is dropped when the stonix version, the rule template or the
+platform changes, since rules may set their properties based on the
+environment.
+
+Rules whose entry shows they are not applicable, need root when we are not
+root, or were not asked for with -m are skipped without being imported.
+Rules that override isapplicable are always imported.
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+
+from stonix_resources.logdispatcher import LogPriority
+from stonix_resources.rule import Rule, checkapplicability
+from stonix_resources.CheckApplicable import overridesapplicable
+
+MANIFESTNAME = 'rulemanifest.json'
+MANIFESTVERSION = 1
+
+
+def getmanifestpath(environ):
+    '''Return the path the manifest is kept at for the current user, or None
+    if there is nowhere suitable to keep it.
+
+    :param environ: environment object
+    :returns: string or None
+    '''
+    if environ.geteuid() == 0:
+        return os.path.join('/var/db/stonix', MANIFESTNAME)
+    home = environ.geteuidhome()
+    if not home or home == '/dev/null':
+        return None
+    return os.path.join(home, '.stonix', MANIFESTNAME)
+
+
+class RuleManifest(object):
+    '''Rule metadata cache keyed by rule file size and mtime.'''
+
+    def __init__(self, logger, environ, manifestfile=None):
+        '''
+        :param logger: logdispatcher object
+        :param environ: environment object
+        :param manifestfile: path of the manifest. Defaults to
+            getmanifestpath(environ); None keeps the manifest in memory only
+        '''
+        self.logger = logger
+        self.environ = environ
+        if manifestfile is None:
+            manifestfile = getmanifestpath(environ)
+        self.manifestfile = manifestfile
+        self.lock = threading.Lock()
+        # module name -> entry dict
+        self.rules = {}
+        self.changed = False
+        self.envkey = self.getenvkey()
+        self.load()
+
+    def getenvkey(self):
+        '''Return the values the cached rule properties may depend on'''
+        template = sys.modules[Rule.__module__].__file__
+        return [self.environ.getstonixversion(), os.stat(template).st_mtime,
+                self.environ.getosfamily(), self.environ.getostype(),
+                self.environ.getosver(), self.environ.geteuid()]
+
+    def load(self):
+        '''Read the manifest file. A missing, unreadable or outdated manifest
+        leaves the manifest empty.
+        '''
+        if not self.manifestfile or not os.path.exists(self.manifestfile):
+            return
+        try:
+            with open(self.manifestfile) as fhandle:
+                data = json.load(fhandle)
+        except (IOError, OSError, ValueError) as err:
+            self.logger.log(LogPriority.DEBUG,
+                            ['RuleManifest.load',
+                             'Ignoring unreadable manifest ' +
+                             self.manifestfile + ': ' + str(err)])
+            return
+        if not isinstance(data, dict) or \
+           data.get('version') != MANIFESTVERSION or \
+           data.get('envkey') != self.envkey:
+            self.logger.log(LogPriority.DEBUG,
+                            ['RuleManifest.load',
+                             'Manifest is outdated, rebuilding'])
+            self.changed = True
+            return
+        self.rules = data.get('rules', {})
+
+    def save(self):
+        '''Write the manifest if it changed. Errors are logged and otherwise
+        ignored; the manifest is only an optimization.
+        '''
+        with self.lock:
+            if not self.changed or not self.manifestfile:
+                return
+            data = {'version': MANIFESTVERSION, 'envkey': self.envkey,
+                    'rules': self.rules}
+            dirname = os.path.dirname(self.manifestfile)
+            tmpname = None
+            try:
+                if not os.path.isdir(dirname):
+                    os.makedirs(dirname, 0o700)
+                fd, tmpname = tempfile.mkstemp(dir=dirname,
+                                               prefix='.rulemanifest')
+                with os.fdopen(fd, 'w') as fhandle:
+                    json.dump(data, fhandle, sort_keys=True)
+                os.chmod(tmpname, 0o600)
+                os.rename(tmpname, self.manifestfile)
+                self.changed = False
+            except (IOError, OSError, TypeError, ValueError) as err:
+                if tmpname and os.path.exists(tmpname):
+                    os.remove(tmpname)
+                self.logger.log(LogPriority.DEBUG,
+                                ['RuleManifest.save',
+                                 'Unable to write ' + self.manifestfile +
+                                 ': ' + str(err)])
+
+    def lookup(self, module, path):
+        '''Return the entry for a rule module if it is still valid for the
+        file at path.
+
+        :param module: rule module name
+        :param path: path of the rule file
+        :returns: dict or None
+        '''
+        entry = self.rules.get(module)
+        if entry is None:
+            return None
+        try:
+            fstat = os.stat(path)
+        except OSError:
+            return None
+        if entry.get('mtime') != fstat.st_mtime or \
+           entry.get('size') != fstat.st_size:
+            return None
+        return entry
+
+    def add(self, module, path, rule):
+        '''Record the properties of a freshly instantiated rule. Must be
+        called before isapplicable has been run on the rule.
+
+        :param module: rule module name
+        :param path: path of the rule file
+        :param rule: rule instance
+        '''
+        try:
+            fstat = os.stat(path)
+            entry = {'mtime': fstat.st_mtime,
+                     'size': fstat.st_size,
+                     'number': rule.getrulenum(),
+                     'name': rule.getrulename(),
+                     'applicable': rule.applicable,
+                     'rootrequired': bool(rule.getisrootrequired()),
+                     'customapplicable': overridesapplicable(rule),
+                     'configitems': [item.getkey() for item in
+                                     rule.getconfigitems()]}
+            # make sure the entry survives the round trip through json
+            entry = json.loads(json.dumps(entry))
+        except (OSError, TypeError, ValueError, AttributeError) as err:
+            self.logger.log(LogPriority.DEBUG,
+                            ['RuleManifest.add',
+                             'Not caching ' + module + ': ' + str(err)])
+            return
+        with self.lock:
+            if self.rules.get(module) != entry:
+                self.rules[module] = entry
+                self.changed = True
+
+    def prune(self, modules):
+        '''Drop the entries of rule modules that no longer exist
+
+        :param modules: list of current rule module names
+        '''
+        with self.lock:
+            for module in set(self.rules) - set(modules):
+                del self.rules[module]
+                self.changed = True
+
+    def skippable(self, entry, wanted=None):
+        '''Return True if the rule described by entry would be discarded by
+        the controller, so it does not need to be imported.
+
+        :param entry: manifest entry
+        :param wanted: optional collection of rule names; rules not in it are
+            skipped
+        :returns: bool
+        '''
+        if wanted and entry['name'] not in wanted:
+            return True
+        if self.environ.geteuid() != 0 and entry['rootrequired']:
+            return True
+        if entry['customapplicable']:
+            return False
+        try:
+            return not checkapplicability(entry['applicable'], self.environ,
+                                          self.logger, entry['name'])
+        except Exception:
+            # let the real rule report the problem
+            return False
@@ -0,0 +1,311 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+The rule profiler records the time and resources used by each phase
+(report, fix, re-report, undo) of each rule: wall and CPU time, the number
+of subprocesses started, the number of commands run by CommandHelper and
+the time spent in them, the bytes read and written and the number of
+LogDispatcher.log calls.
+
+The phase being profiled is kept per thread, so rules run concurrently by
+the rule scheduler are kept apart. CommandHelper and LogDispatcher report to
+the phase of the calling thread through recordcommand and recordlog, which
+do nothing when no phase is being profiled. Subprocesses are counted with an
+audit hook so that commands started without CommandHelper are counted too.
+
+The results are written as JSON and as a Prometheus text file for the
+node_exporter textfile collector.
+"""
+
+import json
+import os
+import sys
+import threading
+import time
+
+PHASES = ['report', 'fix', 'rereport', 'undo']
+
+JSONFILE = 'stonix-profile.json'
+
+PROMFILE = 'stonix.prom'
+
+# name, help text and PhaseRecord attribute of the Prometheus metrics
+METRICS = [('stonix_rule_wall_seconds',
+            'Wall clock time spent in a rule phase.', 'wall'),
+           ('stonix_rule_cpu_seconds',
+            'CPU time used by the thread running a rule phase.', 'cpu'),
+           ('stonix_rule_subprocesses',
+            'Subprocesses started by a rule phase.', 'subprocesses'),
+           ('stonix_rule_commands',
+            'Commands run through CommandHelper by a rule phase.',
+            'commands'),
+           ('stonix_rule_command_seconds',
+            'Time spent in CommandHelper by a rule phase.', 'commandtime'),
+           ('stonix_rule_read_bytes',
+            'Bytes read by the thread running a rule phase.', 'bytesread'),
+           ('stonix_rule_written_bytes',
+            'Bytes written by the thread running a rule phase.',
+            'byteswritten'),
+           ('stonix_rule_log_calls',
+            'LogDispatcher.log calls made by a rule phase.', 'logcalls'),
+           ('stonix_rule_runs',
+            'Number of times a rule phase was run.', 'runs')]
+
+# the phase record of each thread
+_current = threading.local()
+_hooklock = threading.Lock()
+_hooked = False
+
+
+class PhaseRecord(object):
+    """Totals for one phase of one rule"""
+
+    def __init__(self, rule, phase):
+        """
+        :param rule: string - name of the rule
+        :param phase: string - one of PHASES
+        """
+        self.rule = rule
+        self.phase = phase
+        self.runs = 0
+        self.wall = 0.0
+        self.cpu = 0.0
+        self.subprocesses = 0
+        self.commands = 0
+        self.commandtime = 0.0
+        self.bytesread = 0
+        self.byteswritten = 0
+        self.logcalls = 0
+        self.lock = threading.Lock()
+
+    def add(self, name, value):
+        """Add value to the named total. Used for the totals that may be
+        updated by the helper threads of a phase.
+
+        :param name: string - attribute name
+        :param value: int or float
+        """
+        with self.lock:
+            setattr(self, name, getattr(self, name) + value)
+
+    def todict(self):
+        """Return the totals as a dict
+
+        :returns: dict
+        """
+        return {'rule': self.rule,
+                'phase': self.phase,
+                'runs': self.runs,
+                'wall_seconds': self.wall,
+                'cpu_seconds': self.cpu,
+                'subprocesses': self.subprocesses,
+                'commands': self.commands,
+                'command_seconds': self.commandtime,
+                'read_bytes': self.bytesread,
+                'written_bytes': self.byteswritten,
+                'log_calls': self.logcalls}
+
+
+def getrecord():
+    """Return the phase record of the calling thread, None if no phase is
+    being profiled
+
+    :returns: PhaseRecord
+    """
+    return getattr(_current, 'record', None)
+
+
+def setrecord(record):
+    """Make record the phase record of the calling thread. Used to hand the
+    phase of a rule to the helper threads it starts.
+
+    :param record: PhaseRecord or None
+    """
+    _current.record = record
+
+
+def recordcommand(elapsed):
+    """Count a command run by CommandHelper for the phase being profiled by
+    the calling thread
+
+    :param elapsed: float - seconds the command took
+    """
+    record = getattr(_current, 'record', None)
+    if record is not None:
+        record.add('commands', 1)
+        record.add('commandtime', elapsed)
+
+
+def recordlog():
+    """Count a LogDispatcher.log call for the phase being profiled by the
+    calling thread
+
+    """
+    record = getattr(_current, 'record', None)
+    if record is not None:
+        record.add('logcalls', 1)
+
+
+def audithook(event, args):
+    """Count the subprocesses started by the phase being profiled by the
+    calling thread
+
+    """
+    if event == 'subprocess.Popen' or event == 'os.system':
+        record = getattr(_current, 'record', None)
+        if record is not None:
+            record.add('subprocesses', 1)
+
+
+def installhook():
+    """Install audithook once per process. Audit hooks cannot be removed, the
+    hook does nothing when no phase is being profiled.
+
+    """
+    global _hooked
+    with _hooklock:
+        if not _hooked and hasattr(sys, 'addaudithook'):
+            sys.addaudithook(audithook)
+            _hooked = True
+
+
+def getthreadio():
+    """Return the bytes read and written by the calling thread, (None, None)
+    where this is not known
+
+    :returns: tuple of (int, int)
+    """
+    try:
+        with open('/proc/thread-self/io', 'r') as iofile:
+            counters = dict(line.split(':', 1) for line in iofile)
+        return int(counters['rchar']), int(counters['wchar'])
+    except (IOError, OSError, KeyError, ValueError):
+        return None, None
+
+
+def escapelabel(value):
+    """Escape a Prometheus label value
+
+    :param value: string
+    :returns: string
+    """
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n',
+                                                                  '\\n')
+
+
+class RuleProfiler(object):
+    """Collects the PhaseRecords of a run"""
+
+    def __init__(self):
+        self.records = {}
+        self.lock = threading.Lock()
+        installhook()
+
+    def getrecords(self):
+        """Return the phase records in the order they were first run
+
+        :returns: list of PhaseRecord
+        """
+        with self.lock:
+            return list(self.records.values())
+
+    def runphase(self, rulename, phase, method, *args):
+        """Call method, adding the time and resources it uses to the record
+        of the phase. Exceptions raised by method are passed on.
+
+        :param rulename: string - name of the rule
+        :param phase: string - one of PHASES
+        :param method: callable
+        :returns: the return value of method
+        """
+        with self.lock:
+            record = self.records.get((rulename, phase))
+            if record is None:
+                record = PhaseRecord(rulename, phase)
+                self.records[(rulename, phase)] = record
+        previous = getrecord()
+        setrecord(record)
+        startread, startwritten = getthreadio()
+        startcpu = time.thread_time()
+        start = time.time()
+        try:
+            return method(*args)
+        finally:
+            record.add('wall', time.time() - start)
+            record.add('cpu', time.thread_time() - startcpu)
+            record.add('runs', 1)
+            endread, endwritten = getthreadio()
+            if startread is not None and endread is not None:
+                record.add('bytesread', endread - startread)
+                record.add('byteswritten', endwritten - startwritten)
+            setrecord(previous)
+
+    def writejson(self, path):
+        """Write the records as a JSON list
+
+        :param path: string - path of the file
+        """
+        records = [record.todict() for record in self.getrecords()]
+        self.writefile(path, json.dumps({'time': time.time(),
+                                         'records': records}, indent=1))
+
+    def writeprometheus(self, path):
+        """Write the records in the Prometheus text format
+
+        :param path: string - path of the file, it must end in .prom to be
+            read by the node_exporter textfile collector
+        """
+        records = self.getrecords()
+        lines = []
+        for name, helptext, attribute in METRICS:
+            lines.append('# HELP ' + name + ' ' + helptext)
+            lines.append('# TYPE ' + name + ' gauge')
+            for record in records:
+                lines.append('%s{rule="%s",phase="%s"} %s' %
+                             (name, escapelabel(record.rule),
+                              escapelabel(record.phase),
+                              repr(getattr(record, attribute))))
+        lines.append('# HELP stonix_profile_timestamp_seconds Time the '
+                     'profile was written.')
+        lines.append('# TYPE stonix_profile_timestamp_seconds gauge')
+        lines.append('stonix_profile_timestamp_seconds ' + repr(time.time()))
+        self.writefile(path, '\n'.join(lines) + '\n')
+
+    def write(self, directory):
+        """Write JSONFILE and PROMFILE to directory
+
+        :param directory: string
+        """
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o755)
+        self.writejson(os.path.join(directory, JSONFILE))
+        self.writeprometheus(os.path.join(directory, PROMFILE))
+
+    def writefile(self, path, contents):
+        """Replace a file in one step so a collector never reads a partial
+        file
+
+        :param path: string
+        :param contents: string
+        """
+        tmppath = path + '.' + str(os.getpid())
+        with open(tmppath, 'w') as outfile:
+            outfile.write(contents)
+        os.rename(tmppath, path)
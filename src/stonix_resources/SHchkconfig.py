@@ -20,13 +20,16 @@ Created on Aug 9, 2012
 
 @author: David Kennel
 @change: ??? - ??? - Added try/except in list services to handle blank lines in output
+@change: 2026/10/18 - auditService and listServices answer from one cached
+        chkconfig --list call
 """
 
 import os
 import re
 
 from stonix_resources.logdispatcher import LogPriority
-from stonix_resources.ServiceHelperTemplate import ServiceHelperTemplate
+from stonix_resources.ServiceHelperTemplate import ServiceHelperTemplate, \
+    getStateTable
 from stonix_resources.CommandHelper import CommandHelper
 
 
@@ -48,6 +51,8 @@ class SHchkconfig(ServiceHelperTemplate):
         self.logger = logdispatcher
         self.initobjs()
         self.localize()
+        self.states = getStateTable("chkconfig", self.loadStates,
+                                    self.logger)
 
     def initobjs(self):
         """initialize class objects"""
@@ -76,6 +81,29 @@ class SHchkconfig(ServiceHelperTemplate):
         if not self.chk:
             raise IOError("Could not locate the chkconfig utility on this system")
 
+    def loadStates(self):
+        """build the state table from a single chkconfig --list call
+
+        :returns: states; None if chkconfig failed
+        :rtype: dict
+
+        """
+
+        states = {"list": {}}
+        ch = CommandHelper(self.logger)
+
+        ch.executeCommand(self.chk + " --list")
+        if ch.getReturnCode() != 0:
+            self.logger.log(LogPriority.DEBUG, "Failed to list services with chkconfig")
+            return None
+        for line in ch.getOutput():
+            try:
+                states["list"][line.split()[0]] = line
+            except IndexError:
+                pass
+
+        return states
+
     def startService(self, service, **kwargs):
         """start a given service
 
@@ -138,6 +166,7 @@ class SHchkconfig(ServiceHelperTemplate):
 
         disabled = True
 
+        self.states.invalidate(service)
         self.ch.executeCommand(self.chk + " " + service + " off")
         retcode = self.ch.getReturnCode()
         if retcode != 0:
@@ -166,6 +195,7 @@ class SHchkconfig(ServiceHelperTemplate):
 
         enabled = True
 
+        self.states.invalidate(service)
         self.ch.executeCommand(self.chk + " " + service + " on")
         retcode = self.ch.getReturnCode()
         if retcode != 0:
@@ -213,6 +243,12 @@ class SHchkconfig(ServiceHelperTemplate):
 
         enabled = True
 
+        line = self.states.lookup("list", service)
+        # only runlevel lines are answered from the table, xinetd based
+        # services are listed in a different format
+        if line is not None and re.search("[0-6]:", line):
+            return ":on" in line
+
         self.ch.executeCommand(self.chk + " --list " + service)
         retcode = self.ch.getReturnCode()
         if retcode != 0:
@@ -324,6 +360,10 @@ class SHchkconfig(ServiceHelperTemplate):
 
         service_list = []
 
+        listed = self.states.getSection("list")
+        if listed is not None:
+            return list(listed.keys())
+
         self.ch.executeCommand(self.chk + " --list")
         outputlines = self.ch.getOutput()
         for line in outputlines:
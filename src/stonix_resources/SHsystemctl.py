@@ -25,13 +25,22 @@ Created on Sep 19, 2012
         added start and stop service methods; fixed doc strings; added error logging;
         removed unused imports; methods now use commandhelper instead of subprocess;
         fixed typo in license
+@change: 2026/10/18 - auditService, isRunning, getServiceStatus and
+        listServices answer from a state table built with one list-unit-files
+        and one list-units call; changed units are re-queried
 """
 
 import os
 
 from stonix_resources.CommandHelper import CommandHelper
 from stonix_resources.logdispatcher import LogPriority
-from stonix_resources.ServiceHelperTemplate import ServiceHelperTemplate
+from stonix_resources.ServiceHelperTemplate import ServiceHelperTemplate, \
+    getStateTable
+
+# unit name suffixes systemctl recognizes; other names get .service appended
+UNITSUFFIXES = (".service", ".socket", ".target", ".timer", ".mount",
+                ".automount", ".swap", ".path", ".slice", ".scope",
+                ".device")
 
 
 class SHsystemctl(ServiceHelperTemplate):
@@ -51,6 +60,8 @@ class SHsystemctl(ServiceHelperTemplate):
         self.ch = CommandHelper(self.logdispatcher)
 
         self.localize()
+        self.states = getStateTable("systemctl", self.loadStates,
+                                    self.logdispatcher)
 
     def localize(self):
         ''' '''
@@ -69,6 +80,87 @@ class SHsystemctl(ServiceHelperTemplate):
         # do not attempt to manipulate any service which has a status in this list
         self.handsoff = ["static", "transient", "generated", "masked", "masked-runtime"]
 
+    def loadStates(self):
+        '''build the service state table from one list-unit-files call (unit
+        file states, as is-enabled reports them) and one list-units call
+        (active states, as is-active reports them)
+
+        :returns: states; None if systemctl could not list the units
+        :rtype: dict
+
+        '''
+
+        states = {"unitfiles": {}, "units": {}}
+        ch = CommandHelper(self.logdispatcher)
+
+        ch.executeCommand([self.sysctl, "list-unit-files", "--no-legend", "--no-pager"])
+        if ch.getReturnCode() != 0:
+            self.logdispatcher.log(LogPriority.DEBUG, ch.getErrorString())
+            return None
+        for line in ch.getOutput():
+            fields = line.split()
+            if len(fields) >= 2:
+                states["unitfiles"][fields[0]] = fields[1]
+
+        ch.executeCommand([self.sysctl, "list-units", "--all", "--no-legend", "--no-pager", "--plain"])
+        if ch.getReturnCode() != 0:
+            self.logdispatcher.log(LogPriority.DEBUG, ch.getErrorString())
+            return None
+        for line in ch.getOutput():
+            # failed units are marked with a bullet on older versions
+            fields = line.replace("\u25cf", " ").split()
+            if len(fields) >= 3:
+                states["units"][fields[0]] = fields[2]
+
+        self.logdispatcher.log(LogPriority.DEBUG, "Loaded state of " + str(len(states["unitfiles"])) + " unit files and " + str(len(states["units"])) + " units")
+
+        return states
+
+    def unitName(self, service):
+        '''return the unit name systemctl would use for service
+
+        :param service: string; service or unit name
+        :returns: unit name
+        :rtype: string
+
+        '''
+
+        service = service.strip()
+        if not service.endswith(UNITSUFFIXES):
+            service += ".service"
+        return service
+
+    def cachedUnitFileState(self, service):
+        '''return the unit file state of service from the state table
+
+        :param service: string; service or unit name
+        :returns: state; None if the table cannot answer
+        :rtype: string
+
+        '''
+
+        state = self.states.lookup("unitfiles", self.unitName(service))
+        if state == "alias":
+            # is-enabled reports the state of the unit the alias points to
+            return None
+        return state
+
+    def cachedActiveState(self, service):
+        '''return the active state of service from the state table
+
+        :param service: string; service or unit name
+        :returns: state; None if the table cannot answer
+        :rtype: string
+
+        '''
+
+        unit = self.unitName(service)
+        state = self.states.lookup("units", unit)
+        if state is None and self.cachedUnitFileState(unit) is not None:
+            # installed but not loaded, is-active reports it as inactive
+            state = "inactive"
+        return state
+
     def disableService(self, service, **kwargs):
         '''Disables the service and terminates it if it is running.
 
@@ -83,7 +175,8 @@ class SHsystemctl(ServiceHelperTemplate):
         '''
 
         disabled = True
-    
+
+        self.states.invalidate(self.unitName(service))
         self.ch.executeCommand(self.sysctl + " disable " + service)
         retcode = self.ch.getReturnCode()
         if retcode != 0:
@@ -116,6 +209,7 @@ class SHsystemctl(ServiceHelperTemplate):
             enabled = False
             return enabled
 
+        self.states.invalidate(self.unitName(service))
         self.ch.executeCommand(self.sysctl + " enable " + service)
         retcode = self.ch.getReturnCode()
         if retcode != 0:
@@ -138,6 +232,10 @@ class SHsystemctl(ServiceHelperTemplate):
 
         enabled = False
 
+        state = self.cachedUnitFileState(service)
+        if state is not None:
+            return "enabled" in state
+
         self.ch.executeCommand(self.sysctl + " is-enabled " + service)
 
         if self.ch.findInOutput("not a native service"):
@@ -166,6 +264,10 @@ class SHsystemctl(ServiceHelperTemplate):
         running = True
         inactive_keys = ["inactive", "unknown"]
 
+        state = self.cachedActiveState(service)
+        if state is not None:
+            return state not in inactive_keys
+
         self.ch.executeCommand(self.sysctl + " is-active " + service)
         for k in inactive_keys:
             if self.ch.findInOutput(k):
@@ -194,6 +296,7 @@ class SHsystemctl(ServiceHelperTemplate):
             success = False
             return success
 
+        self.states.invalidate(self.unitName(service))
         self.ch.executeCommand(self.sysctl + " reload-or-restart " + service)
         retcode = self.ch.getReturnCode()
         if retcode != 0:
@@ -219,6 +322,10 @@ class SHsystemctl(ServiceHelperTemplate):
 
         service_list = []
 
+        unitfiles = self.states.getSection("unitfiles")
+        if unitfiles is not None:
+            return [unit for unit in unitfiles if unit.endswith(".service")]
+
         # list all installed, service-type service units on the system
         self.ch.executeCommand(self.sysctl + " -a -t service --no-pager list-unit-files")
         output = self.ch.getOutput()
@@ -255,6 +362,7 @@ class SHsystemctl(ServiceHelperTemplate):
             started = False
             return started
 
+        self.states.invalidate(self.unitName(service))
         self.ch.executeCommand(self.sysctl + " start " + service)
         retcode = self.ch.getReturnCode()
         if retcode != 0:
@@ -285,6 +393,7 @@ class SHsystemctl(ServiceHelperTemplate):
             return stopped
 
         else:
+            self.states.invalidate(self.unitName(service))
             self.ch.executeCommand(self.sysctl + " stop " + service)
             retcode = self.ch.getReturnCode()
             if retcode != 0:
@@ -324,8 +433,12 @@ class SHsystemctl(ServiceHelperTemplate):
                           "masked", "masked-runtime", "static", "indirect", "disabled",
                           "generated", "transient"]
 
-        self.ch.executeCommand(self.sysctl + " is-enabled " + service)
-        output = self.ch.getOutputString()
+        cached = self.cachedUnitFileState(service)
+        if cached is not None:
+            output = cached
+        else:
+            self.ch.executeCommand(self.sysctl + " is-enabled " + service)
+            output = self.ch.getOutputString()
 
         try:
             if len(output.split()) == 1:
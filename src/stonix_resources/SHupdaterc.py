@@ -23,13 +23,18 @@ Created on Sep 19, 2012
 @change: 2018/02/22 Brandon Gonzales Changed regex in auditService to cut off after the
                     service's name
 @change: 2019/05/13 Breen Malmberg - refactored class
+@change: 2026/10/18 - auditService, isRunning and listServices answer from
+        one cached read of the rc directories and one service --status-all
 """
 
 import re
+import os
+import glob
 
 from stonix_resources.logdispatcher import LogPriority
 from stonix_resources.CommandHelper import CommandHelper
-from stonix_resources.ServiceHelperTemplate import ServiceHelperTemplate
+from stonix_resources.ServiceHelperTemplate import ServiceHelperTemplate, \
+    getStateTable
 
 
 class SHupdaterc(ServiceHelperTemplate):
@@ -49,6 +54,41 @@ class SHupdaterc(ServiceHelperTemplate):
         self.ch = CommandHelper(self.logdispatcher)
         self.updaterc = "/usr/sbin/update-rc.d "
         self.svc = "/usr/sbin/service "
+        self.states = getStateTable("updaterc", self.loadStates,
+                                    self.logdispatcher)
+
+    def loadStates(self):
+        """build the state table from the names of the links in the rc
+        directories and a single service --status-all call
+
+        :returns: states; None if service --status-all failed
+        :rtype: dict
+
+        """
+
+        states = {"links": {}, "status": {}}
+        ch = CommandHelper(self.logdispatcher)
+
+        for rcdir in glob.glob("/etc/rc*.d"):
+            try:
+                for name in os.listdir(rcdir):
+                    states["links"][name] = rcdir
+            except OSError:
+                continue
+
+        ch.executeCommand(self.svc + "--status-all")
+        if ch.getReturnCode() != 0:
+            self.logdispatcher.log(LogPriority.DEBUG, ch.getErrorString())
+            return None
+        for line in ch.getOutput():
+            if re.search("^\s*\[", line):
+                try:
+                    flag, name = line.split("]", 1)
+                    states["status"][name.strip()] = flag.replace("[", "").strip()
+                except (IndexError, ValueError):
+                    continue
+
+        return states
 
     def disableService(self, service, **kwargs):
         """Disables the service and terminates it if it is running.
@@ -66,6 +106,7 @@ class SHupdaterc(ServiceHelperTemplate):
 
         self.logdispatcher.log(LogPriority.DEBUG, "Disabling service: " + service)
 
+        self.states.invalidate(service)
         self.ch.executeCommand(self.updaterc + service + " disable")
         retcode = self.ch.getReturnCode()
         if retcode != 0:
@@ -98,6 +139,7 @@ class SHupdaterc(ServiceHelperTemplate):
 
         self.logdispatcher.log(LogPriority.DEBUG, "Enabling service: " + service)
 
+        self.states.invalidate(service)
         self.ch.executeCommand(self.updaterc + service + " enable")
         retcode = self.ch.getReturnCode()
         if retcode != 0:
@@ -131,9 +173,16 @@ class SHupdaterc(ServiceHelperTemplate):
 
         self.logdispatcher.log(LogPriority.DEBUG, "Checking if service: " + service + " is enabled")
 
-        self.ch.executeCommand("ls -l /etc/rc*.d/")
-        if self.ch.findInOutput("S[0-9]+" + service):
-            enabled = True
+        links = self.states.getSection("links")
+        if links is not None and not self.states.isStale(service):
+            for name in links:
+                if re.search("S[0-9]+" + service, name):
+                    enabled = True
+                    break
+        else:
+            self.ch.executeCommand("ls -l /etc/rc*.d/")
+            if self.ch.findInOutput("S[0-9]+" + service):
+                enabled = True
 
         if enabled:
             self.logdispatcher.log(LogPriority.DEBUG, "Service: " + service + " is enabled")
@@ -158,9 +207,16 @@ class SHupdaterc(ServiceHelperTemplate):
 
         self.logdispatcher.log(LogPriority.DEBUG, "Checking if service: " + service + " is running")
 
-        self.ch.executeCommand(self.svc + "--status-all")
-        if self.ch.findInOutput("\[\s+\+\s+\]\s+" + service):
-            running = True
+        status = self.states.getSection("status")
+        if status is not None and not self.states.isStale(service):
+            for name in status:
+                if status[name] == "+" and re.match(service, name):
+                    running = True
+                    break
+        else:
+            self.ch.executeCommand(self.svc + "--status-all")
+            if self.ch.findInOutput("\[\s+\+\s+\]\s+" + service):
+                running = True
 
         if running:
             self.logdispatcher.log(LogPriority.DEBUG, "Service: " + service + " IS running")
@@ -187,6 +243,7 @@ class SHupdaterc(ServiceHelperTemplate):
 
         self.logdispatcher.log(LogPriority.DEBUG, "Reloading service: " + service)
 
+        self.states.invalidate(service)
         self.ch.executeCommand(self.svc + service + " stop")
         self.ch.executeCommand(self.svc + service + " start")
         retcode = self.ch.getReturnCode()
@@ -216,6 +273,10 @@ class SHupdaterc(ServiceHelperTemplate):
 
         self.logdispatcher.log(LogPriority.DEBUG, "Fetching list of services")
 
+        status = self.states.getSection("status")
+        if status is not None:
+            return list(status.keys())
+
         self.ch.executeCommand(self.svc + "--status-all")
         output = self.ch.getOutput()
         for line in output:
@@ -35,6 +35,8 @@ installed.
         change events
 @change: 2019/07/30 Brandon R. Gonzales - Add conditional for chkconfig systems
         to make sure that the 'service' command is available
+@change: 2026/10/18 - probe for the service management programs and load libc
+        once per process instead of once per ServiceHelper
 """
 
 import os
@@ -52,6 +54,51 @@ from stonix_resources import SHlaunchdTwo
 from stonix_resources.logdispatcher import LogPriority
 from stonix_resources.get_libc import getLibc
 
+# results of probeHelpers() and getLibc(), filled in by the first
+# ServiceHelper created in the process
+_probe = {}
+
+
+def probeHelpers():
+    '''Check which service management programs are installed. The result is
+    the same for every ServiceHelper in the process, so the file system is
+    only probed once.
+
+    :returns: dict of helper type -> bool
+
+    '''
+    if "helpers" in _probe:
+        return _probe["helpers"]
+
+    systemctl_paths = ["/usr/bin/systemctl", "/bin/systemctl"]
+    helpers = {}
+    # Red Hat, CentOS, SUSE
+    helpers["chkconfig"] = os.path.exists('/sbin/chkconfig') and \
+        (os.path.exists('/sbin/service') or os.path.exists('/usr/sbin/service'))
+    # Gentoo
+    helpers["rcupdate"] = os.path.exists('/sbin/rc-update')
+    # Ubuntu, Debian
+    helpers["updaterc"] = os.path.exists('/usr/sbin/update-rc.d')
+    # Fedora, RHEL 7
+    helpers["systemctl"] = any(os.path.exists(p) for p in systemctl_paths)
+    # Solaris
+    helpers["svcadm"] = os.path.exists('/usr/sbin/svcadm')
+    # FreeBSD
+    helpers["rcconf"] = os.path.exists('/etc/rc.conf') and \
+        os.path.exists('/etc/rc.d/LOGIN')
+    # OS X
+    helpers["launchd"] = os.path.exists('/sbin/launchd')
+
+    _probe["helpers"] = helpers
+    return helpers
+
+
+def getSharedLibc():
+    '''Return the libc handle, loading it the first time only'''
+    if "libc" not in _probe:
+        _probe["libc"] = getLibc()
+    return _probe["libc"]
+
 
 class ServiceHelper(object):
     '''The ServiceHelper class serves as an abstraction layer between rules that
@@ -91,54 +138,21 @@ class ServiceHelper(object):
         self.servicename = ""
 
         try:
-            self.lc = getLibc()
+            self.lc = getSharedLibc()
         except Exception as err:
             self.logdispatcher.log(LogPriority.ERROR, str(err))
             raise
 
-        systemctl_paths = ["/usr/bin/systemctl", "/bin/systemctl"]
-
-        # Red Hat, CentOS, SUSE
-        foundchkconfig = os.path.exists('/sbin/chkconfig')
-        foundservice = os.path.exists('/sbin/service') or \
-                       os.path.exists('/usr/sbin/service')
-        if foundchkconfig and foundservice:
-            ischkconfig = True
-        else:
-            ischkconfig = False
-
-        # Gentoo
-        if os.path.exists('/sbin/rc-update'):
-            isrcupdate = True
-        else:
-            isrcupdate = False
-        # Ubuntu, Debian
-        if os.path.exists('/usr/sbin/update-rc.d'):
-            isupdaterc = True
-        else:
-            isupdaterc = False
-        # Fedora, RHEL 7
-        if any(os.path.exists(p) for p in systemctl_paths):
-            issystemctl = True
-        else:
-            issystemctl = False
-        # Solaris
-        if os.path.exists('/usr/sbin/svcadm'):
-            issvcadm = True
-        else:
-            issvcadm = False
-        # FreeBSD
-        if os.path.exists('/etc/rc.conf') and \
-        os.path.exists('/etc/rc.d/LOGIN'):
-            isrcconf = True
-        else:
-            isrcconf = False
-        # OS X
-        if os.path.exists('/sbin/launchd'):
-            islaunchd = True
+        helpers = probeHelpers()
+        ischkconfig = helpers["chkconfig"]
+        isrcupdate = helpers["rcupdate"]
+        isupdaterc = helpers["updaterc"]
+        issystemctl = helpers["systemctl"]
+        issvcadm = helpers["svcadm"]
+        isrcconf = helpers["rcconf"]
+        islaunchd = helpers["launchd"]
+        if islaunchd:
             self.isdualparameterservice = True
-        else:
-            islaunchd = False
 
         truecount = 0
         for svctype in [ischkconfig, isrcupdate, isupdaterc,
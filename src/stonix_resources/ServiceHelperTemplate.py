@@ -22,11 +22,121 @@ Created on November 3, 2016
 
 Note: Each concrete helper will inherit this class, which will be the default 
       behavior of all service helpers.
+
+@change: 2026/10/18 - added ServiceStateTable, a process wide cache of
+      service state shared by all instances of a concrete helper
 '''
-import inspect
+import sys
+import threading
 
 from stonix_resources.logdispatcher import LogPriority
 
+# helper name -> ServiceStateTable
+_statetables = {}
+_statetableslock = threading.Lock()
+
+
+def getStateTable(name, loader, logger):
+    '''Return the process wide ServiceStateTable for a concrete helper,
+    creating it on first use.
+
+    :param name: string; name of the concrete helper, e.g. 'systemctl'
+    :param loader: callable returning the table contents, see
+        ServiceStateTable
+    :param logger: logdispatcher object
+    :returns: ServiceStateTable
+
+    '''
+    with _statetableslock:
+        if name not in _statetables:
+            _statetables[name] = ServiceStateTable(loader, logger)
+        return _statetables[name]
+
+
+class ServiceStateTable(object):
+    '''Cache of service state for one kind of service helper. The table is
+    filled by a single call to the loader the first time a question is
+    asked, so that auditing a hundred services costs one or two commands
+    instead of one per service.
+
+    The loader returns a dict of section name -> dict of service -> value,
+    or None if the state could not be read. Services that a helper has just
+    changed are marked stale; lookups for stale services return None so the
+    helper asks the system directly again.
+
+    '''
+
+    def __init__(self, loader, logger):
+        self.loader = loader
+        self.logger = logger
+        self.lock = threading.RLock()
+        self.loaded = False
+        self.table = None
+        self.stale = set()
+
+    def reset(self):
+        '''Throw away the whole table, the next lookup loads it again'''
+        with self.lock:
+            self.loaded = False
+            self.table = None
+            self.stale = set()
+
+    def invalidate(self, service):
+        '''Mark a service as changed
+
+        :param service: string; name of the service as used by lookup
+
+        '''
+        with self.lock:
+            self.stale.add(service)
+
+    def isStale(self, service):
+        '''Return True if the service has been changed since the table was
+        loaded
+
+        :param service: string; service name
+        :returns: bool
+
+        '''
+        with self.lock:
+            return service in self.stale
+
+    def getSection(self, section):
+        '''Return one section of the table, loading the table if needed
+
+        :param section: string; section name
+        :returns: dict or None if the table could not be loaded
+
+        '''
+        with self.lock:
+            if not self.loaded:
+                try:
+                    self.table = self.loader()
+                except Exception as err:
+                    self.logger.log(LogPriority.DEBUG,
+                                    'Unable to load service states: ' +
+                                    str(err))
+                    self.table = None
+                self.loaded = True
+            if self.table is None:
+                return None
+            return self.table.get(section)
+
+    def lookup(self, section, service):
+        '''Return the cached value for a service
+
+        :param section: string; section name
+        :param service: string; service name
+        :returns: the cached value, or None if the service is stale, not in
+            the table, or the table could not be loaded
+
+        '''
+        with self.lock:
+            values = self.getSection(section)
+            if values is None or service in self.stale:
+                return None
+            return values.get(service)
+
 
 class MethodNotImplementedError(Exception):
     '''Meant for being thrown in the template, for when a class that
@@ -81,9 +191,11 @@ class ServiceHelperTemplate(object):
         @author: Roy Nielsen
         """
         try:
-            filename = inspect.stack()[2][1]
-            functionName = str(inspect.stack()[2][3])
-            lineNumber = str(inspect.stack()[2][2])
+            frame = sys._getframe(2)
+            filename = frame.f_code.co_filename
+            functionName = str(frame.f_code.co_name)
+            lineNumber = str(frame.f_lineno)
+            del frame
         except Exception as err:
             raise err
         else:
@@ -29,8 +29,11 @@ oldfile does not exist
 @change: 2017/10/23 rsn - change to new service helper interface
 @change: 2018/12/06 Brandon R. Gonzales - Fixed issue where patch files are
         created without a trailing endline character
+@change: 2026/10/18 - Guarded eventlog access with a lock for concurrent
+        rule execution
+@change: 2026/10/18 - Replaced the shelve eventlog with the append only
+        ChangeEventStore, indexed by rule number
 '''
-import shelve
 import shutil
 import os
 import re
@@ -40,8 +43,10 @@ import time
 import difflib
 import weakref
 import subprocess
+import threading
 
 from stonix_resources.logdispatcher import LogPriority
+from stonix_resources.ChangeEventStore import ChangeEventStore
 
 
 class StateChgLogger(object):
@@ -88,24 +93,14 @@ class StateChgLogger(object):
         self.diffdir = '/var/db/stonix/diffdir'
         self.archive = '/var/db/stonix/archive'
         self.privmode = True
+        # The rule scheduler may run rules on several threads
+        self.eventlock = threading.RLock()
         try:
             if not os.path.exists('/var/db/stonix') and \
                self.environment.geteuid() == 0:
                 os.makedirs('/var/db/stonix', 0o700)
             if self.environment.geteuid() == 0:
-                try:
-                    self.eventlog = shelve.open('/var/db/stonix/eventlog', 'c', None, True)
-                except:
-                    # if a python 3 version of stonix attempts to access an eventlog file
-                    # created or written to in a python 2 version of stonix, there is an incompatibility
-                    # which results in a traceback; catch this traceback and backup the old python 2 version
-                    # of the file and create a new python 3 version of it
-                    if not os.path.isfile('/var/db/stonix/eventlog.old'):
-                        if os.path.isfile('/var/db/stonix/eventlog'):
-                            shutil.copy2('/var/db/stonix/eventlog', '/var/db/stonix/eventlog.old')
-                    if os.path.isfile('/var/db/stonix/eventlog'):
-                        os.remove('/var/db/stonix/eventlog')
-                    self.eventlog = shelve.open('/var/db/stonix/eventlog', 'c', None, True)
+                self.eventlog = ChangeEventStore(self.logger)
             else:
                 self.privmode = False
             for node in [self.diffdir, self.archive]:
@@ -419,10 +414,10 @@ are an end user please report a bug.''')
             raise RuntimeError('''recordfilechange method called without privilege.
 If you are a rule developer you should guard against this. If you
 are an end user please report a bug.''')
-        self.eventlog[eventcode] = eventdict
+        with self.eventlock:
+            self.eventlog.record(eventcode, eventdict)
         debug = "Recorded new change event with event code " + eventcode
         self.logger.log(LogPriority.DEBUG, debug)
-        self.eventlog.sync()
 
     def getchgevent(self, eventcode):
         '''Get change event takes an eventcode and returns a dictionary containing
@@ -440,7 +435,8 @@ are an end user please report a bug.''')
             raise RuntimeError('''recordfilechange method called without privilege.
 If you are a rule developer you should guard against this. If you
 are an end user please report a bug.''')
-        eventdict = self.eventlog[eventcode]
+        with self.eventlock:
+            eventdict = self.eventlog.get(eventcode)
         return eventdict
 
     def closelog(self):
@@ -457,6 +453,19 @@ If you are a rule developer you should guard against this. If you
 are an end user please report a bug.''')
         self.eventlog.close()
 
+    def syncrule(self, ruleid):
+        '''Make sure the change events recorded for a rule are on disk. Events
+        are written as they are recorded but the fsync is batched; the
+        controller calls this once a rule's fix has finished. Does nothing
+        when running without privilege.
+
+        :param ruleid: int or four digit zero padded string rule number
+        '''
+        if not self.privmode:
+            return
+        with self.eventlock:
+            self.eventlog.sync(str(ruleid).zfill(4))
+
     def archivefile(self, oldfile):
         '''Private method to archive a copy of a file into the file archive. This
         is intended to be called by the recordfilechanges method.
@@ -526,7 +535,6 @@ are an end user please report a bug.''')
 If you are a rule developer you should guard against this. If you
 are an end user please report a bug.''')
         myruleid = ''
-        eventlist = []
         if not ruleid:
             raise TypeError('Null Rule ID')
         if type(ruleid) == int:
@@ -538,18 +546,8 @@ are an end user please report a bug.''')
         self.logger.log(LogPriority.DEBUG,
                         ['StateChgLogger.findrulechanges',
                          "Searching for: %s" % ruleid])
-        for key in self.eventlog:
-            try:
-                keyruleid = key[0:4]
-                # self.logger.log(LogPriority.DEBUG,
-                #                 ['StateChgLogger.findrulechanges',
-                #                  "Comparing to keyruleid: %s" % keyruleid])
-                if keyruleid == myruleid:
-                    eventlist.append(key)
-            except(IndexError):
-                self.logger.log(LogPriority.ERROR,
-                                ['StateChgLogger.findrulechanges',
-                                 'Bad key detected in eventlog: ' + key])
+        with self.eventlock:
+            eventlist = self.eventlog.rulekeys(myruleid[0:4])
         self.logger.log(LogPriority.DEBUG,
                         ['StateChgLogger.findrulechanges',
                          "returning eventlist: %s" % eventlist])
@@ -579,7 +577,8 @@ are an end user please report a bug.''')
         if not eventid or not type(eventid) == str:
             raise TypeError('Null eventid or wrong type')
         try:
-            del self.eventlog[eventid]
+            with self.eventlock:
+                self.eventlog.delete(eventid)
         except(KeyError):
             # key was not found in the event log
             return True
@@ -0,0 +1,323 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+Linux kernel parameters (sysctl) shared by all rules.
+
+Live values are read straight from /proc/sys instead of running
+/sbin/sysctl once per key. Values read are kept in a process wide snapshot
+until they are written through this module or the snapshot is refreshed.
+
+The configured values are taken from /etc/sysctl.d/*.conf and the other
+sysctl.d directories followed by /etc/sysctl.conf, in the order
+"sysctl --system" loads them, so a later file overrides an earlier one.
+Each configured value is reported together with the file and line it came
+from. Files are only parsed again when their size or mtime changes.
+
+apply() writes a group of values to /proc/sys in one pass, the equivalent
+of "sysctl -q -e -w" for each of them, and returns the previous values so
+that callers can record undo events.
+
+Use getsysctl() to obtain the shared instance.
+"""
+
+import os
+import threading
+
+from collections import namedtuple
+
+from stonix_resources.logdispatcher import LogPriority
+
+PROCSYS = '/proc/sys'
+
+SYSCTLCONF = '/etc/sysctl.conf'
+
+# Directories searched for *.conf files. A file name found in an earlier
+# directory hides files of the same name in later ones.
+SYSCTLDIRS = ['/etc/sysctl.d', '/run/sysctl.d', '/usr/local/lib/sysctl.d',
+              '/usr/lib/sysctl.d', '/lib/sysctl.d']
+
+SysctlSetting = namedtuple('SysctlSetting', ['key', 'value', 'path',
+                                             'lineno'])
+
+_sysctl = None
+_sysctllock = threading.Lock()
+
+
+def getsysctl(logger):
+    '''Return the shared Sysctl instance, creating it on first use
+
+    :param logger: logdispatcher object
+    :returns: Sysctl
+    '''
+    global _sysctl
+    with _sysctllock:
+        if _sysctl is None:
+            _sysctl = Sysctl(logger)
+        return _sysctl
+
+
+def normalizekey(key):
+    '''Return a key in dotted form. sysctl accepts either dots or slashes as
+    separators; with slashes a dot is part of a name (a vlan interface for
+    instance) and is kept as a slash in the dotted form.
+
+    :param key: string
+    :returns: string
+    '''
+    key = key.strip().strip('.')
+    if '/' in key:
+        key = key.strip('/').translate(str.maketrans('./', '/.'))
+    return key
+
+
+def normalizevalue(value):
+    '''Return a value with runs of white space (the tabs between the fields
+    of multi valued parameters for instance) turned into single spaces
+
+    :param value: string
+    :returns: string
+    '''
+    return ' '.join(str(value).split())
+
+
+class Sysctl(object):
+    '''Snapshot of the live kernel parameters and merged view of the sysctl
+    configuration files.
+    '''
+
+    def __init__(self, logger, procsys=PROCSYS, sysctlconf=SYSCTLCONF,
+                 sysctldirs=None):
+        '''
+        :param logger: logdispatcher object
+        :param procsys: path of the kernel parameter tree
+        :param sysctlconf: path of sysctl.conf
+        :param sysctldirs: list of sysctl.d directories, defaults to
+            SYSCTLDIRS
+        '''
+        self.logger = logger
+        self.procsys = procsys
+        self.sysctlconf = sysctlconf
+        if sysctldirs is None:
+            sysctldirs = SYSCTLDIRS
+        self.sysctldirs = sysctldirs
+        self.lock = threading.RLock()
+        # key -> live value, or None for keys the kernel does not have
+        self.live = {}
+        # path -> ((size, mtime), list of SysctlSetting)
+        self.parsed = {}
+
+    def procpath(self, key):
+        '''Return the /proc/sys path of a key given in either form'''
+        key = normalizekey(key)
+        return os.path.join(self.procsys,
+                            key.translate(str.maketrans('./', '/.')))
+
+    def getlive(self, key):
+        '''Return the current value of a kernel parameter, or None if the
+        kernel does not have it or it cannot be read
+
+        :param key: parameter name, for example net.ipv4.ip_forward
+        :returns: string or None
+        '''
+        nkey = normalizekey(key)
+        with self.lock:
+            if nkey in self.live:
+                return self.live[nkey]
+            try:
+                with open(self.procpath(key)) as fhandle:
+                    value = normalizevalue(fhandle.read())
+            except (IOError, OSError) as err:
+                self.logger.log(LogPriority.DEBUG,
+                                ['Sysctl.getlive',
+                                 'Unable to read ' + nkey + ': ' + str(err)])
+                value = None
+            self.live[nkey] = value
+            return value
+
+    def refresh(self, keys=None):
+        '''Drop values from the snapshot so they are read again
+
+        :param keys: list of keys, defaults to all of them
+        '''
+        with self.lock:
+            if keys is None:
+                self.live = {}
+                return
+            for key in keys:
+                self.live.pop(normalizekey(key), None)
+
+    def checklive(self, settings):
+        '''Compare live values with the wanted ones
+
+        :param settings: dict of key -> wanted value
+        :returns: dict of key -> live value (None if unreadable) for the keys
+            that do not have the wanted value
+        '''
+        wrong = {}
+        for key, wanted in settings.items():
+            value = self.getlive(key)
+            if value != normalizevalue(wanted):
+                wrong[key] = value
+        return wrong
+
+    def apply(self, settings):
+        '''Write kernel parameters in one pass. As with sysctl -e -w, keys the
+        kernel does not have are ignored.
+
+        :param settings: dict of key -> value
+        :returns: tuple (dict of key -> previous value for the keys that were
+            changed, list of keys that could not be written)
+        '''
+        changed = {}
+        failed = []
+        with self.lock:
+            for key, value in settings.items():
+                value = normalizevalue(value)
+                nkey = normalizekey(key)
+                # something other than this module may have changed the key
+                self.live.pop(nkey, None)
+                previous = self.getlive(key)
+                if previous == value:
+                    continue
+                path = self.procpath(key)
+                if previous is None and not os.path.exists(path):
+                    continue
+                self.live.pop(nkey, None)
+                try:
+                    with open(path, 'w') as fhandle:
+                        fhandle.write(value + '\n')
+                except (IOError, OSError) as err:
+                    self.logger.log(LogPriority.DEBUG,
+                                    ['Sysctl.apply',
+                                     'Unable to set ' + nkey + ' = ' +
+                                     value + ': ' + str(err)])
+                    failed.append(key)
+                    continue
+                changed[key] = previous
+        return changed, failed
+
+    def conffiles(self):
+        '''Return the configuration files in the order they are loaded
+
+        :returns: list of paths
+        '''
+        byname = {}
+        for dirname in self.sysctldirs:
+            try:
+                names = os.listdir(dirname)
+            except OSError:
+                continue
+            for name in names:
+                if name.endswith('.conf') and name not in byname:
+                    byname[name] = os.path.join(dirname, name)
+        files = [byname[name] for name in sorted(byname)]
+        if os.path.isfile(self.sysctlconf):
+            # /etc/sysctl.d/99-sysctl.conf is often a link to sysctl.conf
+            real = os.path.realpath(self.sysctlconf)
+            files = [path for path in files if os.path.realpath(path) != real]
+            files.append(self.sysctlconf)
+        return files
+
+    def parsefile(self, path):
+        '''Return the settings in one configuration file, parsing it only if
+        it changed since the last call
+
+        :param path: string
+        :returns: list of SysctlSetting
+        '''
+        try:
+            fstat = os.stat(path)
+        except OSError:
+            return []
+        stamp = (fstat.st_size, fstat.st_mtime)
+        with self.lock:
+            cached = self.parsed.get(path)
+            if cached is not None and cached[0] == stamp:
+                return cached[1]
+        settings = []
+        try:
+            with open(path) as fhandle:
+                for lineno, line in enumerate(fhandle, 1):
+                    line = line.strip()
+                    if not line or line[0] in '#;' or '=' not in line:
+                        continue
+                    key, value = line.split('=', 1)
+                    # a leading - means errors setting the key are ignored
+                    key = normalizekey(key.lstrip('-'))
+                    if key:
+                        settings.append(SysctlSetting(key,
+                                                      normalizevalue(value),
+                                                      path, lineno))
+        except (IOError, OSError, UnicodeDecodeError) as err:
+            self.logger.log(LogPriority.DEBUG,
+                            ['Sysctl.parsefile',
+                             'Unable to read ' + path + ': ' + str(err)])
+            return []
+        with self.lock:
+            self.parsed[path] = (stamp, settings)
+        return settings
+
+    def getconfiguration(self):
+        '''Return the merged configuration
+
+        :returns: dict of key -> SysctlSetting that takes effect
+        '''
+        merged = {}
+        for path in self.conffiles():
+            for setting in self.parsefile(path):
+                merged[setting.key] = setting
+        return merged
+
+    def getconfigured(self, key):
+        '''Return the configured setting of a key
+
+        :param key: parameter name
+        :returns: SysctlSetting or None if no file sets the key
+        '''
+        return self.getconfiguration().get(normalizekey(key))
+
+    def checkconfigured(self, settings):
+        '''Compare the configured values with the wanted ones
+
+        :param settings: dict of key -> wanted value
+        :returns: dict of key -> SysctlSetting (None if the key is not set
+            anywhere) for the keys not configured with the wanted value
+        '''
+        merged = self.getconfiguration()
+        wrong = {}
+        for key, wanted in settings.items():
+            setting = merged.get(normalizekey(key))
+            if setting is None or setting.value != normalizevalue(wanted):
+                wrong[key] = setting
+        return wrong
+
+    def describe(self, key, setting):
+        '''Return a one line description of a configured setting for the
+        detailed results of a rule
+
+        :param key: parameter name
+        :param setting: SysctlSetting or None
+        :returns: string
+        '''
+        if setting is None:
+            return key + " is not set in " + self.sysctlconf + " or " + \
+                "sysctl.d"
+        return key + " is set to " + setting.value + " in " + \
+            setting.path + " line " + str(setting.lineno)
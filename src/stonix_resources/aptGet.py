@@ -22,11 +22,12 @@ Created on Aug 06, 2012
 """
 
 import re
+import os
 import time
 
-from stonix_resources.stonixutilityfunctions import psRunning
 from stonix_resources.logdispatcher import LogPriority
 from stonix_resources.CommandHelper import CommandHelper
+from stonix_resources.PackageLock import getpackagelock
 from stonix_resources.StonixExceptions import repoError
 
 
@@ -62,10 +63,12 @@ class AptGet(object):
 
         self.logger = logger
         self.ch = CommandHelper(self.logger)
+        self.pkglock = getpackagelock('apt', self.logger)
 
         self.aptgetloc = "/usr/bin/apt-get"
         self.aptcacheloc = "/usr/bin/apt-cache"
         self.dpkgloc = "/usr/bin/dpkg"
+        self.dpkgquery = "/usr/bin/dpkg-query"
 
         self.aptinstall = "DEBIAN_FRONTEND=noninteractive " + self.aptgetloc + " -y --assume-yes install "
         self.aptremove = "DEBIAN_FRONTEND=noninteractive " + self.aptgetloc + " -y remove "
@@ -93,23 +96,14 @@ class AptGet(object):
         """
 
         installed = True
-        maxtries = 12
-        trynum = 0
-        pslist = ["apt", "apt-get", "dpkg"]
 
         if type(package) is bytes:
             package = package.decode('utf-8')
 
-        for ps in pslist:
-            while psRunning(ps):
-                trynum += 1
-                if trynum == maxtries:
-                    self.logger.log(LogPriority.DEBUG, "Timed out while attempting to install package, due to Apt package manager being in-use by another process.")
-                    installed = False
-                    return installed
-                else:
-                    self.logger.log(LogPriority.DEBUG, "Apt package manager is in-use by another process. Waiting for it to be freed...")
-                    time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to install package, due to Apt package manager being in-use by another process.")
+            installed = False
+            return installed
 
         try:
 
@@ -119,6 +113,7 @@ class AptGet(object):
             # recursive call to this method if package manager is still locked
             if re.search("Could not get lock", errstr, re.I):
                 self.logger.log(LogPriority.DEBUG, "Apt package manager is in-use by another process. Waiting for it to be freed...")
+                self.pkglock.invalidate()
                 time.sleep(5)
                 return self.installpackage(package)
             elif retcode in self.pkgerrors:
@@ -146,23 +141,14 @@ class AptGet(object):
         """
 
         removed = True
-        maxtries = 12
-        trynum = 0
-        pslist = ["apt", "apt-get", "dpkg"]
 
         if type(package) is bytes:
             package = package.decode('utf-8')
 
-        for ps in pslist:
-            while psRunning(ps):
-                trynum += 1
-                if trynum == maxtries:
-                    self.logger.log(LogPriority.DEBUG, "Timed out while attempting to remove package, due to Apt package manager being in-use by another process.")
-                    removed = False
-                    return removed
-                else:
-                    self.logger.log(LogPriority.DEBUG, "Apt package manager is in-use by another process. Waiting for it to be freed...")
-                    time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to remove package, due to Apt package manager being in-use by another process.")
+            removed = False
+            return removed
 
         try:
 
@@ -197,23 +183,14 @@ class AptGet(object):
         """
 
         installed = False
-        maxtries = 12
-        trynum = 0
-        pslist = ["apt", "apt-get", "dpkg"]
 
         if type(package) is bytes:
             package = package.decode('utf-8')
 
-        for ps in pslist:
-            while psRunning(ps):
-                trynum += 1
-                if trynum == maxtries:
-                    self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check status of package, due to Apt package manager being in-use by another process.")
-                    installed = False
-                    return installed
-                else:
-                    self.logger.log(LogPriority.DEBUG, "Apt package manager is in-use by another process. Waiting for it to be freed...")
-                    time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check status of package, due to Apt package manager being in-use by another process.")
+            installed = False
+            return installed
 
         try:
 
@@ -250,25 +227,14 @@ class AptGet(object):
 
         found = False
         outputstr = ""
-        maxtries = 12
-        trynum = 0
-        pslist = ["apt", "apt-get", "dpkg"]
 
         if type(package) is bytes:
             package = package.decode('utf-8')
 
-        for ps in pslist:
-            while psRunning(ps):
-                trynum += 1
-                if trynum == maxtries:
-                    self.logger.log(LogPriority.DEBUG,
-                                    "Timed out while attempting to check availability of package, due to apt package manager being in-use by another process.")
-                    available = False
-                    return available
-                else:
-                    self.logger.log(LogPriority.DEBUG,
-                                    "apt package manager is in-use by another process. Waiting for it to be freed...")
-                    time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check availability of package, due to apt package manager being in-use by another process.")
+            available = False
+            return available
 
         try:
 
@@ -374,6 +340,69 @@ class AptGet(object):
             raise
         return updatesavail
 
+    def listInstalled(self):
+        """return the names of all installed packages from a single
+        dpkg-query call. Each package is listed both as name and as
+        name:arch
+
+        :returns: installed; None if the query failed
+        :rtype: set
+
+        """
+
+        installed = None
+
+        try:
+
+            if not os.path.exists(self.dpkgquery):
+                return installed
+
+            self.ch.executeCommand([self.dpkgquery, "-W", "-f",
+                                    "${Package} ${Architecture} ${Status}\\n"])
+            if self.ch.getReturnCode() == 0:
+                installed = set()
+                for line in self.ch.getOutput():
+                    fields = line.split()
+                    # status is "install ok installed" for installed packages
+                    if len(fields) >= 3 and fields[-1] == "installed":
+                        installed.add(fields[0])
+                        installed.add(fields[0] + ":" + fields[1])
+            else:
+                errstr = self.ch.getErrorString()
+                self.logger.log(LogPriority.DEBUG, "Failed to list installed packages: " + str(errstr))
+
+        except Exception:
+            raise
+        return installed
+
+    def listAvailable(self):
+        """return the names of all packages known to apt from a single
+        apt-cache call
+
+        :returns: available; None if the query failed
+        :rtype: set
+
+        """
+
+        available = None
+
+        try:
+
+            if not os.path.exists(self.aptcacheloc):
+                return available
+
+            self.ch.executeCommand([self.aptcacheloc, "pkgnames"])
+            if self.ch.getReturnCode() == 0:
+                available = set([line.strip() for line in self.ch.getOutput()
+                                 if line.strip()])
+            else:
+                errstr = self.ch.getErrorString()
+                self.logger.log(LogPriority.DEBUG, "Failed to list available packages: " + str(errstr))
+
+        except Exception:
+            raise
+        return available
+
     def getPackageFromFile(self, filename):
         """Returns the name of the package that provides the given
         filename/path.
@@ -23,11 +23,10 @@ Created on Aug 13, 2015
 
 import re
 import os
-import time
 
-from stonix_resources.stonixutilityfunctions import psRunning
 from stonix_resources.logdispatcher import LogPriority
 from stonix_resources.CommandHelper import CommandHelper
+from stonix_resources.PackageLock import getpackagelock
 from stonix_resources.StonixExceptions import repoError
 
 
@@ -49,6 +48,7 @@ class Dnf(object):
     def __init__(self, logger):
         self.logger = logger
         self.ch = CommandHelper(self.logger)
+        self.pkglock = getpackagelock('dnf', self.logger)
         self.dnfloc = "/usr/bin/dnf"
         self.install = self.dnfloc + " install -yq "
         self.remove = self.dnfloc + " remove -yq "
@@ -75,18 +75,11 @@ class Dnf(object):
         '''
 
         installed = True
-        maxtries = 12
-        trynum = 0
-
-        while psRunning("dnf"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG, "Timed out while attempting to install package, due to dnf package manager being in-use by another process.")
-                installed = False
-                return installed
-            else:
-                self.logger.log(LogPriority.DEBUG, "dnf package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to install package, due to dnf package manager being in-use by another process.")
+            installed = False
+            return installed
 
         try:
 
@@ -121,18 +114,11 @@ class Dnf(object):
         '''
 
         removed = True
-        maxtries = 12
-        trynum = 0
-
-        while psRunning("dnf"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG, "Timed out while attempting to remove package, due to dnf package manager being in-use by another process.")
-                installed = False
-                return installed
-            else:
-                self.logger.log(LogPriority.DEBUG, "dnf package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to remove package, due to dnf package manager being in-use by another process.")
+            installed = False
+            return installed
 
         try:
 
@@ -169,18 +155,11 @@ class Dnf(object):
         installed = False
         errstr = ""
         outputstr = ""
-        maxtries = 12
-        trynum = 0
-
-        while psRunning("dnf"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check status of package, due to dnf package manager being in-use by another process.")
-                installed = False
-                return installed
-            else:
-                self.logger.log(LogPriority.DEBUG, "dnf package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check status of package, due to dnf package manager being in-use by another process.")
+            installed = False
+            return installed
 
         try:
 
@@ -235,20 +214,11 @@ class Dnf(object):
         '''
 
         found = False
-        maxtries = 12
-        trynum = 0
-
-        while psRunning("dnf"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG,
-                                "Timed out while attempting to check availability of package, due to dnf package manager being in-use by another process.")
-                found = False
-                return found
-            else:
-                self.logger.log(LogPriority.DEBUG,
-                                "dnf package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check availability of package, due to dnf package manager being in-use by another process.")
+            found = False
+            return found
 
         try:
 
@@ -370,6 +340,76 @@ class Dnf(object):
             raise
         return updated
 
+    def listInstalled(self):
+        '''return the names of all installed packages from a single rpm
+        query. Each package is listed both as name and as name.arch
+
+        :returns: installed; None if the query failed
+        :rtype: set
+
+        '''
+
+        installed = None
+
+        try:
+
+            if not os.path.exists("/bin/rpm"):
+                return installed
+
+            self.ch.executeCommand(["/bin/rpm", "-qa", "--qf",
+                                    "%{NAME} %{ARCH}\\n"])
+            if self.ch.getReturnCode() == 0:
+                installed = set()
+                for line in self.ch.getOutput():
+                    fields = line.split()
+                    if len(fields) == 2:
+                        installed.add(fields[0])
+                        installed.add(fields[0] + "." + fields[1])
+            else:
+                errstr = self.ch.getErrorString()
+                self.logger.log(LogPriority.DEBUG, "Failed to list installed packages: " + str(errstr))
+
+        except Exception:
+            raise
+        return installed
+
+    def listAvailable(self):
+        '''return the names of all packages available to install from
+        a single dnf query. Each package is listed both as name and as
+        name.arch
+
+        :returns: available; None if the query failed
+        :rtype: set
+
+        '''
+
+        available = None
+
+        try:
+
+            if not os.path.exists(self.dnfloc):
+                return available
+
+            self.ch.executeCommand(self.chavailable.strip())
+            if self.ch.getReturnCode() == 0:
+                available = set()
+                for line in self.ch.getOutput():
+                    # long names push the version onto an indented line
+                    if not line or line[0].isspace():
+                        continue
+                    token = line.split()[0]
+                    if "." not in token:
+                        continue
+                    available.add(token)
+                    available.add(token.rsplit(".", 1)[0])
+            else:
+                errstr = self.ch.getErrorString()
+                self.logger.log(LogPriority.DEBUG, "Failed to list available packages: " + str(errstr))
+
+        except Exception:
+            raise
+        return available
+
     def getPackageFromFile(self, filename):
         '''return a string with the name of the parent package
         in it
@@ -38,16 +38,23 @@ Created on Aug 24, 2010
 @change: 2017/03/07 - dkennel - added fisma risk level support
 @change: 2017/09/20 - bgonz12 - updated the implementation of getdefaultip and
             getallips.
+@change: 2026/10/18 - collect the OS, init system and network facts on first
+            use and keep them in a cache under /var/db/stonix
 """
 
 import os
 import re
 import sys
+import json
 import socket
 import subprocess
 import platform
 import pwd
 import time
+import tempfile
+import threading
+
+from collections import namedtuple
 
 from stonix_resources.localize import CORPORATENETWORKSERVERS, STONIXVERSION, FISMACAT
 
@@ -60,6 +67,102 @@ if os.geteuid() == 0:
 else:
     DMI = False
 
+FACTCACHE = '/var/db/stonix/environment.cache'
+
+BOOTID = '/proc/sys/kernel/random/boot_id'
+
+# A group of facts collected together on first use. collectors are the
+# Environment methods that set the facts, files are the paths whose mtime
+# invalidates the cached facts, bootbound facts only stay valid until the
+# next boot and maxage is the number of seconds they may be cached, None for
+# no limit.
+FactGroup = namedtuple('FactGroup', ['collectors', 'facts', 'files',
+                                     'bootbound', 'maxage'])
+
+FACTGROUPS = {'os': FactGroup(['discoveros'],
+                              ['operatingsystem', 'osreportstring',
+                               'osversion'],
+                              ['/usr/bin/lsb_release', '/etc/lsb-release',
+                               '/etc/redhat-release', '/etc/gentoo-release',
+                               '/etc/os-release',
+                               '/System/Library/CoreServices/'
+                               'SystemVersion.plist'],
+                              False, None),
+              'osname': FactGroup(['setosname'], ['osname'],
+                                  ['/usr/bin/lsb_release',
+                                   '/etc/redhat-release', '/etc/os-release'],
+                                  False, None),
+              'systemtype': FactGroup(['setsystemtype'], ['systemtype'],
+                                      [], True, None),
+              'network': FactGroup(['sethostname', 'setipaddress',
+                                    'setmacaddress'],
+                                   ['hostname', 'ipaddress', 'macaddress'],
+                                   ['/etc/hostname', '/etc/hosts',
+                                    '/etc/resolv.conf'],
+                                   True, 3600),
+              'sysuuid': FactGroup(['setsysuuid'], ['sysuuid'], [], True,
+                                   None)}
+
+# facts already collected by this process, shared by all instances
+_facts = {}
+_factslock = threading.RLock()
+
+
+def clearfactcache():
+    """Forget the facts collected by this process, the next Environment
+    instance collects or reads them again.
+
+    """
+    with _factslock:
+        _facts.clear()
+
+
+def getbootid():
+    """Return the id of the current boot or None if it is unknown
+
+    :returns: string
+
+    """
+    try:
+        with open(BOOTID, 'r') as bootfile:
+            return bootfile.read().strip()
+    except (IOError, OSError):
+        return None
+
+
+def getfilestamps(paths):
+    """Return a dict of path: mtime for the paths that exist
+
+    :param paths: list of paths
+    :returns: dict
+
+    """
+    stamps = {}
+    for path in paths:
+        try:
+            stamps[path] = os.stat(path).st_mtime_ns
+        except OSError:
+            continue
+    return stamps
+
+
+def factproperty(name):
+    """Return a property for a fact that is collected on first access
+
+    :param name: name of the fact
+    :returns: property
+
+    """
+    def getfact(self):
+        if name not in self.facts:
+            self.loadfacts(FACTINDEX[name])
+        return self.facts[name]
+
+    def setfact(self, value):
+        self.facts[name] = value
+
+    return property(getfact, setfact)
+
 
 class Environment:
 
@@ -71,19 +174,23 @@ class Environment:
 
     """
 
+    operatingsystem = factproperty('operatingsystem')
+    osreportstring = factproperty('osreportstring')
+    osversion = factproperty('osversion')
+    osname = factproperty('osname')
+    systemtype = factproperty('systemtype')
+    hostname = factproperty('hostname')
+    ipaddress = factproperty('ipaddress')
+    macaddress = factproperty('macaddress')
+    sysuuid = factproperty('sysuuid')
+
     def __init__(self):
-        self.operatingsystem = ''
-        self.osreportstring = ''
+        # the facts of FACTGROUPS are collected when first used
+        self.facts = {}
         self.osfamily = ''
-        self.osname = ''
-        self.hostname = ''
-        self.ipaddress = ''
-        self.macaddress = ''
-        self.osversion = ''
         self.major_ver = ''
         self.minor_ver = ''
         self.trivial_ver = ''
-        self.systemtype = ''
         self.numrules = 0
         self.stonixversion = STONIXVERSION
         self.euid = os.geteuid()
@@ -98,7 +205,12 @@ class Environment:
         self.runtime = time.strftime("%Y-%m-%d %H:%M:%S", time.localtime())
         self.systemfismacat = 'low'
         self.systemfismacat = self.determinefismacat()
-        self.collectinfo()
+        if self.euid == 0:
+            self.factcache = FACTCACHE
+        else:
+            self.factcache = None
+        self.setosfamily()
+        self.collectpaths()
 
     def setsystemtype(self):
         """determine whether the current system is based on:
@@ -367,7 +479,8 @@ class Environment:
         return self.stonixversion
 
     def collectinfo(self):
-        """Private method to populate data.
+        """Private method to populate data. Facts already collected by this
+        process or cached under /var/db/stonix are not collected again.
 
 
         :returns: void
@@ -375,16 +488,119 @@ class Environment:
 
         """
 
-        self.discoveros()
         self.setosfamily()
-        self.setosname()
-        self.guessnetwork()
         self.collectpaths()
         self.determinefismacat()
-        self.setsystemtype()
-        self.sethostname()
-        self.setipaddress()
-        self.setmacaddress()
+        for group in FACTGROUPS:
+            self.loadfacts(group)
+
+    def loadfacts(self, group):
+        """Set the facts of a group of FACTGROUPS, from the facts this
+        process already collected, from the fact cache or by running the
+        collectors of the group.
+
+        :param group: name of the group
+
+        """
+
+        with _factslock:
+            facts = _facts.get(group)
+            if facts is None:
+                facts = self.readfactcache(group)
+            if facts is None:
+                for name in FACTGROUPS[group].facts:
+                    self.facts.setdefault(name, '')
+                for collector in FACTGROUPS[group].collectors:
+                    getattr(self, collector)()
+                facts = dict((name, self.facts[name])
+                             for name in FACTGROUPS[group].facts)
+                self.writefactcache(group, facts)
+            _facts[group] = facts
+        for name, value in facts.items():
+            self.facts.setdefault(name, value)
+
+    def readfactcache(self, group):
+        """Return the facts of a group from the fact cache, or None if they
+        are not cached or no longer valid
+
+        :param group: name of the group
+        :returns: dict
+
+        """
+
+        if not self.factcache:
+            return None
+        try:
+            with open(self.factcache, 'r') as cachefile:
+                cache = json.load(cachefile)
+            entry = cache['groups'][group]
+        except (IOError, OSError, ValueError, KeyError, TypeError):
+            return None
+        factgroup = FACTGROUPS[group]
+        if cache.get('version') != self.stonixversion:
+            return None
+        if entry.get('stamps') != getfilestamps(factgroup.files):
+            return None
+        if factgroup.bootbound:
+            bootid = getbootid()
+            if bootid is None or entry.get('bootid') != bootid:
+                return None
+        if factgroup.maxage is not None:
+            age = time.time() - entry.get('time', 0)
+            if age < 0 or age > factgroup.maxage:
+                return None
+        facts = entry.get('facts')
+        if not isinstance(facts, dict) or \
+           set(facts) != set(factgroup.facts):
+            return None
+        return facts
+
+    def writefactcache(self, group, facts):
+        """Store the facts of a group in the fact cache. The cache holds
+        host identifiers, so its directory is created private to the owner
+        and the file is written with mode 0600 and renamed into place.
+        Failures are ignored, the facts are collected again by the next run.
+
+        :param group: name of the group
+        :param facts: dict of fact: value
+
+        """
+
+        if not self.factcache:
+            return
+        factgroup = FACTGROUPS[group]
+        bootid = getbootid()
+        if factgroup.bootbound and bootid is None:
+            return
+        try:
+            with open(self.factcache, 'r') as cachefile:
+                cache = json.load(cachefile)
+            if cache.get('version') != self.stonixversion or \
+               not isinstance(cache.get('groups'), dict):
+                raise ValueError('stale fact cache')
+        except (IOError, OSError, ValueError, AttributeError):
+            cache = {'version': self.stonixversion, 'groups': {}}
+        cache['groups'][group] = {'stamps': getfilestamps(factgroup.files),
+                                  'bootid': bootid,
+                                  'time': time.time(),
+                                  'facts': facts}
+        tmpfile = None
+        try:
+            cachedir = os.path.dirname(self.factcache)
+            if not os.path.isdir(cachedir):
+                os.makedirs(cachedir, 0o700)
+            # mkstemp creates the file with mode 0600
+            fdesc, tmpfile = tempfile.mkstemp(dir=cachedir,
+                                              prefix='.factcache')
+            with os.fdopen(fdesc, 'w') as cachefile:
+                json.dump(cache, cachefile)
+            os.rename(tmpfile, self.factcache)
+        except (IOError, OSError, TypeError, ValueError):
+            if tmpfile:
+                try:
+                    os.remove(tmpfile)
+                except OSError:
+                    pass
 
     def setosname(self):
         """set the name of the OS (variable self.osname)
@@ -1130,6 +1346,13 @@ class Environment:
 
         :returns: string
 
+        """
+        return self.sysuuid
+
+    def setsysuuid(self):
+        """Private method to look up the unique identifier of the system
+        returned by get_sys_uuid and set self.sysuuid
+
         """
         uuid = '0'
         if DMI and self.euid == 0:
@@ -1183,8 +1406,7 @@ class Environment:
             uuid = cmd1.stdout.readline()
         if type(uuid) is bytes:
             uuid = uuid.decode('utf-8')
-        uuid = uuid.strip()
-        return uuid
+        self.sysuuid = uuid.strip()
 
     def ismobile(self):
         """Returns a bool indicating whether or not the system in question is a
@@ -1514,3 +1736,7 @@ class Environment:
             self.systemfismacat = 'high'
         elif self.systemfismacat == 'low' and category == 'high':
             self.systemfismacat = category
+
+
+FACTINDEX = dict((fact, group) for group, factgroup in FACTGROUPS.items()
+                 for fact in factgroup.facts)
@@ -35,25 +35,40 @@ Created on Aug 24, 2010
 @author: dkennel
 @change: 2016/07/18 eball Added smtplib.SMTPRecipientsRefused to try/except for
     reporterr method, and added debug output for both exceptions.
+@change: 2026/10/18 log() drops messages below the configured level before
+    doing any work and finds its caller with sys._getframe instead of
+    inspect.stack()
+@change: 2026/10/18 The XML report is streamed to disk and postreport uploads
+    it with ReportUploader instead of probing the server and running curl
+@change: 2026/10/18 log() calls are counted by the rule profiler
+@change: 2026/10/18 reporterr queues errors for an ErrorReporter thread which
+    mails one deduplicated digest per run instead of one mail per error
 """
 
 from stonix_resources.observable import Observable
+from stonix_resources.RuleProfiler import recordlog
 
 import atexit
-import re
+import gzip
+import http.client
+import ssl
+import tempfile
+import time
+import uuid
 import logging
 from stonix_resources import localize
 import logging.handlers
 import os.path
 import os
+import queue
 import socket
-import inspect
+import sys
+import threading
 import traceback
 import smtplib
 import xml.etree.ElementTree as ET
-import subprocess
 
-from shutil import move
+from shutil import copyfileobj, move
 
 def singleton_decorator(class_):
     instances = {}
@@ -107,6 +122,8 @@ class LogDispatcher (Observable):
         self.__initializelogs()
         self.last_message_received = ""
         self.last_prio = LogPriority.ERROR
+        self.errorreporter = None
+        self.errorlock = threading.Lock()
 
     def postreport(self):
         """
@@ -132,48 +149,34 @@ class LogDispatcher (Observable):
 
         self.xmlreport.closeReport()
         xmlreport = self.xmllog
-        resolvable = True
-
-        # check socket establish
-        try:
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-            sock.connect((localize.REPORTSERVER, 80))
-            sock.close()
-        except (socket.gaierror, socket.timeout, socket.error) as sockerr:
-            self.log(LogPriority.DEBUG, str(sockerr))
-            resolvable = False
 
         # upload the report
         try:
-            if resolvable:
-
-                curl = "curl"
-                curlpaths = ["/usr/bin/curl", "/bin/curl"]
-                for p in curlpaths:
-                    if os.path.exists(p):
-                        curl = p
-
-                # added -T option to curl command for large file uploads (sometimes log files are very large)
-                curlcommand = curl + ' -k -s -G -F "file=@' + xmlreport + ';type=text/xml" https://' + localize.REPORTSERVER + '/stonix/results.php'
-
+            if os.path.exists(xmlreport):
+                # certificates are not verified, as with the curl -k
+                # option used before
+                uploader = ReportUploader(localize.REPORTSERVER,
+                                          context=ssl._create_unverified_context())
                 if self.debug:
                     self.log(LogPriority.DEBUG,
                              ['LogDispatcher.postreport',
-                              'Upload command: ' + curlcommand])
-                cmd = subprocess.Popen(curlcommand, shell=True, close_fds=True,
-                                       stdout=subprocess.PIPE,
-                                       stderr=subprocess.PIPE)
-                uploadstatus = cmd.stdout.read()
-                uploadstatus = uploadstatus + cmd.stderr.read()
-                if self.debug:
-                    self.log(LogPriority.DEBUG,
-                             ['LogDispatcher.postreport',
-                              'Upload status: ' + \
-                              uploadstatus.decode('utf-8')])
-            if self.debug and not resolvable:
-                self.log(LogPriority.DEBUG,
-                         ['LogDispatcher.postreport',
-                          'Could not resolve upload host'])
+                              'Uploading ' + xmlreport + ' to https://' +
+                              localize.REPORTSERVER + uploader.path])
+                try:
+                    status, uploadstatus = uploader.upload(xmlreport)
+                    if self.debug:
+                        self.log(LogPriority.DEBUG,
+                                 ['LogDispatcher.postreport',
+                                  'Upload status: ' + str(status) + ' ' +
+                                  uploadstatus])
+                except (OSError, http.client.HTTPException) as err:
+                    self.log(LogPriority.DEBUG, str(err))
+                    if self.debug:
+                        self.log(LogPriority.DEBUG,
+                                 ['LogDispatcher.postreport',
+                                  'Could not reach upload host'])
+                finally:
+                    uploader.close()
             if not self.debug and os.path.exists(xmlreport):
                 os.remove(xmlreport)
 
@@ -206,6 +209,13 @@ class LogDispatcher (Observable):
 
         """
 
+        recordlog()
+
+        # Messages below the configured level are dropped before any
+        # formatting or caller lookup is done.
+        if not self.isenabled(priority):
+            return
+
         try:
 
             if type(msg_data) is list:
@@ -223,46 +233,16 @@ class LogDispatcher (Observable):
             self.last_message_received = entry
             self.last_prio = priority
 
-            if self.debug:
-                #####
-                # Set up inspect to use stack variables to log file and
-                # method/function that is being called. Message to be in the
-                # format:
-                # DEBUG:<name_of_module>:<name of function>(<line number>): <message to print>
-                stack1 = inspect.stack()[1]
-                mod = inspect.getmodule(stack1[0])
-                if mod:
-                    prefix = mod.__name__ + \
-                          ":" + stack1[3] + \
-                          "(" + str(stack1[2]) + "): "
-                else:
-                    prefix = stack1[3] + \
-                          "(" + str(stack1[2]) + "): "
-            else:
-                stack1 = inspect.stack()[1]
-                mod = inspect.getmodule(stack1[0])
-                if mod:
-                    prefix = mod.__name__ + \
-                          ":" + stack1[3] + ":"
-                else:
-                    prefix = stack1[3] + ":"
+            #####
+            # Message to be in the format:
+            # DEBUG:<name_of_module>:<name of function>(<line number>): <message to print>
+            prefix = self.callerprefix(2)
 
-            if re.search('RULE START', msg):
-                prefix = ''
-                msg = msg + '\n\n'
-            if re.search('RULE END', msg):
+            if 'RULE START' in msg or 'RULE END' in msg:
                 prefix = ''
                 msg = msg + '\n\n'
-            if re.search('START REPORT', msg):
-                prefix = ''
-                msg = msg + '\n'
-            if re.search('END REPORT', msg):
-                prefix = ''
-                msg = msg + '\n'
-            if re.search('START FIX', msg):
-                prefix = ''
-                msg = msg + '\n'
-            if re.search('END FIX', msg):
+            elif 'START REPORT' in msg or 'END REPORT' in msg or \
+                    'START FIX' in msg or 'END FIX' in msg:
                 prefix = ''
                 msg = msg + '\n'
 
@@ -298,11 +278,54 @@ class LogDispatcher (Observable):
         except Exception as err:
             print(str(err))
 
+    def isenabled(self, priority):
+        """Return True if a message logged at the given priority will be
+        written anywhere. DEBUG messages are only kept in debug mode and INFO
+        messages are only kept in debug or verbose mode. WARNING and above are
+        always processed since they feed the xml report and error mail.
+
+        :param priority: LogPriority value
+        :returns: bool
+
+        """
+        if priority == LogPriority.DEBUG:
+            return self.debug
+        if priority == LogPriority.INFO:
+            return self.debug or self.verbose
+        return True
+
+    def callerprefix(self, depth=1):
+        """Build the module:function prefix for a log line from the calling
+        frame. This uses sys._getframe which only touches the frame object,
+        unlike inspect.stack() which builds context (and reads source files)
+        for every frame on the stack.
+
+        :param depth: int - number of frames above the caller of this method
+            to look at. 1 is the caller of callerprefix.
+        :returns: string
+
+        """
+        try:
+            frame = sys._getframe(depth)
+        except (AttributeError, ValueError):
+            return ''
+        modname = frame.f_globals.get('__name__')
+        funcname = frame.f_code.co_name
+        if self.debug:
+            suffix = "(" + str(frame.f_lineno) + "): "
+        else:
+            suffix = ":"
+        del frame
+        if modname:
+            return modname + ":" + funcname + suffix
+        return funcname + suffix
+
     def reporterr(self, errmsg, prefix):
         """reporterr(errmsg)
         
         reporterr sends error messages generated by STONIX to the unixeffort
-        email address. Requires an error message string.
+        email address. Requires an error message string. Errors are queued
+        and mailed as one digest when stonix exits, see ErrorReporter.
 
         :param errmsg: 
         :param prefix: 
@@ -321,33 +344,15 @@ class LogDispatcher (Observable):
             print("\nUNABLE TO LOG DUE TO ONE OR MORE OF THE FOLLOWING CONSTANTS NOT BEING SET, OR BEING SET TO None, in localize.py: STONIXERR, STONIXDEVS, MAILRELAYSERVER, REPORTSERVER\n")
             return
 
-        # Function wrapped in try/except to allow the program to keep running
-        # when the mail server is unavailable.
-        try:
-            message = '''From: ''' + localize.STONIXERR + '''
-To: ''' + localize.STONIXDEVS + '''
-Subject: STONIX Error Report: ''' + prefix + '''
-
-'''
-            message = prefix + ' ' + message + 'Sent by: ' + \
-            self.environment.gethostname() + ' IP: ' \
-            + self.environment.getipaddress() + ' OS: ' + \
-            self.environment.getostype() + ': ' + \
-            str(self.environment.getosver()) + \
-            ' STONIX Ver: ' + str(self.environment.getstonixversion())
-            message = message + '\n' + errmsg
-            to = localize.STONIXDEVS + '\r\n'
-            frm = localize.STONIXERR + '\r\n'
-
-            server = smtplib.SMTP(localize.MAILRELAYSERVER)
-            server.sendmail(frm, to, message)
-            server.quit()
-        except socket.error:
-            self.log(LogPriority.DEBUG, "Could not send error e-mail: " +
-                     "error contacting e-mail server")
-        except smtplib.SMTPRecipientsRefused:
-            self.log(LogPriority.DEBUG, "Could not send error e-mail: " +
-                     "bad e-mail address in localize.STONIXDEVS")
+        # The mail is sent by a background thread at the end of the run so a
+        # slow or unreachable mail server never holds up the rules.
+        with self.errorlock:
+            if self.errorreporter is None:
+                self.errorreporter = ErrorReporter(self.environment, self,
+                                                   localize.MAILRELAYSERVER,
+                                                   localize.STONIXERR,
+                                                   localize.STONIXDEVS)
+        self.errorreporter.submit(errmsg, prefix)
 
     def format_message_data(self, msg_data):
         """If the expected 2 item array is passed then attach those items to
@@ -591,12 +596,23 @@ class LogPriority:
 class xmlReport:
     """
     Simple class to manage the STONIX XML report formatting.
-    
+
     @author: dkennel
 
     @change: 2019/11/19 Brandon R. Gonzales - Replace destructor with cleanup
         function to be triggered by the python atexit library on termination.
+    @change: 2026/10/18 - Entries are streamed to the report file as they
+        are logged instead of being kept in an ElementTree until the report
+        is closed. The closing tags are rewritten after every entry so the
+        file is a valid document even if stonix dies before closeReport.
+        Rules log from the scheduler threads, so the file is only written
+        while holding self.lock.
     """
+
+    HEAD = '<run><metadata>'
+    MIDDLE = '</metadata><findings>'
+    TAIL = '</findings></run>'
+
     def __init__(self, path, debug=False):
         """
         xmlReport.__init__(path): The xmlReport constructor. Requires a string
@@ -609,12 +625,28 @@ class xmlReport:
         """
         self.path = path
         self.debug = debug
-        self.root = ET.Element('run')
-        self.meta = ET.SubElement(self.root, 'metadata')
-        self.findings = ET.SubElement(self.root, 'findings')
+        # metadata is a few dozen entries, it is kept so the head of the
+        # report can be rewritten when metadata is logged after findings
+        self.metadata = []
+        self.latemetadata = []
+        self.handle = None
+        self.findingsstart = 0
+        self.tailstart = 0
         self.closed = False
+        # reentrant, closeReport and writeMetadata go through writeReport
+        self.lock = threading.RLock()
         atexit.register(self.cleanup)
 
+    def formatEntry(self, entry):
+        """Return the XML element for a STONIX log entry
+
+        :param entry: Formatted version of the log data.
+        :returns: string
+
+        """
+        return ET.tostring(ET.Element(entry.Tag, val=entry.Detail),
+                           encoding="unicode")
+
     def writeMetadata(self, entry):
         """xmlReport.writeMetadata(entry): The xmlReport method to add a metadata
         entry to the report. Requires a STONIX log entry which is a list of
@@ -624,7 +656,15 @@ class xmlReport:
         @author: dkennel
 
         """
-        ET.SubElement(self.meta, entry.Tag, val=entry.Detail)
+        element = self.formatEntry(entry)
+        with self.lock:
+            if self.tailstart > self.findingsstart:
+                # findings follow the head, the entry is kept in the tail
+                # until the report is closed
+                self.latemetadata.append(element)
+            else:
+                self.metadata.append(element)
+            self.writeReport(False)
         if self.debug:
             print('xmlReport.writeMetadata: Added entry ' + entry.Tag + ' ' + entry.Detail)
 
@@ -637,11 +677,129 @@ class xmlReport:
         @author: dkennel
 
         """
-        ET.SubElement(self.findings, entry.Tag, val=entry.Detail)
+        element = self.formatEntry(entry)
+        with self.lock:
+            if self.openReport():
+                try:
+                    self.handle.seek(self.tailstart)
+                    self.handle.write(element.encode('utf-8'))
+                    self.tailstart = self.handle.tell()
+                    self.writeTail()
+                except (IOError, OSError) as err:
+                    self.failReport(err)
         #if self.debug:
             #print 'xmlReport.writeFinding: Added entry ' + entry.Tag + \
             #' ' + entry.Detail
 
+    def openReport(self):
+        """Open the report file and write the head of the report on first
+        use. Returns False if the report is closed or cannot be written.
+
+        :returns: bool
+
+        """
+        if self.closed:
+            return False
+        if self.handle is None:
+            try:
+                self.handle = open(self.path, 'w+b')
+                self.writeHead()
+            except (IOError, OSError) as err:
+                self.failReport(err)
+                return False
+        return True
+
+    def writeReport(self, final):
+        """Write the head of the report and, if no findings follow it yet,
+        the tail. When findings were written, only the tail is rewritten
+        unless final is True, in which case the report is copied to a new
+        file with all metadata in the head.
+
+        :param final: bool - True if the report is being closed
+
+        """
+        with self.lock:
+            if not self.openReport():
+                return
+            try:
+                if final and self.latemetadata:
+                    self.rewriteReport()
+                elif self.tailstart == self.findingsstart:
+                    self.writeHead()
+                else:
+                    self.writeTail()
+            except (IOError, OSError) as err:
+                self.failReport(err)
+
+    def writeHead(self):
+        """Write the metadata and the closing tags of a report that holds no
+        findings yet
+
+        """
+        self.handle.seek(0)
+        self.handle.write((self.HEAD + ''.join(self.metadata) +
+                           self.MIDDLE).encode('utf-8'))
+        self.findingsstart = self.tailstart = self.handle.tell()
+        self.writeTail()
+
+    def writeTail(self):
+        """Write the closing tags after the last finding"""
+        tail = self.TAIL
+        if self.latemetadata:
+            tail = '</findings><metadata>' + ''.join(self.latemetadata) + \
+                '</metadata></run>'
+        self.handle.seek(self.tailstart)
+        self.handle.write(tail.encode('utf-8'))
+        self.handle.truncate()
+        self.handle.flush()
+
+    def rewriteReport(self):
+        """Copy the findings to a new report file whose head holds the
+        metadata logged after the first finding, then replace the report
+        with it.
+
+        """
+        self.metadata.extend(self.latemetadata)
+        self.latemetadata = []
+        tmppath = self.path + '.tmp'
+        with open(tmppath, 'wb') as newreport:
+            newreport.write((self.HEAD + ''.join(self.metadata) +
+                             self.MIDDLE).encode('utf-8'))
+            findingsstart = newreport.tell()
+            self.handle.seek(self.findingsstart)
+            remaining = self.tailstart - self.findingsstart
+            while remaining > 0:
+                chunk = self.handle.read(min(remaining, 65536))
+                if not chunk:
+                    break
+                newreport.write(chunk)
+                remaining -= len(chunk)
+            tailstart = newreport.tell()
+            newreport.write(self.TAIL.encode('utf-8'))
+        os.rename(tmppath, self.path)
+        self.handle.close()
+        self.handle = open(self.path, 'r+b')
+        self.findingsstart = findingsstart
+        self.tailstart = tailstart
+
+    def failReport(self, err):
+        """Stop writing the report after an error
+
+        :param err: the exception raised
+
+        """
+        if self.debug:
+            print('logdispatcher.xmlReport: Error encountered writing ' +
+                  self.path)
+            print(err)
+        if self.handle is not None:
+            try:
+                self.handle.close()
+            except (IOError, OSError):
+                pass
+        self.handle = None
+        self.closed = True
+
     def closeReport(self):
         """xmlReport.closeReport(): This method will write the xmlReport to disk.
         
@@ -650,14 +808,19 @@ class xmlReport:
 
         """
         try:
-            if not self.closed:
-                f = open(self.path, 'w')
-                ET.ElementTree(self.root).write(f, encoding="unicode")
-                f.close()
-                self.closed = True
-            if self.debug:
-                print('xmlReport.closeReport: dumping the ElementTree: ')
-                ET.dump(self.root)
+            with self.lock:
+                if not self.closed:
+                    self.writeReport(True)
+                    if self.handle is not None:
+                        self.handle.close()
+                        self.handle = None
+                    self.closed = True
+            if self.debug and os.path.exists(self.path):
+                print('xmlReport.closeReport: dumping the report: ')
+                with open(self.path, 'r') as report:
+                    for chunk in iter(lambda: report.read(65536), ''):
+                        sys.stdout.write(chunk)
+                print('')
         except Exception as err:
             if self.debug:
                 print('logdispatcher.xmlReport.closeReport: Error encountered processing xml')
@@ -671,7 +834,321 @@ class xmlReport:
         @author: Brandon R. Gonzales
         """
         try:
-            if not self.closed:
-                self.closeReport()
+            with self.lock:
+                if not self.closed:
+                    self.closeReport()
         except Exception:
             pass
+
+
+# Errors on the way to a reachable server which are worth another attempt.
+# Failing to resolve or connect to the server is not retried, so a host
+# without network gives up at once.
+TRANSIENTERRORS = (ConnectionResetError, ConnectionAbortedError,
+                   BrokenPipeError, http.client.HTTPException)
+
+
+class ReportUploader:
+    """
+    Uploads report files to the report server as a multipart form with a
+    single "file" field, the way the results.php script of the server
+    expects them. The connection is kept open for further uploads and
+    failed uploads are retried with an exponential backoff. The request
+    body is only gzip compressed when asked for, as the web server must be
+    set up to decode compressed requests for results.php to see the file.
+    """
+
+    def __init__(self, host, path='/stonix/results.php', port=None,
+                 secure=True, context=None, timeout=30, retries=3,
+                 backoff=2.0, compress=False):
+        """
+        @param host: string - name of the report server
+        @param path: string - path of the upload script on the server
+        @param port: int - port of the server, None for the default
+        @param secure: Bool - whether or not to use https
+        @param context: ssl.SSLContext used for https connections
+        @param timeout: int - seconds to wait for the server
+        @param retries: int - number of times a failed upload is retried
+        @param backoff: float - seconds to wait before the first retry,
+            doubled for every further retry
+        @param compress: Bool - whether or not to gzip the request body.
+            Only set this for servers which decode compressed requests
+        """
+        self.host = host
+        self.path = path
+        self.port = port
+        self.secure = secure
+        self.context = context
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.compress = compress
+        self.connection = None
+
+    def connect(self):
+        """Return the connection to the server, opening it if needed
+
+        :returns: http.client.HTTPConnection
+
+        """
+        if self.connection is None:
+            if self.secure:
+                self.connection = http.client.HTTPSConnection(
+                    self.host, self.port, timeout=self.timeout,
+                    context=self.context)
+            else:
+                self.connection = http.client.HTTPConnection(
+                    self.host, self.port, timeout=self.timeout)
+        return self.connection
+
+    def close(self):
+        """Close the connection to the server"""
+        if self.connection is not None:
+            self.connection.close()
+            self.connection = None
+
+    def buildbody(self, report, boundary, compress):
+        """Return a temporary file holding the multipart form for report,
+        gzip compressed if compress is True. The report is copied in chunks
+        so it is never held in memory.
+
+        :param report: string - path of the report file
+        :param boundary: string - multipart boundary
+        :param compress: bool
+        :returns: file object positioned at the start of the body
+
+        """
+        body = tempfile.TemporaryFile()
+        if compress:
+            writer = gzip.GzipFile(fileobj=body, mode='wb')
+        else:
+            writer = body
+        writer.write(('--' + boundary + '\r\n'
+                      'Content-Disposition: form-data; name="file"; '
+                      'filename="' + os.path.basename(report) + '"\r\n'
+                      'Content-Type: text/xml\r\n\r\n').encode('utf-8'))
+        with open(report, 'rb') as reportfile:
+            copyfileobj(reportfile, writer, 65536)
+        writer.write(('\r\n--' + boundary + '--\r\n').encode('utf-8'))
+        if compress:
+            writer.close()
+        body.seek(0)
+        return body
+
+    def upload(self, report):
+        """Upload a report file. Server errors and dropped connections are
+        retried, a server that does not accept compressed requests is sent
+        the report again uncompressed. Returns the status and the text of
+        the response of the server. Raises the error straight away if the
+        server cannot be resolved or connected to, and the last error if
+        every attempt lost the connection.
+
+        :param report: string - path of the report file
+        :returns: tuple of (int, string)
+
+        """
+        boundary = uuid.uuid4().hex
+        compress = self.compress
+        attempt = 0
+        while True:
+            body = self.buildbody(report, boundary, compress)
+            try:
+                headers = {'Content-Type': 'multipart/form-data; boundary=' +
+                           boundary,
+                           'Content-Length': str(os.fstat(body.fileno()).st_size)}
+                if compress:
+                    headers['Content-Encoding'] = 'gzip'
+                try:
+                    connection = self.connect()
+                    connection.request('POST', self.path, body, headers)
+                    response = connection.getresponse()
+                    text = response.read().decode('utf-8', 'replace')
+                    status = response.status
+                    if response.will_close:
+                        self.close()
+                except TRANSIENTERRORS:
+                    self.close()
+                    if attempt >= self.retries:
+                        raise
+                    status = None
+                except OSError:
+                    self.close()
+                    raise
+            finally:
+                body.close()
+            if status == 415 and compress:
+                compress = False
+                continue
+            if status is not None and status < 500 or \
+               attempt >= self.retries:
+                return status, text
+            time.sleep(self.backoff * 2 ** attempt)
+            attempt += 1
+
+
+class ErrorReporter:
+    """
+    Mails the errors of a stonix run to the STONIX developers as a single
+    digest. Errors are handed to a background thread through a queue so
+    logging an error never waits on the mail server. The thread drops
+    repeats of an error it has already seen, keeping only a count, and
+    keeps at most maxperrule different errors for each rule. When the
+    reporter is closed, at the latest when stonix exits, the digest is sent
+    over one SMTP session.
+    """
+
+    def __init__(self, environment, logger, relay, sender, recipients,
+                 maxperrule=10, timeout=30):
+        """
+        @param environment: environment object, used for the host details
+            at the top of the digest
+        @param logger: LogDispatcher used to report mail failures
+        @param relay: string - mail relay, "host" or "host:port"
+        @param sender: string - from address of the digest
+        @param recipients: string - address the digest is sent to
+        @param maxperrule: int - number of different errors kept for a rule
+        @param timeout: int - seconds to wait for the mail relay
+        """
+        self.environment = environment
+        self.logger = logger
+        self.relay = relay
+        self.sender = sender
+        self.recipients = recipients
+        self.maxperrule = maxperrule
+        self.timeout = timeout
+        # (prefix, errmsg) -> number of times the error was reported, in the
+        # order the errors were first seen
+        self.errors = {}
+        self.rulecounts = {}
+        self.suppressed = {}
+        self.sent = False
+        self.closed = False
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self.run,
+                                       name='stonix-errorreporter',
+                                       daemon=True)
+        self.thread.start()
+        atexit.register(self.close)
+
+    def submit(self, errmsg, prefix):
+        """Queue an error for the digest. This never blocks. Errors submitted
+        after the reporter was closed are dropped.
+
+        :param errmsg: string - error message
+        :param prefix: string - module:function prefix of the log line
+
+        """
+        if not self.closed:
+            self.queue.put((prefix, errmsg))
+
+    def getrule(self, prefix):
+        """Return the name of the rule (or module) which logged an error
+
+        :param prefix: string - module:function prefix of the log line
+        :returns: string
+
+        """
+        return prefix.split(':')[0] or 'stonix'
+
+    def add(self, prefix, errmsg):
+        """Add an error to the digest, counting repeats of known errors and
+        suppressing errors of rules which reached maxperrule.
+
+        :param prefix: string - module:function prefix of the log line
+        :param errmsg: string - error message
+
+        """
+        key = (prefix, errmsg)
+        if key in self.errors:
+            self.errors[key] += 1
+            return
+        rule = self.getrule(prefix)
+        if self.rulecounts.get(rule, 0) >= self.maxperrule:
+            self.suppressed[rule] = self.suppressed.get(rule, 0) + 1
+            return
+        self.rulecounts[rule] = self.rulecounts.get(rule, 0) + 1
+        self.errors[key] = 1
+
+    def run(self):
+        """Body of the background thread. Collects queued errors until the
+        reporter is closed, then sends the digest.
+        """
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            self.add(*item)
+        if self.errors:
+            self.send()
+
+    def getheader(self):
+        """Return the line describing the system the errors came from
+
+        :returns: string
+
+        """
+        try:
+            return 'Sent by: ' + self.environment.gethostname() + ' IP: ' + \
+                self.environment.getipaddress() + ' OS: ' + \
+                self.environment.getostype() + ': ' + \
+                str(self.environment.getosver()) + \
+                ' STONIX Ver: ' + str(self.environment.getstonixversion())
+        except Exception:
+            return 'Sent by: ' + socket.gethostname()
+
+    def formatdigest(self):
+        """Return the digest mail for the errors collected so far
+
+        :returns: string
+
+        """
+        total = sum(self.errors.values()) + sum(self.suppressed.values())
+        lines = ['From: ' + self.sender,
+                 'To: ' + self.recipients,
+                 'Subject: STONIX Error Report: ' + str(total) +
+                 ' errors in ' + str(len(self.rulecounts)) + ' rules',
+                 '',
+                 self.getheader(),
+                 '']
+        for (prefix, errmsg), count in self.errors.items():
+            if count > 1:
+                lines.append(prefix + ' (reported ' + str(count) + ' times)')
+            else:
+                lines.append(prefix)
+            lines.append(errmsg.rstrip())
+            lines.append('')
+        for rule, count in self.suppressed.items():
+            lines.append(str(count) + ' further errors from ' + rule +
+                         ' were not included')
+        return '\r\n'.join(lines) + '\r\n'
+
+    def send(self):
+        """Send the digest over a single SMTP session"""
+        message = self.formatdigest()
+        try:
+            server = smtplib.SMTP(self.relay, timeout=self.timeout)
+            try:
+                server.sendmail(self.sender, self.recipients,
+                                message.encode('utf-8'))
+            finally:
+                try:
+                    server.quit()
+                except (OSError, smtplib.SMTPException):
+                    server.close()
+            self.sent = True
+        except smtplib.SMTPRecipientsRefused:
+            self.logger.log(LogPriority.DEBUG, "Could not send error e-mail: " +
+                            "bad e-mail address in localize.STONIXDEVS")
+        except (OSError, smtplib.SMTPException):
+            self.logger.log(LogPriority.DEBUG, "Could not send error e-mail: " +
+                            "error contacting e-mail server")
+
+    def close(self):
+        """Stop collecting errors and send the digest. Waits for the mail to
+        be sent for at most a little longer than the relay timeout.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(None)
+        self.thread.join(self.timeout + 5)
@@ -19,9 +19,167 @@
 import re
 #import yum, aptGet, portage, zypper, freebsd, solaris, dnf
 from stonix_resources import yum, aptGet, portage, zypper, freebsd, solaris, dnf
+import fnmatch
+import threading
 import traceback
 from stonix_resources.logdispatcher import LogPriority
 
+# Package manager chosen for each (os family, os type); determineMgr() only
+# has to work it out once per process
+_managers = {}
+
+# manager name -> PackageSnapshot, shared by every Pkghelper in the process
+_snapshots = {}
+_snapshotlock = threading.Lock()
+
+
+def getsnapshot(manager, pckgr, logger):
+    """return the process wide PackageSnapshot for the named package
+    manager, creating it on first use
+
+    :param manager: string; package manager name, see Pkghelper.osDictionary
+    :param pckgr: package manager object used to run the bulk queries
+    :param logger: logdispatcher object
+    :returns: PackageSnapshot
+
+    """
+
+    with _snapshotlock:
+        if manager not in _snapshots:
+            _snapshots[manager] = PackageSnapshot(pckgr, logger)
+        return _snapshots[manager]
+
+
+if __name__ != "stonix_resources.pkghelper":
+    # Rules import this module as "pkghelper" while rule.py, which undoes
+    # pkghelper events, imports it as "stonix_resources.pkghelper". Python
+    # loads the two names as separate modules, so the registries of the
+    # package qualified module are used by both.
+    from stonix_resources.pkghelper import _managers, _snapshots, \
+        _snapshotlock
+
+
+class PackageSnapshot(object):
+    """In memory view of the installed and available packages for one
+    package manager. Each view is loaded with a single bulk query the first
+    time it is needed and kept until invalidate() is called, which Pkghelper
+    does after every install, remove and update.
+
+    Package managers without listInstalled/listAvailable methods, or whose
+    bulk query fails, get None back from the lookups and Pkghelper falls
+    back to asking the package manager about each package.
+
+    """
+
+    def __init__(self, pckgr, logger):
+        self.pckgr = pckgr
+        self.logger = logger
+        self.lock = threading.RLock()
+        self.installed = None
+        self.available = None
+        self.loaded = {'installed': False, 'available': False}
+        self.providers = {}
+
+    def invalidate(self):
+        """forget everything, the next lookup queries the package manager
+        again
+
+        """
+
+        with self.lock:
+            self.installed = None
+            self.available = None
+            self.loaded = {'installed': False, 'available': False}
+            self.providers = {}
+
+    def load(self, view):
+        """load one view with its bulk query if that has not been tried yet
+
+        :param view: string; 'installed' or 'available'
+        :returns: set of package names, or None if not supported
+
+        """
+
+        with self.lock:
+            if not self.loaded[view]:
+                method = {'installed': 'listInstalled',
+                          'available': 'listAvailable'}[view]
+                names = None
+                try:
+                    names = getattr(self.pckgr, method)()
+                except AttributeError:
+                    pass
+                except Exception:
+                    self.logger.log(LogPriority.DEBUG,
+                                    traceback.format_exc())
+                setattr(self, view, names)
+                self.loaded[view] = True
+                if names is not None:
+                    self.logger.log(LogPriority.DEBUG,
+                                    "Loaded " + str(len(names)) + " " +
+                                    view + " package names")
+            return getattr(self, view)
+
+    def match(self, package, names):
+        """check a package name against a set of names. Shell style
+        wildcards are honored, as the package managers' list commands do
+
+        :param package: string; package name
+        :param names: set of package names
+        :returns: bool
+
+        """
+
+        package = package.strip()
+        if package in names:
+            return True
+        if re.search(r"[*?\[]", package):
+            return bool(fnmatch.filter(names, package))
+        return False
+
+    def isInstalled(self, package):
+        """return True/False if the package is installed, or None if the
+        installed view is not available
+
+        :param package: string; package name
+        :returns: bool or None
+
+        """
+
+        names = self.load('installed')
+        if names is None:
+            return None
+        return self.match(package, names)
+
+    def isAvailable(self, package):
+        """return True/False if the package is available to install, or None
+        if the available view is not available
+
+        :param package: string; package name
+        :returns: bool or None
+
+        """
+
+        names = self.load('available')
+        if names is None:
+            return None
+        return self.match(package, names)
+
+    def getPackageFromFile(self, filename):
+        """return the package providing filename, asking the package manager
+        only the first time a given filename is looked up
+
+        :param filename: string; path of the file
+        :returns: string
+
+        """
+
+        with self.lock:
+            if filename not in self.providers:
+                self.providers[filename] = \
+                    self.pckgr.getPackageFromFile(filename)
+            return self.providers[filename]
+
 
 class Pkghelper(object):
     """Package helper class that interacts with rules needing to install, remove
@@ -32,6 +190,10 @@ class Pkghelper(object):
     @change: 2015/08/20 eball - Added getPackageFromFile
     @change: 2015/09/04 rsn - Gave default value to self.pckgr for OSs that
                               are not included, specifically OS X.
+    @change: 2026/10/18 - check, checkAvailable and getPackageFromFile answer
+                          from a process wide PackageSnapshot; install, remove
+                          and Update invalidate it. determineMgr results are
+                          cached per os.
 
 
     """
@@ -77,6 +239,11 @@ class Pkghelper(object):
         else:
             self.pckgr = None
 
+        if self.pckgr:
+            self.snapshot = getsnapshot(self.manager, self.pckgr, self.logger)
+        else:
+            self.snapshot = None
+
     def determineMgr(self):
         """determines the package manager for the current os
         
@@ -85,6 +252,34 @@ class Pkghelper(object):
                 initialization; added doc string
 
 
+        """
+
+        packageMgr = None
+
+        try:
+
+            oskey = (self.enviro.getosfamily(), self.enviro.getostype())
+            if oskey in _managers:
+                return _managers[oskey]
+            packageMgr = self.matchMgr()
+            _managers[oskey] = packageMgr
+            return packageMgr
+
+        except(KeyboardInterrupt, SystemExit):
+            raise
+        except Exception:
+            info = traceback.format_exc()
+            self.logger.log(LogPriority.ERROR, info)
+            raise
+
+    def matchMgr(self):
+        """match the os type (linux) or os family (everything else) against
+        osDictionary to find the package manager
+
+
+        :returns: packageMgr
+        :rtype: string or None
+
         """
 
         packageMgr = None
@@ -142,7 +337,9 @@ class Pkghelper(object):
 
         try:
             if self.enviro.geteuid() is 0 and self.pckgr:
-                if self.pckgr.installpackage(package):
+                installed = self.pckgr.installpackage(package)
+                self.snapshot.invalidate()
+                if installed:
                     return True
                 else:
                     return False
@@ -170,7 +367,10 @@ install command"
 
         try:
             if self.enviro.geteuid() == 0:
-                if self.pckgr.removepackage(package):
+                removed = self.pckgr.removepackage(package)
+                if self.snapshot:
+                    self.snapshot.invalidate()
+                if removed:
                     return True
                 else:
                     return False
@@ -199,6 +399,10 @@ remove command"
         """
 
         try:
+            installed = self.snapshot.isInstalled(package)
+            if installed is not None:
+                self.logger.log(LogPriority.DEBUG, "Package " + str(package) + " installed: " + str(installed))
+                return installed
             if self.pckgr.checkInstall(package):
                 return True
             else:
@@ -224,6 +428,10 @@ remove command"
         """
 
         try:
+            available = self.snapshot.isAvailable(package)
+            if available is not None:
+                self.logger.log(LogPriority.DEBUG, "Package " + str(package) + " available: " + str(available))
+                return available
             if self.pckgr.checkAvailable(package):
                 return True
             else:
@@ -292,7 +500,10 @@ remove command"
 
             if updatesavail:
                 self.logger.log(LogPriority.DEBUG, "Updates are available to install")
-                if not self.pckgr.Update(package):
+                success = self.pckgr.Update(package)
+                if self.snapshot:
+                    self.snapshot.invalidate()
+                if not success:
                     self.logger.log(LogPriority.DEBUG, "Failed to install updates")
                     updated = False
                 else:
@@ -315,7 +526,7 @@ remove command"
         """
 
         try:
-            return self.pckgr.getPackageFromFile(filename)
+            return self.snapshot.getPackageFromFile(filename)
         except(KeyboardInterrupt, SystemExit):
             raise
         except Exception:
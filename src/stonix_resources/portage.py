@@ -17,6 +17,7 @@
 
 
 import re
+import os
 from stonix_resources.logdispatcher import LogPriority
 from stonix_resources.CommandHelper import CommandHelper
 import glob
@@ -43,6 +44,10 @@ class Portage(object):
         self.install = "/usr/bin/emerge "
         self.remove = self.install + " --unmerge "
         self.search = self.install + " --search "
+        self.pkgdb = "/var/db/pkg"
+        self.trees = ["/var/db/repos/gentoo", "/usr/portage"]
+        # strips the version from a package database entry (name-1.2.3-r1)
+        self.versionre = re.compile(r"-[0-9][^/]*$")
 
 ###############################################################################
     def installpackage(self, package):
@@ -286,6 +291,64 @@ class Portage(object):
             raise
         return updated
 
+###############################################################################
+    def listInstalled(self):
+        '''return the names of all installed packages, read from the portage
+        package database. Each package is listed both as name and as
+        category/name
+
+        :returns: installed; None if the database could not be read
+        :rtype: set
+
+        '''
+
+        installed = None
+
+        try:
+
+            if os.path.isdir(self.pkgdb):
+                installed = set()
+                for pkgdir in glob.glob(os.path.join(self.pkgdb, '*', '*')):
+                    category = os.path.basename(os.path.dirname(pkgdir))
+                    name = self.versionre.sub('', os.path.basename(pkgdir))
+                    installed.add(name)
+                    installed.add(category + '/' + name)
+            else:
+                self.logger.log(LogPriority.DEBUG, "Portage package database " + self.pkgdb + " not found")
+
+        except Exception:
+            raise
+        return installed
+
+###############################################################################
+    def listAvailable(self):
+        '''return the names of all packages in the local portage trees. Each
+        package is listed both as name and as category/name
+
+        :returns: available; None if no portage tree was found
+        :rtype: set
+
+        '''
+
+        available = None
+
+        try:
+
+            for tree in self.trees:
+                for pkgdir in glob.glob(os.path.join(tree, '*-*', '*')):
+                    if not os.path.isdir(pkgdir):
+                        continue
+                    if available is None:
+                        available = set()
+                    category = os.path.basename(os.path.dirname(pkgdir))
+                    name = os.path.basename(pkgdir)
+                    available.add(name)
+                    available.add(category + '/' + name)
+
+        except Exception:
+            raise
+        return available
+
 ###############################################################################
     def getInstall(self):
         return self.install
@@ -93,6 +93,14 @@ class ProgramArguments(object):
                           default=False,
                           help="List all installed rules that stonix will run on this platform.")
 
+        self.parser.add_option("-j", "--jobs", dest="jobs", type="int",
+                          default=1, action="store",
+                          help="Number of rules to run concurrently during a full fix or report run. Default is 1.")
+
+        self.parser.add_option("--profile", dest="profile", default="",
+                          action="store", metavar="DIR",
+                          help="Record the time and resources used by each rule and write them to DIR/stonix-profile.json and DIR/stonix.prom (for the node_exporter textfile collector).")
+
         #####
         # The Self Update test will look to a development/test environment
         # to test Self Update rather than testing self update
@@ -118,6 +126,9 @@ class ProgramArguments(object):
         if self.opts.list and (self.opts.fix or self.opts.report or self.opts.rollback or self.opts.pcf):
             self.parser.error('The -l --list option may not be used with the fix, report, rollback, or GUI options')
 
+        if self.opts.jobs < 1:
+            self.parser.error("The -j --jobs option must be 1 or greater.")
+
         if self.opts.debug:
             print("Selected options: ")
             print((self.opts))
@@ -254,3 +265,22 @@ class ProgramArguments(object):
 
         '''
         return self.opts.list
+
+    def get_jobs(self):
+        '''
+
+
+        :returns: number of rules to run concurrently.
+
+        '''
+        return self.opts.jobs
+
+    def get_profile(self):
+        '''
+
+
+        :returns: directory the rule profile is written to, empty if rules
+            are not profiled.
+
+        '''
+        return self.opts.profile
@@ -34,6 +34,12 @@ Created on Aug 24, 2010
 @change: eball 2015/07/08 - Added pkghelper and ServiceHelper undos
 @change: 2017/03/07 dkennel - Added FISMA risk level support to isapplicable
 @change: 2017/10/23 rsn - change to new service helper interface
+@change: 2026/10/18 - Added resources and getexecutionpriority for
+    the rule scheduler
+@change: 2026/10/18 - Moved the body of isapplicable to checkapplicability
+    so the rule manifest can use it
+@change: 2026/10/18 - checkapplicability uses the compiled predicates from
+    CheckApplicable
 '''
 
 from stonix_resources.observable import Observable
@@ -42,7 +48,6 @@ from stonix_resources.logdispatcher import LogPriority
 from types import *
 import os
 import re
-from distutils.version import LooseVersion
 from shutil import rmtree
 
 from stonix_resources.stonixutilityfunctions import isServerVersionHigher
@@ -55,7 +60,27 @@ from stonix_resources.CommandHelper import CommandHelper
 from stonix_resources.pkghelper import Pkghelper
 from stonix_resources.ServiceHelper import ServiceHelper
 import traceback
-from stonix_resources.CheckApplicable import CheckApplicable
+from stonix_resources.CheckApplicable import CheckApplicable, \
+    evaluateapplicable
+
+
+def checkapplicability(applicable, environ, logger, rulename=''):
+    '''Return True if a rule with the passed applicable dictionary applies to
+    the platform described by environ. This is the body of
+    Rule.isapplicable; it is a function so that applicability can be decided
+    from cached rule metadata without instantiating the rule. See
+    Rule.isapplicable for the format of the dictionary.
+
+    The dictionary is compiled into a predicate the first time it is seen
+    and results are cached per environment, see CheckApplicable.
+
+    :param applicable: dict - the rule's applicable property
+    :param environ: environment object
+    :param logger: logdispatcher object
+    :param rulename: name of the rule, used in log messages
+    :returns: bool
+    '''
+    return evaluateapplicable(applicable, environ, logger, rulename)
 
 
 class Rule(Observable):
@@ -98,6 +123,10 @@ LANL-stonix."""
         self.targetstate = "configured"
         self.guidance = []
         self.auditonly = False
+        # Resources this rule changes. Used by the rule scheduler to keep
+        # rules that touch the same files, services or packages from running
+        # at the same time.
+        self.resources = {'files': [], 'services': [], 'packages': []}
 
     def fix(self):
         '''The fix method will apply the required settings to the system.
@@ -258,6 +287,22 @@ LANL-stonix."""
         '''
         return self.rulenumber
 
+    def getexecutionpriority(self):
+        '''Return the execution priority of the rule. Rules with a lower
+        priority value are run before rules with a higher value.
+        :returns: int :
+        '''
+        return self.executionpriority
+
+    def getresources(self):
+        '''Return the dictionary of resources this rule touches. The
+        dictionary has the keys files, services and packages, each holding a
+        list of names. A rule that declares nothing is assumed to touch
+        anything and will be run on its own during fix.
+        :returns: dict :
+        '''
+        return self.resources
+
     def getrulename(self):
         '''Return the name of the rule
         :returns: string :
@@ -435,142 +480,8 @@ LANL-stonix."""
         @change: 2015/04/13 added this method to template class
         @change: 2017/11/13 ekkehard - make eligible for OS X El Capitan 10.11+
         '''
-        # return True
-        # Shortcut if we are defaulting to true
-        self.logdispatch.log(LogPriority.DEBUG,
-                             'Check applicability for ' + self.rulename)
-        self.logdispatch.log(LogPriority.DEBUG,
-                             'Dictionary is: ' + str(self.applicable))
-        try:
-            if 'os' not in self.applicable and 'family' not in self.applicable:
-                amidefault = self.applicable['default']
-                if amidefault == 'default':
-                    self.logdispatch.log(LogPriority.DEBUG,
-                                         'Defaulting to True')
-                    return True
-        except KeyError:
-            pass
-
-        # Determine whether we are a blacklist or a whitelist, default to a
-        # blacklist
-        if 'type' in self.applicable:
-            listtype = self.applicable['type']
-        else:
-            listtype = 'black'
-        # Set the default return as appropriate to the list type
-        # FIXME check for valid input
-        assert listtype in ['white', 'black'], 'Invalid list type specified: %r' % listtype
-        if listtype == 'black':
-            applies = True
-        else:
-            applies = False
-
-        # get our data in local vars
-        myosfamily = self.environ.getosfamily()
-        myosversion = self.environ.getosver()
-        myostype = self.environ.getostype()
-
-        # Process the os family list
-        if 'family' in self.applicable:
-            if myosfamily in self.applicable['family']:
-                if listtype == 'black':
-                    applies = False
-                else:
-                    applies = True
-                self.logdispatch.log(LogPriority.DEBUG,
-                                     'Family match, applies: ' + str(applies))
-
-        # Process the OS list
-        if 'os' in self.applicable:
-            for ostype, osverlist in list(self.applicable['os'].items()):
-
-                if re.search(ostype, myostype):
-                    # Process version and up
-                    if '+' in osverlist:
-                        assert len(osverlist) is 2, "Wrong number of entries for a +"
-                        if osverlist[1] == '+':
-                            baseversion = osverlist[0]
-                        else:
-                            baseversion = osverlist[1]
-                        if LooseVersion(myosversion) >= LooseVersion(baseversion):
-                            if listtype == 'black':
-                                applies = False
-                            else:
-                                applies = True
-                            self.logdispatch.log(LogPriority.DEBUG,
-                                                 'Plus match, applies: ' + str(applies))
-                    # Process version and lower
-                    elif '-' in osverlist:
-                        assert len(osverlist) is 2, "Wrong number of entries for a -"
-                        if osverlist[1] == '-':
-                            baseversion = osverlist[0]
-                        else:
-                            baseversion = osverlist[1]
-                        if LooseVersion(myosversion) <= LooseVersion(baseversion):
-                            if listtype == 'black':
-                                applies = False
-                            else:
-                                applies = True
-                            self.logdispatch.log(LogPriority.DEBUG,
-                                                 'Minus match, applies: ' + str(applies))
-                    # Process inclusive range
-                    elif 'r' in osverlist:
-                        assert len(osverlist) is 3, "Wrong number of entries for a range"
-                        vertmp = osverlist
-                        vertmp.remove('r')
-                        if LooseVersion(vertmp[0]) > LooseVersion(vertmp[1]):
-                            highver = vertmp[0]
-                            lowver = vertmp[1]
-                        elif LooseVersion(vertmp[0]) < LooseVersion(vertmp[1]):
-                            highver = vertmp[1]
-                            lowver = vertmp[0]
-                        else:
-                            raise ValueError('Range versions are the same')
-                        if LooseVersion(myosversion) <= LooseVersion(highver) \
-                                and LooseVersion(myosversion) >= LooseVersion(lowver):
-                            if listtype == 'black':
-                                applies = False
-                            else:
-                                applies = True
-                            self.logdispatch.log(LogPriority.DEBUG,
-                                                 'Range match, applies: ' + str(applies))
-                    # Process explicit match
-                    else:
-                        if myosversion in osverlist:
-                            if listtype == 'black':
-                                applies = False
-                            else:
-                                applies = True
-                            self.logdispatch.log(LogPriority.DEBUG,
-                                                 'Version match, applies: ' + str(applies))
-
-        # Perform the rootless check
-        if applies and self.environ.geteuid() == 0:
-            if 'noroot' in self.applicable:
-                if self.applicable['noroot'] == True:
-                    applies = False
-
-        # Perform the FISMA categorization check
-        if applies:
-            rulefisma = ''
-            systemfismacat = ''
-            systemfismacat = self.environ.getsystemfismacat()
-            if systemfismacat not in ['high', 'med', 'low']:
-                raise ValueError('SystemFismaCat invalid: valid values are low, med, high')
-            if 'fisma' in self.applicable:
-                if self.applicable['fisma'] not in ['high', 'med', 'low']:
-                    raise ValueError('fisma value invalid: valid values are low, med, high')
-                else:
-                    rulefisma = self.applicable['fisma']
-            if systemfismacat == 'high' and rulefisma == 'high':
-                pass
-            elif systemfismacat == 'med' and rulefisma == 'high':
-                applies = False
-            elif systemfismacat == 'low' and \
-                    (rulefisma == 'med' or rulefisma == "high"):
-                applies = False
-
-        return applies
+        return checkapplicability(self.applicable, self.environ,
+                                  self.logdispatch, self.rulename)
 
     def checkConsts(self, constlist=[]):
         '''This method returns True or False depending
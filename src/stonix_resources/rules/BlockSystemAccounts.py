@@ -43,18 +43,20 @@ mac os x functionality; refactored code for readability; fixed pep8 violations
 @change: 2018/10/50 Breen Malmberg - refactor of rule
 @change: 2019/03/12 Ekkehard - make eligible for macOS Sierra 10.12+
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - read accounts, login shells and UID_MIN from the
+    shared account database
 """
 
 
 
 import os
-import re
 import traceback
 
 from rule import Rule
 from logdispatcher import LogPriority
 from CommandHelper import CommandHelper
-from stonixutilityfunctions import readFile, iterate
+from AccountDatabase import getaccounts
+from stonixutilityfunctions import iterate
 from stonixutilityfunctions import resetsecon
 
 
@@ -141,27 +143,11 @@ shells set the value of this to False, or No."""
 
         """
 
-        uid_min = ""
-        logindefs = "/etc/login.defs"
+        # get normal user uid start value
+        uid_min = getaccounts(self.logger).getlogindef("UID_MIN", "")
 
-        try:
-
-            # get normal user uid start value
-            logindefscontents = readFile(logindefs, self.logger)
-            if logindefscontents:
-                for line in logindefscontents:
-                    if re.search("^UID_MIN", line, re.IGNORECASE):
-                        sline = line.split()
-                        uid_min = sline[1]
-
-            if not uid_min:
-                self.logger.log(LogPriority.DEBUG, "Unable to determine UID_MIN")
-
-        except IndexError:
-            pass
-        except IOError:
-            self.logger.log(LogPriority.DEBUG, "Failed to read uid_min from file")
-            return uid_min
+        if not uid_min:
+            self.logger.log(LogPriority.DEBUG, "Unable to determine UID_MIN")
 
         return uid_min
 
@@ -190,20 +176,10 @@ shells set the value of this to False, or No."""
             uid_min = self.getUIDMIN()
             if not uid_min:
                 uid_min = "500"
-            f = open("/etc/passwd", "r")
-            contentlines = f.readlines()
-            f.close()
-
-            try:
-
-                for line in contentlines:
-                    sline = line.split(":")
-                    if int(sline[2]) < int(uid_min):
-                        if sline[0] not in exclude_accounts:
-                            system_accounts_list.append(sline[0])
-
-            except IndexError:
-                pass
+            for account in getaccounts(self.logger).getusers(remote=False):
+                if account.uid < int(uid_min):
+                    if account.name not in exclude_accounts:
+                        system_accounts_list.append(account.name)
 
         return system_accounts_list
 
@@ -217,23 +193,9 @@ shells set the value of this to False, or No."""
 
         loginshell = ""
 
-        try:
-            f = open("/etc/passwd", "r")
-            contentlines = f.readlines()
-            f.close()
-        except IOError:
-            self.logger.log(LogPriority.DEBUG, "Could not read from passwd file")
-            return loginshell
-
-        try:
-
-            for line in contentlines:
-                if re.search("^"+account, line, re.IGNORECASE):
-                    sline = line.split(":")
-                    loginshell = sline[6]
-
-        except IndexError:
-            pass
+        account = getaccounts(self.logger).getuser(account, remote=False)
+        if account:
+            loginshell = account.shell
 
         return loginshell
 
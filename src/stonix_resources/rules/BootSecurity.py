@@ -34,11 +34,15 @@ bluetooth, microphones, and cameras.
 @change: 2018/06/08 Ekkehard - make eligible for macOS Mojave 10.14
 @change: 2019/03/12 Ekkehard - make eligible for macOS Sierra 10.12+
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - fips=1 is checked, added and removed through the shared
+    boot loader model; grub.cfg is generated once by the controller at the
+    end of the run
 """
 
 import traceback
 import os
 import re
+import shutil
 
 from rule import Rule
 from logdispatcher import LogPriority
@@ -47,6 +51,7 @@ from CommandHelper import CommandHelper
 from stonixutilityfunctions import iterate
 from KVEditorStonix import KVEditorStonix
 from pkghelper import Pkghelper
+from stonix_resources.BootLoader import getbootloader
 
 
 class BootSecurity(Rule):
@@ -118,22 +123,7 @@ class BootSecurity(Rule):
         self.systemd_service_name = "stonixBootSecurity.service"
         self.stonix_launchd_plist = "/Library/LaunchDaemons/gov.lanl.stonix.bootsecurity.plist"
         self.stonix_launchd_name = "gov.lanl.stonix.bootsecurity"
-        self.grub_file = "/etc/default/grub"
-        self.grub_config_file = ""
-        grub_configs = ["/boot/grub2/grub.cfg", "/boot/efi/EFI/redhat/grub.cfg"]
-        for c in grub_configs:
-            if os.path.isfile(c):
-                self.grub_config_file = c
-                break
-        self.grub_updater_cmd = ""
-        grub_updater_locs = ["/usr/sbin/grub2-mkconfig","/sbin/grub2-mkconfig", "/usr/sbin/update-grub", "/sbin/update-grub"]
-        for l in grub_updater_locs:
-            if os.path.isfile(l):
-                self.grub_updater_cmd = l
-                break
-
-        if self.grub_updater_cmd in ["/usr/sbin/grub2-mkconfig","/sbin/grub2-mkconfig"]:
-            self.grub_updater_cmd += " -o " + self.grub_config_file
+        self.bootloader = getbootloader(self.logdispatch)
 
     def auditsystemd(self):
         """
@@ -258,26 +248,8 @@ class BootSecurity(Rule):
             else:
                 self.logdispatch.log(LogPriority.DEBUG, "fips compliance check enabled. Checking for fips compliance...")
 
-            # check grub template file for fips
-            if self.grub_file:
-                f = open(self.grub_file, "r")
-                contentlines = f.readlines()
-                f.close()
-
-                for line in contentlines:
-                    if re.search('^GRUB_CMDLINE_LINUX_DEFAULT=', line, re.I):
-                        if re.search("fips=1", line, re.I):
-                            found_fips = True
-
-            # check permanent grub config file for fips
-            if self.grub_config_file:
-                f = open(self.grub_config_file, "r")
-                contentlines = f.readlines()
-                f.close()
-
-                for line in contentlines:
-                    if re.search("fips=1", line, re.I):
-                        found_fips = True
+            # check the grub template and all boot entries for fips
+            found_fips = self.bootloader.isset("fips=1")
 
             if self.is_luks_encrypted():
                 if found_fips:
@@ -436,8 +408,6 @@ class BootSecurity(Rule):
         """
 
         success = True
-        fixed_fips = False
-        tmpfile = self.grub_file + ".stonixtmp"
 
         try:
 
@@ -455,31 +425,8 @@ class BootSecurity(Rule):
             else:
                 self.logdispatch.log(LogPriority.DEBUG, "System is not RHEL-based. Running generic fixes...")
 
-                f = open(self.grub_file, "r")
-                contentlines = f.readlines()
-                f.close()
-
-                for line in contentlines:
-                    if re.search("^GRUB_CMDLINE_LINUX_DEFAULT=", line, re.I):
-                        contentlines = [c.replace(line, line.strip()[:-1] + ' fips=1"\n') for c in contentlines]
-                        fixed_fips = True
-
-                if not fixed_fips:
-                    contentlines.append('GRUB_CMDLINE_LINUX_DEFAULT="splash quiet audit=1 fips=1"\n')
-
-                tf = open(tmpfile, "w")
-                tf.writelines(contentlines)
-                tf.close()
-
-                self.iditerator += 1
-                myid = iterate(self.iditerator, self.rulenumber)
-                event = {"eventtype": "conf",
-                         "filepath": self.grub_file}
-                self.statechglogger.recordchgevent(myid, event)
-                self.statechglogger.recordfilechange(tmpfile, self.grub_file, myid)
-                os.rename(tmpfile, self.grub_file)
-
-                self.ch.executeCommand(self.grub_updater_cmd)
+                if not self.write_grub_file(add=["fips=1"]):
+                    success = False
 
         except:
             raise
@@ -502,44 +449,11 @@ class BootSecurity(Rule):
 
         self.logdispatch.log(LogPriority.DEBUG, "Attempting to remove fips=1 option from grub boot config...")
 
-        tmpfile = self.grub_file + ".stonixtmp"
-
-        f = open(self.grub_file, "r")
-        contentlines = f.readlines()
-        f.close()
-
-        for line in contentlines:
-            if re.search("^GRUB_CMDLINE_LINUX_DEFAULT=", line, re.I):
-                self.logdispatch.log(LogPriority.DEBUG, "fips=1 found in boot config file")
-                line2 = line.replace("fips=1", "")
-                self.logdispatch.log(LogPriority.DEBUG, "removing fips=1 from " + str(self.grub_file))
-                contentlines = [c.replace(line, line2) for c in contentlines]
-
-        tf = open(tmpfile, "w")
-        tf.writelines(contentlines)
-        tf.close()
-
-        self.iditerator += 1
-        myid = iterate(self.iditerator, self.rulenumber)
-        event = {"eventtype": "conf",
-                 "filepath": self.grub_file}
-        self.statechglogger.recordchgevent(myid, event)
-        self.statechglogger.recordfilechange(tmpfile, self.grub_file, myid)
-        os.rename(tmpfile, self.grub_file)
-
-        self.logdispatch.log(LogPriority.DEBUG, "regenerating efi boot config file...")
-        self.ch.executeCommand(self.grub_updater_cmd)
-        retcode = self.ch.getReturnCode()
-        if retcode != 0:
-            self.logdispatch.log(LogPriority.WARNING, "Failed to update efi boot config file!")
-
-        f = open(self.grub_config_file, "r")
-        contentlines = f.readlines()
-        f.close()
-
-        for line in contentlines:
-            if re.search("fips=1", line, re.I):
-                success = False
+        if not self.write_grub_file(remove=["fips=1"]):
+            success = False
+
+        if self.bootloader.isset("fips=1"):
+            success = False
 
         if not success:
             self.logdispatch.log(LogPriority.WARNING, "fips=1 option still found in efi boot configuration!")
@@ -548,6 +462,42 @@ class BootSecurity(Rule):
 
         return success
 
+    def write_grub_file(self, add=(), remove=()):
+        """
+        add and remove kernel options in the grub template and schedule
+        the regeneration of the grub configuration, which the controller
+        runs once after all rules have run
+
+        :param add: list of kernel options to add
+        :param remove: list of kernel options to remove
+        :return: success
+        :rtype: bool
+        """
+
+        grub_file, contents, changed = self.bootloader.render(add, remove)
+        if not grub_file:
+            self.detailedresults += "\nUnable to locate the grub configuration file"
+            return False
+
+        if changed:
+            tmpfile = grub_file + ".stonixtmp"
+            tf = open(tmpfile, "w")
+            tf.write(contents)
+            tf.close()
+            shutil.copymode(grub_file, tmpfile)
+
+            self.iditerator += 1
+            myid = iterate(self.iditerator, self.rulenumber)
+            event = {"eventtype": "conf",
+                     "filepath": grub_file}
+            self.statechglogger.recordchgevent(myid, event)
+            self.statechglogger.recordfilechange(grub_file, tmpfile, myid)
+            os.rename(tmpfile, grub_file)
+
+        self.bootloader.schedule(add, remove, self.rulenumber)
+
+        return True
+
     def is_luks_encrypted(self):
         """
         check all drive devices to see if any are luks encrypted
@@ -35,6 +35,8 @@ on a system must have unique UIDs.
 @change: 2018/06/08 Ekkehard - make eligible for macOS Mojave 10.14
 @change: 2019/03/12 Ekkehard - make eligible for macOS Sierra 10.12+
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - read the local accounts from the shared account
+    database
 """
 
 
@@ -46,6 +48,7 @@ import traceback
 from rule import Rule
 from logdispatcher import LogPriority
 from CommandHelper import CommandHelper
+from AccountDatabase import getaccounts
 
 
 class CheckDupIDs(Rule):
@@ -206,47 +209,38 @@ class CheckDupIDs(Rule):
 
         try:
             retval = True
-            filelist = ['/etc/passwd', '/etc/group']
-            for adb in filelist:
+            accounts = getaccounts(self.logger)
+            # only the local files, accounts from a directory service are
+            # not ours to check
+            tables = [('/etc/passwd', accounts.getusers(remote=False), 'uid'),
+                      ('/etc/group', accounts.getgroups(remote=False), 'gid')]
+            for adb, records, idfield in tables:
                 if os.path.exists(adb):
                     self.logger.log(LogPriority.DEBUG,
                                     ['CheckDuplicateIds.nixcheck',
                                      "Checking : " + adb])
-                    namelist = []
-                    idlist = []
-                    fdata = open(adb, 'r')
-                    for line in fdata:
-                        line = line.split(':')
-                        try:
-                            if len(line) > 2:
-                                self.logger.log(LogPriority.DEBUG,
-                                                ['CheckDuplicateIds.nixcheck',
-                                                 "Checking line: " + str(line)])
-                                name = line[0]
-                                uid = line[2]
-                                self.logger.log(LogPriority.DEBUG,
-                                                "Checking account: " + name + ' ' + uid)
-                                if name not in namelist:
-                                    namelist.append(name)
-                                else:
-                                    issue = "Duplicate Name: NAME('" + name + "'; UID('" + uid + "')"
-                                    self.issuelist.append(issue)
-                                    retval = False
-                                if uid not in idlist:
-                                    idlist.append(uid)
-                                else:
-                                    issue = "Duplicate UID: NAME('" + name + "'; UID('" + uid + "')"
-                                    self.issuelist.append(issue)
-                        except(IndexError):
-                            # Some systems have malformed lines in the
-                            # accounts db due to poor administration
-                            # practices. Go to the next record.
-                            continue
+                    namelist = set()
+                    idlist = set()
+                    for record in records:
+                        name = record.name
+                        uid = str(getattr(record, idfield))
+                        self.logger.log(LogPriority.DEBUG,
+                                        "Checking account: " + name + ' ' + uid)
+                        if name not in namelist:
+                            namelist.add(name)
+                        else:
+                            issue = "Duplicate Name: NAME('" + name + "'; UID('" + uid + "')"
+                            self.issuelist.append(issue)
+                            retval = False
+                        if uid not in idlist:
+                            idlist.add(uid)
+                        else:
+                            issue = "Duplicate UID: NAME('" + name + "'; UID('" + uid + "')"
+                            self.issuelist.append(issue)
                     self.logger.log(LogPriority.DEBUG,
-                                    "NAMELIST: " + str(namelist))
+                                    "NAMELIST: " + str(sorted(namelist)))
                     self.logger.log(LogPriority.DEBUG,
-                                    "IDLIST: " + str(idlist))
-                    fdata.close()
+                                    "IDLIST: " + str(sorted(idlist)))
             return retval
 
         except:
@@ -39,6 +39,8 @@ checked in fix method.
 @change: 2018/06/08 ekkehard - make eligible for macOS Mojave 10.14
 @change: 2019/03/12 ekkehard - make eligible for macOS Sierra 10.12+
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - look the current user's home directory up in the
+    shared account database
 '''
 
 
@@ -50,6 +52,7 @@ from rule import Rule
 from logdispatcher import LogPriority
 from stonixutilityfunctions import isWritable
 from CommandHelper import CommandHelper
+from AccountDatabase import getaccounts
 
 
 class ConfigureDotFiles(Rule):
@@ -152,26 +155,18 @@ being made non-world-writable, set the value of ConfigureDotFiles to False.'''
 
         try:
 
-            f = open('/etc/passwd', 'r')
-            contentlines = f.readlines()
-            f.close()
+            home = self.environ.geteuidhome()
+            for account in getaccounts(self.logger).getusersbyhome(home):
 
-            for line in contentlines:
+                if account.home and account.uid >= 500 and \
+                   not re.search('nfsnobody', account.name):
 
-                line = line.split(':')
-
-                if len(line) >= 6 and line[5] and \
-                   self.environ.geteuidhome() == str(line[5]):
-
-                    line[2] = int(line[2])
-                    if line[2] >= 500 and not re.search('nfsnobody', line[0]):
-
-                        if os.path.exists(line[5]):
-                            filelist = os.listdir(line[5])
-                            for i in range(len(filelist)):
-                                if re.search('^\.', filelist[i]):
-                                    dotfilelist.append(line[5] + '/' +
-                                                       filelist[i])
+                    if os.path.exists(account.home):
+                        filelist = os.listdir(account.home)
+                        for i in range(len(filelist)):
+                            if re.search('^\.', filelist[i]):
+                                dotfilelist.append(account.home + '/' +
+                                                   filelist[i])
 
         except Exception:
             raise
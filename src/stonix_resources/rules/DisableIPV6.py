@@ -41,6 +41,9 @@ Created on Apr 9, 2013
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
 @change: 2019/08/07 Brandon R. Gonzales - Improve logging in linux report;
         Remove/cleanup unused lines of code
+@change: 2026/10/18 - linux kernel parameters are read and set through the
+    shared sysctl snapshot and checked against sysctl.conf and sysctl.d
+    together
 '''
 
 from stonixutilityfunctions import iterate, setPerms, checkPerms, writeFile
@@ -48,6 +51,7 @@ from stonixutilityfunctions import readFile, resetsecon, createFile
 from rule import Rule
 from logdispatcher import LogPriority
 from KVEditorStonix import KVEditorStonix
+from Sysctl import getsysctl
 from pkghelper import Pkghelper
 from CommandHelper import CommandHelper
 from ServiceHelper import ServiceHelper
@@ -391,48 +395,32 @@ and/or wasn't able to be created\n"
                 if re.search(":", line):
                     compliant = False
 
-        # check compliancy of /etc/sysctl.conf file
-        if not os.path.exists(sysctl):
-            self.detailedresults += "File " + sysctl + " does not exist\n"
+        # check the kernel parameters configured in /etc/sysctl.conf and
+        # sysctl.d
+        sysctlview = getsysctl(self.logger)
+        configured = sysctlview.checkconfigured(self.sysctls)
+        if configured:
+            for key, setting in configured.items():
+                self.detailedresults += sysctlview.describe(key, setting) + \
+                    ", expected " + self.sysctls[key] + "\n"
+            compliant = False
+        if os.path.exists(sysctl) and \
+           not checkPerms(sysctl, [0, 0, 0o644], self.logger):
+            self.detailedresults += "Permissions for " + sysctl + \
+                "are incorrect\n"
             compliant = False
-        else:
-            tmpfile = sysctl + ".tmp"
-            self.editor1 = KVEditorStonix(self.statechglogger, self.logger,
-                                          "conf", sysctl, tmpfile, self.sysctls,
-                                          "present", "openeq")
-            if not self.editor1.report():
-                self.detailedresults += "/etc/sysctl file doesn't contain \
-                    the correct contents\n"
-                compliant = False
-            if not checkPerms(sysctl, [0, 0, 0o644], self.logger):
-                self.detailedresults += "Permissions for " + sysctl + \
-                    "are incorrect\n"
-                compliant = False
 
-        # in addition to checking /etc/sysctl.conf contents we need to
-        # also check sysctl compliancy using the sysctl command
-        for key in self.sysctls:
-            self.ch.executeCommand("/sbin/sysctl " + key)
-            retcode = self.ch.getReturnCode()
-            output = self.ch.getOutputString()
-            errmsg = output + self.ch.getErrorString()
-            if retcode != 0:
-                if re.search("unknown key", errmsg):
-                    continue
-                else:
-                    self.detailedresults += "Failed to get value " + key + " using sysctl command\n"
-                    errmsg = self.ch.getErrorString()
-                    self.logger.log(LogPriority.DEBUG, errmsg)
-                    compliant = False
-            else:
-                actualoutput = output.strip()
-                expectedoutput = key + " = " + self.sysctls[key]
-                if actualoutput != expectedoutput:
-                    compliant = False
-                    self.detailedresults += "\nsysctl output has " + \
-                                            "incorrect value: expected " + \
-                                            expectedoutput + ", found " + \
-                                            actualoutput + "\n"
+        # in addition to checking the configuration files we need to
+        # also check the live values in the kernel
+        sysctlview.refresh(list(self.sysctls))
+        for key, value in sysctlview.checklive(self.sysctls).items():
+            # keys the kernel does not have are skipped
+            if value is None:
+                continue
+            compliant = False
+            self.detailedresults += "\nKernel has incorrect value: " + \
+                "expected " + key + " = " + self.sysctls[key] + \
+                ", found " + value + "\n"
         # check files inside modprobe.d directory for correct contents
         if os.path.exists("/etc/modprobe.d/"):
             modprobefiles = glob.glob("/etc/modprobe.d/*")
@@ -674,42 +662,20 @@ contain the correct contents\n"
                             success = False
                     resetsecon(sysctl)
 
-        # here we also check the output of the sysctl command for each key
-        # to cover all bases
-        for key in self.sysctls:
-            if self.ch.executeCommand("/sbin/sysctl " + key):
-                output = self.ch.getOutputString().strip()
-                errmsg = output + self.ch.getErrorString()
-                if re.search("unknown key", errmsg):
-                    continue
-                if not re.search(self.sysctls[key] + "$", output):
-                    undovalue = output[-1]
-                    self.ch.executeCommand("/sbin/sysctl -q -e -w " + key + "=" + self.sysctls[key])
-                    retcode = self.ch.getReturnCode()
-                    if retcode != 0:
-                        success = False
-                        self.detailedresults += "Failed to set " + key + " = " + self.sysctls[key] + "\n"
-                        errmsg = self.ch.getErrorString()
-                        self.logger.log(LogPriority.DEBUG, errmsg)
-                    else:
-                        self.iditerator += 1
-                        myid = iterate(self.iditerator, self.rulenumber)
-                        command = "/sbin/sysctl -q -e -w " + key + "=" + undovalue
-                        event = {"eventtype": "commandstring",
-                                 "command": command}
-                        self.statechglogger.recordchgevent(myid, event)
-            else:
-                self.detailedresults += "Unable to get value for " + key + "\n"
-                success = False
-        # at the end do a print and ignore any key errors to ensure
-        # the new values are read into the kernel
-        self.ch.executeCommand("/sbin/sysctl -q -e -p")
-        retcode2 = self.ch.getReturnCode()
-        if retcode2 != 0:
+        # here we also check the live value of each key to cover all bases
+        changed, failed = getsysctl(self.logger).apply(self.sysctls)
+        for key in failed:
             success = False
-            self.detailedresults += "Failed to load new sysctl configuration from config file\n"
-            errmsg2 = self.ch.getErrorString()
-            self.logger.log(LogPriority.DEBUG, errmsg2)
+            self.detailedresults += "Failed to set " + key + " = " + self.sysctls[key] + "\n"
+        for key, undovalue in changed.items():
+            if undovalue is None:
+                continue
+            self.iditerator += 1
+            myid = iterate(self.iditerator, self.rulenumber)
+            command = "/sbin/sysctl -q -e -w " + key + "=" + undovalue
+            event = {"eventtype": "commandstring",
+                     "command": command}
+            self.statechglogger.recordchgevent(myid, event)
 
         # We never found the correct contents in any of the modprobe.d files
         # so we're going to created the stonix-blacklist file
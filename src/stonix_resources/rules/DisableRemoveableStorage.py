@@ -46,6 +46,12 @@ OS X Mavericks not Mountain Lion, Lion, etc.
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
 @chagne: 2019/12/18 Brandon R. Gonzales - update grub file fix to account for
     Fedora 31's new kernel option format
+@change: 2026/10/18 - Loaded modules and modprobe directives are looked up in
+    the shared modprobe policy index instead of running lsmod and reading
+    every file of /etc/modprobe.d
+@change: 2026/10/18 - The nousb and usbcore.authorized_default=0 kernel
+    options are checked and set through the shared boot loader model instead
+    of editing grub.cfg, which grub-mkconfig overwrites
 '''
 
 
@@ -53,7 +59,6 @@ OS X Mavericks not Mountain Lion, Lion, etc.
 import os
 import re
 import traceback
-import glob
 import sys
 
 from CommandHelper import CommandHelper
@@ -62,6 +67,8 @@ from stonixutilityfunctions import readFile, setPerms, createFile
 from stonixutilityfunctions import checkPerms, iterate, writeFile, resetsecon
 from logdispatcher import LogPriority
 from pkghelper import Pkghelper
+from ModprobePolicy import getmodprobe
+from stonix_resources.BootLoader import getbootloader
 from ..KVEditorStonix import KVEditorStonix
 
 
@@ -104,6 +111,7 @@ class DisableRemoveableStorage(Rule):
         self.grubfiles = ["/boot/grub2/grub.cfg",
                           "/boot/grub/grub.cfg",
                           "/boot/grub/grub.conf"]
+        self.kernelargs = ["nousb", "usbcore.authorized_default=0"]
         self.pcmcialist = ['pcmcia-cs', 'kernel-pcmcia-cs', 'pcmciautils']
         self.pkgremovedlist = []
         self.iditerator = 0
@@ -168,28 +176,15 @@ class DisableRemoveableStorage(Rule):
 
         '''
         compliant = True
-        lsmodcmd = ""
-
-        # determine location of lsmod binary
-        if os.path.exists("/sbin/lsmod"):
-            lsmodcmd = "/sbin/lsmod"
-        elif os.path.exists("/usr/bin/lsmod"):
-            lsmodcmd = "/usr/bin/lsmod"
-
-        usbmods = ["usb_storage",
-                   "usb-storage"]
-        # run lsmod command and look for any of the items from
-        # usbmods list in the output.  If item exists in output
-        # then that usb module is not disabled.  This is for
-        # reporting only.  There is no fix using lsmod command.
-        if lsmodcmd:
-            for usb in usbmods:
-                cmd = [lsmodcmd, "|", "grep", usb]
-                self.ch.executeCommand(cmd)
-                if self.ch.getReturnCode() == "0":
-                    compliant = False
-                    self.detailedresults += "lsmod command shows usb not disabled\n"
-                    break
+        policy = getmodprobe(self.logger)
+
+        # a loaded usb storage module stays loaded until the next reboot
+        # even once it is disabled.  fix() cannot unload it, so this is
+        # noted for information only and does not affect compliance.
+        if policy.isloaded("usb_storage"):
+            self.detailedresults += "usb_storage module is currently " + \
+                "loaded. It will not be loaded after a reboot once it " + \
+                "is disabled\n"
 
         # check compliance of grub file(s) if files exist
         if re.search("Red Hat", self.environ.getostype()) and \
@@ -206,31 +201,13 @@ class DisableRemoveableStorage(Rule):
                         compliant = False
                         self.detailedresults += "Permissions " + \
                                                 "incorrect on " + grub + " file\n"
-                contents = readFile(grub, self.logger)
-                if contents:
-                    for line in contents:
-                        if re.search("^kernel", line.strip()) \
-                                or re.search("^linux", line.strip()) \
-                                or re.search("^linux16", line.strip()) \
-                                or re.search("^set default_kernelopts", line.strip()):
-                            if not re.search("\s+nousb\s*", line):
-                                debug = grub + " file doesn't " + \
-                                        "contain nousb kernel option\n"
-                                self.detailedresults += grub + " file doesn't " + \
-                                                        "contain nousb kernel option\n"
-                                self.logger.log(LogPriority.DEBUG,
-                                                debug)
-                                compliant = False
-                            if not re.search("\s+usbcore\.authorized_default=0\s*", line):
-                                debug = grub + " file doesn't " + \
-                                        "contain usbcore.authorized_default=0 " + \
-                                        "kernel option\n"
-                                self.detailedresults += grub + " file doesn't " + \
-                                                        "contain usbcore.authorized_default=0 " + \
-                                                        "kernel option\n"
-                                self.logger.log(LogPriority.DEBUG,
-                                                debug)
-                                compliant = False
+        # the kernel options must be in effect for every boot entry
+        bootloader = getbootloader(self.logger)
+        for arg in bootloader.missing(self.kernelargs):
+            debug = bootloader.describe(arg) + "\n"
+            self.detailedresults += debug
+            self.logger.log(LogPriority.DEBUG, debug)
+            compliant = False
         # check for existence of certain usb packages, non-compliant
         # if any exist
         for item in self.pcmcialist:
@@ -239,77 +216,22 @@ class DisableRemoveableStorage(Rule):
                                         "and shouldn't be\n"
                 compliant = False
 
-        # check modprobe files inside modprobe.d directory for
-        # contents inside self.blacklist variable
-        removeables = []
-        found1 = True
-        # self.blacklist dictionary contains the directives
-        # and the value we're looking for (key) and contains
-        # a default value of False for each one.  Upon finding
-        # each directive and value pair e.g. blacklist usb_storage
-        # the dictionary is updated with a True value.  This keeps
-        # track of the directives we didnt find or that had
-        # incorrect values
-        self.blacklist = {"blacklist usb_storage": False,
-                          "install usbcore /bin/true": False,
-                          "install usb-storage /bin/true": False,
-                          "blacklist uas": False,
-                          "blacklist firewire-ohci": False,
-                          "blacklist firewire-sbp2": False}
-        #check if /etc/modprobe.d directory exists
-        if os.path.exists("/etc/modprobe.d"):
-            #extract all files inside modprobe.d
-            dirs = glob.glob("/etc/modprobe.d/*")
-            # since file name doesn't matter
-            # i.e. all files are read and treated the same in
-            # modprobe.d, if directives are found in any of
-            # the files inside this directory, where they don't
-            # have to be in the same file, the system is compliant
-            for directory in dirs:
-                if os.path.isdir(directory):
-                    continue
-                contents = readFile(directory, self.logger)
-                for item in self.blacklist:
-                    for line in contents:
-                        if re.search("^" + item, line.strip()):
-                            self.blacklist[item] = True
-            # if we don't find all directives in any of the files in
-            # modprobe.d, we will now check /etc/modprobe.conf as
-            # they are all equivalent. We will still keep track of
-            # whether we already found one directive in one of the
-            # files in modprobe.d
-            for item in self.blacklist:
-                if not self.blacklist[item]:
-                    found1 = False
-        else:
-            found1 = False
-
-        # either not all directives inside self.blacklist were found
-        # or /etc/modprobe.d didn't exist.  Now we check /etc/modprobe.conf
-        # for any remaining unfound directives.
-        if not found1:
-            if os.path.exists("/etc/modprobe.conf"):
-                contents = readFile("/etc/modprobe.conf")
-                if contents:
-                    for item in self.blacklist:
-                        for line in contents:
-                            if re.search("^" + item,
-                                         line.strip()):
-                                self.blacklist[item] = True
-            for item in self.blacklist:
-                if not self.blacklist[item]:
-                    debug = "modprobe.conf nor blacklist " + \
-                            "files contain " + item + "\n"
-                    self.logger.log(LogPriority.DEBUG, debug)
-                    compliant = False
-        # any directives that were found we remove from self.blacklist
-        # We must add to a variable called removeables first then
-        # iterate through removeables and remove each item self.blacklist
+        # check the modprobe configuration for the directives below.
+        # The file they are in doesn't matter, modprobe reads all files
+        # in modprobe.d and modprobe.conf the same way.  self.blacklist
+        # keeps the directives that weren't found for fixLinux
+        directives = ["blacklist usb_storage",
+                      "install usbcore /bin/true",
+                      "install usb-storage /bin/true",
+                      "blacklist uas",
+                      "blacklist firewire-ohci",
+                      "blacklist firewire-sbp2"]
+        self.blacklist = policy.missing(directives)
         for item in self.blacklist:
-            if self.blacklist[item]:
-                removeables.append(item)
-        for item in removeables:
-            del (self.blacklist[item])
+            debug = "modprobe.conf nor blacklist " + \
+                    "files contain " + item + "\n"
+            self.logger.log(LogPriority.DEBUG, debug)
+            compliant = False
 
         # check the contents of the udev file for a certain desired line
         self.udevfile = "/etc/udev/rules.d/10-local.rules"
@@ -469,11 +391,9 @@ class DisableRemoveableStorage(Rule):
         created1, created2 = False, False
         changed = False
         tempstring = ""
-        grubfilefound = False
 
         for grub in self.grubfiles:
             if os.path.exists(grub):
-                grubfilefound = True
                 if self.grubperms:
                     if not checkPerms(grub, self.grubperms, self.logger):
                         self.iditerator += 1
@@ -481,59 +401,38 @@ class DisableRemoveableStorage(Rule):
                         if not setPerms(grub, self.grubperms, self.logger,
                                         self.statechglogger, myid):
                             success = False
-                contents = readFile(grub, self.logger)
-                kernellinefound = False
-                if contents:
-                    for line in contents:
-                        if re.search("^kernel", line.strip()) or re.search("^linux", line.strip()) \
-                                or re.search("^linux16", line.strip()):
-                            kernellinefound = True
-                            if not re.search("\s+nousb\s*", line):
-                                changed = True
-                                tempstring += line.strip() + " nousb"
-                            if not re.search("\s+usbcore\.authorized_default=0\s+", line):
-                                changed = True
-                                tempstring += line.strip() + " usbcore.authorized_default=0"
-                            tempstring += "\n"
-                        elif re.search("^set default_kernelopts", line.strip()):
-                            # Fedora 31 has changed it's kernel option line format
-                            kernellinefound = True
-                            kernelline = line.strip()
-                            if not re.search("\s+nousb\s*", kernelline):
-                                changed = True
-                                kernelline = re.sub("\"$", " nousb\"", kernelline)
-                            if not re.search("\s+usbcore\.authorized_default=0\s+", kernelline):
-                                changed = True
-                                kernelline = re.sub("\"$", " usbcore.authorized_default=0\"", kernelline)
-                            tempstring += kernelline + "\n"
-                        else:
-                            tempstring += line
-                if not kernellinefound:
-                    changed = False
-                    self.detailedresults += "The grub file doesn't contain kernel line\n" + \
-                                            "Unable to fully implement fixes in this rule\n"
-                    success = False
-                if changed:
-                    tmpfile = grub + ".tmp"
-                    if writeFile(tmpfile, tempstring, self.logger):
-                        self.iditerator += 1
-                        myid = iterate(self.iditerator, self.rulenumber)
-                        event = {"eventtype": "conf",
-                                 "filepath": grub}
-                        self.statechglogger.recordchgevent(myid, event)
-                        self.statechglogger.recordfilechange(grub, tmpfile,
-                                                             myid)
-                        os.rename(tmpfile, grub)
-                        if not setPerms(grub, self.grubperms, self.logger):
-                            success = False
-                            self.detailedresults += "Unable to set permissions on " + \
-                                                    grub + " file\n"
-                    else:
-                        success = False
-        if not grubfilefound:
+        # the kernel options go in the grub template (or the kernel lines
+        # of grub.conf for grub version one).  grub.cfg is generated once
+        # after all rules have run
+        bootloader = getbootloader(self.logger)
+        grub, tempstring, changed = bootloader.render(add=self.kernelargs)
+        if not grub:
             self.detailedresults += "No grub configuration file found\n" + \
                                     "Unable to fully fix system for this rule\n"
             success = False
+        else:
+            if changed:
+                fstat = os.stat(grub)
+                tmpfile = grub + ".tmp"
+                if writeFile(tmpfile, tempstring, self.logger):
+                    self.iditerator += 1
+                    myid = iterate(self.iditerator, self.rulenumber)
+                    event = {"eventtype": "conf",
+                             "filepath": grub}
+                    self.statechglogger.recordchgevent(myid, event)
+                    self.statechglogger.recordfilechange(grub, tmpfile,
+                                                         myid)
+                    os.rename(tmpfile, grub)
+                    if not setPerms(grub, [fstat.st_uid, fstat.st_gid,
+                                           fstat.st_mode & 0o7777],
+                                    self.logger):
+                        success = False
+                        self.detailedresults += "Unable to set permissions on " + \
+                                                grub + " file\n"
+                else:
+                    success = False
+            bootloader.schedule(add=self.kernelargs,
+                                rulenumber=self.rulenumber)
         blacklistf = "/etc/modprobe.d/stonix-blacklist.conf"
         tempstring = ""
         # Check if self.blacklist still contains values, if it
@@ -555,12 +454,8 @@ class DisableRemoveableStorage(Rule):
                 self.statechglogger.recordchgevent(myid, event)
             # file was already present and we need contents already
             # inside file to remain in newly written file
-            if not created1:
-                contents = readFile(blacklistf, self.logger)
-                for item in contents:
-                    tempstring += item
-            for item in self.blacklist:
-                tempstring += item + "\n"
+            tempstring, _ = getmodprobe(self.logger).render(blacklistf,
+                                                            self.blacklist)
             tmpfile = blacklistf + ".tmp"
             if writeFile(tmpfile, tempstring,
                          self.logger):
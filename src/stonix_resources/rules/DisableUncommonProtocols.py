@@ -21,12 +21,13 @@ This rule disables support for several uncommon network protocols.
 @author: Eric Ball
 @change: 2015/09/10 eball - Original implementation
 @change 2017/08/28 rsn Fixing to use new help text methods
+@change: 2026/10/18 - Look up install directives in the shared modprobe
+    policy index instead of running grep -R once per protocol
 '''
 
 import os
-import re
 import traceback
-from CommandHelper import CommandHelper
+from ModprobePolicy import getmodprobe
 from stonixutilityfunctions import iterate, createFile
 from rule import Rule
 from logdispatcher import LogPriority
@@ -62,7 +63,6 @@ class DisableUncommonProtocols(Rule):
                          "CCE-26239-4", "CCE-26696-5", "CCE-26828-4",
                          "CCE-27106-4"]
         self.iditerator = 0
-        self.ch = CommandHelper(self.logger)
         self.sethelptext()
 
     def report(self):
@@ -70,15 +70,12 @@ class DisableUncommonProtocols(Rule):
             protocols = self.ci2.getcurrvalue()
             self.compliant = True
             self.detailedresults = ""
-            mpdir = "/etc/modprobe.d/"
+            policy = getmodprobe(self.logger)
 
             for proto in protocols:
                 if type(proto) is bytes:
                     proto = proto.decode('utf-8')
-                cmd = ["grep", "-R", proto, mpdir]
-                self.ch.executeCommand(cmd)
-                if not re.search(":install " + proto + " /bin/true",
-                                 self.ch.getOutputString()):
+                if not policy.hasdirective("install " + proto + " /bin/true"):
                     self.compliant = False
                     self.detailedresults += proto + " is not disabled\n"
         except (KeyboardInterrupt, SystemExit):
@@ -115,13 +112,16 @@ class DisableUncommonProtocols(Rule):
                 event = {"eventtype": "creation", "filepath": protoconf}
                 self.statechglogger.recordchgevent(myid, event)
 
+            directives = []
             for proto in protocols:
-                cmd = ["grep", "-R", proto, mpdir]
-                self.ch.executeCommand(cmd)
-                if not re.search(":install " + proto + " /bin/true",
-                                 self.ch.getOutputString()):
-                    open(protoconf, "a").write("install " + proto +
-                                               " /bin/true\n")
+                if type(proto) is bytes:
+                    proto = proto.decode('utf-8')
+                directives.append("install " + proto + " /bin/true")
+            missing = getmodprobe(self.logger).missing(directives)
+            if missing:
+                with open(protoconf, "a") as fhandle:
+                    fhandle.write("".join(directive + "\n"
+                                          for directive in missing))
 
             self.rulesuccess = success
         except (KeyboardInterrupt, SystemExit):
@@ -27,15 +27,18 @@ file system support from the kernel.
 @change: 2016/05/26 ekkehard Results Formatting
 @change: 2016/10/20 eball Results Formatting
 @change: 2017/08/28 rsn Fixing to use new help text methods
+@change: 2026/10/18 - report checks every modprobe.d file through the shared
+    modprobe policy index, as modprobe does, instead of the blacklist file
+    alone
 '''
 
 import os
-import re
 import traceback
 import stat
 
 from rule import Rule
 from logdispatcher import LogPriority
+from ModprobePolicy import getmodprobe
 from stonixutilityfunctions import resetsecon
 
 
@@ -83,6 +86,19 @@ be space separated.'''
                            'family': ['linux']}
         self.sethelptext()
 
+    def getdirectives(self):
+        '''Return the install directives which disable the file systems in
+        FSLIST
+
+        :returns: list of strings
+        '''
+        directives = []
+        for fstype in self.fslist.getcurrvalue():
+            if type(fstype) is bytes:
+                fstype = fstype.decode('utf-8')
+            directives.append('install ' + fstype + ' /bin/true')
+        return directives
+
     def report(self):
         '''Fssupport.report() Public method to report on the status of the
         uncommon filesystem support.
@@ -92,26 +108,12 @@ be space separated.'''
         compliant = True
         try:
             self.detailedresults = ""
-            if not os.path.exists(self.blacklistfile):
+            policy = getmodprobe(self.logger)
+            for directive in policy.missing(self.getdirectives()):
                 compliant = False
                 self.logger.log(LogPriority.DEBUG,
                                 ['DisableUnusedFs.report',
-                                 "blacklist not found"])
-            else:
-                fhandle = open(self.blacklistfile, 'r')
-                fdata = fhandle.readlines()
-                fhandle.close()
-                for fstype in self.fslist.getcurrvalue():
-                    found = False
-                    for line in fdata:
-                        pattern = '^install ' + fstype + ' /bin/true'
-                        if re.search(pattern, line):
-                            found = True
-                    if not found:
-                        compliant = False
-                        self.logger.log(LogPriority.DEBUG,
-                                        ['DisableUnusedFs.report',
-                                         "Directive not found " + pattern])
+                                 "Directive not found " + directive])
 
         except (KeyboardInterrupt, SystemExit):
             # User initiated exit
@@ -150,21 +152,10 @@ filesystem support modules are not disabled."""
                              "Report is False starting fix"])
             try:
                 tempfile = self.blacklistfile + '.stonixtmp'
-                if os.path.exists(self.blacklistfile):
-                    fhandle = open(self.blacklistfile, 'r')
-                    fdata = fhandle.readlines()
-                    fhandle.close()
-                else:
-                    fdata = []
-                for fstype in self.fslist.getcurrvalue():
-                    if type(fstype) is bytes:
-                        fstype = fstype.decode('utf-8')
-                    entry = 'install ' + fstype + ' /bin/true\n'
-                    if entry not in fdata:
-                        fdata.append(entry)
+                fdata, _ = getmodprobe(self.logger).render(
+                    self.blacklistfile, self.getdirectives())
                 whandle = open(tempfile, 'w')
-                for line in fdata:
-                    whandle.write(line)
+                whandle.write(fdata)
                 whandle.close()
                 self.logger.log(LogPriority.DEBUG,
                                 ['DisableUnusedFs.fix', "Recording changes"])
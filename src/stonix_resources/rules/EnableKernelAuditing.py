@@ -31,6 +31,13 @@ account modifications, and authentication events.
 @change: 2018/06/08 ekkehard - make eligible for macOS Mojave 10.14
 @change: 2019/03/12 ekkehard - make eligible for macOS Sierra 10.12+
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - setuid/setgid files come from the shared filesystem
+    inventory instead of a find over /
+@change: 2026/10/18 - audit=1 is checked and set through the shared boot
+    loader model; grub.cfg is generated once by the controller at the end of
+    the run
+@change: 2026/10/18 - audit rules are compared through the shared canonical
+    audit rule index and written to a single generated rules.d file
 """
 
 
@@ -43,6 +50,9 @@ from ServiceHelper import ServiceHelper
 from pkghelper import Pkghelper
 from stonixutilityfunctions import resetsecon
 from stonixutilityfunctions import iterate
+from FilesystemInventory import getinventory
+from stonix_resources.BootLoader import getbootloader
+from AuditRules import getauditrules
 
 import traceback
 import os
@@ -259,71 +269,34 @@ this system, set the value of EnableKernelAuditing to False"""
 
 # AUDIT RULES SECTION
             self.logger.log(LogPriority.DEBUG, "Setting up Audit Rules variables...")
-            self.auditrulesfiles = []
+            self.auditrulespolicy = getauditrules(self.logger)
             self.auditrulesbasedir = '/etc/audit/rules.d/'
             if os.path.exists(self.auditrulesbasedir):
-                self.auditrulesfile = self.auditrulesbasedir + 'audit.rules'
-                self.auditrulesfiles = [f for f in os.listdir(self.auditrulesbasedir) if os.path.isfile(os.path.join(self.auditrulesbasedir, f))]
+                # all rules added by this rule go in one generated file
+                self.auditrulesfile = self.auditrulesbasedir + 'stonix.rules'
             else:
                 self.auditrulesfile = '/etc/audit/audit.rules'
+            self.auditrulesheader = '# Generated by the STONIX EnableKernelAuditing rule.\n' + \
+                '# Rules found in the other rules.d files are not repeated here.\n'
+            # the line -a task,never (added by default on some distro's)
+            # would nullify the logging of all syscalls added by this rule.
+            # the unlink and rename rules encorporate all temp file and
+            # cache management for all applications, which is EXTREMELY
+            # verbose in logging
+            self.badrules = ["^-a\s+(task,never|never,task)",
+                             "^-a.*-S\s+(unlink|rename).*-k\s+delete"]
 
 # GRUB SECTION
             self.logger.log(LogPriority.DEBUG, "Setting up Grub variables...")
-            grubconflocs = ['/boot/grub/grub.conf', '/etc/default/grub']
-            self.grubconffile = ''
-            for loc in grubconflocs:
-                if os.path.exists(loc):
-                    self.grubconffile = loc
-            if not self.grubconffile:
+            self.bootloader = getbootloader(self.logger)
+            self.grubver = self.bootloader.getversion()
+            if not self.grubver:
                 self.logger.log(LogPriority.DEBUG,
                                 "Could not locate the grub configuration file")
-            else:
-                if self.grubconffile == '/boot/grub/grub.conf':
-                    self.set_grub_one()
-                elif self.grubconffile == '/etc/default/grub':
-                    self.set_grub_two()
 
         except Exception:
             raise
 
-    def set_grub_one(self):
-        """set up grub v1 variables and objects
-        
-        @author: Breen Malmberg
-
-
-        """
-
-        self.logger.log(LogPriority.DEBUG, "Setting Grub v1 variables...")
-
-        self.grubver = 1
-
-    def set_grub_two(self):
-        """set up grub v2 variables and objects
-        
-        @author: Breen Malmberg
-
-
-        """
-
-        self.logger.log(LogPriority.DEBUG, "Setting Grub v2 variables...")
-        self.grubver = 2
-        self.grubcfgloc = ''
-        grubcfglocs = ['/boot/grub/grub.cfg', '/boot/grub2/grub.cfg']
-        for loc in grubcfglocs:
-            if os.path.exists(loc):
-                self.grubcfgloc = loc
-        if not self.grubcfgloc:
-            self.logger.log(LogPriority.DEBUG,
-                            "Could not locate the grub v2 cfg file")
-        grubmkconfignames = ['/usr/sbin/grub2-mkconfig',
-                             '/usr/sbin/grub-mkconfig']
-        grubmkconfigname = '/usr/sbin/grub2-mkconfig'
-        for name in grubmkconfignames:
-            if os.path.exists(name):
-                grubmkconfigname = name
-        self.grubupdatecmd = grubmkconfigname + ' -o ' + self.grubcfgloc
-
     def report(self):
         """run report actions to determine the current system's compliancy status
         
@@ -446,17 +419,9 @@ this system, set the value of EnableKernelAuditing to False"""
 
             # GET LIST OF SETUID & SETGID FILES ON SYSTEM
             self.logger.log(LogPriority.DEBUG, "Getting list of setuid and setgid files on this system...")
-            self.cmdhelper.executeCommand('find / -xdev -type f -perm -4000 -o -type f -perm -2000')
-            outputlines = self.cmdhelper.getOutput()
-            errout = self.cmdhelper.getErrorString()
-            retcode = self.cmdhelper.getReturnCode()
-            if retcode != 0:
-                self.detailedresults += "\nCommand to get setuid and setgid files failed with error code: " + str(retcode)
-                self.logger.log(LogPriority.DEBUG, errout)
-            if outputlines:
-                for line in outputlines:
-                    if re.search('^/', line):
-                        suidfiles.append(line.strip())
+            # only the root filesystem, as find / -xdev would
+            inventory = getinventory(self.logger, self.environ)
+            suidfiles = inventory.suidfiles(filesystems=['/'])
 
             # ADD PRIVILEGED ACCESS RULES FOR ALL SETUID/SETGID FILES FOUND ON THIS SYSTEM
             if suidfiles:
@@ -499,10 +464,8 @@ this system, set the value of EnableKernelAuditing to False"""
 
             # if this system starts uid's for users at 500, then replace all instances of auid>=1000
             if uidstart == '500':
-                for item in self.auditrulesoptions:
-                    if re.search('auid>=1000', item):
-                        newitem = item.replace('auid>=1000', 'auid>=500')
-                        self.auditrulesoptions[newitem] = self.auditrulesoptions.pop(item)
+                self.auditrulesoptions = {item.replace('auid>=1000', 'auid>=500'): value
+                                          for item, value in self.auditrulesoptions.items()}
 
             self.localization()
 
@@ -552,18 +515,11 @@ this system, set the value of EnableKernelAuditing to False"""
                     '\n'.join(str(f) for f in self.auditdeditor.fixables) + '\n'
                 self.auditdstatus = False
 
-            if self.grubver == 1:
-                if not self.report_grub_one():
+            if self.grubver:
+                if not self.report_grub():
                     self.detailedresults += '\nThe required audit=1 ' + \
-                        'configuration option was missing from the grub ' + \
-                        'conf file\n'
-                    self.compliant = False
-                    self.grubstatus = False
-            elif self.grubver == 2:
-                if not self.report_grub_two():
-                    self.detailedresults += '\nThe required audit=1 ' + \
-                        'configuration option was missing from the grub ' + \
-                        'conf file\n'
+                        'configuration option is not in effect: ' + \
+                        self.bootloader.describe('audit=1') + '\n'
                     self.compliant = False
                     self.grubstatus = False
 
@@ -647,32 +603,9 @@ this system, set the value of EnableKernelAuditing to False"""
             raise
         return retval
 
-    def report_grub_one(self):
-        """run report actions for grub version 1
-
-
-        :return: retval
-
-        :rtype: bool
-@author: Breen Malmberg
-
-        """
-
-        retval = False
-
-        try:
-
-            contentlines = self.getFileContents(self.grubconffile)
-            for line in contentlines:
-                if re.search('kernel\s+.*audit=1', line):
-                    retval = True
-
-        except Exception:
-            raise
-        return retval
-
-    def report_grub_two(self):
-        """run report actions for grub version 2
+    def report_grub(self):
+        """run report actions for the boot loader; audit=1 must be in effect
+        for all boot entries
 
 
         :return: retval
@@ -682,18 +615,7 @@ this system, set the value of EnableKernelAuditing to False"""
 
         """
 
-        retval = False
-
-        try:
-
-            contentlines = self.getFileContents(self.grubconffile)
-            for line in contentlines:
-                if re.search('^GRUB_CMDLINE_LINUX_DEFAULT=\".*audit=1.*\"',
-                             line):
-                    retval = True
-        except Exception:
-            raise
-        return retval
+        return self.bootloader.hasarg('audit=1')
 
     def reportAuditRules(self):
         """private method to report status on the audit rules configuration
@@ -717,18 +639,23 @@ this system, set the value of EnableKernelAuditing to False"""
                 retval = False
                 return retval
 
-            if not os.path.exists(self.auditrulesfile):
+            if not os.path.exists(self.auditrulesbasedir) and \
+                    not os.path.exists(self.auditrulesfile):
                 self.detailedresults += '\nKernel Auditing is not installed'
                 retval = False
                 return retval
 
-            if self.auditrulesfiles:
-                if not self.reportAURulesParts():
-                    retval = False
+            # one lookup per desired rule in the canonical rule index,
+            # whatever the order of the fields in the configured rules
+            configoptsnotfound = self.auditrulespolicy.missing(list(self.auditrulesoptions))
+            for ar in self.auditrulesoptions:
+                self.auditrulesoptions[ar] = True
+            for ar in configoptsnotfound:
+                self.auditrulesoptions[ar] = False
 
-            else:
-                if not self.reportAURulesSingle():
-                    retval = False
+            if configoptsnotfound:
+                retval = False
+                self.detailedresults += "\nFollowing required audit rule entries not found:\n" + "\n".join(configoptsnotfound)
 
             # check to see if all of the audit rules are loaded (running)
 #             command = '/usr/sbin/auditctl -l'
@@ -761,84 +688,6 @@ this system, set the value of EnableKernelAuditing to False"""
             raise
         return retval
 
-    def reportAURulesSingle(self):
-        """check audit rules which are stored only in a single
-        file (audit.rules)
-
-
-        :return: retval
-
-        :rtype: bool
-@author: Breen Malmberg
-
-        """
-
-        retval = True
-        configoptsnotfound = []
-
-        self.logger.log(LogPriority.DEBUG, "Running reportAURulesSingle()...")
-
-        try:
-
-            contentlines = self.getFileContents('/etc/audit/audit.rules')
-            for item in self.auditrulesoptions:
-                if not self.searchFileContents(contentlines, '^' + item):
-                    retval = False
-                    self.auditrulesoptions[item] = False
-            for ar in self.auditrulesoptions:
-                if not self.auditrulesoptions[ar]:
-                    configoptsnotfound.append(ar)
-
-            if configoptsnotfound:
-                self.detailedresults += "\nFollowing required audit rule entries not found:\n" + "\n".join(configoptsnotfound)
-
-        except Exception:
-            raise
-
-        return retval
-
-    def reportAURulesParts(self):
-        """check audit rules which are stored in multiple files
-        within rules.d/ directory on systems which use this
-        structure
-
-
-        :return: retval
-
-        :rtype: bool
-@author: Breen Malmberg
-
-        """
-
-        retval = True
-        configoptsnotfound = []
-
-        self.logger.log(LogPriority.DEBUG, "Running reportAURulesParts()...")
-
-        try:
-
-            for ar in self.auditrulesoptions:
-                self.auditrulesoptions[ar] = False
-
-            for arf in self.auditrulesfiles:
-                contentlines = self.getFileContents(self.auditrulesbasedir + arf)
-                for ar in self.auditrulesoptions:
-                    if self.searchFileContents(contentlines, ar):
-                        self.auditrulesoptions[ar] = True
-
-            for ar in self.auditrulesoptions:
-                if not self.auditrulesoptions[ar]:
-                    retval = False
-                    configoptsnotfound.append(ar)
-
-            if configoptsnotfound:
-                self.detailedresults += "\nFollowing required audit rule entries not found:\n" + "\n".join(configoptsnotfound)
-
-        except Exception:
-            raise
-
-        return retval
-
     def fix(self):
         """fix audit rules
         ensure audit package is installed
@@ -923,12 +772,8 @@ this system, set the value of EnableKernelAuditing to False"""
 
                 if not self.grubstatus:
                     self.logger.log(LogPriority.DEBUG, "Fixing grub config...")
-                    if self.grubver == 1:
-                        if not self.fix_grub_one():
-                            fixsuccess = False
-                    if self.grubver == 2:
-                        if not self.fix_grub_two():
-                            fixsuccess = False
+                    if not self.fix_grub():
+                        fixsuccess = False
 
                 # start/restart the audit service so it reads the new config
                 self.cmdhelper.executeCommand(self.auditrestart)
@@ -985,6 +830,7 @@ this system, set the value of EnableKernelAuditing to False"""
         retval = True
         owner = [0, 0]
         perms = 0o640
+        linesfixedcount = 0
 
         try:
 
@@ -1002,182 +848,65 @@ this system, set the value of EnableKernelAuditing to False"""
 
         try:
 
-            contentlines = []
-
-            if os.path.exists(self.auditrulesfile):
-                self.logger.log(LogPriority.DEBUG, str(self.auditrulesfile) + " path exists")
-
-                contentlines = self.getFileContents(self.auditrulesfile)
+            policy = self.auditrulespolicy
+            desired = list(self.auditrulesoptions)
 
-            if not contentlines:
-                contentlines.append('-D\n')
-                contentlines.append('-b 8192\n')
+            if policy.usesrulesdir():
+                # remove unwanted rules from the other rule files
+                for path in policy.rulesfiles():
+                    if path == self.auditrulesfile:
+                        continue
+                    contents, removed = policy.strip(path, self.badrules)
+                    if removed:
+                        linesfixedcount += len(removed)
+                        if not self.writeFileContents(contents.splitlines(True), path, owner, perms):
+                            retval = False
+
+                # write the required rules which no other rule file has
+                # to the generated rule file
+                contents = policy.rendergenerated(self.auditrulesfile, desired,
+                                                  self.auditrulesheader)
+                if not policy.isuptodate(self.auditrulesfile, contents):
+                    if not self.writeFileContents(contents.splitlines(True), self.auditrulesfile, owner, perms):
+                        retval = False
+
+                # also write the compiled rules to the primary audit rule file
+                if os.path.exists('/etc/audit/audit.rules'):
+                    lines = [rule.line for rule in policy.getrules()]
+                    if not self.writeCompiledRules(lines, owner, perms):
+                        retval = False
             else:
-                # find -e 2 line if it already exists, remove it
-                # and move it to the end of the file
-                for line in contentlines:
-                    if re.search('^-e 2', line):
-                        contentlines.remove(line)
-
-            # append all missing audit rules options
-            for item in self.auditrulesoptions:
-                if item not in list(map(str.strip, contentlines)):
-                    contentlines.append(item + '\n')
-
-            # append -e 2 (to lock audit rules) last
-            contentlines.append('-e 2\n')
-
-            # remove any duplicate entries
-            contentlines = self.fixDuplicates(contentlines)
-
-            # the line -a task,never (added by default on some distro's)
-            # would nullify the logging of all syscalls added by this rule
-            for line in contentlines:
-                if re.search("^-a\s+task,never", line, re.IGNORECASE):
-                    contentlines = [c.replace(line, '') for c in contentlines]
-
-            # write file contents
-            if not self.writeFileContents(contentlines, self.auditrulesfile, owner, perms):
-                retval = False
-
-            # also write the contents to the primary audit rule file
-            if os.path.exists('/etc/audit/audit.rules'):
-                primcontentlines = self.getFileContents('/etc/audit/audit.rules')
-                primcontentlines.extend(contentlines)
-                for line in primcontentlines:
-                    if re.search('(^-D|^-b|^-e)', line, re.IGNORECASE):
-                        primcontentlines.remove(line)
-                primcontentlines.insert(0, "-b 8192\n")
-                primcontentlines.insert(0, "-D\n")
-                primcontentlines.append('-e 2\n')
-                primcontentlines = self.fixDuplicates(primcontentlines)
-                # the line '-a task,never' (added by default on some distro's)
-                # would nullify the logging of all syscalls added by this rule
-                for line in primcontentlines:
-                    if re.search("^-a\s+task,never", line, re.IGNORECASE):
-                        primcontentlines = [c.replace(line, '') for c in primcontentlines]
-                if not self.writeFileContents(primcontentlines, '/etc/audit/audit.rules', owner, perms):
+                for rule in policy.findrules(self.badrules):
+                    linesfixedcount += 1
+                lines = [rule.line for rule in policy.getrules()] + desired
+                if not self.writeCompiledRules(lines, owner, perms):
                     retval = False
 
-            if not self.remBadRules():
-                self.detailedresults += "\nFailed to remove potentially disruptive and unwanted audit rules"
+            if linesfixedcount > 0:
+                self.logger.log(LogPriority.DEBUG, "Removed " + str(linesfixedcount) + " potentially disruptive audit rule entries")
+                self.detailedresults += "\nRemoved " + str(linesfixedcount) + " audit rules which would have an unacceptable impact on system resources"
 
         except Exception:
             raise
         return retval
 
-    def fixDuplicates(self, contentlines):
-        """build a new list which is a copy of contentlines
-        except for removing all duplicate entries
-
-        :param contentlines: list; list of strings to search
-                through and remove duplicates from
-        :return: fixedlist
-        :rtype: list
-        """
-
-        self.logger.log(LogPriority.DEBUG, "Fixing duplicate audit rules entries...")
-
-        # got nothing, return nothing
-        if not contentlines:
-            return contentlines
-        # not a list, can't do anything
-        if not isinstance(contentlines, list):
-            return contentlines
-
-        fixedlist = []
-
-        try:
-
-            for i in contentlines:
-                if i not in fixedlist:
-                    fixedlist.append(i)
-
-            linesfixed = (len(contentlines) - len(fixedlist))
-
-            if linesfixed > 0:
-                self.logger.log(LogPriority.DEBUG, "Removed " + str(linesfixed) + " duplicate entries")
-                self.detailedresults += "\nRemoved " + str(linesfixed) + " duplicate entries in audit rules"
-            else:
-                self.logger.log(LogPriority.DEBUG, "Nothing was changed")
-
-            # don't want to erase anything by accident
-            if not fixedlist:
-                fixedlist = contentlines
-
-        except Exception:
-            raise
-        return fixedlist
-
-    def remBadRules(self):
-        """look for, and remove any unwanted or "bad" audit
-        rules (rules which may be disruptive or harmful to
-        the normal operation of a system)
-        simply add the correct regex to find the rule you
-        want to remove, to the badrules list below
-
+    def writeCompiledRules(self, lines, owner, perms):
+        """write the given rules to /etc/audit/audit.rules, after -D and -b
+        and before -e 2, without duplicate or unwanted rules
 
+        :param lines: list; rules in the order they are loaded
+        :param owner: list; integer list of owner and group
+        :param perms: int; permissions of the file
         :return: success
         :rtype: bool
         """
 
-        success = True
-        linesfixedcount = 0
-
-        self.logger.log(LogPriority.DEBUG, "Removing bad/unwanted audit rules...")
-
-        # the unlink and rename encorporates all temp file and cache
-        # management for all applications, which is EXTREMELY verbose
-        # in logging
-        badrules = ["^-a.*-S\s+(unlink|rename).*-k\s+delete"]
-        repdict = {}
-        for br in badrules:
-            repdict[br] = ''
-
-        # all files in rules.d/ have these
-        # as well as audit.rules in /etc/audit/
-        owner = [0, 0]
-        perms = 0o640
-
-        try:
-
-            # if we are using a rules.d/ dir with multiple files
-            if self.auditrulesfiles:
-                for arf in self.auditrulesfiles:
-                    replaced = False
-                    contentlines = self.getFileContents(self.auditrulesbasedir + arf)
-                    for br in badrules:
-                        for line in contentlines:
-                            if re.search(br, line, re.IGNORECASE):
-                                contentlines = [c.replace(line, '') for c in contentlines]
-                                linesfixedcount += 1
-                                replaced = True
-                    if replaced:
-                        if not self.writeFileContents(contentlines, self.auditrulesbasedir + arf, owner, perms):
-                            success = False
-            # or if we are using a single audit.rules file
-            if os.path.exists('/etc/audit/audit.rules'):
-                replaced = False
-                contentlines = self.getFileContents('/etc/audit/audit.rules')
-                for br in badrules:
-                        for line in contentlines:
-                            if re.search(br, line, re.IGNORECASE):
-                                contentlines = [c.replace(line, '') for c in contentlines]
-                                linesfixedcount += 1
-                                replaced = True
-                if replaced:
-                    if not self.writeFileContents(contentlines, '/etc/audit/audit.rules', owner, perms):
-                        success = False
-
-            if linesfixedcount > 0:
-                self.logger.log(LogPriority.DEBUG, "Removed " + str(linesfixedcount) + " potentially disruptive audit rule entries")
-                self.detailedresults += "\nRemoved " + str(linesfixedcount) + " audit rules which would have an unacceptable impact on system resources"
-            else:
-                self.logger.log(LogPriority.DEBUG, "Nothing was changed")
-
-        except Exception:
-            raise
-        return success
+        policy = self.auditrulespolicy
+        contents = policy.compile(lines, self.badrules)
+        if policy.isuptodate('/etc/audit/audit.rules', contents):
+            self.logger.log(LogPriority.DEBUG, "Nothing was changed")
+            return True
+        return self.writeFileContents(contents.splitlines(True), '/etc/audit/audit.rules', owner, perms)
 
     def writeFileContents(self, contents, filepath, owner, perms):
         """write new contents to a temp file then rename it to the
@@ -1341,8 +1070,10 @@ this system, set the value of EnableKernelAuditing to False"""
             raise
         return retval
 
-    def fix_grub_one(self):
-        """run fix actions for grub version one
+    def fix_grub(self):
+        """run fix actions for the boot loader; add audit=1 to the grub
+        template (or the kernel lines of grub version one). grub.cfg is
+        generated once by the controller after all rules have run
         
         @author: Breen Malmberg
 
@@ -1350,107 +1081,27 @@ this system, set the value of EnableKernelAuditing to False"""
         """
 
         retval = True
-        replaced = False
 
         try:
 
-            self.logger.log(LogPriority.DEBUG, "Entering fix_grub_one()...")
-
-            if not self.grubconffile:
-                retval = False
-                self.detailedresults += '\nUnable to locate grub conf file'
-                return retval
-
-            contentlines = self.getFileContents(self.grubconffile)
-
-            if not contentlines:
-                retval = False
-                self.detailedresults += '\nUnable to get contents from grub conf file'
-                return retval
-
-            for line in contentlines:
-                if re.search('kernel\s+.*', line):
-                    if not re.search('audit=1', line):
-                        contentlines = [c.replace(line, line.rstrip() + ' audit=1\n') for c in contentlines]
-                        replaced = True
-
-            if replaced:
-                if not self.writeFileContents(contentlines, self.grubconffile, [0, 0], 0o644):
-                    retval = False
-
-        except Exception:
-            raise
-        return retval
-
-    def fix_grub_two(self):
-        """run fix actions for grub version two
-        
-        @author: Breen Malmberg
-
+            self.logger.log(LogPriority.DEBUG, "Entering fix_grub()...")
 
-        """
+            grubconffile, contents, changed = \
+                self.bootloader.render(add=['audit=1'])
 
-        retval = True
-        replaced = False
-        appended = False
-
-        try:
-
-            self.logger.log(LogPriority.DEBUG, "Entering fix_grub_two()...")
-
-            if not self.grubconffile:
+            if not grubconffile:
                 retval = False
                 self.detailedresults += '\nUnable to locate grub conf file'
                 return retval
 
-            contentlines = self.getFileContents(self.grubconffile)
-
-            if not contentlines:
-                retval = False
-                self.detailedresults += '\nUnable to get contents from ' + \
-                    'grub conf file'
-                return retval
-
-            for line in contentlines:
-                if re.search('^GRUB_CMDLINE_LINUX_DEFAULT=\".*\"', line):
-                    if re.search('audit=1', line):
-                        continue
-                    else:
-                        self.logger.log(LogPriority.DEBUG,
-                                        "Grub configuration line found, " +
-                                        "but without audit=1 option. " +
-                                        "Adding audit=1 to line...")
-                        contentlines = [c.replace(line, line.strip()[:-1] +
-                                                  ' audit=1"\n')
-                                        for c in contentlines]
-                        replaced = True
-
-            if not replaced:
-                self.logger.log(LogPriority.DEBUG, "Grub audit configuration line not found in grub conf file. Appending it to grub conf " +
-                                "file...")
-                contentlines.append('GRUB_CMDLINE_LINUX_DEFAULT="quiet splash audit=1"\n')
-                appended = True
-
-            if replaced or appended:
-
+            if changed:
                 self.logger.log(LogPriority.DEBUG, "The grub conf file contents have been edited. Saving those changes to the file now...")
-
-                if not self.writeFileContents(contentlines, self.grubconffile, [0, 0], 0o644):
+                if not self.writeFileContents(contents.splitlines(True), grubconffile, [0, 0], 0o644):
                     retval = False
-
-                if not self.grubupdatecmd:
-                    retval = False
-                    self.detailedresults += '\ngrub update command was not correctly set and could not be run'
                     return retval
 
-                self.logger.log(LogPriority.DEBUG, "Executing grub update command, to update the grub.cfg file...")
-                self.cmdhelper.executeCommand(self.grubupdatecmd)
-                errout = self.cmdhelper.getErrorString()
-                retcode = self.cmdhelper.getReturnCode()
-                if retcode != 0:
-                    retval = False
-                    self.detailedresults += '\nThe grub update command failed with error code: ' + str(retcode)
-                    self.logger.log(LogPriority.DEBUG, errout)
+            self.bootloader.schedule(add=['audit=1'],
+                                     rulenumber=self.rulenumber)
 
         except Exception:
             raise
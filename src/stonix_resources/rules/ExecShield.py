@@ -24,17 +24,19 @@ ExecShield overflow prevention and the randomize_va_space ASLR mechanism.
 @change: 2015/10/07 eball Help text/PEP8 cleanup
 @change: 2016/04/26 ekkehard Results Formatting
 @change 2017/08/28 rsn Fixing to use new help text methods
+@change: 2026/10/18 - read and set the parameters through the shared sysctl
+    snapshot instead of running sysctl
 '''
 
 import os
 import re
 import traceback
-import subprocess
 
 from rule import Rule
 from stonixutilityfunctions import resetsecon
 from logdispatcher import LogPriority
 from KVEditorStonix import KVEditorStonix
+from Sysctl import getsysctl
 
 
 class ExecShield(Rule):
@@ -66,7 +68,8 @@ class ExecShield(Rule):
         self.applicable = {'type': 'white',
                            'family': ['linux']}
         self.varandomcompliant = False
-        self.shieldprocpath = '/proc/sys/kernel/exec-shield'
+        self.sysctl = getsysctl(self.logdispatch)
+        self.shieldprocpath = self.sysctl.procpath('kernel.exec-shield')
         if os.path.exists(self.shieldprocpath):
             self.execshieldapplies = True
             self.directives = {'kernel.exec-shield': '1',
@@ -95,33 +98,22 @@ class ExecShield(Rule):
         myci = self.initCi(datatype, key, instructions, default)
         return myci
 
-    def checkproc(self, procpath):
-        '''Check for the value of a specific key in proc. Return that value.
-        This method is designed for proc keys that only return a single value.
+    def checkproc(self, key):
+        '''Return the live value of a kernel parameter from the shared sysctl
+        snapshot. This method is designed for keys that only hold a single
+        value.
 
-        :param procpath: string: fully qualified path to the element to be
-        checked.
-        :returns: string version of the value at that proc location.
+        :param key: string: name of the parameter to be checked
+        :returns: string version of the value, or None if it cannot be read
         @author: dkennel
+        @change: 2026/10/18 - take the parameter name instead of its proc
+            path and read it through the sysctl snapshot
 
         '''
-        myval = ''
-        try:
-            rhandle = open(procpath, 'r')
-            myval = rhandle.read()
-            rhandle.close()
-            myval = myval.strip()
-            return myval
-        except (KeyboardInterrupt, SystemExit):
-            # User initiated exit
-            raise
-        except Exception:
-            self.detailedresults = 'ExecShield.checkproc: '
-            self.detailedresults += traceback.format_exc()
-            self.rulesuccess = False
-            self.logdispatch.log(LogPriority.ERROR,
-                                 ['ExecShield.checkproc',
-                                  self.detailedresults])
+        myval = self.sysctl.getlive(key)
+        if myval is None:
+            self.detailedresults += 'Unable to read ' + key + '\n'
+        return myval
 
     def report(self):
         '''Main report method. We rely on the active values in proc to make our
@@ -139,12 +131,12 @@ class ExecShield(Rule):
 
         self.detailedresults = ''
         self.compliant = False
-        va_path = '/proc/sys/kernel/randomize_va_space'
 
         try:
 
+            self.sysctl.refresh(list(self.directives))
             if self.execshieldapplies:
-                execval = int(self.checkproc(self.shieldprocpath))
+                execval = int(self.checkproc('kernel.exec-shield'))
                 if execval == 1:
                     self.execshieldcompliant = True
                     self.detailedresults += 'Exec-Shield present and ' + \
@@ -153,7 +145,7 @@ class ExecShield(Rule):
                     self.detailedresults += 'Exec-Shield present but not ' + \
                         'compliant. Current value: ' + str(execval) + '\n'
 
-            vaval = int(self.checkproc(va_path))
+            vaval = int(self.checkproc('kernel.randomize_va_space'))
 
             if vaval == 2:
                 self.varandomcompliant = True
@@ -215,11 +207,10 @@ class ExecShield(Rule):
                 self.editor = KVEditorStonix(self.statechglogger, self.logdispatch,
                                              kvtype, self.sysctlconf, self.tmpPath,
                                              self.directives, intent, "openeq")
-                if self.execshieldapplies:
-                    cmdshield = '/sbin/sysctl -w kernel.exec-shield=1'
-                    subprocess.call(cmdshield, shell=True)
-                cmdvarand = '/sbin/sysctl -w kernel.randomize_va_space=2'
-                subprocess.call(cmdvarand, shell=True)
+                failed = self.sysctl.apply(self.directives)[1]
+                for key in failed:
+                    self.detailedresults += 'Unable to set ' + key + '\n'
+                    self.rulesuccess = False
     
                 if not self.editor.report():
                     if self.editor.fixables:
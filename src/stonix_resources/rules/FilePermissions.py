@@ -40,22 +40,27 @@ rule class
 @change: 2018/06/08 ekkehard - make eligible for macOS Mojave 10.14
 @change: 2019/03/12 ekkehard - make eligible for macOS Sierra 10.12+
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - multifind and gwreport query the shared filesystem
+    inventory instead of walking the disk
+@change: 2026/10/18 - persist the inventory index so later runs only read
+    changed directories, full scan every FULLRESCANDAYS days
+@change: 2026/10/18 - SUID files are checked against rpm in bulk through the
+    shared RpmVerifier
 '''
 
 import os
 import traceback
-import subprocess
 import random
 import shutil
 import stat
 import re
-import pwd
-import grp
 
 from rule import Rule
 from logdispatcher import LogPriority
 from localize import SITELOCALWWWDIRS
 from stonixutilityfunctions import getlocalfs
+from FilesystemInventory import getinventory, LIBBINDIRS, INDEXFILE
+from RpmVerifier import getverifier
 
 
 class FilePermissions(Rule):
@@ -134,6 +139,16 @@ file system names with spaces.'''
         defval = ['/run/media', '/media']
         self.bypassfs = self.initCi(datat, keyname, instr, defval)
 
+        datatype = 'int'
+        key = 'FULLRESCANDAYS'
+        instructions = '''Between full scans this rule only reads \
+directories that have changed since its last run, which keeps nightly \
+reports short on large file systems. Changing the permissions of an existing \
+file does not mark its directory as changed, so a full scan is done every \
+FULLRESCANDAYS days. Set to 0 to do a full scan on every run.'''
+        default = 7
+        self.rescandays = self.initCi(datatype, key, instructions, default)
+
         ww_datatype = 'bool'
         ww_key = 'FIXWW'
         ww_instructions = '''To prevent the FilePermissions rule from removing \
@@ -214,10 +229,9 @@ value of FIXROOTOWNERSHIP to False. The affected directories are: /bin, \
         return fslist
 
     def multifind(self):
-        '''Private method that runs the find command on the file system to create
-        lists of world writable, suid/sgid, and unowned files. The invocation
-        of the find shell command is a bit complex to do all of this in one
-        shot.
+        '''Private method that queries the shared filesystem inventory to
+        create lists of world writable, suid/sgid, and unowned files and
+        rotates the database files that hold them.
         
         @author: dkennel
 
@@ -253,132 +267,21 @@ value of FIXROOTOWNERSHIP to False. The affected directories are: /bin, \
                 if os.path.exists(dbsets[dbset]['db']):
                     os.rename(dbsets[dbset]['db'], dbsets[dbset]['last'])
 
-            fslist = self.getfilesystems()
-            for filesystem in fslist:
-                if filesystem in self.bypassfs.getcurrvalue():
-                    self.logger.log(LogPriority.DEBUG,
-                                    ['FilePermissions.multifind',
-                                     'Skipping Filesystem: ' +
-                                     str(filesystem)])
-                    continue
-                self.logger.log(LogPriority.DEBUG,
-                                ['FilePermissions.multifind',
-                                 'Walking Filesystem: ' + str(filesystem)])
-                if self.findoverrun:
-                        break
-                for root, dirs, files in os.walk(filesystem):
-                    # check the number of hits we have if we've got 30,000
-                    # hits then this FS is so bad we don't want to continue
-                    try:
-                        if len(dbsets['ww']['results']) > 25000:
-                            self.logger.log(LogPriority.DEBUG,
-                                            ['FilePermissions.multifind',
-                                             'WW overflow!'])
-                            self.findoverrun = True
-                    except TypeError:
-                        pass
-                    try:
-                        if len(dbsets['suid']['results']) > 25000:
-                            self.logger.log(LogPriority.DEBUG,
-                                            ['FilePermissions.multifind',
-                                             'SUID overflow!'])
-                            self.findoverrun = True
-                    except TypeError:
-                        pass
-                    try:
-                        if len(dbsets['unowned']['results']) > 25000:
-                            self.logger.log(LogPriority.DEBUG,
-                                            ['FilePermissions.multifind',
-                                             'Unowned overflow!'])
-                            self.findoverrun = True
-                    except TypeError:
-                        pass
-
-                    if self.findoverrun:
-                        break
-
-                    # This wacky looking snippet filters out directories that
-                    # are actually file system mount points
-                    dirs[:] = [dirname for dirname in dirs if not
-                               os.path.ismount(os.path.join(root, dirname))]
-                    for dirname in dirs:
-                        path = os.path.join(root, dirname)
-                        try:
-                            mode = os.stat(path)
-                        except OSError:
-                            continue
-                        worldwrite = mode.st_mode & stat.S_IWOTH
-                        # sticky = mode.st_mode & stat.S_ISVTX
-                        if worldwrite:
-                            dbsets['ww']['results'].append(path)
-                            self.logger.log(LogPriority.DEBUG,
-                                            ['FilePermissions.multifind',
-                                             'Found WW Dir: ' + str(path)])
-                    for name in files:
-                        try:
-                            if len(dbsets['ww']['results']) > 25000:
-                                self.logger.log(LogPriority.DEBUG,
-                                                ['FilePermissions.multifind',
-                                                 'WW overflow!'])
-                                self.findoverrun = True
-                        except TypeError:
-                            pass
-                        try:
-                            if len(dbsets['suid']['results']) > 25000:
-                                self.logger.log(LogPriority.DEBUG,
-                                                ['FilePermissions.multifind',
-                                                 'SUID overflow!'])
-                                self.findoverrun = True
-                        except TypeError:
-                            pass
-                        try:
-                            if len(dbsets['unowned']['results']) > 25000:
-                                self.logger.log(LogPriority.DEBUG,
-                                                ['FilePermissions.multifind',
-                                                 'Unowned overflow!'])
-                                self.findoverrun = True
-                        except TypeError:
-                            pass
-
-                        if self.findoverrun:
-                            break
-
-                        fpath = os.path.join(root, name)
-                        if os.path.islink(fpath):
-                            continue
-                        try:
-                            fmode = os.stat(fpath)
-                        except OSError:
-                            continue
-                        worldwrite = fmode.st_mode & stat.S_IWOTH
-                        if worldwrite:
-                            dbsets['ww']['results'].append(fpath)
-                            self.logger.log(LogPriority.DEBUG,
-                                            ['FilePermissions.multifind',
-                                             'Found WW File: ' + str(fpath)])
-                        suid = fmode.st_mode & stat.S_ISUID
-                        sgid = fmode.st_mode & stat.S_ISGID
-                        if suid or sgid:
-                            dbsets['suid']['results'].append(fpath)
-                            self.logger.log(LogPriority.DEBUG,
-                                            ['FilePermissions.multifind',
-                                             'Found SUID File: ' + str(fpath)])
-                        try:
-                            pwd.getpwuid(fmode.st_uid)[0]
-                        except KeyError:
-                            dbsets['unowned']['results'].append(fpath)
-                            self.logger.log(LogPriority.DEBUG,
-                                            ['FilePermissions.multifind',
-                                             'Found unowned File: ' +
-                                             str(fpath)])
-                        try:
-                            grp.getgrgid(fmode.st_gid)[0]
-                        except KeyError:
-                            dbsets['unowned']['results'].append(fpath)
-                            self.logger.log(LogPriority.DEBUG,
-                                            ['FilePermissions.multifind',
-                                             'Found unowned File, bad group: '
-                                             + str(fpath)])
+            bypass = self.bypassfs.getcurrvalue()
+            inventory = getinventory(self.logger, self.environ, bypass)
+            if self.environ.geteuid() == 0:
+                # the shared inventory already uses the index; this only
+                # applies the configured rescan interval
+                inventory.useindex(INDEXFILE,
+                                   self.rescandays.getcurrvalue() * 86400)
+            dbsets['ww']['results'] = inventory.worldwritable(bypass=bypass)
+            dbsets['suid']['results'] = inventory.suidfiles(bypass=bypass)
+            dbsets['unowned']['results'] = inventory.unowned(bypass=bypass)
+            if inventory.overrun:
+                self.findoverrun = True
+            self.logger.log(LogPriority.DEBUG,
+                            ['FilePermissions.multifind',
+                             'Inventory: ' + inventory.describe()])
             for myset in dbsets:
                 data = '\n'.join(dbsets[myset]['results'])
                 whandle = open(dbsets[myset]['db'], 'w')
@@ -620,53 +523,24 @@ find / -xdev -type f \( -perm -0002 -a ! -perm -1000 \) -print'''
 
         '''
         compliant = False
-        locationList = ["/lib", "/lib64", "/usr/lib", "/usr/lib64",
-                        "/lib/modules", "/bin", "/usr/bin", "/usr/local/bin",
-                        "/sbin", "/usr/sbin", "/usr/local/sbin"]
         gwfiles = []
         nrofiles = []
-
-        for loc in locationList:
-            if os.path.islink(loc):
-                continue
-            for root, dirs, files in os.walk(loc):
-                for dirname in dirs:
-                    path = os.path.join(root, dirname)
-#                     if os.path.islink(path):
-#                         continue
-                    try:
-                        mode = os.stat(path)
-                    except OSError:
-                        continue
-                    groupwrite = mode.st_mode & stat.S_IWGRP
-                    if groupwrite:
-                        gwfiles.append(path)
-                    if mode.st_uid != 0:
-                        nrofiles.append(path)
-                for name in files:
-                    fpath = os.path.join(root, name)
-                    if os.path.islink(fpath):
-                        continue
-                    try:
-                        fmode = os.stat(fpath)
-                    except OSError:
-                        continue
-                    groupwrite = fmode.st_mode & stat.S_IWGRP
-                    if groupwrite:
-                        gwfiles.append(fpath)
-                    if fmode.st_uid != 0:
-                        if self.environ.getosfamily() == 'darwin':
-                            macuucpfiles = ['/usr/lib/cron', '/usr/bin/cu',
-                                            '/usr/bin/uucp', '/usr/bin/uuname',
-                                            '/usr/bin/uustat', '/usr/bin/uux',
-                                            '/usr/sbin/uucico',
-                                            '/usr/sbin/uuxqt']
-                            if fpath in macuucpfiles:
-                                continue
-                            else:
-                                nrofiles.append(fpath)
-                        else:
-                            nrofiles.append(fpath)
+        macuucpfiles = ['/usr/lib/cron', '/usr/bin/cu',
+                        '/usr/bin/uucp', '/usr/bin/uuname',
+                        '/usr/bin/uustat', '/usr/bin/uux',
+                        '/usr/sbin/uucico',
+                        '/usr/sbin/uuxqt']
+
+        inventory = getinventory(self.logger, self.environ)
+        for entry in inventory.underdirs(LIBBINDIRS):
+            if entry.mode & stat.S_IWGRP:
+                gwfiles.append(entry.path)
+            if entry.uid != 0:
+                if not entry.isdir and \
+                   self.environ.getosfamily() == 'darwin' and \
+                   entry.path in macuucpfiles:
+                    continue
+                nrofiles.append(entry.path)
 
         self.logger.log(LogPriority.DEBUG,
                         ['GroupWritable.report',
@@ -960,13 +834,15 @@ find / -xdev -type f \( -perm -0002 -a ! -perm -1000 \) -print'''
         wrongmode = []
         # Important! lines coming from the files will have newlines unless
         # they are stripped.
+        rpmstatus = self.rpmcheckall([suidfile.strip() for suidfile in
+                                      lastrun])
         for suidfile in lastrun:
             suidpath = suidfile.strip()
             if suidfile not in prevrun:
                 newfilessincelast.append(suidpath)
             if suidfile not in firstrun:
                 newfilessinceorigin.append(suidpath)
-            rpmchkval = self.rpmcheck(suidfile)
+            rpmchkval = rpmstatus.get(suidpath, 5)
             if rpmchkval > 3:
                 if suidpath not in suidlist:
                     notknown.append(suidpath)
@@ -1174,27 +1050,24 @@ find / -xdev \( -nouser -o -nogroup \) -print
 
         '''
         path = path.strip()
-        if not os.path.exists('/bin/rpm'):
-            return 4
-        cmd = '/bin/rpm -Vf ' + path
+        return self.rpmcheckall([path]).get(path, 5)
+
+    def rpmcheckall(self, paths):
+        '''Bulk version of rpmcheck. All of the passed paths are checked with
+        the shared RpmVerifier, which uses one rpm -qf and one rpm -Vf call
+        for the lot, or no calls at all if InstalledSoftwareVerification has
+        already verified every package during this run.
+
+        :param paths: list of paths
+        :returns: dict of path -> int, see rpmcheck for the values
+
+        '''
         try:
-            proc = subprocess.Popen(cmd, shell=True, close_fds=True,
-                                    stdout=subprocess.PIPE,
-                                    stderr=subprocess.PIPE)
-            output = proc.stdout.readlines()
-            errout = proc.stderr.readlines()
+            status = getverifier(self.logger).rpmcheck(paths)
             self.logger.log(LogPriority.DEBUG,
-                            ['AuditSUID.rpmcheck',
-                             'rpm -Vf Results: ' + str(output) + str(errout)])
-            if len(output) == 0:
-                for line in errout:
-                    if re.search('No such file or directory', line):
-                        return 3
-                return 5
-            for line in output:
-                if re.search('M', line.decode('utf-8')):
-                    return 0
-            return 1
+                            ['FilePermissions.rpmcheckall',
+                             'rpm check results: ' + str(status)])
+            return status
         except (KeyboardInterrupt, SystemExit):
             # User initiated exit
             raise
@@ -1202,9 +1075,9 @@ find / -xdev \( -nouser -o -nogroup \) -print
         except Exception:
             self.detailedresults = traceback.format_exc()
             self.logger.log(LogPriority.ERROR,
-                            ['AuditSUID.rpmcheck',
+                            ['FilePermissions.rpmcheckall',
                              self.detailedresults])
-            return 5
+            return dict([(path, 5) for path in paths])
 
     def report(self):
         '''Public report method for the FilePermissions rule. This method will
@@ -1393,6 +1266,8 @@ has been called a second time. The previous results are displayed. '''
                         continue
             # Re-run gwreport(), so that group writable and non-root owned
             # lists are updated
+            inventory = getinventory(self.logger, self.environ)
+            inventory.update(self.gwfiles + self.nrofiles)
             self.gwreport()
         except (KeyboardInterrupt, SystemExit):
             # User initiated exit
@@ -24,16 +24,18 @@ Verify package integrity, correct permissions
 @change: 2016/04/20 eball - Per RHEL 7 STIG, added a fix to automate correction
     of file permissions
 @change: 2018/07/30 Breen Malmberg - re-wrote the report and fix methods entirely
+@change: 2026/10/18 - verify all packages in a few parallel rpm processes
+    through the shared RpmVerifier instead of one rpm -V per package
 """
 
 
 
-import re
 import traceback
 
 from rule import Rule
 from logdispatcher import LogPriority
 from CommandHelper import CommandHelper
+from RpmVerifier import getverifier, MODE, GROUP, OWNER, DIGEST
 
 
 class InstalledSoftwareVerification(Rule):
@@ -110,7 +112,7 @@ default.'
         self.detailedresults = ""
         self.compliant = True
         self.ch = CommandHelper(self.logger)
-        reportcmd = "/usr/bin/rpm -V --nosignature --nolinkto --nofiledigest --nosize --nomtime --nordev --nocaps "
+        self.verifier = getverifier(self.logger)
         self.badpermfiles = []
         self.badpermpkgs = {}
         self.badgroupfiles = []
@@ -123,28 +125,17 @@ default.'
 
             installedpkgs = self.getInstalledPackages()
 
-            for pkg in installedpkgs:
-                self.ch.executeCommand(reportcmd + pkg)
-                outputlist = self.ch.getOutput()
-                self.badpermpkgs[pkg] = []
-                for line in outputlist:
-                    # search for bad permissions
-                    if re.search("^.*(\.+M|M\.+)", line, re.IGNORECASE):
-                        sline = line.split()
-                        self.badpermpkgs[pkg].append(sline[len(sline)-1])
-                        self.badpermfiles.append(sline[len(sline)-1])
-                    # search for bad group ownership
-                    if re.search("^.*(\.+G|G\.+)", line, re.IGNORECASE):
-                        sline = line.split()
-                        self.badgroupfiles.append(sline[len(sline)-1])
-                    # search for bad ownership (user)
-                    if re.search("^.*(\.+U|U\.+)", line, re.IGNORECASE):
-                        sline = line.split()
-                        self.badownerfiles.append(sline[len(sline)-1])
-                    # search for bad md5 hash
-                    if re.search("^.*(\.+5|5\.+)", line, re.IGNORECASE):
-                        sline = line.split()
-                        self.badhashfiles.append(sline[len(sline)-1])
+            self.verifier.verify(installedpkgs)
+            self.badpermfiles = self.verifier.failed(MODE)
+            self.badgroupfiles = self.verifier.failed(GROUP)
+            self.badownerfiles = self.verifier.failed(OWNER)
+            self.badhashfiles = self.verifier.failed(DIGEST)
+            # rpm -V output does not name the package, so the owners are
+            # looked up for the (few) files with bad permissions only
+            owners = self.verifier.owners(self.badpermfiles)
+            for badfile in self.badpermfiles:
+                for pkg in owners.get(badfile, []):
+                    self.badpermpkgs.setdefault(pkg, []).append(badfile)
 
             if self.badpermfiles:
                 self.compliant = False
@@ -198,6 +189,8 @@ default.'
                     retcode = self.ch.getReturnCode()
                     if retcode != 0:
                         self.rulesuccess = False
+            # package file modes have changed, drop the stored results
+            self.verifier.invalidate()
 
             self.detailedresults += "\n\nPlease note that we will not attempt to fix ownership, group ownership, or bad md5 checksums. For suggestions on what to do if files are found with these issues, please see the rule's help text."
             self.detailedresults += "\nIt is expected that this rule will still be non-compliant after fix if files are found with incorrect ownership or group ownership."
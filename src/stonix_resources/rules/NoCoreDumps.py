@@ -42,6 +42,8 @@ which conflicted with DisableIPV6 and NoCoreDumps which expected 644.
     consistent with other rules that handle sysctl and to properly
     handle sysctl by writing to /etc/sysctl.conf and also using command
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - read and set fs.suid_dumpable through the shared sysctl
+    snapshot and check it against sysctl.conf and sysctl.d together
 """
 
 
@@ -55,6 +57,7 @@ from rule import Rule
 from logdispatcher import LogPriority
 from stonixutilityfunctions import iterate, readFile, checkPerms, createFile, setPerms, writeFile, resetsecon
 from KVEditorStonix import KVEditorStonix
+from Sysctl import getsysctl
 
 
 class NoCoreDumps(Rule):
@@ -227,32 +230,22 @@ class NoCoreDumps(Rule):
         '''
 
         compliant = True
+        directives = {"fs.suid_dumpable": "0"}
+        sysctl = getsysctl(self.logger)
 
-        self.ch.executeCommand("/sbin/sysctl fs.suid_dumpable")
-        retcode = self.ch.getReturnCode()
-
-        if retcode != 0:
-            self.detailedresults += "Failed to get value of core dumps configuration with sysctl command\n"
-            errmsg = self.ch.getErrorString()
-            self.logger.log(LogPriority.DEBUG, errmsg)
+        sysctl.refresh(list(directives))
+        value = sysctl.getlive("fs.suid_dumpable")
+        if value is None:
+            self.detailedresults += "Failed to get value of core dumps configuration from the kernel\n"
             compliant = False
-        else:
-            output = self.ch.getOutputString()
-            if output.strip() != "fs.suid_dumpable = 0":
-                compliant = False
-                self.detailedresults += "Core dumps are currently enabled\n"
+        elif value != "0":
+            compliant = False
+            self.detailedresults += "Core dumps are currently enabled\n"
 
-        if not os.path.exists("/etc/sysctl.conf"):
+        for key, setting in sysctl.checkconfigured(directives).items():
             compliant = False
-            self.detailedresults += "/etc/sysctl.conf file doesn't exist\n"
-        else:
-            self.editor = KVEditorStonix(self.statechglogger, self.logger,
-                                         "conf", "/etc/sysctl.conf",
-                                         "/etc/sysctl.conf.tmp",
-                                         {"fs.suid_dumpable": "0"}, "present", "openeq")
-            if not self.editor.report():
-                compliant = False
-                self.detailedresults += "Did not find correct contents inside /etc/sysctl.conf\n"
+            self.detailedresults += sysctl.describe(key, setting) + \
+                ", expected " + directives[key] + "\n"
         return compliant
 
     def fix(self):
@@ -388,31 +381,21 @@ class NoCoreDumps(Rule):
                             success = False
                     resetsecon(sysctl)
 
-        # using sysctl -w command
-        self.logger.log(LogPriority.DEBUG, "Configuring /etc/sysctl fs.suid_dumpable directive")
-        self.ch.executeCommand("/sbin/sysctl -w fs.suid_dumpable=0")
-        retcode = self.ch.getReturnCode()
-        if retcode != 0:
+        # set the live value as well
+        self.logger.log(LogPriority.DEBUG, "Configuring fs.suid_dumpable kernel parameter")
+        changed, failed = getsysctl(self.logger).apply({"fs.suid_dumpable": "0"})
+        if failed:
             success = False
             self.detailedresults += "Failed to set core dumps variable suid_dumpable to 0\n"
-            errmsg = self.ch.getErrorString()
-            self.logger.log(LogPriority.DEBUG, errmsg)
-        else:
-            self.logger.log(LogPriority.DEBUG, "Re-reading sysctl configuration from files")
-            self.ch.executeCommand("/sbin/sysctl -q -e -p")
-            retcode2 = self.ch.getReturnCode()
-            if retcode2 != 0:
-                success = False
-                self.detailedresults += "Failed to load new sysctl configuration from config file\n"
-                errmsg2 = self.ch.getErrorString()
-                self.logger.log(LogPriority.DEBUG, errmsg2)
-            else:
-                self.iditerator += 1
-                myid = iterate(self.iditerator, self.rulenumber)
-                command = "/sbin/sysctl -w fs.suid_dumpable=1"
-                event = {"eventtype": "commandstring",
-                         "command": command}
-                self.statechglogger.recordchgevent(myid, event)
+        for key, undovalue in changed.items():
+            if undovalue is None:
+                continue
+            self.iditerator += 1
+            myid = iterate(self.iditerator, self.rulenumber)
+            command = "/sbin/sysctl -w " + key + "=" + undovalue
+            event = {"eventtype": "commandstring",
+                     "command": command}
+            self.statechglogger.recordchgevent(myid, event)
         return success
 
     def fix_security_limits(self):
@@ -23,11 +23,14 @@ Created on Oct 29, 2012
 @change: 2014/10/17 ekkehard OS X Yosemite 10.10 Update
 @change: 2015/04/16 dkennel updated for new isApplicable
 @change: 2015/10/07 eball Help text/PEP8 cleanup
+@change: 2026/10/18 - check the local users against a set of the accounts
+    with empty passwords from the shared account database
 '''
 
 
 from stonixutilityfunctions import setPerms, checkPerms, readFile, writeFile
 from stonixutilityfunctions import getUserGroupName
+from AccountDatabase import getaccounts, SHADOW
 from rule import Rule
 from logdispatcher import LogPriority
 from pkghelper import Pkghelper
@@ -78,6 +81,7 @@ class NoEmptyPasswords(Rule):
             self.detailedresults = ""
             compliant = True
             self.ph = ""
+            accounts = getaccounts(self.logger)
             osfamily = self.environ.getosfamily()
             if osfamily == "linux" or osfamily == "solaris":
                 self.ph = Pkghelper(self.logger, self.environ)
@@ -98,16 +102,9 @@ class NoEmptyPasswords(Rule):
 /etc/passwd file but it's blank\n"
                     compliant = False
                 else:
-                    try:
-                        for line in contents:
-                            if re.search(":", line):
-                                line = line.split(":")
-                                if int(line[2]) >= 500:
-                                    self.users.append(line[0])
-                    except IndexError:
-                        self.detailedresults += traceback.format_exc() + "\n"
-                        self.detailedresults += "Index out of range\n"
-                        compliant = False
+                    for account in accounts.getusers(remote=False):
+                        if account.uid >= 500:
+                            self.users.append(account.name)
             if not os.path.exists(self.shadow):
                 self.detailedresults += "This system doesn't contain an \
 /etc/shadow file or /etc/master.passwd file\n"
@@ -121,24 +118,18 @@ system that need to be checked for empty passwords\n"
 /etc/shadow file or /etc/master.passwd file but it's blank\n"
                 compliant = False
             else:
-                try:
-                    for user in self.users:
-                        for line in contents:
-                            if re.search(":", line):
-                                line = line.split(":")
-                                if line[0] == user:
-                                    # if line[1].isdigit():
-                                    #    compliant = False
-                                    # elif line[1].strip() == "":
-                                    if line[1].strip() == "":
-                                        if line[0] not in self.empty:
-                                            self.empty.append(line[0])
-                                            compliant = False
-                                            break
-                except IndexError:
-                    self.detailedresults += traceback.format_exc() + "\n"
-                    self.detailedresults += "Index out of range\n"
-                    compliant = False
+                if self.shadow == SHADOW:
+                    shadows = [(entry.name, entry.password)
+                               for entry in accounts.getshadows()]
+                else:
+                    shadows = [line.split(":")[:2] for line in contents
+                               if re.search(":", line)]
+                emptyaccounts = set(name for name, password in shadows
+                                    if password.strip() == "")
+                for user in self.users:
+                    if user in emptyaccounts and user not in self.empty:
+                        self.empty.append(user)
+                        compliant = False
             if self.ph:
                 if self.ph.manager == "apt-get":
                     retval = getUserGroupName("/etc/shadow")
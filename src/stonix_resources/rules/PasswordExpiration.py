@@ -30,6 +30,9 @@ Created on Jun 17, 2013
 @change: 2015/10/07 eball Help text/PEP8 cleanup
 @change: 2016/06/20 eball 35 days for account expire, removed chk/fixPam
 @change: 2016/12/7 dwalker changed min number of days value from 7 to 1
+@change: 2026/10/18 - chkShadow resolves the uids of all shadow entries in
+    one pass over the shared account database instead of running id -u
+    for every line
 '''
 
 from stonixutilityfunctions import iterate, writeFile, readFile, resetsecon
@@ -40,9 +43,10 @@ from logdispatcher import LogPriority
 from KVEditorStonix import KVEditorStonix
 from CommandHelper import CommandHelper
 from pkghelper import Pkghelper
-from subprocess import Popen, PIPE
+from AccountDatabase import getaccounts
 from time import strftime
 import traceback
+import pwd
 import re
 import os
 import shutil
@@ -214,121 +218,21 @@ class PasswordExpiration(Rule):
                     "the correct permissions. Expected 400 or 0, found " + \
                     str(getOctalPerms(self.shadowfile)) + ".\n"
             contents = readFile(self.shadowfile, self.logger)
-            if self.environ.getosfamily() == "solaris" or \
-               self.environ.getosfamily() == "linux":
-                if self.environ.getosfamily() == "linux":
-                    whichid = "/usr/bin/id"
-                elif self.environ.getosfamily() == "solaris":
-                    whichid = "/usr/xpg4/bin/id"
-                for line in contents:
-                    badacct = False
-                    debug = ""
-                    if re.search("^\#", line) or re.match("^\s*$", line):
-                        continue
-                    if re.search(":", line):
-                        field = line.split(":")
-                        cmd = [whichid, "-u", field[0]]
-                        self.ch.executeCommand(cmd)
-                        output = self.ch.getOutputString().strip()
-                        error = self.ch.getError()
-                        if error:
-                            continue
-                        if output:
-                            if output.isdigit():
-                                uid = int(output)
-                            else:
-                                uid = 100
-                        else:
-                            continue
-                        try:
-                            if uid >= 500 and not re.search(self.lockedpwds,
-                                                            field[1]):
-                                for i in [3, 4, 5, 6]:
-                                    if field[i]:
-                                        val = field[i]
-                                        if val.isdigit():
-                                            field[i] = int(field[i])
-                                        elif i == 6:
-                                            field[i] = 99
-                                        else:
-                                            field[i] = 0
-                                    elif i == 6:
-                                        field[i] = 99
-                                    else:
-                                        field[i] = 0
-                                if field[3] != 1 or field[3] == "":
-                                    compliant = False
-                                    self.detailedresults += "Shadow file: " + \
-                                        "Minimum age is not equal to 1\n"
-                                    badacct = True
-                                if field[4] > 180 or field[4] == "":
-                                    compliant = False
-                                    self.detailedresults += "Shadow file: " + \
-                                        "Expiration is not 180 or less\n"
-                                    badacct = True
-                                if field[5] != 28 or field[5] == "":
-                                    compliant = False
-                                    self.detailedresults += "Shadow file: " + \
-                                        "Password expiration warnings are " + \
-                                        "not set to 28 days\n"
-                                    badacct = True
-                                if field[6] != 35 or field[6] == "":
-                                    compliant = False
-                                    self.detailedresults += "Shadow file: " + \
-                                        "Account lock is not set to 35 days\n"
-                                    badacct = True
-                        except IndexError:
-                            compliant = False
-                            debug = traceback.format_exc()
-                            debug += ' Index out of range\n'
-                            badacct = True
-                        if debug:
-                            self.logger.log(LogPriority.DEBUG, debug)
-                    if badacct:
-                        self.fixusers.append(field[0])
-            if self.environ.getosfamily() == 'freebsd':
-                for line in contents:
-                    debug = ""
-                    if re.search("^\#", line) or re.match('^\s*$', line):
-                        continue
-                    if re.search(':', line):
-                        field = line.split(':')
-                        message = Popen(['/usr/bin/id', '-u', field[0]],
-                                        stderr=PIPE, stdout=PIPE, shell=False)
-                        uid = message.stdout.readline()
-                        uid = uid.strip()
-                        message.stdout.close()
-                        if uid.isdigit():
-                            uid = int(uid)
-                        else:
-                            uid = 100
-                        try:
-                            if uid >= 500 and not re.search(self.lockedpwds,
-                                                            field[1]):
-                                for i in [5, 6]:
-                                    if field[i]:
-                                        val = field[i]
-                                        if not val.isdigit():
-                                            field[i] = 0
-                                    else:
-                                        field[i] = 0
-
-                                if int(field[5]) > 180 or field[5] == "":
-                                    self.shadow = False
-                                    compliant = False
-                                    debug += "expiration is not 180 or less"
-                                if int(field[6]) != 1 or field[6] == "":
-                                    self.shadow = False
-                                    compliant = False
-                                    debug += "Account lock is not set to 1"
-                        except IndexError:
-                            self.shadow = False
-                            compliant = False
-                            debug = traceback.format_exc()
-                            debug += ' Index out of range'
-                            self.logger.log(LogPriority.DEBUG, debug)
-                        if debug:
-                            self.logger.log(LogPriority.DEBUG, debug)
+            uids = self.getuids([line.split(":")[0] for line in contents
+                                 if ":" in line])
+            # the messages are collected in a list, adding each of them to
+            # self.detailedresults copies the whole string every time
+            results = []
+            try:
+                if self.environ.getosfamily() == "solaris" or \
+                   self.environ.getosfamily() == "linux":
+                    compliant = self.chkShadowFields(contents, uids,
+                                                     results) and compliant
+                if self.environ.getosfamily() == 'freebsd':
+                    compliant = self.chkMasterFields(contents, uids) and \
+                        compliant
+            finally:
+                self.detailedresults += "".join(results)
         else:
             self.detailedresults += self.shadowfile + " does not exist\n"
             compliant = False
@@ -337,6 +241,151 @@ class PasswordExpiration(Rule):
         self.logger.log(LogPriority.DEBUG, debug)
         return compliant
 
+###############################################################################
+
+    def getuids(self, names):
+        '''Return the uid of each account name that has one, resolved the
+        way id -u resolves it: from /etc/passwd, or through the name service
+        switch for names that are not in the local file.
+
+        :param names: list of account names
+        :returns: dict of name -> int uid
+
+        '''
+        local = {}
+        for user in getaccounts(self.logger).getusers(remote=False):
+            local.setdefault(user.name, user.uid)
+        uids = {}
+        for name in names:
+            if name in local:
+                uids[name] = local[name]
+                continue
+            try:
+                uids[name] = pwd.getpwnam(name).pw_uid
+            except KeyError:
+                continue
+        return uids
+
+    def chkShadowFields(self, contents, uids, results):
+        '''Check the password aging fields of the unlocked user accounts in
+        a linux or solaris shadow file. Accounts which need fixing are added
+        to self.fixusers.
+
+        :param contents: list of lines of the shadow file
+        :param uids: dict of account name -> uid, see getuids
+        :param results: list the messages for the detailed results are
+            added to
+        :returns: bool
+
+        '''
+        compliant = True
+        for line in contents:
+            badacct = False
+            debug = ""
+            if re.search("^\#", line) or re.match("^\s*$", line):
+                continue
+            if re.search(":", line):
+                field = line.split(":")
+                uid = uids.get(field[0])
+                if uid is None:
+                    continue
+                try:
+                    if uid >= 500 and not re.search(self.lockedpwds,
+                                                    field[1]):
+                        for i in [3, 4, 5, 6]:
+                            if field[i]:
+                                val = field[i]
+                                if val.isdigit():
+                                    field[i] = int(field[i])
+                                elif i == 6:
+                                    field[i] = 99
+                                else:
+                                    field[i] = 0
+                            elif i == 6:
+                                field[i] = 99
+                            else:
+                                field[i] = 0
+                        if field[3] != 1 or field[3] == "":
+                            compliant = False
+                            results.append("Shadow file: " +
+                                           "Minimum age is not equal to 1\n")
+                            badacct = True
+                        if field[4] > 180 or field[4] == "":
+                            compliant = False
+                            results.append("Shadow file: " +
+                                           "Expiration is not 180 or less\n")
+                            badacct = True
+                        if field[5] != 28 or field[5] == "":
+                            compliant = False
+                            results.append("Shadow file: " +
+                                           "Password expiration warnings " +
+                                           "are not set to 28 days\n")
+                            badacct = True
+                        if field[6] != 35 or field[6] == "":
+                            compliant = False
+                            results.append("Shadow file: " +
+                                           "Account lock is not set to 35 " +
+                                           "days\n")
+                            badacct = True
+                except IndexError:
+                    compliant = False
+                    debug = traceback.format_exc()
+                    debug += ' Index out of range\n'
+                    badacct = True
+                if debug:
+                    self.logger.log(LogPriority.DEBUG, debug)
+            if badacct:
+                self.fixusers.append(field[0])
+        return compliant
+
+    def chkMasterFields(self, contents, uids):
+        '''Check the password aging fields of the unlocked user accounts in
+        the freebsd master.passwd file
+
+        :param contents: list of lines of master.passwd
+        :param uids: dict of account name -> uid, see getuids
+        :returns: bool
+
+        '''
+        compliant = True
+        for line in contents:
+            debug = ""
+            if re.search("^\#", line) or re.match('^\s*$', line):
+                continue
+            if re.search(':', line):
+                field = line.split(':')
+                # accounts id -u could not resolve were taken as system
+                # accounts
+                uid = uids.get(field[0], 100)
+                try:
+                    if uid >= 500 and not re.search(self.lockedpwds,
+                                                    field[1]):
+                        for i in [5, 6]:
+                            if field[i]:
+                                val = field[i]
+                                if not val.isdigit():
+                                    field[i] = 0
+                            else:
+                                field[i] = 0
+
+                        if int(field[5]) > 180 or field[5] == "":
+                            self.shadow = False
+                            compliant = False
+                            debug += "expiration is not 180 or less"
+                        if int(field[6]) != 1 or field[6] == "":
+                            self.shadow = False
+                            compliant = False
+                            debug += "Account lock is not set to 1"
+                except IndexError:
+                    self.shadow = False
+                    compliant = False
+                    debug = traceback.format_exc()
+                    debug += ' Index out of range'
+                    self.logger.log(LogPriority.DEBUG, debug)
+                if debug:
+                    self.logger.log(LogPriority.DEBUG, debug)
+        return compliant
+
 ###############################################################################
 
     def chkUserAdd(self):
@@ -28,10 +28,15 @@ Created on Jul 13, 2012
 @change: 2018/06/08 ekkehard - make eligible for macOS Mojave 10.14
 @change: 2019/03/12 ekkehard - make eligible for macOS Sierra 10.12+
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - take the home directories of Linux and Unix users
+    from the shared account database instead of enumerating NSS
+@change: 2026/10/18 - add the SCANREMOTEHOMES CI, on by default, so the
+    homes of directory (LDAP, SSSD) accounts are still searched
 '''
 
 import pwd
 from rule import Rule
+from AccountDatabase import getaccounts
 from stonixutilityfunctions import *
 
 
@@ -64,16 +69,31 @@ class RemoveBadDotFiles(Rule):
         "REMOVEBADDOTFILES to False"
         default = True
         self.nonetrc = self.initCi(datatype, key, instructions, default)
+        datatype = 'bool'
+        key = 'SCANREMOTEHOMES'
+        instructions = "When True the home directories of all accounts " + \
+        "known to the name service switch, including directory (LDAP, " + \
+        "SSSD) accounts, are searched. Set SCANREMOTEHOMES to False to " + \
+        "search only the homes of the accounts in /etc/passwd."
+        default = True
+        self.scanremote = self.initCi(datatype, key, instructions, default)
         self.guidance = ['NSA 2.3.4.5', 'cce-4578-1']
         self.applicable = {'type': 'white',
                            'family': ['linux', 'solaris', 'freebsd'],
                            'os': {'Mac OS X': ['10.15', 'r', '10.15.10']}}
         self.homelist = ['/', '/root']
         try:
-            mypwd = pwd.getpwall()
-            for user in mypwd:
-                home = user[5]
-                if home not in self.homelist:
+            if self.environ.getosfamily() == 'darwin':
+                # the accounts of macOS live in its directory service
+                homes = [user[5] for user in pwd.getpwall()]
+            else:
+                remote = bool(self.scanremote.getcurrvalue())
+                homes = [user.home for user in
+                         getaccounts(self.logger).getusers(remote=remote)]
+            seen = set(self.homelist)
+            for home in homes:
+                if home not in seen:
+                    seen.add(home)
                     self.homelist.append(home)
             if self.environ.geteuid() != 0:
                 pwdsingle = pwd.getpwuid(self.environ.geteuid())
@@ -21,14 +21,15 @@ Created on May 9, 2016
 Unprivileged access to the kernel syslog can expose sensitive kernel address information.
 
 @author: Breen Malmberg
+@change: 2026/10/18 - read and set kernel.dmesg_restrict through the shared
+    sysctl snapshot instead of running sysctl
 '''
 
 
 from rule import Rule
-from CommandHelper import CommandHelper
 from logdispatcher import LogPriority
+from Sysctl import getsysctl
 
-import re
 import traceback
 
 
@@ -70,8 +71,7 @@ class RestrictAccessToKernelMessageBuffer(Rule):
         '''
 
         # set defaults
-        self.fixcommand = "sysctl -w kernel.dmesg_restrict=1"
-        self.reportcommand = "sysctl kernel.dmesg_restrict"
+        self.directives = {"kernel.dmesg_restrict": "1"}
 
     def initobjs(self):
         '''initialize class objects
@@ -81,7 +81,7 @@ class RestrictAccessToKernelMessageBuffer(Rule):
 
         '''
 
-        self.ch = CommandHelper(self.logger)
+        self.sysctl = getsysctl(self.logger)
 
     def report(self):
         '''run report actions for this rule
@@ -96,29 +96,17 @@ class RestrictAccessToKernelMessageBuffer(Rule):
 
         self.detailedresults = ""
         self.compliant = True
-        kernelopt = False
 
         try:
 
-            self.ch.executeCommand(self.reportcommand)
-            output = self.ch.getOutput()
-            retcode = self.ch.getReturnCode()
-            if retcode != 0:
-                self.detailedresults += "\nError while running command: " + str(self.reportcommand)
-            for line in output:
-                if re.search("kernel\.dmesg\_restrict", line):
-                    kernelopt = True
-                    sline = line.split('=')
-                    if len(sline) > 1:
-                        if str(sline[1]).strip() == '0':
-                            self.compliant = False
-                            self.detailedresults += "\nKernel message buffer is currently not restricted."
-                    else:
-                        self.compliant = False
-                        self.detailedresults += "\nCould not determine the state of the kernel message buffer access restrictions."
-            if not kernelopt:
+            self.sysctl.refresh(list(self.directives))
+            value = self.sysctl.getlive("kernel.dmesg_restrict")
+            if value is None:
                 self.compliant = False
                 self.detailedresults += "\nCould not determine the state of the kernel message buffer access restrictions."
+            elif value == '0':
+                self.compliant = False
+                self.detailedresults += "\nKernel message buffer is currently not restricted."
 
         except (KeyboardInterrupt, SystemExit):
             raise
@@ -145,12 +133,10 @@ class RestrictAccessToKernelMessageBuffer(Rule):
 
         try:
 
-            self.ch.executeCommand(self.fixcommand)
-            rcode = self.ch.getReturnCode()
-            errmsg = self.ch.getErrorString()
-            if rcode != '0':
+            failed = self.sysctl.apply(self.directives)[1]
+            if failed:
                 success = False
-                self.detailedresults += "\n" + str(errmsg)
+                self.detailedresults += "\nUnable to set kernel.dmesg_restrict"
 
         except (KeyboardInterrupt, SystemExit):
             raise
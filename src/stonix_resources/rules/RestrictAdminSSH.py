@@ -58,6 +58,9 @@ RESTRICTADMINSSH to False.'''
         self.ci = self.initCi(datatype, key, instructions, default)
         self.guidance = []
         self.ssh = {"DenyGroups": "admin"}
+        self.resources = {'files': ['/etc/ssh/sshd_config'],
+                          'services': ['sshd'],
+                          'packages': []}
         self.iditerator = 0
         self.applicable = {'type': 'white',
                            'os': {'Mac OS X': ['10.15', 'r', '10.15.10']}}
@@ -78,6 +78,9 @@ class SSHTimeout(Rule):
                            'family': ['linux', 'solaris', 'freebsd'],
                            'os': {'Mac OS X': ['10.15', 'r', '10.15.10']}}
         self.ph = Pkghelper(self.logger, self.environ)
+        self.resources = {'files': ['/etc/ssh/sshd_config'],
+                          'services': [],
+                          'packages': ['openssh-server']}
 
     def report(self):
         '''SSHTimeout.report(): produce a report on whether or not a valid
@@ -31,6 +31,8 @@ Created on May 20, 2013
 @change: 2018/06/28 Breen Malmberg - re-wrote much of the rule; added doc strings
         to some existing methods
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - read accounts and UID_MIN from the shared account
+    database instead of running awk and getpwnam for each account
 '''
 
 
@@ -41,7 +43,7 @@ import stat
 import re
 import pwd
 
-from stonixutilityfunctions import readFile
+from AccountDatabase import getaccounts
 from rule import Rule
 from logdispatcher import LogPriority
 from CommandHelper import CommandHelper
@@ -290,12 +292,7 @@ class SecureHomeDir(Rule):
         self.logger.log(LogPriority.DEBUG, "Building list of Linux user home directories...")
 
         HomeDirs = []
-        awk = "/usr/bin/awk"
-        passwd = "/etc/passwd"
         invalidshells = ["/sbin/nologin", "/sbin/halt", "/sbin/shutdown", "/dev/null", "/bin/sync"]
-        getacctscmd = awk + " -F: '{ print $1 }' " + passwd
-        acctnames = []
-        usernames = []
 
         try:
 
@@ -304,40 +301,18 @@ class SecureHomeDir(Rule):
             if not uid_min:
                 uid_min = "500"
 
-            if os.path.exists(awk):
-                # build a list of user (non-system) account names
-                self.cmdhelper.executeCommand(getacctscmd)
-                acctnames = self.cmdhelper.getOutput()
-            else:
-                self.logger.log(LogPriority.DEBUG, "awk utility not installed! What kind of Linux are you running??")
-                # alternate method of getting account names in case system
-                # does not have the awk utility installed..
-                f = open(passwd, 'r')
-                contents = f.readlines()
-                f.close()
-
-                for line in contents:
-                    sline = line.split(':')
-                    if len(sline) > 1:
-                        acctnames.append(sline[0])
-
-            if acctnames:
-                for an in acctnames:
-                    if int(pwd.getpwnam(an).pw_uid) >= int(uid_min):
-                        usernames.append(an)
-            else:
+            accounts = getaccounts(self.logger).getusers(remote=False)
+            if not accounts:
                 self.logger.log(LogPriority.DEBUG, "Could not find any accounts on this system!")
                 return HomeDirs
 
-            # further check to see if this might still be a system account
+            # build a list of user (non-system) account home directories,
+            # further checking to see if this might still be a system account
             # which just got added in the user id range somehow (by checking
             # the shell)
-            for un in usernames:
-                if pwd.getpwnam(un).pw_shell in invalidshells:
-                    usernames.remove(un)
-
-            for un in usernames:
-                HomeDirs.append(pwd.getpwnam(un).pw_dir)
+            for account in accounts:
+                if account.uid >= int(uid_min) and account.shell not in invalidshells:
+                    HomeDirs.append(account.home)
             # now we should be reasonably certain that the list we have are all
             # valid users (and not system accounts) but let's do one more check
             # to make sure they weren't assigned a home directory some where that
@@ -428,24 +403,11 @@ class SecureHomeDir(Rule):
 
         '''
 
-        uid_min = ""
-        logindefs = "/etc/login.defs"
-
-        try:
+        # get normal user uid start value
+        uid_min = getaccounts(self.logger).getlogindef("UID_MIN", "")
 
-            # get normal user uid start value
-            logindefscontents = readFile(logindefs, self.logger)
-            if logindefscontents:
-                for line in logindefscontents:
-                    if re.search("^UID_MIN", line, re.IGNORECASE):
-                        sline = line.split()
-                        uid_min = sline[1]
-
-            if not uid_min:
-                self.logger.log(LogPriority.DEBUG, "Unable to determine UID_MIN")
-
-        except Exception:
-            raise
+        if not uid_min:
+            self.logger.log(LogPriority.DEBUG, "Unable to determine UID_MIN")
 
         return uid_min
 
@@ -43,6 +43,9 @@ variable.
     handle sysctl by writing to /etc/sysctl.conf and also using command
 @change: 2019/06/26 Brandon R. Gonzales - Fix MacOS CI logic in fix()
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - linux kernel parameters are read and set through the
+    shared sysctl snapshot and checked against sysctl.conf and sysctl.d
+    together
 '''
 
 from stonixutilityfunctions import resetsecon, iterate, readFile, writeFile
@@ -53,9 +56,9 @@ from logdispatcher import LogPriority
 from CommandHelper import CommandHelper
 from subprocess import Popen, PIPE, call
 from KVEditorStonix import KVEditorStonix
+from Sysctl import getsysctl
 import os
 import traceback
-import re
 
 
 class SecureIPV4(Rule):
@@ -81,6 +84,7 @@ class SecureIPV4(Rule):
                            'os': {'Mac OS X': ['10.15', 'r', '10.15.10']}}
         self.iditerator = 0
         self.ch = CommandHelper(self.logger)
+        self.sysctl = getsysctl(self.logger)
 
     def __InitializeNetworkTuning1(self):
         '''Private method to initialize the configurationitem object for the
@@ -155,97 +159,73 @@ class SecureIPV4(Rule):
 
     def reportLinux1(self):
         '''Linux specific report method that ensures the items in fileContents
-        exist in /etc/sysctl.conf.  Sets self.compliant to True if all items
-        exist in the file.  Returns True if successful in updating the file
+        are configured in /etc/sysctl.conf or sysctl.d and set in the kernel.
+        Returns True if all items are configured and set
 
 
         :returns: bool
 
         '''
-        compliant = True
-        if not os.path.exists(self.path):
-            self.detailedresults += self.path + " does not exist\n"
+        lfc = {"net.ipv4.conf.all.secure_redirects": "0",
+               "net.ipv4.conf.all.accept_redirects": "0",
+               "net.ipv4.conf.all.rp_filter": "1",
+               "net.ipv4.conf.all.log_martians": "1",
+               "net.ipv4.conf.all.accept_source_route": "0",
+               "net.ipv4.conf.default.accept_redirects": "0",
+               "net.ipv4.conf.default.secure_redirects": "0",
+               "net.ipv4.conf.default.rp_filter": "1",
+               "net.ipv4.conf.default.accept_source_route": "0",
+               "net.ipv4.tcp_syncookies": "1",
+               "net.ipv4.icmp_echo_ignore_broadcasts": "1",
+               "net.ipv4.tcp_max_syn_backlog": "4096"}
+        compliant = self.reportSysctl(lfc, 1)
+        if os.path.exists(self.path) and \
+           not checkPerms(self.path, [0, 0, 0o644], self.logger):
+            self.detailedresults += "Permissions are incorrect on " + \
+                self.path + "\n"
             compliant = False
-        else:
-            lfc = {"net.ipv4.conf.all.secure_redirects": "0",
-                   "net.ipv4.conf.all.accept_redirects": "0",
-                   "net.ipv4.conf.all.rp_filter": "1",
-                   "net.ipv4.conf.all.log_martians": "1",
-                   "net.ipv4.conf.all.accept_source_route": "0",
-                   "net.ipv4.conf.default.accept_redirects": "0",
-                   "net.ipv4.conf.default.secure_redirects": "0",
-                   "net.ipv4.conf.default.rp_filter": "1",
-                   "net.ipv4.conf.default.accept_source_route": "0",
-                   "net.ipv4.tcp_syncookies": "1",
-                   "net.ipv4.icmp_echo_ignore_broadcasts": "1",
-                   "net.ipv4.tcp_max_syn_backlog": "4096"}
-            editor = KVEditorStonix(self.statechglogger, self.logger,
-                                    "conf", self.path, self.tmpPath, lfc,
-                                    "present", "openeq")
-            if not editor.report():
-                self.detailedresults += self.path + " is not configured " + \
-                    "correctly for configuration item 1\n"
-                compliant = False
-            if not checkPerms(self.path, [0, 0, 0o644], self.logger):
-                self.detailedresults += "Permissions are incorrect on " + \
-                    self.path + "\n"
-                compliant = False
-        for key in lfc:
-            self.ch.executeCommand("/sbin/sysctl " + key)
-            retcode = self.ch.getReturnCode()
-
-            if retcode != 0:
-                self.detailedresults += "Failed to get value of core dumps configuration with sysctl command\n"
-                errmsg = self.ch.getErrorString()
-                self.logger.log(LogPriority.DEBUG, errmsg)
-                compliant = False
-            else:
-                output = self.ch.getOutputString()
-                if output.strip() != key + " = " + lfc[key]:
-                    compliant = False
-                    self.detailedresults += "sysctl output has incorrect value: " + \
-                        output + "\n"
         return compliant
 
     def reportLinux2(self):
         '''Linux specific report method2 that ensures the items in fileContents
-        exist in /etc/sysctl.conf.  Sets self.compliant to True if all items
-        exist in the file.  Returns True if successful in updating the file
+        are configured in /etc/sysctl.conf or sysctl.d and set in the kernel.
+        Returns True if all items are configured and set
 
 
         :returns: bool
 
         '''
-        compliant = True
-        if not os.path.exists(self.path):
-            compliant = False
-        else:
-            lfc = {"net.ipv4.conf.default.send_redirects": "0",
-                   "net.ipv4.conf.all.send_redirects": "0",
-                   "net.ipv4.ip_forward": "0"}
-            editor = KVEditorStonix(self.statechglogger, self.logger,
-                                    "conf", self.path, self.tmpPath,
-                                    lfc, "present", "openeq")
-            if not editor.report():
-                self.detailedresults += self.path + " is not configured " + \
-                    "correctly for configuration item 2\n"
-                compliant = False
+        lfc = {"net.ipv4.conf.default.send_redirects": "0",
+               "net.ipv4.conf.all.send_redirects": "0",
+               "net.ipv4.ip_forward": "0"}
+        return self.reportSysctl(lfc, 2)
 
-        for key in lfc:
-            self.ch.executeCommand("/sbin/sysctl " + key)
-            retcode = self.ch.getReturnCode()
+    def reportSysctl(self, lfc, item):
+        '''Check the configured and the live values of kernel parameters
 
-            if retcode != 0:
-                self.detailedresults += "Failed to get value of core dumps configuration with sysctl command\n"
-                errmsg = self.ch.getErrorString()
-                self.logger.log(LogPriority.DEBUG, errmsg)
-                compliant = False
+        :param lfc: dict of key -> wanted value
+        :param item: number of the configuration item, for the results
+        :returns: bool
+
+        '''
+        compliant = True
+        self.sysctl.refresh(list(lfc))
+        configured = self.sysctl.checkconfigured(lfc)
+        if configured:
+            self.detailedresults += "Kernel parameters are not configured " + \
+                "correctly for configuration item " + str(item) + "\n"
+            for key, setting in configured.items():
+                self.detailedresults += self.sysctl.describe(key, setting) + \
+                    ", expected " + lfc[key] + "\n"
+            compliant = False
+        for key, value in self.sysctl.checklive(lfc).items():
+            compliant = False
+            if value is None:
+                self.detailedresults += "Failed to get value of " + key + \
+                    " from the kernel\n"
             else:
-                output = self.ch.getOutputString()
-                if output.strip() != key + " = " + lfc[key]:
-                    compliant = False
-                    self.detailedresults += "sysctl output has incorrect value: " + \
-                        output + "\n"
+                self.detailedresults += "Kernel has incorrect value: " + \
+                    key + " = " + value + "\n"
         return compliant
 
     def reportMac(self):
@@ -485,39 +465,20 @@ class SecureIPV4(Rule):
                         success = False
                 resetsecon(self.path)
 
-        # here we also check the output of the sysctl command for each key
-        # to cover all bases
-        for key in lfc:
-            if self.ch.executeCommand("/sbin/sysctl " + key):
-                output = self.ch.getOutputString().strip()
-                if not re.search(lfc[key] + "$", output):
-                    undovalue = output[-1]
-                    self.ch.executeCommand("/sbin/sysctl -w " + key + "=" + lfc[key])
-                    retcode = self.ch.getReturnCode()
-                    if retcode != 0:
-                        success = False
-                        self.detailedresults += "Failed to set " + key + " = " + lfc[key] + "\n"
-                        errmsg = self.ch.getErrorString()
-                        self.logger.log(LogPriority.DEBUG, errmsg)
-                    else:
-                        self.iditerator += 1
-                        myid = iterate(self.iditerator, self.rulenumber)
-                        command = "/sbin/sysctl -w " + key + "=" + undovalue
-                        event = {"eventtype": "commandstring",
-                                 "command": command}
-                        self.statechglogger.recordchgevent(myid, event)
-            else:
-                self.detailedresults += "Unable to get value for " + key + "\n"
-                success = False
-        # at the end do a print and ignore any key errors to ensure
-        # the new values are read into the kernel
-        self.ch.executeCommand("/sbin/sysctl -q -e -p")
-        retcode2 = self.ch.getReturnCode()
-        if retcode2 != 0:
+        # here we also check the live value of each key to cover all bases
+        changed, failed = self.sysctl.apply(lfc)
+        for key in failed:
             success = False
-            self.detailedresults += "Failed to load new sysctl configuration from config file\n"
-            errmsg2 = self.ch.getErrorString()
-            self.logger.log(LogPriority.DEBUG, errmsg2)
+            self.detailedresults += "Failed to set " + key + " = " + lfc[key] + "\n"
+        for key, undovalue in changed.items():
+            if undovalue is None:
+                continue
+            self.iditerator += 1
+            myid = iterate(self.iditerator, self.rulenumber)
+            command = "/sbin/sysctl -w " + key + "=" + undovalue
+            event = {"eventtype": "commandstring",
+                     "command": command}
+            self.statechglogger.recordchgevent(myid, event)
         return success
 
     def fixMac(self):
@@ -33,6 +33,10 @@ Created on Jan 14, 2014
     consistent with other rules that handle sysctl and to properly
     handle sysctl by writing to /etc/sysctl.conf and also using command
 @change: 2019/08/07 ekkehard - enable for macOS Catalina 10.15 only
+@change: 2026/10/18 - reportMac reads the sysctl directives concurrently
+@change: 2026/10/18 - linux kernel parameters are read and set through the
+    shared sysctl snapshot and checked against sysctl.conf and sysctl.d
+    together
 '''
 
 from stonixutilityfunctions import iterate, setPerms, checkPerms, writeFile
@@ -40,6 +44,7 @@ from stonixutilityfunctions import readFile, resetsecon, createFile
 from rule import Rule
 from logdispatcher import LogPriority
 from KVEditorStonix import KVEditorStonix
+from Sysctl import getsysctl
 from CommandHelper import CommandHelper
 from pkghelper import Pkghelper
 import traceback
@@ -141,10 +146,14 @@ False.'''
 
             self.cmdhelper = CommandHelper(self.logger)
 
-            for directive in self.directives:
+            # the directives are read with one sysctl call each, run at once
+            directives = list(self.directives)
+            helpers = self.cmdhelper.executeCommands(
+                [[sysctl, "-n", directive] for directive in directives])
+            for directive, helper in zip(directives, helpers):
                 cmd = [sysctl, "-n", directive]
-                if self.cmdhelper.executeCommand(cmd):
-                    output = self.cmdhelper.getOutputString().strip()
+                if helper.getReturnCode() == 0:
+                    output = helper.getOutputString().strip()
                     if output != self.directives[directive]:
                         self.detailedresults += "The value for " + directive + \
                             " is not " + self.directives[directive] + ", it's " + \
@@ -152,9 +161,9 @@ False.'''
                         compliant = False
                         self.fixables[directive] = self.directives[directive]
                 else:
-                    error = self.cmdhelper.getErrorString()
+                    error = helper.getErrorString()
                     self.detailedresults += "There was an error running the " + \
-                        "the command " + cmd + "\n"
+                        "the command " + " ".join(cmd) + "\n"
                     self.logger.log(LogPriority.DEBUG, error)
                     self.fixables[directive] = self.directives[directive]
                     compliant = False
@@ -196,43 +205,33 @@ False.'''
                    "net.ipv6.conf.default.accept_redirects": "0"}
         self.ph = Pkghelper(self.logger, self.environ)
 
-        # check compliancy of /etc/sysctl.conf file
-        if not os.path.exists(sysctl):
+        # check the kernel parameters configured in /etc/sysctl.conf and
+        # sysctl.d
+        sysctlview = getsysctl(self.logger)
+        configured = sysctlview.checkconfigured(self.sysctls)
+        if configured:
+            self.detailedresults += "Kernel parameters are not " + \
+                "configured correctly\n"
+            for key, setting in configured.items():
+                self.detailedresults += sysctlview.describe(key, setting) + \
+                    ", expected " + self.sysctls[key] + "\n"
+            compliant = False
+        if os.path.exists(sysctl) and \
+           not checkPerms(sysctl, [0, 0, 0o644], self.logger):
+            self.detailedresults += "Permissions for " + sysctl + \
+                                    "are incorrect\n"
             compliant = False
-            self.detailedresults += sysctl + " file doesn't exist\n"
-        else:
-            tmpfile = sysctl + ".tmp"
-            self.editor1 = KVEditorStonix(self.statechglogger, self.logger,
-                                          "conf", sysctl, tmpfile, self.sysctls,
-                                          "present", "openeq")
-            if not self.editor1.report():
-                self.detailedresults += "/etc/sysctl file doesn't contain \
-                    the correct contents\n"
-                compliant = False
-            if not checkPerms(sysctl, [0, 0, 0o644], self.logger):
-                self.detailedresults += "Permissions for " + sysctl + \
-                                        "are incorrect\n"
-                compliant = False
 
-        # in addition to checking /etc/sysctl.conf contents we need to
-        # also check sysctl compliancy using the sysctl command
-        for key in self.sysctls:
-            self.ch.executeCommand("/sbin/sysctl " + key)
-            retcode = self.ch.getReturnCode()
-            output = self.ch.getOutputString()
-            errmsg = output + self.ch.getErrorString()
-            if retcode != 0:
-                if re.search("unknown key", errmsg):
-                    continue
-                else:
-                    self.detailedresults += "Failed to get value of " + key + " key with sysctl command\n"
-                    self.logger.log(LogPriority.DEBUG, errmsg)
-                    compliant = False
-            else:
-                if output.strip() != key + " = " + self.sysctls[key]:
-                    compliant = False
-                    self.detailedresults += "sysctl output has incorrect value: " + \
-                        output + "\n"
+        # in addition to checking the configuration files we need to
+        # also check the live values in the kernel
+        sysctlview.refresh(list(self.sysctls))
+        for key, value in sysctlview.checklive(self.sysctls).items():
+            # keys the kernel does not have (ipv6 disabled) are skipped
+            if value is None:
+                continue
+            compliant = False
+            self.detailedresults += "Kernel has incorrect value: " + \
+                key + " = " + value + "\n"
 
         # set the appropriate files based on the system
         if self.ph.manager == "yum":
@@ -497,42 +496,20 @@ the correct contents\n"
                             success = False
                     resetsecon(sysctl)
 
-        # here we also check the output of the sysctl command for each key
-        # to cover all bases
-        for key in self.sysctls:
-            if self.ch.executeCommand("/sbin/sysctl " + key):
-                output = self.ch.getOutputString().strip()
-                errmsg = output + self.ch.getErrorString()
-                if re.search("unknown key", errmsg):
-                    continue
-                if not re.search(self.sysctls[key] + "$", output):
-                    undovalue = output[-1]
-                    self.ch.executeCommand("/sbin/sysctl -q -e -w " + key + "=" + self.sysctls[key])
-                    retcode = self.ch.getReturnCode()
-                    if retcode != 0:
-                        success = False
-                        self.detailedresults += "Failed to set " + key + " = " + self.sysctls[key] + "\n"
-                        errmsg = self.ch.getErrorString()
-                        self.logger.log(LogPriority.DEBUG, errmsg)
-                    else:
-                        self.iditerator += 1
-                        myid = iterate(self.iditerator, self.rulenumber)
-                        command = "/sbin/sysctl -q -e -w " + key + "=" + undovalue
-                        event = {"eventtype": "commandstring",
-                                 "command": command}
-                        self.statechglogger.recordchgevent(myid, event)
-            else:
-                self.detailedresults += "Unable to get value for " + key + "\n"
-                success = False
-        # at the end do a print and ignore any key errors to ensure
-        # the new values are read into the kernel
-        self.ch.executeCommand("/sbin/sysctl -q -e -p")
-        retcode2 = self.ch.getReturnCode()
-        if retcode2 != 0:
+        # here we also check the live value of each key to cover all bases
+        changed, failed = getsysctl(self.logger).apply(self.sysctls)
+        for key in failed:
             success = False
-            self.detailedresults += "Failed to load new sysctl configuration from config file\n"
-            errmsg2 = self.ch.getErrorString()
-            self.logger.log(LogPriority.DEBUG, errmsg2)
+            self.detailedresults += "Failed to set " + key + " = " + self.sysctls[key] + "\n"
+        for key, undovalue in changed.items():
+            if undovalue is None:
+                continue
+            self.iditerator += 1
+            myid = iterate(self.iditerator, self.rulenumber)
+            command = "/sbin/sysctl -q -e -w " + key + "=" + undovalue
+            event = {"eventtype": "commandstring",
+                     "command": command}
+            self.statechglogger.recordchgevent(myid, event)
 
         # correct the network file if it exists
         if netwrkfile:
@@ -91,6 +91,10 @@ class SecureSSH(Rule):
                          'CCE 3660-8', 'CCE 4431-3', 'CCE 14716-5',
                          'CCE 14491-5']
         self.ed1, self.ed2 = "", ""
+        self.resources = {'files': ['/etc/ssh/sshd_config',
+                                    '/etc/ssh/ssh_config'],
+                          'services': ['sshd'],
+                          'packages': []}
 
         self.osname = self.environ.getosname()
         if self.osname == "Mac OS":
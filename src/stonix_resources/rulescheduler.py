@@ -0,0 +1,198 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+"""
+Created on Oct 18, 2026
+
+The rule scheduler runs a list of rule objects through a bounded pool of
+worker threads. Rules are grouped by their execution priority and each group
+acts as a barrier: no rule in a later group is started until every rule in
+the earlier group has completed. Inside a group, rules whose declared
+resources (files, services, packages) overlap are never run at the same
+time.
+
+Completed rules are handed back to the caller on the calling thread so that
+progress notifications (numrulescomplete, notify_check) are still emitted
+from one place, in the same way they were when rules ran serially.
+"""
+
+import traceback
+
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from stonix_resources.logdispatcher import LogPriority
+
+# Resource token that is held by any rule which declares one or more packages.
+# Package managers are single writer so package claims always conflict.
+PKGMGRTOKEN = ('package', '*')
+
+# Resource token held by rules which do not declare what they touch. It
+# conflicts with everything when the scheduler runs in exclusive mode.
+EXCLUSIVETOKEN = ('exclusive', '*')
+
+
+class RuleScheduler(object):
+    """Run rule objects concurrently while honoring execution priority
+    barriers and resource conflicts.
+    """
+
+    def __init__(self, logger, workers=1):
+        """
+        :param logger: LogDispatcher instance
+        :param workers: int - maximum number of rules to run at once. A
+            value of 1 (the default) runs rules serially on the calling
+            thread.
+        """
+        self.logger = logger
+        try:
+            self.workers = max(1, int(workers))
+        except (TypeError, ValueError):
+            self.workers = 1
+
+    def getworkers(self):
+        """Return the size of the worker pool
+
+        :returns: int
+        """
+        return self.workers
+
+    def prioritygroups(self, rules):
+        """Split the passed rules into execution priority groups. Lower
+        execution priority values run first. Rule order inside a group is
+        preserved.
+
+        :param rules: list of rule objects
+        :returns: list of lists of rule objects
+        """
+        groups = {}
+        for rule in rules:
+            try:
+                priority = int(rule.getexecutionpriority())
+            except (AttributeError, TypeError, ValueError):
+                priority = 50
+            groups.setdefault(priority, []).append(rule)
+        return [groups[key] for key in sorted(groups)]
+
+    def getclaims(self, rule, exclusive):
+        """Return the set of resource tokens the rule holds while it runs.
+
+        :param rule: rule object
+        :param exclusive: bool - rules that declare no resources are given
+            the exclusive token so they run alone
+        :returns: set of (type, name) tuples
+        """
+        claims = set()
+        try:
+            resources = rule.getresources()
+        except AttributeError:
+            resources = {}
+        for restype in ['files', 'services', 'packages']:
+            for item in resources.get(restype, []):
+                claims.add((restype, str(item)))
+        if resources.get('packages'):
+            claims.add(PKGMGRTOKEN)
+        if not claims and exclusive:
+            claims.add(EXCLUSIVETOKEN)
+        return claims
+
+    def conflicts(self, claims, held):
+        """Return True if the claims conflict with currently held claims
+
+        :param claims: set of resource tokens for a candidate rule
+        :param held: set of resource tokens held by running rules
+        :returns: bool
+        """
+        if not held:
+            return False
+        if EXCLUSIVETOKEN in claims or EXCLUSIVETOKEN in held:
+            return True
+        return not claims.isdisjoint(held)
+
+    def run(self, rules, task, exclusive=False):
+        """Run task(rule) for every rule. This is a generator that yields a
+        (rule, trace) tuple on the calling thread as each rule finishes. trace
+        is None if the task returned normally, otherwise it is the formatted
+        traceback of the exception raised by the task.
+
+        KeyboardInterrupt and SystemExit raised by a task are re-raised once
+        the running tasks have drained.
+
+        :param rules: list of rule objects
+        :param task: callable taking a single rule object
+        :param exclusive: bool - if True rules that declare no resources are
+            run alone. Use this for phases that change the system.
+        """
+        if self.workers == 1:
+            for group in self.prioritygroups(rules):
+                for rule in group:
+                    yield rule, self.__runtask(task, rule)
+            return
+
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            for group in self.prioritygroups(rules):
+                for item in self.__rungroup(pool, group, task, exclusive):
+                    yield item
+
+    def __rungroup(self, pool, group, task, exclusive):
+        """Run one priority group to completion on the pool.
+
+        :param pool: ThreadPoolExecutor
+        :param group: list of rule objects of equal execution priority
+        :param task: callable taking a single rule object
+        :param exclusive: see run()
+        """
+        pending = [(rule, self.getclaims(rule, exclusive)) for rule in group]
+        running = {}
+        held = set()
+        while pending or running:
+            deferred = []
+            for rule, claims in pending:
+                if len(running) >= self.workers or \
+                   self.conflicts(claims, held):
+                    deferred.append((rule, claims))
+                    continue
+                future = pool.submit(self.__runtask, task, rule)
+                running[future] = (rule, claims)
+                held.update(claims)
+            pending = deferred
+            if not running:
+                # Should not happen, the first pending rule can always start
+                # once nothing is running.
+                break
+            done, _ = wait(list(running.keys()), return_when=FIRST_COMPLETED)
+            for future in done:
+                rule, claims = running.pop(future)
+                held.difference_update(claims)
+                yield rule, future.result()
+
+    def __runtask(self, task, rule):
+        """Run the task for a single rule and trap any failure.
+
+        :param task: callable taking a single rule object
+        :param rule: rule object
+        :returns: None or string traceback
+        """
+        try:
+            task(rule)
+        except (KeyboardInterrupt, SystemExit):
+            raise
+        except Exception:
+            trace = traceback.format_exc()
+            self.logger.log(LogPriority.DEBUG,
+                            ['RuleScheduler', 'Task failed: ' + trace])
+            return trace
+        return None
@@ -63,7 +63,7 @@ Miscellaneous utility functions.
 
 import os
 import grp
-import inspect
+import sys
 import pwd
 import re
 import subprocess
@@ -1382,9 +1382,11 @@ def validateParam(logger, param, ptype, pname):
     return valid
 
 def reportStack(level=1):
-    filename = inspect.stack()[level][1]
-    functionName = str(inspect.stack()[level][3])
-    lineNumber = str(inspect.stack()[level][2])
+    frame = sys._getframe(level)
+    filename = frame.f_code.co_filename
+    functionName = str(frame.f_code.co_name)
+    lineNumber = str(frame.f_lineno)
+    del frame
     '''  
     print("----------------")
     print(filename)
@@ -1418,7 +1420,7 @@ def psRunning(ps):
         return isrunning
 
     output, errmsg = Popen(cmd, stdout=PIPE, stderr=PIPE, shell=False).communicate()
-    if ps in output.split():
+    if ps in output.decode('utf-8', 'replace').split():
         isrunning = True
 
     return isrunning
@@ -22,11 +22,11 @@ Created on Aug 06, 2012
 """
 
 import re
-import time
+import os
 
-from stonix_resources.stonixutilityfunctions import psRunning
 from stonix_resources.logdispatcher import LogPriority
 from stonix_resources.CommandHelper import CommandHelper
+from stonix_resources.PackageLock import getpackagelock
 from stonix_resources.StonixExceptions import repoError
 from stonix_resources.environment import Environment
 
@@ -41,6 +41,7 @@ class Yum(object):
         self.environ = Environment()
         self.logger = logger
         self.ch = CommandHelper(self.logger)
+        self.pkglock = getpackagelock('yum', self.logger)
         self.yumloc = "/usr/bin/yum"
         self.install = self.yumloc + " install -y "
         self.remove = self.yumloc + " remove -y "
@@ -69,18 +70,11 @@ class Yum(object):
         """
 
         installed = True
-        maxtries = 12
-        trynum = 0
 
-        while psRunning("yum"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG, "Timed out while attempting to install package due to yum package manager being in-use by another process.")
-                installed = False
-                return installed
-            else:
-                self.logger.log(LogPriority.DEBUG, "Yum package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to install package due to yum package manager being in-use by another process.")
+            installed = False
+            return installed
 
         try:
 
@@ -112,18 +106,11 @@ class Yum(object):
         """
 
         removed = True
-        maxtries = 12
-        trynum = 0
 
-        while psRunning("yum"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG, "Timed out while attempting to remove package, due to yum package manager being in-use by another process.")
-                removed = False
-                return removed
-            else:
-                self.logger.log(LogPriority.DEBUG, "Yum package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to remove package, due to yum package manager being in-use by another process.")
+            removed = False
+            return removed
 
         try:
 
@@ -156,19 +143,12 @@ class Yum(object):
         """
 
         installed = True
-        maxtries = 12
-        trynum = 0
         acceptablecodes = [1,0]
 
-        while psRunning("yum"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check status of package, due to yum package manager being in-use by another process.")
-                installed = False
-                return installed
-            else:
-                self.logger.log(LogPriority.DEBUG, "Yum package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check status of package, due to yum package manager being in-use by another process.")
+            installed = False
+            return installed
 
         try:
 
@@ -296,18 +276,11 @@ class Yum(object):
         """
 
         available = True
-        maxtries = 12
-        trynum = 0
 
-        while psRunning("yum"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check availability of package, due to yum package manager being in-use by another process.")
-                available = False
-                return available
-            else:
-                self.logger.log(LogPriority.DEBUG, "Yum package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check availability of package, due to yum package manager being in-use by another process.")
+            available = False
+            return available
 
         try:
 
@@ -363,6 +336,76 @@ class Yum(object):
             raise
         return packagename
 
+    def listInstalled(self):
+        """return the names of all installed packages from a single rpm
+        query. Each package is listed both as name and as name.arch
+
+        :return: installed; None if the query failed
+        :rtype: set
+
+        """
+
+        installed = None
+
+        try:
+
+            if not os.path.exists(self.rpmloc):
+                return installed
+
+            self.ch.executeCommand([self.rpmloc, "-qa", "--qf",
+                                    "%{NAME} %{ARCH}\\n"])
+            if self.ch.getReturnCode() == 0:
+                installed = set()
+                for line in self.ch.getOutput():
+                    fields = line.split()
+                    if len(fields) == 2:
+                        installed.add(fields[0])
+                        installed.add(fields[0] + "." + fields[1])
+            else:
+                errstr = self.ch.getErrorString()
+                self.logger.log(LogPriority.DEBUG, "Failed to list installed packages: " + str(errstr))
+
+        except Exception:
+            raise
+        return installed
+
+    def listAvailable(self):
+        """return the names of all packages available to install from
+        a single yum query. Each package is listed both as name and as
+        name.arch
+
+        :return: available; None if the query failed
+        :rtype: set
+
+        """
+
+        available = None
+
+        try:
+
+            if not os.path.exists(self.yumloc):
+                return available
+
+            self.ch.executeCommand(self.listavail.strip())
+            if self.ch.getReturnCode() == 0:
+                available = set()
+                for line in self.ch.getOutput():
+                    # long names push the version onto an indented line
+                    if not line or line[0].isspace():
+                        continue
+                    token = line.split()[0]
+                    if "." not in token:
+                        continue
+                    available.add(token)
+                    available.add(token.rsplit(".", 1)[0])
+            else:
+                errstr = self.ch.getErrorString()
+                self.logger.log(LogPriority.DEBUG, "Failed to list available packages: " + str(errstr))
+
+        except Exception:
+            raise
+        return available
+
     def getInstall(self):
         return self.install
 
@@ -22,11 +22,11 @@ Created on Aug 08, 2012
 """
 
 import re
-import time
+import os
 
-from stonix_resources.stonixutilityfunctions import psRunning
 from stonix_resources.logdispatcher import LogPriority
 from stonix_resources.CommandHelper import CommandHelper
+from stonix_resources.PackageLock import getpackagelock
 
 
 class Zypper(object):
@@ -53,6 +53,7 @@ class Zypper(object):
     def __init__(self, logger):
         self.logger = logger
         self.ch = CommandHelper(self.logger)
+        self.pkglock = getpackagelock('zypper', self.logger)
         self.zyploc = "/usr/bin/zypper"
         self.install = self.zyploc + " --non-interactive --quiet install "
         self.remove = self.zyploc + " --non-interactive remove "
@@ -79,18 +80,11 @@ class Zypper(object):
         """
 
         installed = True
-        maxtries = 12
-        trynum = 0
 
-        while psRunning("zypper"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG, "Timed out while attempting to install package due to zypper package manager being in-use by another process.")
-                installed = False
-                return installed
-            else:
-                self.logger.log(LogPriority.DEBUG, "zypper package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to install package due to zypper package manager being in-use by another process.")
+            installed = False
+            return installed
 
         try:
 
@@ -128,18 +122,11 @@ class Zypper(object):
         """
 
         removed = True
-        maxtries = 12
-        trynum = 0
 
-        while psRunning("zypper"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG, "Timed out while attempting to remove package due to zypper package manager being in-use by another process.")
-                removed = False
-                return removed
-            else:
-                self.logger.log(LogPriority.DEBUG, "zypper package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to remove package due to zypper package manager being in-use by another process.")
+            removed = False
+            return removed
 
         try:
 
@@ -181,18 +168,11 @@ class Zypper(object):
         """
 
         installed = True
-        maxtries = 12
-        trynum = 0
 
-        while psRunning("zypper"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check status of  package due to zypper package manager being in-use by another process.")
-                installed = False
-                return installed
-            else:
-                self.logger.log(LogPriority.DEBUG, "zypper package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check status of  package due to zypper package manager being in-use by another process.")
+            installed = False
+            return installed
 
         try:
 
@@ -232,20 +212,11 @@ class Zypper(object):
 
         available = True
         found = False
-        maxtries = 12
-        trynum = 0
-
-        while psRunning("zypper"):
-            trynum += 1
-            if trynum == maxtries:
-                self.logger.log(LogPriority.DEBUG,
-                                "Timed out while attempting to check availability of package, due to zypper package manager being in-use by another process.")
-                available = False
-                return available
-            else:
-                self.logger.log(LogPriority.DEBUG,
-                                "zypper package manager is in-use by another process. Waiting for it to be freed...")
-                time.sleep(5)
+
+        if not self.pkglock.waitforunlock():
+            self.logger.log(LogPriority.DEBUG, "Timed out while attempting to check availability of package, due to zypper package manager being in-use by another process.")
+            available = False
+            return available
 
         try:
 
@@ -351,6 +322,76 @@ class Zypper(object):
             raise
         return updated
 
+    def listInstalled(self):
+        """return the names of all installed packages from a single rpm
+        query. Each package is listed both as name and as name.arch
+
+        :returns: installed; None if the query failed
+        :rtype: set
+
+        """
+
+        installed = None
+
+        try:
+
+            if not os.path.exists("/usr/bin/rpm"):
+                return installed
+
+            self.ch.executeCommand(["/usr/bin/rpm", "-qa", "--qf",
+                                    "%{NAME} %{ARCH}\\n"])
+            if self.ch.getReturnCode() == 0:
+                installed = set()
+                for line in self.ch.getOutput():
+                    fields = line.split()
+                    if len(fields) == 2:
+                        installed.add(fields[0])
+                        installed.add(fields[0] + "." + fields[1])
+            else:
+                errstr = self.ch.getErrorString()
+                self.logger.log(LogPriority.DEBUG, "Failed to list installed packages: " + str(errstr))
+
+        except Exception:
+            raise
+        return installed
+
+    def listAvailable(self):
+        """return the names of all packages which are available to install
+        and not installed, from a single zypper search
+
+        :returns: available; None if the query failed
+        :rtype: set
+
+        """
+
+        available = None
+
+        try:
+
+            if not os.path.exists(self.zyploc):
+                return available
+
+            self.ch.executeCommand(self.searchu.strip())
+            retcode = self.ch.getReturnCode()
+            if retcode in self.pkgnotfound:
+                available = set()
+            elif retcode in self.pkgerrs:
+                errstr = self.ch.getErrorString()
+                self.logger.log(LogPriority.DEBUG, "Failed to list available packages because:\n" + str(errstr))
+            else:
+                available = set()
+                for line in self.ch.getOutput():
+                    # S | Name | Summary | Type
+                    fields = [field.strip() for field in line.split("|")]
+                    if len(fields) < 4 or fields[1] == "Name":
+                        continue
+                    if fields[3] == "package":
+                        available.add(fields[1])
+
+        except Exception:
+            raise
+        return available
+
     def getPackageFromFile(self, filename):
         """Returns the name of the package that provides the given
         filename/path.
@@ -0,0 +1,153 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Created on Oct 18, 2026
+
+Runs the hermetic rule benchmarks of src/tests/lib/RuleBenchmark.py and
+compares them with the stored baseline of the profile. Run from the top of
+the source tree:
+
+    python src/tests/benchmarks/rulebenchmarks.py [options]
+
+The exit status is 1 if a rule got slower, used more memory or started more
+commands than the baseline allows. --update-baseline stores the results of
+the run as the new baseline instead.
+
+The framework still imports plistlib.readPlist, which was removed in Python
+3.9, so run the benchmarks with Python 3.8 or older. The stored baselines
+record the interpreter they were measured with.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+from optparse import OptionParser
+
+TOPDIR = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(
+    __file__)), '..', '..', '..'))
+# the tree for the src. imports, src for the stonix_resources package that
+# the framework modules import each other through
+sys.path.append(TOPDIR)
+sys.path.insert(0, os.path.join(TOPDIR, 'src'))
+from src.tests.lib.RuleBenchmark import FakeRoot, RuleBenchmark, PROFILES, \
+    loadbaseline, savebaseline, comparebaseline
+
+# rules whose reports cover files, accounts, packages, services and sysctl
+RULES = ['BlockSystemAccounts', 'CheckDupIDs', 'DisableIPV6',
+         'EnableKernelAuditing', 'MinimizeServices', 'NoEmptyPasswords',
+         'PasswordExpiration', 'RemoveSoftware', 'RemoveSUIDGames',
+         'SecureHomeDir', 'SecureSSH', 'SetDaemonUmask']
+
+BASELINEDIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def getbaselinepath(profile):
+    '''Return the path of the stored baseline of a profile
+
+    :param profile: string
+    :returns: string
+    '''
+    return os.path.join(BASELINEDIR, 'baseline-' + profile + '.json')
+
+
+def main():
+    parser = OptionParser(usage="  %prog [options]")
+    parser.add_option("-m", "--module", dest="rules", default="",
+                      help="Comma separated list of rules to benchmark. "
+                      "Defaults to " + ",".join(RULES))
+    parser.add_option("-p", "--profile", dest="profile", default="rhel7",
+                      help="Fake root to build: " +
+                      ", ".join(sorted(PROFILES)) + ". Default is rhel7.")
+    parser.add_option("-n", "--files", dest="files", type="int",
+                      default=5000,
+                      help="Number of files in the synthetic filesystem.")
+    parser.add_option("-u", "--users", dest="users", type="int", default=50,
+                      help="Number of login accounts.")
+    parser.add_option("--packages", dest="packages", type="int",
+                      default=500, help="Number of installed packages.")
+    parser.add_option("-r", "--repeat", dest="repeat", type="int", default=3,
+                      help="Timed runs of each report, the fastest is kept.")
+    parser.add_option("-b", "--baseline", dest="baseline", default="",
+                      help="Baseline file. Defaults to the stored baseline "
+                      "of the profile.")
+    parser.add_option("-t", "--tolerance", dest="tolerance", type="float",
+                      default=1.5,
+                      help="Factor by which times and memory may exceed "
+                      "the baseline. Default is 1.5.")
+    parser.add_option("--update-baseline", dest="update",
+                      action="store_true", default=False,
+                      help="Store the results as the new baseline.")
+    parser.add_option("--keep", dest="keep", action="store_true",
+                      default=False,
+                      help="Keep the fake root and print where it is.")
+    (opts, args) = parser.parse_args()
+    if opts.profile not in PROFILES:
+        parser.error("Unknown profile " + opts.profile)
+
+    rules = RULES
+    if opts.rules:
+        rules = [rule.strip() for rule in opts.rules.split(',')
+                 if rule.strip()]
+    baselinepath = opts.baseline or getbaselinepath(opts.profile)
+
+    rootdir = tempfile.mkdtemp(prefix='stonix-benchmark-')
+    try:
+        fakeroot = FakeRoot(rootdir, opts.profile, opts.files, opts.users,
+                            opts.packages).build()
+        results = RuleBenchmark(fakeroot, opts.repeat).run(rules)
+    finally:
+        if opts.keep:
+            print("Fake root kept in " + rootdir)
+        else:
+            shutil.rmtree(rootdir, ignore_errors=True)
+
+    print("%-24s %10s %10s %8s %8s %10s %8s" %
+          ("Rule", "wall s", "cpu s", "procs", "log", "peak KiB", "allocs"))
+    for rule in rules:
+        result = results[rule]
+        if result['error']:
+            print("%-24s %s" % (rule, "FAILED"))
+            continue
+        print("%-24s %10.4f %10.4f %8d %8d %10.1f %8d" %
+              (rule, result['wall_seconds'], result['cpu_seconds'],
+               result['subprocesses'], result['log_calls'],
+               result['peak_bytes'] / 1024.0, result['allocations']))
+
+    if opts.update:
+        savebaseline(baselinepath, results, fakeroot)
+        print("Baseline written to " + baselinepath)
+        return 0
+
+    baseline = loadbaseline(baselinepath)
+    for key, value in [('files', opts.files), ('users', opts.users),
+                       ('packages', opts.packages)]:
+        if key in baseline and baseline[key] != value:
+            print("Warning: the baseline was measured with %s=%s" %
+                  (key, baseline[key]))
+    regressions = comparebaseline(results, baseline, opts.tolerance,
+                                  opts.tolerance)
+    for regression in regressions:
+        print("REGRESSION " + regression)
+    if regressions:
+        return 1
+    print("No regressions against " + baselinepath)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the shared account database. Temporary files stand in for
+/etc/passwd, /etc/shadow, /etc/group and /etc/login.defs.
+'''
+
+import os
+import pwd
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.AccountDatabase import AccountDatabase
+
+
+class zzzTestFrameworkAccountDatabase(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.paths = {}
+        for name in ['passwd', 'shadow', 'group', 'logindefs']:
+            self.paths[name] = os.path.join(self.tmpdir, name)
+        self.writefile('passwd',
+                       'bin:x:1:1:bin:/bin:/sbin/nologin\n'
+                       'alice:x:1000:1000:Alice:/home/alice:/bin/bash\n'
+                       'bob:x:1001:100:Bob:/home/bob:/bin/bash\n'
+                       'toor:x:1000:1000::/home/alice:/bin/sh\n'
+                       'broken:x:abc:1::/:/bin/sh\n')
+        self.writefile('shadow',
+                       'alice:$6$salt$hash:19000:1:90:7::::\n'
+                       'bob::19000::::::\n')
+        self.writefile('group',
+                       'users:x:100:alice,bob\n'
+                       'alice:x:1000:\n')
+        self.writefile('logindefs',
+                       '# uid range\n'
+                       'UID_MIN                  1000\n'
+                       'UID_MAX                 60000\n')
+        self.accounts = AccountDatabase(self.logger, self.paths['passwd'],
+                                        self.paths['shadow'],
+                                        self.paths['group'],
+                                        self.paths['logindefs'])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def writefile(self, name, contents):
+        with open(self.paths[name], 'w') as fhandle:
+            fhandle.write(contents)
+
+    def testUsers(self):
+        users = self.accounts.getusers()
+        self.assertEqual([user.name for user in users],
+                         ['bin', 'alice', 'bob', 'toor'])
+        alice = self.accounts.getuser('alice')
+        self.assertEqual((alice.uid, alice.gid, alice.home, alice.shell),
+                         (1000, 1000, '/home/alice', '/bin/bash'))
+        self.assertIsNone(self.accounts.getuser('broken'))
+        self.assertEqual([user.name for user in
+                          self.accounts.getusersbyuid(1000)],
+                         ['alice', 'toor'])
+        self.assertEqual([user.name for user in
+                          self.accounts.getusersbyhome('/home/alice')],
+                         ['alice', 'toor'])
+        self.assertEqual([user.name for user in
+                          self.accounts.getusersbygid(100)], ['bob'])
+
+    def testGroups(self):
+        users = self.accounts.getgroup('users')
+        self.assertEqual(users.gid, 100)
+        self.assertEqual(users.members, ['alice', 'bob'])
+        self.assertEqual(self.accounts.getgroupsbygid(1000)[0].members, [])
+        self.assertIsNone(self.accounts.getgroup('wheel'))
+
+    def testShadow(self):
+        alice = self.accounts.getshadow('alice')
+        self.assertEqual((alice.lastchg, alice.minimum, alice.maximum,
+                          alice.warn, alice.inactive),
+                         (19000, 1, 90, 7, None))
+        self.assertEqual(self.accounts.getshadow('bob').password, '')
+        self.assertIsNone(self.accounts.getshadow('bin'))
+
+    def testLoginDefs(self):
+        self.assertEqual(self.accounts.getuidmin(), 1000)
+        self.assertEqual(self.accounts.getlogindef('uid_max'), '60000')
+        self.writefile('logindefs', 'UID_MIN notanumber\n')
+        self.assertEqual(self.accounts.getuidmin(500), 500)
+
+    def testChangedFile(self):
+        first = self.accounts.getusers()
+        self.assertEqual(self.accounts.getusers(), first)
+        with open(self.paths['passwd'], 'a') as fhandle:
+            fhandle.write('carol:x:1002:100::/home/carol:/bin/bash\n')
+        self.assertEqual(self.accounts.getuser('carol').uid, 1002)
+
+    def testRemotePolicy(self):
+        # the accounts of this system are not in the test files
+        remote = pwd.getpwall()[0]
+        self.assertIsNone(self.accounts.getuser(remote.pw_name))
+        self.assertEqual(self.accounts.getuser(remote.pw_name,
+                                               remote=True).uid,
+                         remote.pw_uid)
+        self.accounts.setremote(True)
+        users = self.accounts.getusers()
+        self.assertTrue(users[-1].remote)
+        self.assertFalse(users[0].remote)
+        self.assertEqual(len(self.accounts.getusers(remote=False)), 4)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Benchmark and consistency checks for the compiled applicability predicates.
+The interpretive evaluation Rule.isapplicable did before is kept here as the
+reference; the compiled predicates must agree with it and be faster.
+Results are printed as evaluations per second.
+'''
+
+import re
+import sys
+import time
+import unittest
+from distutils.version import LooseVersion
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.logdispatcher import LogPriority
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.rule import Rule
+from src.stonix_resources.CheckApplicable import evaluateapplicable, \
+    evaluaterules, fingerprint
+
+PASSES = 50
+
+APPLICABLES = [
+    {'default': 'default'},
+    {'type': 'white', 'family': ['linux']},
+    {'type': 'white', 'family': 'linux'},
+    {'type': 'black', 'family': ['darwin']},
+    {'type': 'white', 'os': {'Mac OS X': ['10.15', 'r', '10.16']}},
+    {'type': 'white', 'os': {'Red Hat Enterprise Linux': ['7.0', '+'],
+                             'CentOS': ['7.0', '+']}},
+    {'type': 'white', 'os': {'Ubuntu': ['16.04', '-']}},
+    {'type': 'white', 'family': ['linux'], 'fisma': 'high'},
+    {'type': 'white', 'family': ['linux', 'solaris'], 'noroot': True},
+    {'type': 'black', 'os': {'Fedora': ['28']}, 'fisma': 'med'},
+]
+
+
+class FakeEnviron(object):
+    '''Stands in for the environment so every branch can be exercised'''
+
+    def __init__(self, family, ostype, osver, euid, fismacat):
+        self.values = (family, ostype, osver, euid, fismacat)
+
+    def getosfamily(self):
+        return self.values[0]
+
+    def getostype(self):
+        return self.values[1]
+
+    def getosver(self):
+        return self.values[2]
+
+    def geteuid(self):
+        return self.values[3]
+
+    def getsystemfismacat(self):
+        return self.values[4]
+
+
+def oldapplicable(applicable, environ, logger=None):
+    '''Applicability as Rule.isapplicable evaluated it on every call'''
+    if logger:
+        logger.log(LogPriority.DEBUG, 'Check applicability for rule')
+        logger.log(LogPriority.DEBUG, 'Dictionary is: ' + str(applicable))
+    if 'os' not in applicable and 'family' not in applicable and \
+       applicable.get('default') == 'default':
+        return True
+    listtype = applicable.get('type', 'black')
+    applies = listtype == 'black'
+    if 'family' in applicable and \
+       environ.getosfamily() in applicable['family']:
+        applies = listtype == 'white'
+    for ostype, osverlist in list(applicable.get('os', {}).items()):
+        if not re.search(ostype, environ.getostype()):
+            continue
+        myver = environ.getosver()
+        if '+' in osverlist:
+            base = osverlist[0] if osverlist[1] == '+' else osverlist[1]
+            matched = LooseVersion(myver) >= LooseVersion(base)
+        elif '-' in osverlist:
+            base = osverlist[0] if osverlist[1] == '-' else osverlist[1]
+            matched = LooseVersion(myver) <= LooseVersion(base)
+        elif 'r' in osverlist:
+            ends = [ver for ver in osverlist if ver != 'r']
+            low = min(LooseVersion(ends[0]), LooseVersion(ends[1]))
+            high = max(LooseVersion(ends[0]), LooseVersion(ends[1]))
+            matched = low <= LooseVersion(myver) <= high
+        else:
+            matched = myver in osverlist
+        if matched:
+            applies = listtype == 'white'
+    if applies and environ.geteuid() == 0 and applicable.get('noroot'):
+        applies = False
+    if applies:
+        rulefisma = applicable.get('fisma', '')
+        cat = environ.getsystemfismacat()
+        if cat == 'med' and rulefisma == 'high':
+            applies = False
+        elif cat == 'low' and rulefisma in ['med', 'high']:
+            applies = False
+    return applies
+
+
+class zzzTestFrameworkApplicabilityBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.environ = Environment()
+        self.logger = LogDispatcher(self.environ)
+        self.environs = [
+            FakeEnviron('linux', 'Red Hat Enterprise Linux', '7.6', 0,
+                        'low'),
+            FakeEnviron('linux', 'CentOS Linux', '6.10', 1000, 'high'),
+            FakeEnviron('linux', 'Ubuntu', '16.04', 0, 'med'),
+            FakeEnviron('linux', 'Fedora', '28', 0, 'high'),
+            FakeEnviron('darwin', 'Mac OS X', '10.15.7', 501, 'low'),
+            FakeEnviron('solaris', 'SunOS', '5.11', 1000, 'med')]
+
+    def makerules(self):
+        rules = []
+        for applicable in APPLICABLES:
+            rule = Rule(None, self.environ, self.logger, None)
+            rule.applicable = applicable
+            rules.append(rule)
+        return rules
+
+    def testMatchesReference(self):
+        for environ in self.environs:
+            for applicable in APPLICABLES:
+                self.assertEqual(evaluateapplicable(applicable, environ,
+                                                    self.logger),
+                                 oldapplicable(applicable, environ),
+                                 '%s on %s' % (applicable, environ.values))
+
+    def testRangeNotMutated(self):
+        applicable = {'type': 'white',
+                      'os': {'Mac OS X': ['10.15', 'r', '10.16']}}
+        environ = self.environs[4]
+        self.assertTrue(evaluateapplicable(applicable, environ, self.logger))
+        self.assertEqual(applicable['os']['Mac OS X'], ['10.15', 'r', '10.16'])
+
+    def testBadListTypeRaises(self):
+        self.assertRaises(AssertionError, evaluateapplicable,
+                          {'type': 'grey', 'family': ['linux']},
+                          self.environs[0], self.logger)
+
+    def testEvaluateRules(self):
+        rules = self.makerules()
+        results = evaluaterules(rules, self.environ, self.logger)
+        self.assertEqual(results, [rule.isapplicable() for rule in rules])
+
+    def testEvaluationRate(self):
+        environ = self.environs[0]
+
+        def old():
+            for applicable in APPLICABLES:
+                oldapplicable(applicable, environ, self.logger)
+
+        def new():
+            envprint = fingerprint(environ)
+            for applicable in APPLICABLES:
+                evaluateapplicable(applicable, environ, self.logger, '',
+                                   envprint)
+
+        counts = []
+        for func in [old, new]:
+            start = time.time()
+            for _ in range(PASSES):
+                func()
+            elapsed = max(time.time() - start, 1e-9)
+            counts.append(PASSES * len(APPLICABLES) / elapsed)
+        print('\napplicability evaluations/sec before: %.0f after: %.0f' %
+              tuple(counts))
+        self.assertGreater(counts[1], counts[0])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the canonical audit rule index. A temporary directory stands
+in for /etc/audit/rules.d.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.AuditRules import AuditRules, canonicalize
+
+BASE = '''## First rule - delete all
+-D
+-b 320
+-a never,task
+-w /etc/passwd -p aw -k identity
+'''
+
+LOCAL = '''-a exit,always -F auid!=-1 -S open,creat -F arch=b64 -F auid>=1000 -F key=access
+-a always,exit -F arch=b64 -S unlink -S rename -k delete
+-w /etc/passwd -p wa -k identity
+'''
+
+BADRULES = ["^-a\\s+(task,never|never,task)",
+            "^-a.*-S\\s+(unlink|rename).*-k\\s+delete"]
+
+
+class zzzTestFrameworkAuditRules(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.rulesdir = os.path.join(self.tmpdir, 'rules.d')
+        os.mkdir(self.rulesdir)
+        self.rulesfile = os.path.join(self.tmpdir, 'audit.rules')
+        self.writefile('10-base.rules', BASE)
+        self.writefile('50-local.rules', LOCAL)
+        self.writefile('README', '-w /etc/shadow -p wa\n')
+        self.rules = AuditRules(self.logger, self.rulesdir, self.rulesfile)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def writefile(self, name, contents):
+        with open(os.path.join(self.rulesdir, name), 'w') as fhandle:
+            fhandle.write(contents)
+
+    def testCanonicalize(self):
+        self.assertEqual(canonicalize('-w /etc/selinux/ -p wa -k MAC'),
+                         canonicalize('-w /etc/selinux -p aw -F key=MAC'))
+        self.assertEqual(
+            canonicalize('-a always,exit -F arch=b64 -S creat -S open '
+                         '-F auid>=1000 -F auid!=4294967295 -k access'),
+            canonicalize(LOCAL.splitlines()[0]))
+        self.assertNotEqual(canonicalize('-a always,exit -S open -k a'),
+                            canonicalize('-a never,exit -S open -k a'))
+        self.assertIsNone(canonicalize('  # comment'))
+        self.assertEqual(canonicalize('-b 8192'), ('control', '-b', '8192'))
+
+    def testMissing(self):
+        self.assertEqual([os.path.basename(path)
+                          for path in self.rules.rulesfiles()],
+                         ['10-base.rules', '50-local.rules'])
+        desired = ['-w /etc/passwd -p wa -k identity',
+                   '-w /etc/shadow -p wa -k identity',
+                   '-a always,exit -F arch=b64 -S open -S creat '
+                   '-F auid>=1000 -F auid!=4294967295 -k access']
+        self.assertEqual(self.rules.missing(desired), [desired[1]])
+        self.assertEqual(len(self.rules.getindex()[canonicalize(desired[0])]),
+                         2)
+        self.writefile('60-more.rules', desired[1] + '\n')
+        self.assertEqual(self.rules.missing(desired), [])
+
+    def testStrip(self):
+        contents, removed = self.rules.strip(
+            os.path.join(self.rulesdir, '50-local.rules'), BADRULES)
+        self.assertEqual([rule.lineno for rule in removed], [2])
+        self.assertEqual(contents, LOCAL.splitlines(True)[0] +
+                         LOCAL.splitlines(True)[2])
+        self.assertEqual(len(self.rules.findrules(BADRULES)), 2)
+
+    def testGenerated(self):
+        path = os.path.join(self.rulesdir, 'stonix.rules')
+        contents = self.rules.rendergenerated(
+            path, ['-w /etc/passwd -p wa -k identity',
+                   '-w /etc/group -p wa -k identity',
+                   '-w /etc/group -p aw -k identity'], '# generated\n')
+        self.assertEqual(contents, '# generated\n'
+                         '-w /etc/group -p wa -k identity\n-e 2\n')
+        self.writefile('stonix.rules', '# This file created by STONIX\n\n' +
+                       contents)
+        self.assertTrue(self.rules.isuptodate(path, contents))
+        self.assertEqual(self.rules.rendergenerated(
+            path, ['-w /etc/group -p wa -k identity'], '# generated\n'),
+            contents)
+
+    def testCompile(self):
+        lines = [rule.line for rule in self.rules.getrules()]
+        self.assertEqual(self.rules.compile(lines, BADRULES),
+                         '-D\n-b 320\n'
+                         '-w /etc/passwd -p aw -k identity\n' +
+                         LOCAL.splitlines(True)[0] + '-e 2\n')
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the shared boot loader model. Temporary files stand in for
+/etc/default/grub, grub.cfg, grubenv, the BLS entries and grub.conf.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.BootLoader import BootLoader, applyargs
+
+TEMPLATE = '''GRUB_TIMEOUT=5
+GRUB_CMDLINE_LINUX="crashkernel=auto rhgb quiet audit=0"
+GRUB_CMDLINE_LINUX_DEFAULT='splash' # desktop only
+GRUB_ENABLE_BLSCFG=true
+'''
+
+GRUBCFG = '''set default_kernelopts="root=/dev/sda1 ro"
+insmod blscfg
+blscfg
+menuentry 'Old kernel' --class os {
+	linux16 /vmlinuz-old root=/dev/sda1 ro crashkernel=auto audit=1
+}
+menuentry 'Memory test' {
+	linux16 /memtest86+.bin
+}
+'''
+
+BLSENTRY = '''title Linux (5.3.7)
+version 5.3.7
+linux /vmlinuz-5.3.7
+options $kernelopts audit=1
+'''
+
+BLSRESCUE = '''title Linux (0-rescue)
+linux /vmlinuz-0-rescue
+options root=/dev/sda1 ro
+'''
+
+BLSSTATIC = '''title Linux (5.2.9)
+linux /vmlinuz-5.2.9
+options root=/dev/sda1 ro
+'''
+
+
+class RecordingStateChgLogger(object):
+    '''Keeps the change events and file changes it is asked to record'''
+
+    def __init__(self):
+        self.events = []
+        self.filechanges = []
+        self.synced = []
+
+    def recordchgevent(self, eventid, event):
+        self.events.append((eventid, event))
+
+    def recordfilechange(self, oldfile, newfile, eventid):
+        self.filechanges.append((oldfile, open(newfile).read(), eventid))
+
+    def syncrule(self, ruleid):
+        self.synced.append(ruleid)
+
+LEGACY = '''default=0
+title Red Hat Enterprise Linux (2.6.32)
+	root (hd0,0)
+	kernel /vmlinuz-2.6.32 ro root=/dev/sda1 rhgb quiet
+	initrd /initramfs-2.6.32.img
+'''
+
+
+class zzzTestFrameworkBootLoader(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.blsdir = os.path.join(self.tmpdir, 'entries')
+        os.mkdir(self.blsdir)
+        self.paths = {}
+        for name in ['grub', 'grub.cfg', 'grubenv', 'grub.conf',
+                     'mkconfig', 'mkconfig.log']:
+            self.paths[name] = os.path.join(self.tmpdir, name)
+        self.bootloader = BootLoader(self.logger, self.paths['grub'],
+                                     [self.paths['grub.cfg']],
+                                     [self.paths['grub.conf']],
+                                     [self.paths['grubenv']], self.blsdir,
+                                     [self.paths['mkconfig']])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def writefile(self, name, contents):
+        path = self.paths.get(name, os.path.join(self.blsdir, name))
+        with open(path, 'w') as fhandle:
+            fhandle.write(contents)
+
+    def readfile(self, name):
+        with open(self.paths.get(name, os.path.join(self.blsdir, name))) \
+                as fhandle:
+            return fhandle.read()
+
+    def writegrub2(self):
+        self.writefile('grub', TEMPLATE)
+        self.writefile('grub.cfg', GRUBCFG)
+        self.writefile('grubenv', '# GRUB Environment Block\n'
+                       'kernelopts=root=/dev/sda1 ro crashkernel=auto\n'
+                       '########\n')
+        self.writefile('linux.conf', BLSENTRY)
+        self.writefile('rescue.conf', BLSRESCUE)
+
+    def testApplyArgs(self):
+        self.assertEqual(applyargs(['ro', 'audit=0', 'fips=1'],
+                                   ['audit=1', 'nousb'], ['fips=1']),
+                         ['ro', 'audit=1', 'nousb'])
+
+    def testEntries(self):
+        self.writegrub2()
+        self.assertEqual(self.bootloader.getversion(), 2)
+        self.assertEqual(self.bootloader.gettemplateargs(),
+                         ['crashkernel=auto', 'rhgb', 'quiet', 'audit=0',
+                          'splash'])
+        entries = self.bootloader.getentries()
+        self.assertEqual([entry.title for entry in entries],
+                         ['Old kernel', 'Memory test', 'Linux (5.3.7)',
+                          'Linux (0-rescue)'])
+        # $kernelopts comes from grubenv
+        self.assertEqual(entries[2].args, ['root=/dev/sda1', 'ro',
+                                           'crashkernel=auto', 'audit=1'])
+        self.assertEqual(entries[2].lineno, 4)
+        self.assertEqual([self.bootloader.isrecovery(entry)
+                          for entry in entries], [False, True, False, True])
+
+    def testHasArg(self):
+        self.writegrub2()
+        # on every entry but not in the template
+        self.assertFalse(self.bootloader.hasarg('audit=1'))
+        self.assertTrue(self.bootloader.hasarg('crashkernel=auto'))
+        self.assertTrue(self.bootloader.isset('audit=0'))
+        self.assertFalse(self.bootloader.isset('nousb'))
+        self.assertEqual(self.bootloader.missing(['audit=1', 'ro']),
+                         ['audit=1', 'ro'])
+        self.assertIn('GRUB_CMDLINE_LINUX', self.bootloader.describe('ro'))
+        self.writefile('grub', TEMPLATE.replace('audit=0', 'audit=1'))
+        self.assertEqual(self.bootloader.missing(['audit=1']), [])
+
+    def testRender(self):
+        self.writegrub2()
+        path, contents, changed = self.bootloader.render(
+            add=['audit=1', 'nousb', 'splash'], remove=['quiet'])
+        self.assertEqual(path, self.paths['grub'])
+        self.assertTrue(changed)
+        self.assertEqual(contents.splitlines()[1],
+                         'GRUB_CMDLINE_LINUX="crashkernel=auto rhgb '
+                         'audit=1 nousb"')
+        self.assertEqual(contents.splitlines()[2],
+                         "GRUB_CMDLINE_LINUX_DEFAULT='splash' "
+                         "# desktop only")
+        self.writefile('grub', contents)
+        self.assertFalse(self.bootloader.render(add=['nousb'])[2])
+
+    def testRenderMissingKey(self):
+        self.writefile('grub', 'GRUB_TIMEOUT=5')
+        contents = self.bootloader.render(add=['nousb'])[1]
+        self.assertEqual(contents, 'GRUB_TIMEOUT=5\n'
+                         'GRUB_CMDLINE_LINUX="nousb"\n')
+
+    def testRegenerate(self):
+        self.writegrub2()
+        self.writefile('static.conf', BLSSTATIC)
+        self.writefile('mkconfig', '#!/bin/sh\n'
+                       'echo "$@" >> ' + self.paths['mkconfig.log'] + '\n')
+        os.chmod(self.paths['mkconfig'], 0o755)
+        path, contents, _ = self.bootloader.render(add=['nousb'])
+        self.writefile('grub', contents)
+        self.assertEqual(self.bootloader.missing(['nousb']), ['nousb'])
+        self.bootloader.schedule(add=['nousb'])
+        self.assertTrue(self.bootloader.ispending())
+        # the entries are taken to carry the change until grub.cfg is
+        # generated
+        self.assertEqual(self.bootloader.missing(['nousb']), [])
+        self.assertTrue(self.bootloader.regenerate())
+        self.assertFalse(self.bootloader.ispending())
+        self.assertTrue(self.bootloader.regenerate())
+        self.assertEqual(self.readfile('mkconfig.log'),
+                         '-o ' + self.paths['grub.cfg'] + '\n')
+        # literal options are rewritten, $kernelopts is left to grubenv
+        # and recovery entries are left alone
+        self.assertEqual(self.readfile('static.conf').splitlines()[2],
+                         'options root=/dev/sda1 ro nousb')
+        self.assertEqual(self.readfile('linux.conf'), BLSENTRY)
+        self.assertEqual(self.readfile('rescue.conf'), BLSRESCUE)
+
+    def testRegenerateRecordsEvents(self):
+        self.writegrub2()
+        self.writefile('static.conf', BLSSTATIC)
+        self.writefile('mkconfig', '#!/bin/sh\n')
+        os.chmod(self.paths['mkconfig'], 0o755)
+        statechglogger = RecordingStateChgLogger()
+        self.bootloader.schedule(add=['audit=1'], rulenumber=67)
+        self.bootloader.schedule(add=['nousb'], rulenumber=29)
+        self.assertTrue(self.bootloader.regenerate(statechglogger))
+        path = os.path.join(self.blsdir, 'static.conf')
+        self.assertEqual(statechglogger.events,
+                         [('0067901', {'eventtype': 'conf',
+                                       'filepath': path}),
+                          ('0029901', {'eventtype': 'conf',
+                                       'filepath': path})])
+        self.assertEqual([change[2] for change in
+                          statechglogger.filechanges], ['0067901', '0029901'])
+        self.assertEqual(statechglogger.synced, [67, 29])
+        self.assertEqual(self.readfile('static.conf').splitlines()[2],
+                         'options root=/dev/sda1 ro audit=1 nousb')
+
+    def testScheduleChanged(self):
+        self.writegrub2()
+        stamp = self.bootloader.getstamp(self.paths['grub'])
+        self.bootloader.schedulechanged(stamp)
+        self.assertFalse(self.bootloader.ispending())
+        # an undo restores the template
+        self.writefile('grub', TEMPLATE.replace(' audit=0', ''))
+        self.bootloader.schedulechanged(stamp)
+        self.assertTrue(self.bootloader.ispending())
+
+    def testLegacy(self):
+        self.writefile('grub.conf', LEGACY)
+        self.assertEqual(self.bootloader.getversion(), 1)
+        self.assertEqual(self.bootloader.missing(['audit=1', 'quiet']),
+                         ['audit=1'])
+        path, contents, changed = self.bootloader.render(add=['audit=1'],
+                                                         remove=['rhgb'])
+        self.assertEqual(path, self.paths['grub.conf'])
+        self.assertEqual(contents.splitlines()[3],
+                         '\tkernel /vmlinuz-2.6.32 ro root=/dev/sda1 quiet '
+                         'audit=1')
+        self.bootloader.schedule(add=['audit=1'])
+        self.assertFalse(self.bootloader.ispending())
+
+if __name__ == "__main__":
+    unittest.main()
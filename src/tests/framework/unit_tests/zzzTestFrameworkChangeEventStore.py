@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the ChangeEventStore module. The journal and the old shelve
+eventlog live in a temporary directory.
+'''
+
+import os
+import sys
+import shelve
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.ChangeEventStore import ChangeEventStore
+
+
+class zzzTestFrameworkChangeEventStore(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.journal = os.path.join(self.tmpdir, 'eventjournal')
+        self.oldlog = os.path.join(self.tmpdir, 'eventlog')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def openstore(self):
+        return ChangeEventStore(self.logger, self.journal, self.oldlog)
+
+    def testRecordAndReopen(self):
+        store = self.openstore()
+        store.record('0011001', {'eventtype': 'conf', 'filepath': '/a'})
+        store.record('0011002', {'eventtype': 'creation', 'filepath': '/b'})
+        store.record('0012001', {'eventtype': 'perm', 'filepath': '/c',
+                                 'startstate': [0, 0, 0o644]})
+        store.delete('0011001')
+        store.close()
+        self.assertEqual(os.stat(self.journal).st_mode & 0o777, 0o600)
+        store = self.openstore()
+        self.assertEqual(store.rulekeys('0011'), ['0011002'])
+        self.assertEqual(store.rulekeys('0012'), ['0012001'])
+        self.assertEqual(store.rulekeys('0099'), [])
+        self.assertEqual(store.get('0012001')['startstate'], [0, 0, 0o644])
+        self.assertRaises(KeyError, store.get, '0011001')
+        self.assertRaises(KeyError, store.delete, '0011001')
+        store.close()
+        store.close()
+
+    def testTruncatedTail(self):
+        store = self.openstore()
+        store.record('0011001', {'eventtype': 'conf', 'filepath': '/a'})
+        store.record('0011002', {'eventtype': 'conf', 'filepath': '/b'})
+        store.close()
+        size = os.path.getsize(self.journal)
+        with open(self.journal, 'r+b') as fhandle:
+            fhandle.truncate(size - 3)
+        store = self.openstore()
+        self.assertEqual(store.keys(), ['0011001'])
+        store.record('0011003', {'eventtype': 'conf', 'filepath': '/c'})
+        store.close()
+        self.assertEqual(self.openstore().keys(), ['0011001', '0011003'])
+
+    def testSyncPerRule(self):
+        store = self.openstore()
+        store.record('0011001', {'eventtype': 'conf', 'filepath': '/a'})
+        self.assertEqual(store.pending, set(['0011']))
+        store.sync('0012')
+        self.assertEqual(store.npending, 1)
+        store.sync('0011')
+        self.assertEqual(store.npending, 0)
+        store.close()
+
+    def testMigrateShelve(self):
+        oldlog = shelve.open(self.oldlog, 'c')
+        oldlog['0011001'] = {'eventtype': 'conf', 'filepath': '/a'}
+        oldlog['0012001'] = {'eventtype': 'comm', 'command': ['/bin/true']}
+        oldlog.close()
+        store = self.openstore()
+        self.assertEqual(store.rulekeys('0012'), ['0012001'])
+        self.assertEqual(store.get('0011001')['filepath'], '/a')
+        store.close()
+        leftover = [name for name in os.listdir(self.tmpdir)
+                    if name.startswith('eventlog')]
+        self.assertTrue(leftover)
+        self.assertTrue(all(name.endswith('.migrated') for name in leftover))
+        # the journal now exists so the migration is not repeated
+        store = self.openstore()
+        self.assertEqual(len(store), 2)
+        store.close()
+
+    def testCompaction(self):
+        store = self.openstore()
+        for num in range(600):
+            store.record('0011001', {'eventtype': 'conf', 'count': num})
+        store.close()
+        store = self.openstore()
+        self.assertEqual(store.nrecords, 1)
+        self.assertEqual(store.get('0011001')['count'], 599)
+        store.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -38,8 +38,11 @@ Perform tests on different parts of the functionality for framework CommandHelpe
 
 
 
+import os
 import unittest
 import sys
+import time
+import tempfile
 
 sys.path.append("../../../..")
 from src.tests.lib.logdispatcher_lite import LogPriority
@@ -92,6 +95,43 @@ class zzzTestFrameworkCommandHelper(unittest.TestCase):
                         "Execute commandhelper.executeCommand(['ls','-l','/'])"
                         + " Command List Failed!")
 
+    def testTimeoutKillsProcessGroup(self):
+        '''A timed out command and the processes it started are killed
+        without waiting for them to finish'''
+
+        marker = tempfile.mktemp()
+        self.commandhelper.cmdtimeout = 1
+        start = time.time()
+        self.assertFalse(self.commandhelper.executeCommand(
+            "(sleep 3; touch " + marker + ") & sleep 30"))
+        self.assertLess(time.time() - start, 10)
+        self.assertEqual(self.commandhelper.getReturnCode(), -1)
+        time.sleep(3)
+        self.assertFalse(os.path.exists(marker))
+
+    def testTimeoutNotReached(self):
+        ''' '''
+
+        self.commandhelper.cmdtimeout = 10
+        self.assertTrue(self.commandhelper.executeCommand(["echo", "done"]))
+        self.assertEqual(self.commandhelper.getOutputString().strip(), "done")
+        self.assertEqual(self.commandhelper.getReturnCode(), 0)
+
+    def testExecuteCommands(self):
+        '''Batched commands run at the same time and report their own
+        results'''
+
+        commands = [["sh", "-c", "sleep 1; echo " + str(num) + "; exit " +
+                     str(num)] for num in range(4)]
+        start = time.time()
+        helpers = self.commandhelper.executeCommands(commands, workers=4)
+        self.assertLess(time.time() - start, 3.5)
+        self.assertEqual([helper.getReturnCode() for helper in helpers],
+                         [0, 1, 2, 3])
+        self.assertEqual([helper.getOutputString().strip() for helper in
+                          helpers], ["0", "1", "2", "3"])
+        self.assertEqual(self.commandhelper.executeCommands([]), [])
+
 if __name__ == "__main__":
     #import sys;sys.argv = ['', 'Test.testName']
     unittest.main()
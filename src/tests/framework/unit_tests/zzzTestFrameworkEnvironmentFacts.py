@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the lazily collected and cached facts of Environment.
+'''
+
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+import src.stonix_resources.environment as environment
+
+
+class zzzTestFrameworkEnvironmentFacts(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.cachefile = os.path.join(self.tmpdir, 'db', 'environment.cache')
+        environment.clearfactcache()
+
+    def tearDown(self):
+        environment.clearfactcache()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def getenviron(self):
+        environ = environment.Environment()
+        environ.factcache = self.cachefile
+        return environ
+
+    def readcache(self):
+        with open(self.cachefile, 'r') as cachefile:
+            return json.load(cachefile)
+
+    def testLazyFacts(self):
+        environ = self.getenviron()
+        self.assertNotIn('osversion', environ.facts)
+        self.assertNotIn('hostname', environ.facts)
+        osversion = environ.getosver()
+        self.assertIn('osversion', environ.facts)
+        self.assertNotIn('hostname', environ.facts)
+        self.assertEqual(environ.osversion, osversion)
+        self.assertEqual(list(self.readcache()['groups']), ['os'])
+        # another instance of this process does not collect them again
+        other = environment.Environment()
+        other.discoveros = None
+        self.assertEqual(other.getosver(), osversion)
+
+    def testCachedFacts(self):
+        environ = self.getenviron()
+        osfamily = environ.getosfamily()
+        hostname = environ.gethostname()
+        environment.clearfactcache()
+
+        cached = self.getenviron()
+        cached.sethostname = None
+        self.assertEqual(cached.gethostname(), hostname)
+        self.assertEqual(cached.getosfamily(), osfamily)
+
+        # a fact set by the caller is not replaced by the cache
+        cached.osreportstring = 'test os'
+        self.assertEqual(cached.getosreportstring(), 'test os')
+
+    def testCachePermissions(self):
+        '''the cache holds host identifiers and is private to its owner'''
+        environ = self.getenviron()
+        environ.getosver()
+        self.assertEqual(os.stat(self.cachefile).st_mode & 0o777, 0o600)
+        self.assertEqual(os.stat(os.path.dirname(self.cachefile)).st_mode &
+                         0o777, 0o700)
+        self.assertEqual(os.listdir(os.path.dirname(self.cachefile)),
+                         ['environment.cache'])
+
+    def testInvalidCache(self):
+        environ = self.getenviron()
+        environ.getosver()
+        cache = self.readcache()
+        cache['groups']['os']['facts']['osversion'] = 'cached'
+        cache['groups']['os']['stamps'] = {'/etc/os-release': 0}
+        with open(self.cachefile, 'w') as cachefile:
+            json.dump(cache, cachefile)
+        environment.clearfactcache()
+        self.assertNotEqual(self.getenviron().getosver(), 'cached')
+
+        cache = self.readcache()
+        cache['version'] = 'old'
+        cache['groups']['os']['facts']['osversion'] = 'cached'
+        with open(self.cachefile, 'w') as cachefile:
+            json.dump(cache, cachefile)
+        environment.clearfactcache()
+        self.assertNotEqual(self.getenviron().getosver(), 'cached')
+        self.assertNotEqual(self.readcache()['version'], 'old')
+
+        with open(self.cachefile, 'w') as cachefile:
+            cachefile.write('not json')
+        environment.clearfactcache()
+        self.assertTrue(self.getenviron().getosver())
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the background error digest of the logdispatcher, mailed to a
+local stand-in for the mail relay.
+'''
+
+import sys
+import time
+import socket
+import threading
+import unittest
+import socketserver
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.logdispatcher import ErrorReporter
+
+
+class SMTPHandler(socketserver.StreamRequestHandler):
+    '''Stand-in for the mail relay, speaks just enough SMTP for smtplib and
+    records the sessions and messages it receives'''
+
+    def reply(self, line):
+        self.wfile.write((line + '\r\n').encode('utf-8'))
+
+    def handle(self):
+        self.server.sessions += 1
+        self.reply('220 localhost ESMTP stand-in')
+        while True:
+            line = self.rfile.readline().decode('utf-8')
+            if not line:
+                break
+            command = line[:4].upper()
+            if command == 'DATA':
+                self.reply('354 end data with <CR><LF>.<CR><LF>')
+                data = []
+                while True:
+                    line = self.rfile.readline().decode('utf-8')
+                    if line in ['.\r\n', '']:
+                        break
+                    data.append(line)
+                self.server.messages.append(''.join(data))
+                self.reply('250 OK')
+            elif command == 'QUIT':
+                self.reply('221 bye')
+                break
+            else:
+                self.reply('250 OK')
+
+
+class zzzTestFrameworkErrorReporter(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.server = socketserver.ThreadingTCPServer(('127.0.0.1', 0),
+                                                      SMTPHandler)
+        self.server.daemon_threads = True
+        self.server.sessions = 0
+        self.server.messages = []
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.relay = '127.0.0.1:%d' % self.server.server_address[1]
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def getreporter(self, relay, **kwargs):
+        return ErrorReporter(self.enviro, self.logger, relay,
+                             'stonix@localhost', 'devs@localhost', **kwargs)
+
+    def testDigest(self):
+        reporter = self.getreporter(self.relay, maxperrule=2)
+        for _ in range(3):
+            reporter.submit('Traceback: same error', 'SecureSSH:fix:')
+        reporter.submit('Traceback: other error', 'SecureSSH:report:')
+        for num in range(5):
+            reporter.submit('error %d' % num, 'ConfigureAIDE:report:')
+        reporter.close()
+        self.assertTrue(reporter.sent)
+        self.assertEqual(self.server.sessions, 1)
+        self.assertEqual(len(self.server.messages), 1)
+        message = self.server.messages[0]
+        self.assertIn('Subject: STONIX Error Report: 9 errors in 2 rules',
+                      message)
+        self.assertEqual(message.count('Traceback: same error'), 1)
+        self.assertIn('SecureSSH:fix: (reported 3 times)\r\n', message)
+        self.assertIn('error 1', message)
+        self.assertNotIn('error 2', message)
+        self.assertIn('3 further errors from ConfigureAIDE were not included',
+                      message)
+        # errors after the digest was sent are dropped
+        reporter.submit('late error', 'SecureSSH:fix:')
+        reporter.close()
+        self.assertEqual(len(self.server.messages), 1)
+
+    def testNoErrors(self):
+        reporter = self.getreporter(self.relay)
+        reporter.close()
+        self.assertFalse(reporter.sent)
+        self.assertEqual(self.server.sessions, 0)
+
+    def testUnresponsiveRelay(self):
+        # a relay which accepts connections but never answers
+        listener = socket.socket()
+        listener.bind(('127.0.0.1', 0))
+        listener.listen(5)
+        try:
+            reporter = self.getreporter('127.0.0.1:%d' %
+                                        listener.getsockname()[1], timeout=1)
+            start = time.time()
+            for num in range(1000):
+                reporter.submit('error %d' % num, 'SecureSSH:fix:')
+            self.assertLess(time.time() - start, 0.5)
+            reporter.close()
+            self.assertFalse(reporter.sent)
+            self.assertLess(time.time() - start, 7)
+        finally:
+            listener.close()
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the FilesystemInventory module. Builds a small tree in a
+temporary directory and checks the inventory queries against it.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources import FilesystemInventory as fsinventory
+from src.stonix_resources.FilesystemInventory import FilesystemInventory
+
+
+class zzzTestFrameworkFilesystemInventory(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.root = tempfile.mkdtemp()
+        self.libdir = os.path.join(self.root, 'lib')
+        os.makedirs(os.path.join(self.root, 'a', 'b'))
+        os.makedirs(self.libdir)
+        self.wwfile = self.touch(os.path.join(self.root, 'a', 'ww'), 0o666)
+        self.wwdir = os.path.join(self.root, 'a', 'b')
+        os.chmod(self.wwdir, 0o777)
+        self.suidfile = self.touch(os.path.join(self.root, 'a', 'suid'),
+                                   0o4755)
+        self.plain = self.touch(os.path.join(self.root, 'a', 'plain'), 0o644)
+        self.gwfile = self.touch(os.path.join(self.libdir, 'gw'), 0o664)
+        self.libfile = self.touch(os.path.join(self.libdir, 'ok'), 0o644)
+        os.symlink(self.wwfile, os.path.join(self.root, 'link'))
+        self.inventory = FilesystemInventory(self.logger, self.enviro,
+                                             filesystems=[self.root],
+                                             trackdirs=[self.libdir])
+
+    def tearDown(self):
+        shutil.rmtree(self.root, ignore_errors=True)
+
+    def touch(self, path, mode):
+        '''Create an empty file with the given mode'''
+        open(path, 'w').close()
+        os.chmod(path, mode)
+        return path
+
+    def testWorldWritable(self):
+        wwlist = self.inventory.worldwritable()
+        self.assertIn(self.wwfile, wwlist)
+        self.assertIn(self.wwdir, wwlist)
+        self.assertNotIn(self.plain, wwlist)
+        self.assertNotIn(os.path.join(self.root, 'link'), wwlist)
+
+    def testSuid(self):
+        self.assertEqual(self.inventory.suidfiles(), [self.suidfile])
+
+    def testGroupWritable(self):
+        self.assertEqual(self.inventory.groupwritable(), [self.gwfile])
+
+    def testOnlyInterestingEntriesKept(self):
+        paths = [entry.path for entry in self.inventory.entries()]
+        self.assertNotIn(self.plain, paths)
+        self.assertIn(self.libfile, paths)
+
+    def testUpdate(self):
+        self.inventory.scan()
+        os.chmod(self.gwfile, 0o644)
+        self.inventory.update([self.gwfile])
+        self.assertEqual(self.inventory.groupwritable(), [])
+
+    def testUnowned(self):
+        if os.geteuid() != 0:
+            return
+        os.chown(self.plain, 59999, 59999)
+        unowned = self.inventory.unowned()
+        self.assertIn(self.plain, unowned)
+
+    def testBypass(self):
+        self.inventory.addbypass([self.root])
+        self.assertEqual(self.inventory.suidfiles(), [])
+
+    def testSharedInventoryUsesIndex(self):
+        '''the shared inventory uses the index whichever rule asks first'''
+        saved = fsinventory._inventory
+        fsinventory._inventory = None
+        try:
+            inventory = fsinventory.getinventory(self.logger, self.enviro)
+            if self.enviro.geteuid() == 0:
+                self.assertEqual(inventory.indexfile, fsinventory.INDEXFILE)
+            else:
+                self.assertIsNone(inventory.indexfile)
+        finally:
+            fsinventory._inventory = saved
+
+    def newinventory(self, interval=86400):
+        '''Return a fresh inventory over the test tree that uses the index
+        file. The previous scan is backdated so that directories created by
+        setUp count as settled.'''
+        inventory = FilesystemInventory(self.logger, self.enviro,
+                                        filesystems=[self.root],
+                                        trackdirs=[self.libdir])
+        inventory.useindex(self.indexfile, interval)
+        return inventory
+
+    def backdate(self):
+        '''Move the mtimes of every test directory two seconds back'''
+        for dirpath, _, _ in os.walk(self.root):
+            past = os.lstat(dirpath).st_mtime - 2
+            os.utime(dirpath, (past, past))
+
+    def testIncrementalScan(self):
+        self.indexfile = os.path.join(self.root, 'index', 'fs.idx')
+        os.makedirs(os.path.dirname(self.indexfile))
+        self.backdate()
+        first = self.newinventory()
+        self.assertEqual(first.suidfiles(), [self.suidfile])
+        self.assertTrue(first.fullscan)
+        self.assertTrue(os.path.exists(self.indexfile))
+        self.assertEqual(os.stat(self.indexfile).st_mode & 0o777, 0o600)
+
+        # a new suid file changes the mtime of its directory
+        newsuid = self.touch(os.path.join(self.wwdir, 'newsuid'), 0o4755)
+        # a fixed entry is dropped even though its directory is unchanged
+        os.chmod(self.wwfile, 0o644)
+        second = self.newinventory()
+        self.assertEqual(sorted(second.suidfiles()),
+                         sorted([self.suidfile, newsuid]))
+        self.assertNotIn(self.wwfile, second.worldwritable())
+        self.assertFalse(second.fullscan)
+        self.assertGreater(second.reused, 0)
+
+    def testRescanInterval(self):
+        self.indexfile = os.path.join(self.root, 'index', 'fs.idx')
+        os.makedirs(os.path.dirname(self.indexfile))
+        self.newinventory(0).scan()
+        again = self.newinventory(0)
+        again.scan()
+        self.assertTrue(again.fullscan)
+        self.assertEqual(again.reused, 0)
+
+if __name__ == "__main__":
+    unittest.main()
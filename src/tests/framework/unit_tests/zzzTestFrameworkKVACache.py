@@ -0,0 +1,173 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the configuration documents shared by KVEditor instances.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import threading
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.KVEditorStonix import KVEditorStonix
+# the editors use the documents of the stonix_resources package
+from stonix_resources.KVACache import getdocument, discardpending
+
+
+class RecordingStateChgLogger(object):
+    '''Keeps the change events and file changes it is asked to record'''
+
+    def __init__(self):
+        self.events = []
+        self.filechanges = []
+
+    def recordchgevent(self, eventid, event):
+        self.events.append((eventid, event))
+
+    def recordfilechange(self, oldfile, newfile, eventid):
+        self.filechanges.append((oldfile, open(oldfile).read(),
+                                 open(newfile).read(), eventid))
+
+
+class zzzTestFrameworkKVACache(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.statechglogger = RecordingStateChgLogger()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'sshd_config')
+        with open(self.path, 'w') as fhandle:
+            fhandle.write('# sshd_config\nPort 22\nPermitRootLogin yes\n')
+
+    def tearDown(self):
+        discardpending()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def geteditor(self, data, eventid=''):
+        editor = KVEditorStonix(self.statechglogger, self.logger, "conf",
+                                self.path, self.path + ".tmp", data,
+                                "present", "space")
+        editor.setEventID(eventid)
+        return editor
+
+    def testSharedLines(self):
+        document = getdocument(self.path)
+        lines = document.getlines()
+        self.assertIs(getdocument(self.path).getlines(), lines)
+        editor1 = self.geteditor({"Port": "22"})
+        editor2 = self.geteditor({"PermitRootLogin": "no"})
+        self.assertEqual(editor1.editor.contents, list(lines))
+        self.assertEqual(editor2.editor.contents, list(lines))
+        self.assertTrue(editor1.report())
+        self.assertFalse(editor2.report())
+
+    def testStale(self):
+        lines = getdocument(self.path).getlines()
+        with open(self.path, 'a') as fhandle:
+            fhandle.write('X11Forwarding no\n')
+        newlines = getdocument(self.path).getlines()
+        self.assertEqual(len(newlines), len(lines) + 1)
+        # a file replaced by rename has a new inode
+        tmpfile = self.path + '.new'
+        with open(tmpfile, 'w') as fhandle:
+            fhandle.write('Port 2222\n')
+        os.rename(tmpfile, self.path)
+        self.assertEqual(getdocument(self.path).getlines(), ('Port 2222\n',))
+
+    def testCoalescedCommit(self):
+        editor1 = self.geteditor({"PermitRootLogin": "no"}, '0001001')
+        editor2 = self.geteditor({"X11Forwarding": "no"}, '0001002')
+        self.assertFalse(editor1.report())
+        self.assertTrue(editor1.fix())
+        # the second editor sees the edit staged by the first one
+        self.assertFalse(editor2.report())
+        self.assertTrue(editor2.fix())
+        self.assertTrue(editor1.commit())
+        self.assertTrue(editor2.commit())
+        contents = open(self.path).read()
+        self.assertIn("PermitRootLogin no\n", contents)
+        self.assertIn("X11Forwarding no\n", contents)
+        self.assertNotIn("PermitRootLogin yes", contents)
+        self.assertEqual(len(self.statechglogger.filechanges), 1)
+        self.assertEqual(len(self.statechglogger.events), 1)
+        self.assertEqual(self.statechglogger.events[0][0], '0001001')
+        self.assertTrue(self.geteditor({"PermitRootLogin": "no",
+                                        "X11Forwarding": "no"}).report())
+
+    def testEventIdOfOtherEditor(self):
+        editor1 = self.geteditor({"PermitRootLogin": "no"})
+        editor2 = self.geteditor({"X11Forwarding": "no"}, '0001002')
+        editor1.report()
+        editor1.fix()
+        editor2.report()
+        editor2.fix()
+        self.assertTrue(editor1.commit())
+        self.assertEqual(self.statechglogger.events[0][0], '0001002')
+
+    def testDiscardPending(self):
+        editor = self.geteditor({"PermitRootLogin": "no"})
+        editor.report()
+        editor.fix()
+        document = getdocument(self.path)
+        self.assertIsNotNone(document.getpending())
+
+        # edits staged by another thread are left alone
+        other = threading.Thread(target=discardpending)
+        other.start()
+        other.join()
+        self.assertIsNotNone(document.getpending())
+
+        discardpending(self.logger)
+        self.assertIsNone(document.getpending())
+        self.assertIn("PermitRootLogin yes\n", document.getlines())
+        self.assertTrue(editor.commit())
+        self.assertEqual(self.statechglogger.filechanges, [])
+
+    def testPendingOfOtherThread(self):
+        def failedfix():
+            editor = self.geteditor({"PermitRootLogin": "no"}, '0001001')
+            editor.report()
+            editor.fix()
+            # the rule dies before committing or discarding its edits
+
+        other = threading.Thread(target=failedfix)
+        other.start()
+        other.join()
+        document = getdocument(self.path)
+        self.assertIsNone(document.getpending())
+        self.assertIn("PermitRootLogin yes\n", document.getlines())
+
+        editor = self.geteditor({"X11Forwarding": "no"}, '0002001')
+        self.assertFalse(editor.report())
+        self.assertTrue(editor.fix())
+        self.assertTrue(editor.commit())
+        contents = open(self.path).read()
+        self.assertIn("PermitRootLogin yes\n", contents)
+        self.assertIn("X11Forwarding no\n", contents)
+        self.assertEqual([event[0] for event in self.statechglogger.events],
+                         ['0002001'])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the key index of KVAConf and the section index of
+KVATaggedConf, including a check that a 50,000 line file is indexed once.
+'''
+
+import os
+import re
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources import KVAConf as kvaconf
+from src.stonix_resources.KVAConf import KVAConf, indexlines
+from src.stonix_resources.KVATaggedConf import KVATaggedConf
+from src.stonix_resources.KVACache import discardpending
+
+
+def scanspace(contents, key, value):
+    '''the line by line search KVAConf used for present space keys'''
+    found = False
+    for line in contents:
+        if re.match('^#', line) or re.match(r'^\s*$', line):
+            continue
+        elif re.search("^" + re.escape(key) + r"\s+", line):
+            temp = re.sub(r"\s+", " ", line.strip())
+            if temp == key + " " + value:
+                found = True
+    return found
+
+
+class zzzTestFrameworkKVAIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'test.conf')
+
+    def tearDown(self):
+        discardpending()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def writeconf(self, contents):
+        with open(self.path, 'w') as fhandle:
+            fhandle.write(contents)
+
+    def geteditor(self, intent, configType):
+        return KVAConf(self.path, self.path + '.tmp', intent, configType,
+                       self.logger)
+
+    def testIndexLines(self):
+        index = indexlines(['# comment\n',
+                            'Port   22\n',
+                            '#PermitRootLogin yes\n',
+                            '  Indented no\n',
+                            'Protocol\n',
+                            'Port 2222\n'], 'space')
+        self.assertEqual([(entry.lineno, entry.value, entry.commented)
+                          for entry in index['Port']],
+                         [(1, '22', False), (5, '2222', False)])
+        self.assertTrue(index['PermitRootLogin'][0].commented)
+        self.assertNotIn('Indented', index)
+        self.assertEqual(index['Protocol'][0].value, '')
+        index = indexlines(['a = 1\n', 'b=2=3\n', 'c\n'], 'openeq')
+        self.assertEqual(index['a'][0].value, '1')
+        self.assertEqual(index['b'][0].value, '2')
+        self.assertNotIn('c', index)
+
+    def testOpenClosedValue(self):
+        self.writeconf('# kernel settings\n'
+                       'net.ipv4.ip_forward = 0\n'
+                       '#kernel.sysrq = 1\n'
+                       'kernel.sysrq = 0\n'
+                       'kernel.sysrq = 1\n')
+        editor = self.geteditor('present', 'openeq')
+        self.assertTrue(editor.validate('net.ipv4.ip_forward', '0'))
+        self.assertFalse(editor.validate('kernel.sysrq', '0'))
+        self.assertFalse(editor.validate('kernel.randomize_va_space', '2'))
+        # keys with regular expression characters are still patterns
+        self.assertTrue(editor.validate('net\\.ipv4\\.ip_.*', '0'))
+        editor.update({'kernel.sysrq': '0'}, {})
+        self.assertEqual(editor.contents, ['# kernel settings\n',
+                                           'net.ipv4.ip_forward = 0\n',
+                                           '#kernel.sysrq = 1\n',
+                                           'kernel.sysrq = 0\n'])
+        self.assertTrue(editor.validate('kernel.sysrq', '0'))
+
+    def testSpaceValue(self):
+        self.writeconf('blacklist usb-storage\n'
+                       'blacklist   firewire-core\n'
+                       'install cramfs /bin/true\n'
+                       'PermitEmptyPasswords')
+        editor = self.geteditor('present', 'space')
+        self.assertEqual(editor.validate('blacklist', ['usb-storage',
+                                                       'firewire-core',
+                                                       'bluetooth']),
+                         ['bluetooth'])
+        self.assertTrue(editor.validate('install cramfs', '/bin/true'))
+        self.assertFalse(editor.validate('PermitEmptyPasswords', ''))
+        editor.setIntent('notpresent')
+        self.assertEqual(editor.validate('blacklist', ['firewire-core',
+                                                       'bluetooth']),
+                         ['firewire-core'])
+        editor.update({'install cramfs': '/bin/false'},
+                      {'blacklist': ['firewire-core']})
+        self.assertEqual(editor.contents, ['blacklist usb-storage\n',
+                                           'PermitEmptyPasswords\n',
+                                           'install cramfs /bin/false\n'])
+
+    def testTaggedSections(self):
+        self.writeconf('[global]\n'
+                       'workgroup = WORKGROUP\n'
+                       'security = share\n'
+                       '# end of global\n'
+                       '\n'
+                       '[homes]\n'
+                       'browseable = yes\n')
+        editor = KVATaggedConf(self.path, self.path + '.tmp', 'present',
+                               'openeq', self.logger)
+        self.assertTrue(editor.getValue('global',
+                                        {'workgroup': 'WORKGROUP'}))
+        self.assertEqual(editor.getValue('global', {'security': 'user',
+                                                    'workgroup': 'WORKGROUP'}),
+                         {'security': 'user'})
+        self.assertEqual(editor.getValue('printers', {'path': '/tmp'}),
+                         {'path': '/tmp'})
+        self.assertEqual(editor.getValue('homes', {'browseable': 'no'}),
+                         {'browseable': 'no'})
+        editor.setValue({'global': {'security': 'user'},
+                         'homes': {'browseable': 'no'},
+                         'printers': {'path': '/tmp'}}, {})
+        self.assertEqual(editor.contents, ['[global]\n',
+                                           'workgroup = WORKGROUP\n',
+                                           'security = user\n',
+                                           '# end of global\n',
+                                           '\n',
+                                           '[homes]\n',
+                                           'browseable = no\n',
+                                           '[printers]\n',
+                                           'path = /tmp\n'])
+        editor.setIntent('notpresent')
+        self.assertEqual(editor.getValue('global', {'workgroup': 'x',
+                                                    'guest ok': 'x'}),
+                         {'workgroup': 'x'})
+        editor.setValue({}, {'global': {'workgroup': 'x'}})
+        self.assertNotIn('workgroup = WORKGROUP\n', editor.contents)
+
+    def testIndexBuiltOnce(self):
+        '''validating keys against a large file builds its index once, for
+        all editors of the file'''
+        lines = ['option%d value %d\n' % (num, num) for num in range(50000)]
+        self.writeconf(''.join(lines))
+        keys = [('option%d' % num, 'value %d' % num)
+                for num in range(0, 50000, 2500)]
+        calls = []
+
+        def countedindex(lines, configType):
+            calls.append(configType)
+            return indexlines(lines, configType)
+
+        kvaconf.indexlines = countedindex
+        try:
+            editor = self.geteditor('present', 'space')
+            for key, value in keys:
+                self.assertTrue(scanspace(lines, key, value))
+                self.assertTrue(editor.validate(key, value))
+            self.assertFalse(editor.validate('option1', 'value 2'))
+            other = self.geteditor('present', 'space')
+            self.assertTrue(other.validate(*keys[0]))
+        finally:
+            kvaconf.indexlines = indexlines
+        self.assertEqual(calls, ['space'])
+
+if __name__ == "__main__":
+    unittest.main()
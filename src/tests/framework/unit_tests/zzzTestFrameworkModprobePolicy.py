@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the kernel module policy index. Temporary directories stand
+in for the modprobe.d directories, modprobe.conf and /proc/modules.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.ModprobePolicy import ModprobePolicy, \
+    parsedirective
+
+
+class zzzTestFrameworkModprobePolicy(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.etcdir = os.path.join(self.tmpdir, 'etc.modprobe.d')
+        self.libdir = os.path.join(self.tmpdir, 'lib.modprobe.d')
+        self.modprobeconf = os.path.join(self.tmpdir, 'modprobe.conf')
+        self.procmodules = os.path.join(self.tmpdir, 'modules')
+        for dirname in [self.etcdir, self.libdir]:
+            os.makedirs(dirname)
+        self.writefile(os.path.join(self.etcdir, 'blacklist.conf'),
+                       '# usb storage\n'
+                       'blacklist usb-storage\n'
+                       'install cramfs   /bin/true\n'
+                       'install dccp /bin/false\n')
+        self.writefile(os.path.join(self.etcdir, 'notes.txt'),
+                       'blacklist firewire-core\n')
+        self.writefile(os.path.join(self.libdir, 'blacklist.conf'),
+                       'blacklist uas\n')
+        self.writefile(os.path.join(self.libdir, 'dist.conf'),
+                       'install dccp /bin/true\n'
+                       'options bonding \\\n'
+                       '    max_bonds=0\n'
+                       'blacklist pcspkr\n')
+        self.writefile(self.modprobeconf, 'install sctp /bin/true\n')
+        self.writefile(self.procmodules,
+                       'usb_storage 77824 1 uas, Live 0x0000000000000000\n'
+                       'uas 28672 0 - Live 0x0000000000000000\n')
+        self.policy = ModprobePolicy(self.logger,
+                                     [self.etcdir, self.libdir],
+                                     self.modprobeconf, self.procmodules)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def writefile(self, path, contents):
+        with open(path, 'w') as fhandle:
+            fhandle.write(contents)
+
+    def testParseDirective(self):
+        self.assertEqual(parsedirective('install  usb-storage   /bin/true'),
+                         ('install', 'usb_storage', '/bin/true'))
+        self.assertEqual(parsedirective('blacklist uas\n'),
+                         ('blacklist', 'uas', ''))
+        self.assertIsNone(parsedirective('# blacklist uas'))
+        self.assertIsNone(parsedirective('   \n'))
+
+    def testConfFiles(self):
+        # the blacklist.conf of the first directory hides the second one,
+        # files not ending in .conf are not read
+        self.assertEqual(self.policy.conffiles(),
+                         [os.path.join(self.etcdir, 'blacklist.conf'),
+                          os.path.join(self.libdir, 'dist.conf'),
+                          self.modprobeconf])
+        self.assertFalse(self.policy.isblacklisted('uas'))
+        self.assertFalse(self.policy.isblacklisted('firewire-core'))
+
+    def testLookups(self):
+        self.assertTrue(self.policy.isblacklisted('usb_storage'))
+        self.assertTrue(self.policy.isblacklisted('usb-storage'))
+        self.assertTrue(self.policy.hasdirective('install cramfs /bin/true'))
+        self.assertTrue(self.policy.hasdirective('install sctp /bin/true'))
+        self.assertFalse(self.policy.hasdirective('install rds /bin/true'))
+        install = self.policy.getinstall('dccp')
+        self.assertEqual((install.args, install.path, install.lineno),
+                         ('/bin/false',
+                          os.path.join(self.etcdir, 'blacklist.conf'), 4))
+        options = self.policy.getdirectives('options', 'bonding')[0]
+        self.assertEqual((options.args, options.lineno), ('max_bonds=0', 2))
+        self.assertEqual(self.policy.missing(['blacklist usb-storage',
+                                              'blacklist pcspkr',
+                                              'install rds /bin/true']),
+                         ['install rds /bin/true'])
+        self.assertIn('dist.conf line 4',
+                      self.policy.describe('blacklist pcspkr'))
+
+    def testLoaded(self):
+        self.assertTrue(self.policy.isloaded('usb-storage'))
+        self.assertEqual(self.policy.getloaded()['usb_storage'].users,
+                         ['uas'])
+        self.assertEqual(self.policy.getloaded()['uas'].users, [])
+        self.assertFalse(self.policy.isloaded('firewire_ohci'))
+
+    def testRender(self):
+        dropin = os.path.join(self.etcdir, 'stonix-blacklist.conf')
+        directives = ['blacklist usb-storage', 'install tipc /bin/true',
+                      'install rds /bin/true']
+        contents, added = self.policy.render(dropin, directives)
+        self.assertEqual(contents, 'install tipc /bin/true\n'
+                                   'install rds /bin/true\n')
+        self.assertEqual(added, directives[1:])
+        self.writefile(dropin, '# stonix\ninstall tipc /bin/true')
+        # the new file is picked up without a refresh
+        contents, added = self.policy.render(dropin, directives)
+        self.assertEqual(contents, '# stonix\ninstall tipc /bin/true\n'
+                                   'install rds /bin/true\n')
+        self.assertEqual(added, ['install rds /bin/true'])
+        self.writefile(dropin, contents)
+        self.assertEqual(self.policy.missing(directives), [])
+
+if __name__ == "__main__":
+    unittest.main()
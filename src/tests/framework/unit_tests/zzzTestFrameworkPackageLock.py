@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the package manager lock probe. A child process holds an
+fcntl lock on a temporary lock file, the way rpm and dpkg hold theirs.
+'''
+
+import fcntl
+import os
+import sys
+import shutil
+import tempfile
+import time
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources import PackageLock as packagelock
+from src.stonix_resources.PackageLock import PackageLock, readproclocks
+
+
+class zzzTestFrameworkPackageLock(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.lockfile = os.path.join(self.tmpdir, 'lock')
+        self.pidfile = os.path.join(self.tmpdir, 'pkg.pid')
+        open(self.lockfile, 'w').close()
+        self.child = None
+
+    def tearDown(self):
+        self.release()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def hold(self):
+        '''Have a child process take a write lock on the lock file'''
+        rfd, wfd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(rfd)
+            fd = os.open(self.lockfile, os.O_RDWR)
+            fcntl.lockf(fd, fcntl.LOCK_EX)
+            os.write(wfd, b'x')
+            time.sleep(30)
+            os._exit(0)
+        os.close(wfd)
+        os.read(rfd, 1)
+        os.close(rfd)
+        self.child = pid
+
+    def release(self):
+        if self.child:
+            os.kill(self.child, 9)
+            os.waitpid(self.child, 0)
+            self.child = None
+
+    def getlock(self, proclocks=packagelock.PROCLOCKS):
+        return PackageLock(self.logger, 'test', [self.lockfile],
+                           [self.pidfile], proclocks)
+
+    def testLockFile(self):
+        lock = self.getlock()
+        self.assertFalse(lock.islocked())
+        self.hold()
+        lock.invalidate()
+        self.assertTrue(lock.islocked())
+        self.release()
+        lock.invalidate()
+        self.assertFalse(lock.islocked())
+
+    def testWithoutProcLocks(self):
+        '''The fcntl probe is used when /proc/locks cannot be read'''
+        lock = self.getlock(os.path.join(self.tmpdir, 'nolocks'))
+        self.assertFalse(lock.islocked())
+        self.hold()
+        lock.invalidate()
+        self.assertTrue(lock.islocked())
+
+    def testReadProcLocks(self):
+        proclocks = os.path.join(self.tmpdir, 'locks')
+        with open(proclocks, 'w') as fhandle:
+            fhandle.write('1: POSIX  ADVISORY  WRITE 1234 fd:01:4242 0 EOF\n'
+                          '1: -> POSIX  ADVISORY  WRITE 99 fd:01:17 0 EOF\n'
+                          '2: FLOCK  ADVISORY  WRITE 1 00:19:77 0 EOF\n'
+                          '3: POSIX  ADVISORY  READ 5678 fd:01:4343 0 EOF\n')
+        self.assertEqual(readproclocks(proclocks),
+                         set([((253, 1), 4242), ((0, 25), 77)]))
+        self.assertIsNone(readproclocks(os.path.join(self.tmpdir, 'none')))
+
+    def testPidFile(self):
+        lock = self.getlock()
+        with open(self.pidfile, 'w') as fhandle:
+            fhandle.write(str(os.getppid()) + '\n')
+        self.assertTrue(lock.islocked())
+        # a pid file left behind by a process that is gone does not count
+        pid = os.fork()
+        if pid == 0:
+            os._exit(0)
+        os.waitpid(pid, 0)
+        with open(self.pidfile, 'w') as fhandle:
+            fhandle.write(str(pid) + '\n')
+        lock.invalidate()
+        self.assertFalse(lock.islocked())
+
+    def testCached(self):
+        lock = self.getlock()
+        self.assertFalse(lock.islocked())
+        self.hold()
+        self.assertFalse(lock.islocked())
+        lock.checked -= packagelock.CACHETTL
+        self.assertTrue(lock.islocked())
+
+    def testWaitForUnlock(self):
+        lock = self.getlock()
+        self.assertTrue(lock.waitforunlock(0))
+        self.hold()
+        lock.invalidate()
+        start = time.time()
+        self.assertFalse(lock.waitforunlock(0.5))
+        self.assertLess(time.time() - start, 2)
+
+if __name__ == "__main__":
+    unittest.main()
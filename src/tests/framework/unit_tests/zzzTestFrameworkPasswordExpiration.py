@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the shadow checks of the PasswordExpiration rule, run inside
+a benchmark fake root, with a benchmark against a 50,000 entry shadow file.
+'''
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.RuleBenchmark import FakeRoot, RuleBenchmark
+
+
+def makeaccounts(count):
+    '''Return passwd and shadow contents for count accounts and the names of
+    the accounts the rule should find fault with. Every 10th account is a
+    system account, every 17th is missing from passwd, every 23rd has a
+    malformed uid, every 7th and 11th is locked and every 29th has a
+    truncated shadow entry. Only every 12th account has the wanted aging
+    fields.'''
+    passwd = ['root:x:0:0:root:/root:/bin/bash',
+              'bin:x:1:1:bin:/bin:/sbin/nologin']
+    shadow = ['# shadow', '', 'root:$6$salt$hash:18000:0:99999:7:::',
+              'bin:*:18000:0:99999:7:::']
+    minimum = ['1', '0', '', 'x']
+    maximum = ['90', '180', '99999', '']
+    warn = ['28', '7', '']
+    inactive = ['35', '', 'abc', '10']
+    faulty = []
+    for num in range(count):
+        name = 'user%05d' % num
+        uid = str(1000 + num)
+        if num % 10 == 0:
+            uid = str(num % 400 + 100)
+        elif num % 23 == 0:
+            uid = 'abc'
+        if num % 17 != 0:
+            passwd.append('%s:x:%s:100::/home/%s:/bin/bash' %
+                          (name, uid, name))
+        password = '$6$salt$hash'
+        if num % 7 == 0:
+            password = '!'
+        elif num % 11 == 0:
+            password = '*'
+        if num % 29 == 0:
+            shadow.append('%s:%s:18000:1' % (name, password))
+        else:
+            shadow.append(':'.join([name, password, '18000',
+                                    minimum[num % 4], maximum[num % 4],
+                                    warn[num % 3], inactive[num % 4], '',
+                                    '']))
+        if uid.isdigit() and int(uid) >= 500 and num % 17 != 0 and \
+           password.startswith('$') and (num % 29 == 0 or num % 12 != 0):
+            faulty.append(name)
+    return '\n'.join(passwd) + '\n', '\n'.join(shadow) + '\n', faulty
+
+
+class zzzTestFrameworkPasswordExpiration(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fakeroot = FakeRoot(os.path.join(self.tmpdir, 'root'), files=10,
+                                 users=1, packages=5).build()
+        self.benchmark = RuleBenchmark(self.fakeroot, repeat=1)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def runreport(self, count):
+        passwd, shadow, faulty = makeaccounts(count)
+        self.fakeroot.writefile('/etc/passwd', passwd)
+        self.fakeroot.writefile('/etc/shadow', shadow, 0o400)
+        with self.benchmark.redirector as redirector:
+            self.benchmark.setup()
+            rule = self.benchmark.loadrule('PasswordExpiration')
+            start = time.time()
+            rule.report()
+            elapsed = time.time() - start
+            commands = list(redirector.commands)
+        return rule, faulty, commands, elapsed
+
+    def testShadow(self):
+        rule, faulty, commands, _ = self.runreport(300)
+        self.assertFalse(rule.compliant)
+        self.assertEqual(rule.fixusers, faulty)
+        self.assertNotIn('user00012', rule.fixusers)
+        self.assertIn('user00013', rule.fixusers)
+        self.assertIn("Shadow file: Account lock is not set to 35 days\n",
+                      rule.detailedresults)
+        self.assertNotIn('/etc/shadow does not have', rule.detailedresults)
+        self.assertEqual([command for command in commands
+                          if 'id' in command.split()[0]], [])
+
+    def testBenchmark(self):
+        '''report on a 50,000 entry shadow file'''
+        rule, faulty, commands, elapsed = self.runreport(50000)
+        self.assertEqual(rule.fixusers, faulty)
+        print('\nPasswordExpiration report with a 50000 entry shadow file: '
+              '%.3fs, %d commands' % (elapsed, len(commands)))
+        self.assertLess(len(commands), 10)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the RpmVerifier module. A small shell script stands in for
+rpm so the tests do not depend on the host's package database.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources import RpmVerifier as rpmverifier
+from src.stonix_resources.RpmVerifier import RpmVerifier, parseline, \
+    MODE, OWNER, MODECHANGED, UNCHANGED, NOTOWNED, NORPM, UNKNOWN
+
+FAKERPM = '''#!/bin/sh
+printf '%%s ' "$@" >> "%(calls)s"
+echo >> "%(calls)s"
+case "$1" in
+    -qa)
+        echo pkga-1.0-1.x86_64
+        echo pkgb-1.0-1.x86_64
+        echo pkgc-1.0-1.x86_64
+        ;;
+    -qf)
+        for path in "$@"; do
+            case "$path" in
+                /usr/bin/stray) echo "file $path is not owned by any package";;
+                /usr/bin/*) echo pkga-1.0-1.x86_64;;
+            esac
+        done
+        ;;
+    -V)
+        for arg in "$@"; do
+            case "$arg" in
+                pkga*|/usr/bin/sudo)
+                    echo ".M.......    /usr/bin/sudo"
+                    echo "missing   c /etc/pkga.conf";;
+                pkgb*)
+                    echo ".....U...  c /etc/pkgb.conf";;
+            esac
+        done
+        ;;
+esac
+'''
+
+
+class zzzTestFrameworkRpmVerifier(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.calls = os.path.join(self.tmpdir, 'calls')
+        self.rpm = os.path.join(self.tmpdir, 'rpm')
+        with open(self.rpm, 'w') as fhandle:
+            fhandle.write(FAKERPM % {'calls': self.calls})
+        os.chmod(self.rpm, 0o755)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def getcalls(self):
+        '''Return the argument lines the fake rpm was called with'''
+        if not os.path.exists(self.calls):
+            return []
+        return open(self.calls).read().splitlines()
+
+    def testParseLine(self):
+        result = parseline('.M.......  c /etc/foo.conf\n')
+        self.assertEqual(result.path, '/etc/foo.conf')
+        self.assertEqual(result.attr, 'c')
+        self.assertIn(MODE, result.flags)
+        result = parseline('missing     /usr/bin/gone')
+        self.assertTrue(result.missing)
+        self.assertEqual(result.path, '/usr/bin/gone')
+        self.assertIsNone(parseline('Unsatisfied dependencies for foo'))
+
+    def testVerifyInChunks(self):
+        verifier = RpmVerifier(self.logger, jobs=2, rpm=self.rpm)
+        verifier.verify()
+        self.assertEqual(verifier.failed(MODE), ['/usr/bin/sudo'])
+        self.assertEqual(verifier.failed(OWNER), ['/etc/pkgb.conf'])
+        verifycalls = [call for call in self.getcalls()
+                       if call.startswith('-V')]
+        self.assertEqual(len(verifycalls), 2)
+        # a second verify uses the stored results
+        verifier.verify()
+        self.assertEqual(len(self.getcalls()), 3)
+
+    def testRpmcheckReusesFullVerify(self):
+        verifier = RpmVerifier(self.logger, jobs=1, rpm=self.rpm)
+        verifier.verify()
+        before = len(self.getcalls())
+        status = verifier.rpmcheck(['/usr/bin/sudo', '/usr/bin/passwd',
+                                    '/usr/bin/stray'])
+        self.assertEqual(status['/usr/bin/sudo'], MODECHANGED)
+        self.assertEqual(status['/usr/bin/passwd'], UNCHANGED)
+        self.assertEqual(status['/usr/bin/stray'], NOTOWNED)
+        # only the ownership query was needed
+        self.assertEqual(len(self.getcalls()), before + 1)
+
+    def testRpmcheckWithoutFullVerify(self):
+        verifier = RpmVerifier(self.logger, rpm=self.rpm)
+        status = verifier.rpmcheck(['/usr/bin/sudo', '/usr/bin/stray'])
+        self.assertEqual(status['/usr/bin/sudo'], MODECHANGED)
+        self.assertEqual(status['/usr/bin/stray'], NOTOWNED)
+        calls = self.getcalls()
+        self.assertEqual(len(calls), 2)
+        self.assertTrue(calls[1].endswith('-f /usr/bin/sudo '))
+
+    def testPartialVerifyIsNotFinal(self):
+        verifier = RpmVerifier(self.logger, rpm=self.rpm)
+        verifier.verify(['pkgb-1.0-1.x86_64'])
+        self.assertFalse(verifier.complete)
+        self.assertEqual(verifier.failed(MODE), [])
+        verifier.verify()
+        self.assertTrue(verifier.complete)
+        self.assertEqual(verifier.failed(MODE), ['/usr/bin/sudo'])
+
+    def testPathsInChunks(self):
+        verifier = RpmVerifier(self.logger, rpm=self.rpm)
+        paths = ['/usr/bin/tool' + str(num) for num in range(5)]
+        maxpaths = rpmverifier.MAXPATHS
+        rpmverifier.MAXPATHS = 2
+        try:
+            status = verifier.rpmcheck(paths)
+        finally:
+            rpmverifier.MAXPATHS = maxpaths
+        self.assertEqual(set(status.values()), set([UNCHANGED]))
+        calls = self.getcalls()
+        self.assertEqual(len([call for call in calls
+                              if call.startswith('-qf')]), 3)
+        self.assertEqual(len([call for call in calls
+                              if call.startswith('-V')]), 3)
+
+    def testFailedRpmIsUnknown(self):
+        verifier = RpmVerifier(self.logger,
+                               rpm=os.path.join(self.tmpdir, 'missing'))
+        self.assertEqual(verifier.rpmcheck(['/usr/bin/sudo']),
+                         {'/usr/bin/sudo': UNKNOWN})
+        self.assertEqual(verifier.checkowned(['/usr/bin/sudo']),
+                         {'/usr/bin/sudo': None})
+        verifier.verify()
+        self.assertFalse(verifier.complete)
+
+    def testNoRpm(self):
+        verifier = RpmVerifier(self.logger, rpm=self.rpm)
+        verifier.rpm = None
+        self.assertEqual(verifier.rpmcheck(['/usr/bin/sudo']),
+                         {'/usr/bin/sudo': NORPM})
+
+    def testOwners(self):
+        verifier = RpmVerifier(self.logger, rpm=self.rpm)
+        self.assertEqual(verifier.owners(['/usr/bin/sudo']),
+                         {'/usr/bin/sudo': ['pkga-1.0-1.x86_64']})
+
+if __name__ == "__main__":
+    unittest.main()
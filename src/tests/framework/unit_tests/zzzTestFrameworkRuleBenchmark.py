@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the hermetic rule benchmark harness: the fake root, the path
+redirection, the command stand-ins and the baseline comparison.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import subprocess
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.RuleBenchmark import FakeRoot, PathRedirector, \
+    RuleBenchmark, comparebaseline, savebaseline, loadbaseline
+
+
+class zzzTestFrameworkRuleBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.fakeroot = FakeRoot(os.path.join(self.tmpdir, 'root'),
+                                 files=200, users=5, packages=20).build()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def run_command(self, command, shell=False):
+        proc = subprocess.Popen(command, shell=shell, stdout=subprocess.PIPE,
+                                stderr=subprocess.PIPE)
+        out, _ = proc.communicate()
+        return proc.returncode, out.decode('utf-8')
+
+    def testFakeRoot(self):
+        self.assertTrue(os.path.isfile(self.fakeroot.realpath('/etc/shadow')))
+        self.assertEqual(os.stat(self.fakeroot.realpath('/etc/shadow')).st_mode
+                         & 0o777, 0o600)
+        with open(self.fakeroot.realpath('/etc/passwd')) as passwd:
+            self.assertIn('user004:x:1004:', passwd.read())
+        count = 0
+        for _, _, files in os.walk(self.fakeroot.realpath('/usr/share/doc')):
+            count += len(files)
+        self.assertGreater(count, 0)
+        # the same arguments build the same tree
+        other = FakeRoot(os.path.join(self.tmpdir, 'other'), files=200,
+                         users=5, packages=20).build()
+        self.assertEqual(sorted(os.listdir(other.realpath('/opt/bench/bin'))),
+                         sorted(os.listdir(self.fakeroot.realpath(
+                             '/opt/bench/bin'))))
+
+    def testRedirect(self):
+        marker = '/etc/stonix-benchmark-test'
+        with PathRedirector(self.fakeroot):
+            with open('/etc/redhat-release') as release:
+                self.assertIn('release 7.9', release.read())
+            self.assertTrue(os.path.exists('/usr/bin/yum'))
+            self.assertIn('user000', os.listdir('/home'))
+            with open(marker, 'w') as outfile:
+                outfile.write('test\n')
+            self.assertTrue(os.path.exists(marker))
+            # python modules are still loaded from the real system
+            self.assertTrue(os.path.exists(os.__file__))
+        self.assertFalse(os.path.exists(marker))
+        self.assertTrue(os.path.exists(self.fakeroot.realpath(marker)))
+
+    def testStubs(self):
+        with PathRedirector(self.fakeroot) as redirector:
+            self.assertEqual(self.run_command(['/bin/rpm', '-q',
+                                               'openssh-server']),
+                             (0, 'openssh-server-1.0-1.el7.x86_64\n'))
+            self.assertEqual(self.run_command(['rpm', '-q', 'nosuch'])[0], 1)
+            status, out = self.run_command(['/bin/rpm', '-qa', '--qf',
+                                            '%{NAME} %{ARCH}\\n'])
+            self.assertIn('audit x86_64\n', out)
+            self.assertEqual(self.run_command('/usr/bin/systemctl '
+                                              'is-enabled sshd', True),
+                             (0, 'enabled\n'))
+            self.assertEqual(self.run_command(['/usr/bin/systemctl',
+                                               'is-active', 'rpcbind']),
+                             (1, 'inactive\n'))
+            status, out = self.run_command(['/usr/bin/systemctl',
+                                            'list-unit-files', '--no-legend',
+                                            '--no-pager'])
+            self.assertIn('sshd.service enabled\n', out)
+            # commands without a stand-in never reach the real system
+            self.assertEqual(self.run_command(['/usr/sbin/useradd',
+                                               'bench'])[0], 127)
+            self.assertEqual(self.run_command('LANG=C /sbin/reboot',
+                                              True)[0], 127)
+            self.assertEqual(self.run_command('cat /etc/passwd | '
+                                              '/usr/bin/awk 1', True)[0], 127)
+            self.assertIn('cat /etc/passwd | /usr/bin/awk 1',
+                          redirector.commands)
+            # grep searches the fake root, globs expand inside it
+            self.assertEqual(self.run_command('/bin/grep -h ^user000: '
+                                              '/etc/pass*', True),
+                             (0, 'user000:x:1000:1000:User 0:/home/user000:'
+                              '/bin/bash\n'))
+            self.assertEqual(os.system('/sbin/shutdown -h now') >> 8, 127)
+            self.assertIn('/usr/sbin/useradd bench', redirector.commands)
+
+    def testBenchmark(self):
+        benchmark = RuleBenchmark(self.fakeroot, repeat=1)
+        results = benchmark.run(['SecureSSH', 'CheckDupIDs', 'NoSuchRule'])
+        self.assertIsNotNone(results['NoSuchRule']['error'])
+        for name in ['SecureSSH', 'CheckDupIDs']:
+            result = results[name]
+            self.assertIsNone(result['error'], result['error'])
+            self.assertGreater(result['wall_seconds'], 0)
+            self.assertGreater(result['peak_bytes'], 0)
+            self.assertGreater(result['log_calls'], 0)
+        # sshd_config of the fake root permits root logins
+        self.assertFalse(results['SecureSSH']['compliant'])
+        self.assertTrue(results['CheckDupIDs']['compliant'])
+
+        path = os.path.join(self.tmpdir, 'baseline.json')
+        savebaseline(path, results, self.fakeroot)
+        baseline = loadbaseline(path)
+        self.assertNotIn('NoSuchRule', baseline['rules'])
+        del results['NoSuchRule']
+        self.assertEqual(comparebaseline(results, baseline), [])
+        results['SecureSSH']['subprocesses'] += 1
+        results['CheckDupIDs']['wall_seconds'] += 10
+        regressions = comparebaseline(results, baseline)
+        self.assertEqual(len(regressions), 2)
+        self.assertTrue(regressions[0].startswith('CheckDupIDs: wall_seconds'))
+        self.assertTrue(regressions[1].startswith('SecureSSH: subprocesses'))
+
+if __name__ == "__main__":
+    unittest.main()
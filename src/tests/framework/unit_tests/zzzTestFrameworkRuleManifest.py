@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the RuleManifest module. Rule files are stand ins written to
+a temporary directory; the rule objects are plain template rules.
+'''
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.rule import Rule
+from src.stonix_resources.RuleManifest import RuleManifest
+
+
+class CustomRule(Rule):
+
+    def isapplicable(self):
+        return True
+
+
+class zzzTestFrameworkRuleManifest(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.manifestfile = os.path.join(self.tmpdir, 'manifest.json')
+        self.rulefile = os.path.join(self.tmpdir, 'FakeRule.py')
+        with open(self.rulefile, 'w') as fhandle:
+            fhandle.write('# fake rule\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def makerule(self, applicable, ruleclass=Rule):
+        rule = ruleclass(None, self.enviro, self.logger, None)
+        rule.rulenumber = 9999
+        rule.rulename = 'FakeRule'
+        rule.rootrequired = False
+        rule.applicable = applicable
+        return rule
+
+    def testRoundTrip(self):
+        manifest = RuleManifest(self.logger, self.enviro, self.manifestfile)
+        manifest.add('FakeRule', self.rulefile,
+                     self.makerule({'default': 'default'}))
+        manifest.save()
+        manifest = RuleManifest(self.logger, self.enviro, self.manifestfile)
+        entry = manifest.lookup('FakeRule', self.rulefile)
+        self.assertEqual(entry['number'], 9999)
+        self.assertEqual(entry['name'], 'FakeRule')
+        self.assertFalse(entry['customapplicable'])
+        self.assertFalse(manifest.skippable(entry))
+
+    def testChangedFileInvalidates(self):
+        manifest = RuleManifest(self.logger, self.enviro, self.manifestfile)
+        manifest.add('FakeRule', self.rulefile,
+                     self.makerule({'default': 'default'}))
+        with open(self.rulefile, 'a') as fhandle:
+            fhandle.write('# edited\n')
+        self.assertIsNone(manifest.lookup('FakeRule', self.rulefile))
+
+    def testOutdatedEnvironment(self):
+        manifest = RuleManifest(self.logger, self.enviro, self.manifestfile)
+        manifest.add('FakeRule', self.rulefile,
+                     self.makerule({'default': 'default'}))
+        manifest.save()
+        with open(self.manifestfile) as fhandle:
+            data = json.load(fhandle)
+        data['envkey'][0] = 'other version'
+        with open(self.manifestfile, 'w') as fhandle:
+            json.dump(data, fhandle)
+        manifest = RuleManifest(self.logger, self.enviro, self.manifestfile)
+        self.assertIsNone(manifest.lookup('FakeRule', self.rulefile))
+
+    def testSkippable(self):
+        family = self.enviro.getosfamily()
+        manifest = RuleManifest(self.logger, self.enviro, None)
+        manifest.add('FakeRule', self.rulefile,
+                     self.makerule({'type': 'black', 'family': [family]}))
+        entry = manifest.lookup('FakeRule', self.rulefile)
+        self.assertTrue(manifest.skippable(entry))
+        manifest.add('FakeRule', self.rulefile,
+                     self.makerule({'type': 'white', 'family': [family]}))
+        entry = manifest.lookup('FakeRule', self.rulefile)
+        self.assertFalse(manifest.skippable(entry))
+        self.assertTrue(manifest.skippable(entry, ['OtherRule']))
+        self.assertFalse(manifest.skippable(entry, ['FakeRule']))
+
+    def testCustomApplicabilityNotSkipped(self):
+        family = self.enviro.getosfamily()
+        manifest = RuleManifest(self.logger, self.enviro, None)
+        manifest.add('FakeRule', self.rulefile,
+                     self.makerule({'type': 'black', 'family': [family]},
+                                   CustomRule))
+        entry = manifest.lookup('FakeRule', self.rulefile)
+        self.assertTrue(entry['customapplicable'])
+        self.assertFalse(manifest.skippable(entry))
+
+    def testPrune(self):
+        manifest = RuleManifest(self.logger, self.enviro, None)
+        manifest.add('FakeRule', self.rulefile,
+                     self.makerule({'default': 'default'}))
+        manifest.prune(['SomeOtherRule'])
+        self.assertIsNone(manifest.lookup('FakeRule', self.rulefile))
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the rule profiler used by the --profile option.
+'''
+
+import os
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+import threading
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.CommandHelper import CommandHelper
+# CommandHelper reports to the profiler of the stonix_resources package
+from stonix_resources.RuleProfiler import RuleProfiler, recordlog, \
+    getrecord, JSONFILE, PROMFILE
+
+
+class zzzTestFrameworkRuleProfiler(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.profiler = RuleProfiler()
+        self.tmpdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def report(self):
+        ch = CommandHelper(self.logger)
+        ch.executeCommand(['true'])
+        ch.executeCommands([['true'], ['true'], ['true']], 3)
+        subprocess.call(['true'])
+        recordlog()
+        with open(os.path.join(self.tmpdir, 'data'), 'w') as outfile:
+            outfile.write('x' * 100000)
+        sum(range(100000))
+        return True
+
+    def testRunPhase(self):
+        self.assertTrue(self.profiler.runphase('TestRule', 'report',
+                                               self.report))
+        self.assertIsNone(getrecord())
+        record = self.profiler.getrecords()[0]
+        self.assertEqual((record.rule, record.phase, record.runs),
+                         ('TestRule', 'report', 1))
+        self.assertEqual(record.commands, 4)
+        self.assertEqual(record.subprocesses, 5)
+        self.assertEqual(record.logcalls, 1)
+        self.assertGreater(record.wall, 0)
+        self.assertGreater(record.cpu, 0)
+        self.assertGreater(record.commandtime, 0)
+        if os.path.exists('/proc/thread-self/io'):
+            self.assertGreaterEqual(record.byteswritten, 100000)
+
+        # work outside of a phase is not counted
+        recordlog()
+        self.profiler.runphase('TestRule', 'report', lambda: None)
+        self.assertEqual((record.runs, record.logcalls, record.commands),
+                         (2, 1, 4))
+
+    def testConcurrentRules(self):
+        def rule(name, count):
+            for _ in range(count):
+                recordlog()
+        threads = [threading.Thread(target=self.profiler.runphase,
+                                    args=('Rule%d' % num, 'fix', rule,
+                                          'Rule%d' % num, num * 10))
+                   for num in range(1, 5)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        counts = dict((record.rule, record.logcalls)
+                      for record in self.profiler.getrecords())
+        self.assertEqual(counts, {'Rule1': 10, 'Rule2': 20, 'Rule3': 30,
+                                  'Rule4': 40})
+
+    def testException(self):
+        def fail():
+            raise ValueError('rule death')
+        self.assertRaises(ValueError, self.profiler.runphase, 'Bad "Rule"',
+                          'undo', fail)
+        self.assertEqual(self.profiler.getrecords()[0].runs, 1)
+        self.assertIsNone(getrecord())
+
+    def testWrite(self):
+        self.profiler.runphase('TestRule', 'report', self.report)
+        self.profiler.runphase('Bad "Rule"', 'fix', lambda: None)
+        outdir = os.path.join(self.tmpdir, 'profile')
+        self.profiler.write(outdir)
+        with open(os.path.join(outdir, JSONFILE)) as jsonfile:
+            records = json.load(jsonfile)['records']
+        self.assertEqual([(record['rule'], record['phase'])
+                          for record in records],
+                         [('TestRule', 'report'), ('Bad "Rule"', 'fix')])
+        self.assertEqual(records[0]['commands'], 4)
+        with open(os.path.join(outdir, PROMFILE)) as promfile:
+            prom = promfile.read().splitlines()
+        self.assertIn('# TYPE stonix_rule_wall_seconds gauge', prom)
+        self.assertIn('stonix_rule_commands{rule="TestRule",phase="report"} 4',
+                      prom)
+        self.assertIn('stonix_rule_runs{rule="Bad \\"Rule\\"",phase="fix"} 1',
+                      prom)
+        self.assertEqual(sorted(os.listdir(outdir)), [JSONFILE, PROMFILE])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the service state table used by SHsystemctl. A shell script
+stands in for systemctl and records how often it is called.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.CommandHelper import CommandHelper
+from src.stonix_resources.SHsystemctl import SHsystemctl
+from src.stonix_resources.ServiceHelperTemplate import ServiceStateTable
+
+FAKESYSTEMCTL = '''#!/bin/sh
+echo "$@" >> "%(calls)s"
+case "$1" in
+    list-unit-files)
+        echo "sshd.service                 enabled   enabled"
+        echo "cups.service                 disabled  enabled"
+        echo "dbus.service                 static    -"
+        echo "cups.socket                  enabled   enabled"
+        echo "ssh.service                  alias     -"
+        ;;
+    list-units)
+        echo "sshd.service   loaded    active   running OpenSSH server daemon"
+        echo "dbus.service   loaded    active   running D-Bus System Message Bus"
+        echo "cups.socket    loaded    inactive dead    CUPS Scheduler"
+        ;;
+    is-enabled)
+        echo "disabled"
+        ;;
+    is-active)
+        echo "inactive"
+        ;;
+esac
+exit 0
+'''
+
+
+class zzzTestFrameworkSHsystemctl(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.calls = os.path.join(self.tmpdir, 'calls')
+        systemctl = os.path.join(self.tmpdir, 'systemctl')
+        with open(systemctl, 'w') as fhandle:
+            fhandle.write(FAKESYSTEMCTL % {'calls': self.calls})
+        os.chmod(systemctl, 0o755)
+        # build the helper by hand so it uses the fake systemctl and a
+        # private state table
+        self.helper = SHsystemctl.__new__(SHsystemctl)
+        self.helper.environment = self.enviro
+        self.helper.logdispatcher = self.logger
+        self.helper.ch = CommandHelper(self.logger)
+        self.helper.sysctl = systemctl
+        self.helper.handsoff = ["static", "transient", "generated", "masked",
+                                "masked-runtime"]
+        self.helper.states = ServiceStateTable(self.helper.loadStates,
+                                               self.logger)
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def getcalls(self):
+        '''Return the argument lines the fake systemctl was called with'''
+        if not os.path.exists(self.calls):
+            return []
+        return open(self.calls).read().splitlines()
+
+    def testAnswersFromTable(self):
+        self.assertTrue(self.helper.auditService('sshd'))
+        self.assertFalse(self.helper.auditService('cups.service'))
+        self.assertTrue(self.helper.auditService('cups.socket'))
+        self.assertTrue(self.helper.isRunning('sshd.service'))
+        self.assertFalse(self.helper.isRunning('cups'))
+        self.assertFalse(self.helper.isRunning('cups.socket'))
+        self.assertEqual(self.helper.getServiceStatus('dbus'), 'static')
+        self.assertEqual(len(self.getcalls()), 2)
+
+    def testListServices(self):
+        services = self.helper.listServices()
+        self.assertIn('sshd.service', services)
+        self.assertNotIn('cups.socket', services)
+
+    def testFallback(self):
+        '''Units the table cannot answer for are asked about directly'''
+        self.assertFalse(self.helper.auditService('ssh'))
+        self.assertFalse(self.helper.isRunning('unknown-unit'))
+        calls = self.getcalls()
+        self.assertIn('is-enabled ssh', calls)
+        self.assertIn('is-active unknown-unit', calls)
+
+    def testInvalidate(self):
+        self.assertTrue(self.helper.auditService('sshd'))
+        self.helper.disableService('sshd')
+        self.assertFalse(self.helper.auditService('sshd'))
+        self.assertIn('is-enabled sshd', self.getcalls())
+
+if __name__ == "__main__":
+    unittest.main()
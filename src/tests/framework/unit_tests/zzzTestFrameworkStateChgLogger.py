@@ -43,8 +43,10 @@ class zzzTestFrameworkStateChgLogger(unittest.TestCase):
         self.environ = environment.Environment()
         self.environ.setdebugmode(True)
         self.logger = logdispatcher.LogDispatcher(self.environ)
-        if os.path.exists('/var/db/stonix/eventlog'):
-            os.remove('/var/db/stonix/eventlog')
+        for eventfile in ['/var/db/stonix/eventlog',
+                          '/var/db/stonix/eventjournal']:
+            if os.path.exists(eventfile):
+                os.remove(eventfile)
         self.testobj = StateChgLogger.StateChgLogger(self.logger, self.environ)
         self.srcfile = '/etc/stonixtest.conf'
         self.dstfile = '/etc/stonixtest.conf.tmp'
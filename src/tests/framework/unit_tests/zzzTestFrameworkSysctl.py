@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the sysctl snapshot and configuration view. A temporary
+directory stands in for /proc/sys and the sysctl configuration files.
+'''
+
+import os
+import sys
+import shutil
+import tempfile
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.Sysctl import Sysctl, normalizekey
+
+
+class zzzTestFrameworkSysctl(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.tmpdir = tempfile.mkdtemp()
+        self.procsys = os.path.join(self.tmpdir, 'proc')
+        self.etcdir = os.path.join(self.tmpdir, 'etc.sysctl.d')
+        self.libdir = os.path.join(self.tmpdir, 'lib.sysctl.d')
+        self.sysctlconf = os.path.join(self.tmpdir, 'sysctl.conf')
+        for dirname in [self.etcdir, self.libdir]:
+            os.makedirs(dirname)
+        self.setproc('net.ipv4.ip_forward', '1')
+        self.setproc('kernel.dmesg_restrict', '0')
+        self.setproc('net.ipv4.tcp_rmem', '4096\t87380\t6291456')
+        self.setproc('net.ipv4.conf.eth0/100.rp_filter', '0')
+        self.sysctl = Sysctl(self.logger, self.procsys, self.sysctlconf,
+                             [self.etcdir, self.libdir])
+
+    def tearDown(self):
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def setproc(self, key, value):
+        path = os.path.join(self.procsys, *key.replace('/', '\0').split('.'))
+        path = path.replace('\0', '.')
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as fhandle:
+            fhandle.write(value + '\n')
+
+    def writeconf(self, path, contents):
+        with open(path, 'w') as fhandle:
+            fhandle.write(contents)
+
+    def testNormalizeKey(self):
+        self.assertEqual(normalizekey('net.ipv4.ip_forward'),
+                         'net.ipv4.ip_forward')
+        self.assertEqual(normalizekey('net/ipv4/ip_forward'),
+                         'net.ipv4.ip_forward')
+        self.assertEqual(normalizekey('net/ipv4/conf/eth0.100/rp_filter'),
+                         'net.ipv4.conf.eth0/100.rp_filter')
+
+    def testGetLive(self):
+        self.assertEqual(self.sysctl.getlive('net.ipv4.ip_forward'), '1')
+        self.assertEqual(self.sysctl.getlive('net.ipv4.tcp_rmem'),
+                         '4096 87380 6291456')
+        self.assertEqual(
+            self.sysctl.getlive('net/ipv4/conf/eth0.100/rp_filter'), '0')
+        self.assertIsNone(self.sysctl.getlive('net.ipv6.conf.all.nokey'))
+
+    def testSnapshot(self):
+        self.assertEqual(self.sysctl.getlive('net.ipv4.ip_forward'), '1')
+        self.setproc('net.ipv4.ip_forward', '0')
+        self.assertEqual(self.sysctl.getlive('net.ipv4.ip_forward'), '1')
+        self.sysctl.refresh(['net.ipv4.ip_forward'])
+        self.assertEqual(self.sysctl.getlive('net.ipv4.ip_forward'), '0')
+
+    def testApply(self):
+        changed, failed = self.sysctl.apply({'net.ipv4.ip_forward': '0',
+                                             'kernel.dmesg_restrict': '0',
+                                             'net.ipv6.conf.all.nokey': '1'})
+        self.assertEqual(changed, {'net.ipv4.ip_forward': '1'})
+        self.assertEqual(failed, [])
+        self.assertEqual(self.sysctl.checklive({'net.ipv4.ip_forward': '0'}),
+                         {})
+        with open(os.path.join(self.procsys, 'net', 'ipv4',
+                               'ip_forward')) as fhandle:
+            self.assertEqual(fhandle.read(), '0\n')
+
+    def testMergedConfiguration(self):
+        self.writeconf(os.path.join(self.libdir, '50-default.conf'),
+                       '# defaults\n'
+                       'kernel.dmesg_restrict = 0\n'
+                       'net.ipv4.ip_forward=1\n')
+        # hidden by the file of the same name in the first directory
+        self.writeconf(os.path.join(self.libdir, '60-local.conf'),
+                       'net.ipv4.tcp_syncookies = 0\n')
+        self.writeconf(os.path.join(self.etcdir, '60-local.conf'),
+                       '; local settings\n'
+                       '-kernel.dmesg_restrict = 1\n')
+        self.writeconf(self.sysctlconf,
+                       '\n'
+                       'net/ipv4/ip_forward = 0\n')
+        merged = self.sysctl.getconfiguration()
+        setting = merged['kernel.dmesg_restrict']
+        self.assertEqual(setting.value, '1')
+        self.assertEqual(setting.path,
+                         os.path.join(self.etcdir, '60-local.conf'))
+        self.assertEqual(setting.lineno, 2)
+        self.assertEqual(merged['net.ipv4.ip_forward'].path, self.sysctlconf)
+        self.assertNotIn('net.ipv4.tcp_syncookies', merged)
+        wrong = self.sysctl.checkconfigured({'net.ipv4.ip_forward': '0',
+                                             'kernel.dmesg_restrict': '1',
+                                             'fs.suid_dumpable': '0'})
+        self.assertEqual(list(wrong), ['fs.suid_dumpable'])
+        self.assertIsNone(wrong['fs.suid_dumpable'])
+
+    def testSysctlConfLink(self):
+        '''sysctl.conf linked into sysctl.d is only read once, last'''
+        self.writeconf(self.sysctlconf, 'net.ipv4.ip_forward = 0\n')
+        os.symlink(self.sysctlconf, os.path.join(self.etcdir,
+                                                 '99-sysctl.conf'))
+        self.assertEqual(self.sysctl.conffiles(), [self.sysctlconf])
+
+    def testParseCache(self):
+        self.writeconf(self.sysctlconf, 'net.ipv4.ip_forward = 0\n')
+        first = self.sysctl.parsefile(self.sysctlconf)
+        self.assertIs(self.sysctl.parsefile(self.sysctlconf), first)
+        self.writeconf(self.sysctlconf, 'net.ipv4.ip_forward = 1\n'
+                       'kernel.dmesg_restrict = 1\n')
+        self.assertEqual(len(self.sysctl.parsefile(self.sysctlconf)), 2)
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Benchmark for LogDispatcher.log. Compares the cost of the caller lookup and
+of discarded DEBUG messages against the inspect.stack() based implementation
+the dispatcher used before. Results are printed as messages per second.
+'''
+
+import sys
+import time
+import inspect
+import unittest
+
+sys.path.append("../../../..")
+from src.stonix_resources.logdispatcher import LogDispatcher, LogPriority
+import src.stonix_resources.environment as environment
+
+ITERATIONS = 2000
+
+
+def rate(func, count=ITERATIONS):
+    '''Return calls per second for func'''
+    start = time.time()
+    for _ in range(count):
+        func()
+    elapsed = time.time() - start
+    if elapsed <= 0:
+        elapsed = 1e-9
+    return count / elapsed
+
+
+class zzzTestFrameworklogdispatcherBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.environ = environment.Environment()
+        self.logger = LogDispatcher(self.environ)
+        self.savedebug = self.logger.debug
+        self.saveverbose = self.logger.verbose
+
+    def tearDown(self):
+        self.logger.debug = self.savedebug
+        self.logger.verbose = self.saveverbose
+
+    def oldprefix(self):
+        '''Caller lookup as done before sys._getframe was used'''
+        stack1 = inspect.stack()[1]
+        mod = inspect.getmodule(stack1[0])
+        if mod:
+            return mod.__name__ + ":" + stack1[3] + ":"
+        return stack1[3] + ":"
+
+    def olddiscard(self):
+        '''Work done for a discarded DEBUG message before the level check
+        was moved ahead of formatting and caller lookup'''
+        msg = 'Discarded message'.strip()
+        self.logger.format_message_data(msg)
+        self.oldprefix()
+
+    def testCallerPrefix(self):
+        '''The frame based caller lookup names the calling function'''
+        self.logger.debug = False
+        prefix = self.logger.callerprefix()
+        self.assertIn('testCallerPrefix', prefix)
+
+    def testCallerLookupRate(self):
+        before = rate(self.oldprefix)
+        after = rate(self.logger.callerprefix)
+        print('\ncaller lookup msgs/sec before: %.0f after: %.0f' %
+              (before, after))
+        self.assertGreater(after, before)
+
+    def testDiscardedDebugRate(self):
+        self.logger.debug = False
+        self.logger.verbose = False
+        before = rate(self.olddiscard)
+        after = rate(lambda: self.logger.log(LogPriority.DEBUG,
+                                             'Discarded message'))
+        print('\ndiscarded DEBUG msgs/sec before: %.0f after: %.0f' %
+              (before, after))
+        self.assertGreater(after, before)
+
+if __name__ == "__main__":
+    unittest.main()
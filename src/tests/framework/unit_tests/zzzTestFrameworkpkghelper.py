@@ -36,6 +36,26 @@ from src.tests.lib.logdispatcher_lite import LogDispatcher
 import src.stonix_resources.environment as environment
 
 
+class FakeManager(object):
+    '''Package manager stand in that counts how often it is asked'''
+
+    def __init__(self):
+        self.calls = 0
+        self.packages = set(['zsh', 'zsh.x86_64', 'openssh-server'])
+
+    def listInstalled(self):
+        self.calls += 1
+        return set(self.packages)
+
+    def checkInstall(self, package):
+        self.calls += 1
+        return package in self.packages
+
+    def getPackageFromFile(self, filename):
+        self.calls += 1
+        return 'zsh'
+
+
 class zzzTestFrameworkpkghelper(unittest.TestCase):
 
     def setUp(self):
@@ -69,5 +89,45 @@ class zzzTestFrameworkpkghelper(unittest.TestCase):
             self.assertFalse(self.helper.check(self.pkg),
                              self.pkg + " still found after pkghelper.remove")
 
+    def testSnapshot(self):
+        manager = FakeManager()
+        snapshot = pkghelper.PackageSnapshot(manager, self.logger)
+        self.assertTrue(snapshot.isInstalled('zsh'))
+        self.assertTrue(snapshot.isInstalled('zsh.x86_64'))
+        self.assertTrue(snapshot.isInstalled('openssh-*'))
+        self.assertFalse(snapshot.isInstalled('zs'))
+        self.assertEqual(manager.calls, 1,
+                         "Snapshot queried the package manager more than once")
+        manager.packages.remove('zsh')
+        snapshot.invalidate()
+        self.assertFalse(snapshot.isInstalled('zsh'))
+        self.assertEqual(manager.calls, 2)
+
+    def testSnapshotUnsupported(self):
+        manager = FakeManager()
+        snapshot = pkghelper.PackageSnapshot(manager, self.logger)
+        self.assertIsNone(snapshot.isAvailable('zsh'),
+                          "Missing listAvailable should give None")
+
+    def testSnapshotProviders(self):
+        manager = FakeManager()
+        snapshot = pkghelper.PackageSnapshot(manager, self.logger)
+        snapshot.getPackageFromFile('/bin/zsh')
+        self.assertEqual(snapshot.getPackageFromFile('/bin/zsh'), 'zsh')
+        self.assertEqual(manager.calls, 1)
+
+    def testSharedRegistry(self):
+        '''the module loaded under another name uses the snapshots of
+        stonix_resources.pkghelper'''
+        import stonix_resources.pkghelper as packaged
+        self.assertIsNot(pkghelper, packaged)
+        manager = FakeManager()
+        snapshot = pkghelper.getsnapshot('fake', manager, self.logger)
+        try:
+            self.assertIs(packaged.getsnapshot('fake', manager, self.logger),
+                          snapshot)
+        finally:
+            packaged._snapshots.pop('fake', None)
+
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,139 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the rulescheduler module.
+'''
+
+import sys
+import time
+import threading
+import unittest
+
+sys.path.append("../../../..")
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+from src.stonix_resources.environment import Environment
+from src.stonix_resources.rulescheduler import RuleScheduler
+
+
+class FakeRule(object):
+    '''Minimal stand in for a rule object'''
+
+    def __init__(self, num, priority=50, files=None, packages=None):
+        self.rulenumber = num
+        self.executionpriority = priority
+        self.resources = {'files': files or [],
+                          'services': [],
+                          'packages': packages or []}
+
+    def getrulenum(self):
+        return self.rulenumber
+
+    def getexecutionpriority(self):
+        return self.executionpriority
+
+    def getresources(self):
+        return self.resources
+
+
+class zzzTestFrameworkrulescheduler(unittest.TestCase):
+
+    def setUp(self):
+        self.enviro = Environment()
+        self.logger = LogDispatcher(self.enviro)
+        self.lock = threading.Lock()
+        self.active = {}
+        self.overlap = []
+        self.started = []
+
+    def tearDown(self):
+        pass
+
+    def task(self, rule):
+        '''Record which rules are running at once'''
+        with self.lock:
+            self.started.append(rule.getrulenum())
+            for other in self.active.values():
+                self.overlap.append((other.getrulenum(), rule.getrulenum()))
+            self.active[rule.getrulenum()] = rule
+        time.sleep(0.05)
+        with self.lock:
+            del self.active[rule.getrulenum()]
+
+    def testSerialOrder(self):
+        '''With one worker rules run in priority order'''
+        rules = [FakeRule(1, 60), FakeRule(2, 10), FakeRule(3, 60)]
+        scheduler = RuleScheduler(self.logger, 1)
+        done = [rule.getrulenum() for rule, _ in scheduler.run(rules,
+                                                                self.task)]
+        self.assertEqual(done, [2, 1, 3])
+        self.assertEqual(self.overlap, [])
+
+    def testPriorityBarrier(self):
+        '''No rule starts before the lower priority group is finished'''
+        rules = [FakeRule(1, 10), FakeRule(2, 10), FakeRule(3, 20)]
+        scheduler = RuleScheduler(self.logger, 4)
+        list(scheduler.run(rules, self.task))
+        self.assertEqual(self.started[-1], 3)
+        self.assertNotIn((1, 3), self.overlap)
+        self.assertNotIn((2, 3), self.overlap)
+
+    def testConcurrentReports(self):
+        '''Independent rules run at the same time'''
+        rules = [FakeRule(1), FakeRule(2), FakeRule(3)]
+        scheduler = RuleScheduler(self.logger, 3)
+        results = list(scheduler.run(rules, self.task))
+        self.assertEqual(len(results), 3)
+        self.assertTrue(self.overlap)
+
+    def testFileConflict(self):
+        '''Rules sharing a file are serialized'''
+        rules = [FakeRule(1, files=['/etc/ssh/sshd_config']),
+                 FakeRule(2, files=['/etc/ssh/sshd_config']),
+                 FakeRule(3, files=['/etc/login.defs'])]
+        scheduler = RuleScheduler(self.logger, 3)
+        list(scheduler.run(rules, self.task, exclusive=True))
+        self.assertNotIn((1, 2), self.overlap)
+        self.assertNotIn((2, 1), self.overlap)
+
+    def testPackageConflict(self):
+        '''Rules declaring packages never run together'''
+        rules = [FakeRule(1, packages=['aide']),
+                 FakeRule(2, packages=['audit'])]
+        scheduler = RuleScheduler(self.logger, 2)
+        list(scheduler.run(rules, self.task, exclusive=True))
+        self.assertEqual(self.overlap, [])
+
+    def testExclusive(self):
+        '''Undeclared rules run alone in exclusive mode'''
+        rules = [FakeRule(1), FakeRule(2, files=['/etc/issue'])]
+        scheduler = RuleScheduler(self.logger, 2)
+        list(scheduler.run(rules, self.task, exclusive=True))
+        self.assertEqual(self.overlap, [])
+
+    def testTaskFailure(self):
+        '''A failing task is reported as a traceback, not raised'''
+        def badtask(rule):
+            raise ValueError('boom')
+        scheduler = RuleScheduler(self.logger, 2)
+        results = list(scheduler.run([FakeRule(1)], badtask))
+        self.assertEqual(len(results), 1)
+        self.assertIn('boom', results[0][1])
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+#!/usr/bin/env python3
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Test suite for the streamed XML report and for uploading it to a local
+stand-in for the report server.
+'''
+
+import os
+import sys
+import gzip
+import shutil
+import tempfile
+import threading
+import unittest
+import xml.etree.ElementTree as ET
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+sys.path.append("../../../..")
+from src.stonix_resources.logdispatcher import xmlReport, ReportUploader, \
+    MessageData
+
+
+class ReportHandler(BaseHTTPRequestHandler):
+    '''Stand-in for results.php, answers with the statuses queued by the
+    test and records the reports it receives'''
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        server = self.server
+        body = self.rfile.read(int(self.headers['Content-Length']))
+        server.clients.add(self.client_address)
+        status = server.statuses.pop(0) if server.statuses else 200
+        if status == 0:
+            # drop the connection without answering
+            self.close_connection = True
+            return
+        if status == 200:
+            if self.headers.get('Content-Encoding') == 'gzip':
+                body = gzip.decompress(body)
+            server.received.append((self.headers, body))
+        text = ('status %d' % status).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Length', str(len(text)))
+        self.end_headers()
+        self.wfile.write(text)
+
+    def log_message(self, *args):
+        pass
+
+
+def makeentry(tag, detail):
+    entry = MessageData()
+    entry.Tag = tag
+    entry.Detail = detail
+    return entry
+
+
+class zzzTestFrameworkxmlReport(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'stonix-xmlreport.xml')
+        self.report = xmlReport(self.path)
+
+    def tearDown(self):
+        self.report.closeReport()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def parse(self):
+        return ET.parse(self.path).getroot()
+
+    def testStreamedReport(self):
+        self.report.writeMetadata(makeentry('Hostname', 'host'))
+        self.report.writeMetadata(makeentry('OS', 'Linux <test> & co'))
+        self.assertEqual(self.parse().find('metadata/OS').get('val'),
+                         'Linux <test> & co')
+        for num in range(3):
+            self.report.writeFinding(makeentry('Rule%d' % num, 'finding'))
+            # the report is complete after every entry
+            root = self.parse()
+            self.assertEqual(len(root.find('findings')), num + 1)
+        self.report.closeReport()
+        root = self.parse()
+        self.assertEqual([child.tag for child in root],
+                         ['metadata', 'findings'])
+        self.assertEqual([child.tag for child in root.find('metadata')],
+                         ['Hostname', 'OS'])
+        # entries logged after the report is closed are ignored
+        self.report.writeFinding(makeentry('Late', 'finding'))
+        self.assertEqual(len(self.parse().find('findings')), 3)
+
+    def testLateMetadata(self):
+        self.report.writeMetadata(makeentry('Hostname', 'host'))
+        self.report.writeFinding(makeentry('Rule1', 'finding'))
+        self.report.writeMetadata(makeentry('RuleCount', '5'))
+        self.report.writeFinding(makeentry('Rule2', 'finding'))
+        self.assertEqual(self.parse().findall('metadata/RuleCount')[0].get('val'),
+                         '5')
+        self.report.closeReport()
+        root = self.parse()
+        self.assertEqual(len(root.findall('metadata')), 1)
+        self.assertEqual([child.tag for child in root.find('metadata')],
+                         ['Hostname', 'RuleCount'])
+        self.assertEqual([child.tag for child in root.find('findings')],
+                         ['Rule1', 'Rule2'])
+        self.assertFalse(os.path.exists(self.path + '.tmp'))
+
+    def testConcurrentWriters(self):
+        # rules log findings from the scheduler threads while the consumer
+        # thread logs metadata
+        self.report.writeMetadata(makeentry('Hostname', 'host'))
+
+        def writefindings(thread):
+            for num in range(200):
+                self.report.writeFinding(makeentry('Rule%d' % thread,
+                                                   'finding %d' % num))
+
+        threads = [threading.Thread(target=writefindings, args=(num,))
+                   for num in range(4)]
+        for thread in threads:
+            thread.start()
+        for num in range(20):
+            self.report.writeMetadata(makeentry('Meta%d' % num, 'value'))
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.parse().find('findings')), 800)
+        self.report.closeReport()
+        root = self.parse()
+        self.assertEqual(len(root.find('findings')), 800)
+        self.assertEqual(len(root.find('metadata')), 21)
+
+    def testUnwritableReport(self):
+        report = xmlReport(os.path.join(self.tmpdir, 'missing', 'report.xml'))
+        report.writeMetadata(makeentry('Hostname', 'host'))
+        report.writeFinding(makeentry('Rule1', 'finding'))
+        report.closeReport()
+        self.assertTrue(report.closed)
+
+
+class zzzTestFrameworkReportUploader(unittest.TestCase):
+
+    def setUp(self):
+        self.server = HTTPServer(('127.0.0.1', 0), ReportHandler)
+        self.server.statuses = []
+        self.server.received = []
+        self.server.clients = set()
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+        self.thread.start()
+        self.tmpdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.tmpdir, 'stonix-xmlreport.xml')
+        report = xmlReport(self.path)
+        report.writeMetadata(makeentry('Hostname', 'host'))
+        for num in range(1000):
+            report.writeFinding(makeentry('Rule%d' % num, 'x' * 100))
+        report.closeReport()
+        self.uploader = ReportUploader('127.0.0.1',
+                                       port=self.server.server_address[1],
+                                       secure=False, backoff=0)
+
+    def tearDown(self):
+        self.uploader.close()
+        self.server.shutdown()
+        self.server.server_close()
+        shutil.rmtree(self.tmpdir, ignore_errors=True)
+
+    def testUpload(self):
+        self.assertEqual(self.uploader.upload(self.path), (200, 'status 200'))
+        self.assertEqual(self.uploader.upload(self.path)[0], 200)
+        # both uploads used the same connection
+        self.assertEqual(len(self.server.clients), 1)
+        headers, body = self.server.received[0]
+        # plain requests unless the server is known to decode gzip
+        self.assertIsNone(headers['Content-Encoding'])
+        self.assertIn(b'name="file"; filename="stonix-xmlreport.xml"', body)
+        self.assertIn(open(self.path, 'rb').read(), body)
+
+    def testCompressedUpload(self):
+        self.uploader.compress = True
+        self.assertEqual(self.uploader.upload(self.path)[0], 200)
+        headers, body = self.server.received[0]
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertLess(int(headers['Content-Length']),
+                        os.path.getsize(self.path))
+        self.assertIn(open(self.path, 'rb').read(), body)
+
+    def testRetry(self):
+        self.server.statuses = [503, 500]
+        self.assertEqual(self.uploader.upload(self.path)[0], 200)
+        self.assertEqual(len(self.server.received), 1)
+        self.server.statuses = [503, 503, 503, 503]
+        self.assertEqual(self.uploader.upload(self.path)[0], 503)
+        self.assertEqual(self.server.statuses, [])
+        self.server.statuses = [404]
+        self.assertEqual(self.uploader.upload(self.path)[0], 404)
+
+    def testDroppedConnection(self):
+        self.server.statuses = [0]
+        self.assertEqual(self.uploader.upload(self.path)[0], 200)
+        self.assertEqual(len(self.server.received), 1)
+
+    def testUncompressedFallback(self):
+        self.uploader.compress = True
+        self.server.statuses = [415]
+        self.assertEqual(self.uploader.upload(self.path)[0], 200)
+        headers, body = self.server.received[0]
+        self.assertIsNone(headers['Content-Encoding'])
+        self.assertIn(open(self.path, 'rb').read(), body)
+
+    def testUnreachable(self):
+        port = self.server.server_address[1]
+        self.server.shutdown()
+        self.server.server_close()
+        # a refused connection is not retried, the backoff would be a
+        # minute
+        uploader = ReportUploader('127.0.0.1', port=port, secure=False,
+                                  backoff=60)
+        self.assertRaises(ConnectionRefusedError, uploader.upload, self.path)
+
+if __name__ == "__main__":
+    unittest.main()
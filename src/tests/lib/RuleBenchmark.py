@@ -0,0 +1,1035 @@
+###############################################################################
+#                                                                             #
+# Copyright 2019. Triad National Security, LLC. All rights reserved.          #
+# This program was produced under U.S. Government contract 89233218CNA000001  #
+# for Los Alamos National Laboratory (LANL), which is operated by Triad       #
+# National Security, LLC for the U.S. Department of Energy/National Nuclear   #
+# Security Administration.                                                    #
+#                                                                             #
+# All rights in the program are reserved by Triad National Security, LLC, and #
+# the U.S. Department of Energy/National Nuclear Security Administration. The #
+# Government is granted for itself and others acting on its behalf a          #
+# nonexclusive, paid-up, irrevocable worldwide license in this material to    #
+# reproduce, prepare derivative works, distribute copies to the public,       #
+# perform publicly and display publicly, and to permit others to do so.       #
+#                                                                             #
+###############################################################################
+
+'''
+Created on Oct 18, 2026
+
+Hermetic benchmark harness for stonix rules. The report method of each rule
+is run against a generated fake root instead of the real system:
+
+FakeRoot builds a directory holding a canned /etc tree for a Red Hat or an
+Ubuntu like system, a synthetic filesystem of a configurable number of files
+and shell stand-ins for rpm, yum, dpkg, dpkg-query, apt-get, lsb_release and
+systemctl that answer from canned package and service tables, and for grep.
+
+PathRedirector maps absolute paths used by open() and the os module onto the
+fake root and runs every subprocess through the stand-ins. Absolute paths in
+the arguments of shell commands are mapped as well, so globs expand inside
+the fake root. Commands without a stand-in fail with status 127, so nothing
+on the real system is read, run or changed. /proc, /sys, /dev and the directories python and stonix are loaded
+from are left alone; neither are lookups through the pwd and grp modules.
+
+RuleBenchmark runs each rule report with RuleProfiler, reruns it under
+tracemalloc for its memory use and compares the results with a stored
+baseline. No root privileges or network access are needed.
+'''
+
+import os
+import io
+import re
+import sys
+import json
+import time
+import random
+import shutil
+import builtins
+import importlib
+import subprocess
+import tracemalloc
+import traceback
+
+from src.stonix_resources import environment as srcenvironment
+
+# the rules import the stonix framework the way stonix.py does
+RESOURCES = os.path.dirname(os.path.abspath(srcenvironment.__file__))
+if os.path.dirname(RESOURCES) not in sys.path:
+    sys.path.append(os.path.dirname(RESOURCES))
+for _path in [RESOURCES, os.path.join(RESOURCES, 'rules')]:
+    if _path not in sys.path:
+        sys.path.append(_path)
+
+from stonix_resources import environment
+from stonix_resources.configuration import Configuration
+from stonix_resources.StateChgLogger import StateChgLogger
+from stonix_resources.RuleProfiler import RuleProfiler, recordlog
+from src.tests.lib.logdispatcher_lite import LogDispatcher
+
+# os functions whose first argument is a path
+PATHFUNCTIONS = ['stat', 'lstat', 'listdir', 'scandir', 'access', 'readlink',
+                 'chmod', 'chown', 'lchown', 'mkdir', 'rmdir', 'remove',
+                 'unlink', 'utime', 'open', 'truncate', 'statvfs', 'chdir',
+                 'mkfifo']
+
+# os functions whose first two arguments are paths
+PAIRFUNCTIONS = ['rename', 'replace', 'link']
+
+# paths that are never redirected. ServiceHelper loads libc with ctypes,
+# which does not go through the os module.
+PASSTHROUGH = ['/proc', '/sys', '/dev', '/lib/x86_64-linux-gnu/libc.so.6',
+               '/lib/i386-linux-gnu/libc.so.6', '/lib64/libc.so.6',
+               '/usr/lib64/libc.so.6']
+
+# absolute command paths at the start of a shell command, after a shell
+# operator or after variable assignments
+SHELLCOMMAND = re.compile(r"(^|[;&|(`]|\$\()((?:\s*\w+=\S*)*\s*)"
+                          r"(/[^\s;&|()`]*/)([^\s/;&|()`]+)")
+
+# absolute paths in the arguments of a shell command or in redirections
+SHELLPATH = re.compile(r"(?<=[\s<>])(/[^\s;&|()`'\"<>]*)")
+
+# command stand-ins, they answer from the tables in .stubs/data
+STUBS = {}
+
+STUBS['missing'] = r'''#!/bin/sh
+echo "$1: command not available in the benchmark root" >&2
+exit 127
+'''
+
+STUBS['rpm'] = r'''#!/bin/sh
+# rpm stand-in for the rule benchmarks
+PATH=/usr/bin:/bin
+PKGS=$(dirname "$0")/../data/packages
+case "$1" in
+    --version)
+        echo "RPM version 4.11.3"
+        exit 0 ;;
+    -V*|--verify)
+        exit 0 ;;
+    -qf|-qif)
+        shift
+        for f in "$@"; do echo "file $f is not owned by any package"; done
+        exit 1 ;;
+    -qa|-qai)
+        shift
+        fmt='%{NAME}-%{VERSION}-%{RELEASE}.%{ARCH}\n'
+        if [ "$1" = "--qf" ] || [ "$1" = "--queryformat" ]; then fmt=$2; fi
+        awk -v fmt="$fmt" '{ out = fmt; gsub(/%\{NAME\}/, $1, out);
+            gsub(/%\{VERSION\}/, $2, out); gsub(/%\{RELEASE\}/, $3, out);
+            gsub(/%\{ARCH\}/, $4, out); printf "%s", out }' "$PKGS"
+        exit 0 ;;
+    -q*)
+        shift
+        status=0
+        for p in "$@"; do
+            case "$p" in -*) continue ;; esac
+            line=$(awk -v p="$p" '$1 == p || $1 "." $4 == p {
+                print $1 "-" $2 "-" $3 "." $4; exit }' "$PKGS")
+            if [ -n "$line" ]; then
+                echo "$line"
+            else
+                echo "package $p is not installed"
+                status=1
+            fi
+        done
+        exit $status ;;
+esac
+exit 0
+'''
+
+STUBS['yum'] = r'''#!/bin/sh
+# yum and dnf stand-in for the rule benchmarks
+PATH=/usr/bin:/bin
+DATA=$(dirname "$0")/../data
+for arg in "$@"; do
+    case "$arg" in
+        -*) ;;
+        *) set -- "$@" "$arg" ;;
+    esac
+    shift
+done
+case "$1 $2" in
+    "list installed")
+        echo "Installed Packages"
+        if [ -n "$3" ]; then
+            awk -v p="$3" '$1 == p { print $1 "." $4 "  " $2 "-" $3 "  @base" }' \
+                "$DATA/packages" | grep . || exit 1
+        else
+            awk '{ print $1 "." $4 "  " $2 "-" $3 "  @base" }' "$DATA/packages"
+        fi
+        exit 0 ;;
+    "list available"|"list "*)
+        echo "Available Packages"
+        if [ -n "$3" ]; then
+            awk -v p="$3" '$1 == p { print $1 "." $4 "  " $2 "-" $3 "  base" }' \
+                "$DATA/available" | grep . || exit 1
+        else
+            awk '{ print $1 "." $4 "  " $2 "-" $3 "  base" }' "$DATA/available"
+        fi
+        exit 0 ;;
+esac
+case "$1" in
+    check-update|makecache|clean)
+        exit 0 ;;
+    provides|whatprovides)
+        echo "No matches found"
+        exit 1 ;;
+esac
+exit 0
+'''
+
+STUBS['dpkg'] = r'''#!/bin/sh
+# dpkg and dpkg-query stand-in for the rule benchmarks
+PATH=/usr/bin:/bin
+PKGS=$(dirname "$0")/../data/packages
+mode=$1
+shift
+case "$mode" in
+    --version)
+        echo "Debian dpkg package management program version 1.19.0.5"
+        exit 0 ;;
+    -S|--search)
+        echo "dpkg-query: no path found matching pattern $1" >&2
+        exit 1 ;;
+    -l|--list)
+        echo "||/ Name Version Architecture Description"
+        if [ -z "$1" ]; then
+            awk '{ print "ii  " $1 "  " $2 "-" $3 "  " $4 "  package" }' "$PKGS"
+            exit 0
+        fi
+        status=0
+        for p in "$@"; do
+            awk -v p="$p" '$1 == p { print "ii  " $1 "  " $2 "-" $3 "  " $4 "  package"; found = 1 }
+                END { exit !found }' "$PKGS" || status=1
+        done
+        exit $status ;;
+    -s|--status)
+        status=0
+        for p in "$@"; do
+            awk -v p="$p" '$1 == p { print "Package: " $1; print "Status: install ok installed";
+                print "Version: " $2 "-" $3; found = 1 } END { exit !found }' "$PKGS" || {
+                echo "dpkg-query: package '$p' is not installed" >&2
+                status=1
+            }
+        done
+        exit $status ;;
+    -W|--show)
+        fmt='${Package}\t${Version}\n'
+        case "$1" in
+            -f|--showformat) fmt=$2; shift 2 ;;
+            -f*|--showformat=*) fmt=${1#*=}; fmt=${fmt#-f}; shift ;;
+        esac
+        [ $# -eq 0 ] && set -- '*'
+        status=0
+        for p in "$@"; do
+            awk -v p="$p" -v fmt="$fmt" '$1 == p || p == "*" { out = fmt;
+                gsub(/\$\{Package\}/, $1, out); gsub(/\$\{binary:Package\}/, $1, out);
+                gsub(/\$\{Version\}/, $2 "-" $3, out);
+                gsub(/\$\{Architecture\}/, $4, out);
+                gsub(/\$\{Status\}/, "install ok installed", out);
+                gsub(/\$\{db:Status-Abbrev\}/, "ii ", out);
+                printf "%s", out; found = 1 } END { exit !found }' "$PKGS" || status=1
+        done
+        exit $status ;;
+esac
+exit 0
+'''
+
+STUBS['apt-get'] = r'''#!/bin/sh
+# apt-get and apt-cache stand-in for the rule benchmarks
+PATH=/usr/bin:/bin
+DATA=$(dirname "$0")/../data
+case "$1" in
+    policy|show)
+        shift
+        awk -v p="$1" '$1 == p { print $1 ":"; print "  Installed: (none)";
+            print "  Candidate: " $2 "-" $3; found = 1 } END { exit !found }' \
+            "$DATA/available"
+        exit $? ;;
+    search)
+        awk -v p="$2" 'index($1, p) { print $1 " - package" }' "$DATA/available"
+        exit 0 ;;
+    -s|--simulate|-u|upgrade)
+        exit 0 ;;
+esac
+exit 0
+'''
+
+STUBS['lsb_release'] = r'''#!/bin/sh
+# lsb_release stand-in for the rule benchmarks
+PATH=/usr/bin:/bin
+cat "$(dirname "$0")/../data/lsb_release"
+exit 0
+'''
+
+STUBS['systemctl'] = r'''#!/bin/sh
+# systemctl stand-in for the rule benchmarks
+PATH=/usr/bin:/bin
+UNITS=$(dirname "$0")/../data/services
+command=""
+for arg in "$@"; do
+    case "$arg" in
+        -t|--type) ;;
+        -*) ;;
+        service|socket|target|timer) [ "$prev" = "-t" ] || [ "$prev" = "--type" ] ||
+            set -- "$@" "$arg" ;;
+        *) set -- "$@" "$arg" ;;
+    esac
+    prev=$arg
+    shift
+done
+command=$1
+[ $# -gt 0 ] && shift
+unit() {
+    case "$1" in
+        *.*) echo "$1" ;;
+        *) echo "$1.service" ;;
+    esac
+}
+case "$command" in
+    --version|"")
+        echo "systemd 219"
+        exit 0 ;;
+    list-unit-files)
+        awk '{ print $1 " " $2 }' "$UNITS"
+        exit 0 ;;
+    list-units)
+        awk '{ sub_ = ($3 == "active") ? "running" : "dead";
+            print $1 " loaded " $3 " " sub_ " " $1 }' "$UNITS"
+        exit 0 ;;
+    is-enabled)
+        name=$(unit "$1")
+        state=$(awk -v u="$name" '$1 == u { print $2; exit }' "$UNITS")
+        if [ -z "$state" ]; then
+            echo "Failed to get unit file state for $name: No such file or directory" >&2
+            exit 1
+        fi
+        echo "$state"
+        [ "$state" = "enabled" ] || [ "$state" = "static" ]
+        exit $? ;;
+    is-active)
+        name=$(unit "$1")
+        state=$(awk -v u="$name" '$1 == u { print $3; exit }' "$UNITS")
+        echo "${state:-inactive}"
+        [ "$state" = "active" ]
+        exit $? ;;
+    status)
+        name=$(unit "$1")
+        state=$(awk -v u="$name" '$1 == u { print $3; exit }' "$UNITS")
+        echo "$name - $name"
+        echo "   Active: ${state:-inactive}"
+        [ "$state" = "active" ] && exit 0
+        exit 3 ;;
+esac
+exit 0
+'''
+
+STUBS['ps'] = r'''#!/bin/sh
+# ps stand-in for the rule benchmarks, only init is running
+echo "  PID TTY          TIME CMD"
+case "$*" in
+    *-p1*|*"-p 1"*) echo "    1 ?        00:00:05 systemd" ;;
+esac
+exit 0
+'''
+
+STUBS['grep'] = r'''#!/bin/sh
+# grep stand-in for the rule benchmarks. The redirector has already mapped
+# the paths in the arguments onto the fake root, so the real grep only
+# searches there
+PATH=/usr/bin:/bin
+exec grep "$@"
+'''
+
+STUBS['id'] = r'''#!/bin/sh
+# id stand-in for the rule benchmarks, users are looked up in the passwd
+# file of the fake root
+PATH=/usr/bin:/bin
+PASSWD=$(dirname "$0")/../../etc/passwd
+[ "$1" = "-u" ] && shift
+if [ -z "$1" ]; then
+    echo 0
+    exit 0
+fi
+awk -F: -v u="$1" '$1 == u { print $3; found = 1; exit }
+    END { if (!found) exit 1 }' "$PASSWD" && exit 0
+echo "id: '$1': no such user" >&2
+exit 1
+'''
+
+# command stand-ins installed under other names
+STUBALIASES = {'dnf': 'yum', 'dpkg-query': 'dpkg', 'apt-cache': 'apt-get'}
+
+# distribution specific parts of the fake root
+PROFILES = {
+    'rhel7': {
+        'files': {
+            '/etc/redhat-release':
+                'Red Hat Enterprise Linux Server release 7.9 (Maipo)\n',
+            '/etc/os-release':
+                'NAME="Red Hat Enterprise Linux Server"\nVERSION="7.9 (Maipo)"\n'
+                'ID="rhel"\nID_LIKE="fedora"\nVERSION_ID="7.9"\n',
+            '/etc/sysconfig/network': 'NETWORKING=yes\n',
+            '/etc/pam.d/system-auth':
+                'auth required pam_env.so\nauth sufficient pam_unix.so '
+                'nullok try_first_pass\nauth required pam_deny.so\n'
+                'password requisite pam_pwquality.so try_first_pass retry=3\n'
+                'password sufficient pam_unix.so sha512 shadow nullok '
+                'use_authtok\n',
+            '/etc/yum.conf': '[main]\ngpgcheck=1\ninstallonly_limit=3\n'},
+        'commands': {'/bin/rpm': 'rpm', '/usr/bin/rpm': 'rpm',
+                     '/usr/bin/yum': 'yum', '/usr/bin/systemctl': 'systemctl',
+                     '/bin/systemctl': 'systemctl', '/usr/bin/ps': 'ps',
+                     '/bin/ps': 'ps', '/usr/bin/id': 'id'},
+        'packages': ['openssh-server', 'openssh-clients', 'postfix', 'rsyslog',
+                     'audit', 'sudo', 'cronie', 'chrony', 'firewalld',
+                     'pam', 'setup', 'kernel', 'grub2', 'bash', 'avahi',
+                     'cups', 'telnet', 'xinetd', 'aide', 'screen'],
+        'lsb_release': None},
+    'ubuntu1804': {
+        'files': {
+            '/etc/os-release':
+                'NAME="Ubuntu"\nVERSION="18.04.5 LTS (Bionic Beaver)"\n'
+                'ID=ubuntu\nID_LIKE=debian\nVERSION_ID="18.04"\n',
+            '/etc/lsb-release':
+                'DISTRIB_ID=Ubuntu\nDISTRIB_RELEASE=18.04\n'
+                'DISTRIB_DESCRIPTION="Ubuntu 18.04.5 LTS"\n',
+            '/etc/debian_version': 'buster/sid\n',
+            '/etc/pam.d/common-auth':
+                'auth [success=1 default=ignore] pam_unix.so nullok_secure\n'
+                'auth requisite pam_deny.so\nauth required pam_permit.so\n',
+            '/etc/pam.d/common-password':
+                'password [success=1 default=ignore] pam_unix.so obscure '
+                'sha512\npassword requisite pam_deny.so\n'},
+        'commands': {'/usr/bin/dpkg': 'dpkg', '/usr/bin/dpkg-query': 'dpkg-query',
+                     '/usr/bin/apt-get': 'apt-get',
+                     '/usr/bin/apt-cache': 'apt-cache',
+                     '/usr/bin/lsb_release': 'lsb_release',
+                     '/bin/systemctl': 'systemctl', '/bin/ps': 'ps',
+                     '/usr/bin/id': 'id'},
+        'packages': ['openssh-server', 'openssh-client', 'postfix', 'rsyslog',
+                     'auditd', 'sudo', 'cron', 'chrony', 'ufw', 'libpam-modules',
+                     'base-files', 'linux-image-generic', 'grub-pc', 'bash',
+                     'avahi-daemon', 'cups', 'telnet', 'xinetd', 'aide', 'screen'],
+        'lsb_release': 'Description:\tUbuntu 18.04.5 LTS\nRelease:\t18.04\n'}}
+
+# /etc files shared by every profile
+ETCFILES = {
+    '/etc/hostname': 'bench.example.com\n',
+    '/etc/hosts': '127.0.0.1 localhost localhost.localdomain\n'
+                  '::1 localhost localhost.localdomain\n',
+    '/etc/resolv.conf': 'search example.com\nnameserver 192.0.2.53\n',
+    '/etc/login.defs': 'MAIL_DIR /var/spool/mail\nPASS_MAX_DAYS 99999\n'
+                       'PASS_MIN_DAYS 0\nPASS_MIN_LEN 5\nPASS_WARN_AGE 7\n'
+                       'UID_MIN 1000\nUID_MAX 60000\nGID_MIN 1000\n'
+                       'GID_MAX 60000\nCREATE_HOME yes\nUMASK 077\n'
+                       'ENCRYPT_METHOD SHA512\n',
+    '/etc/ssh/sshd_config': '#Port 22\nHostKey /etc/ssh/ssh_host_rsa_key\n'
+                            'SyslogFacility AUTHPRIV\nPermitRootLogin yes\n'
+                            'PasswordAuthentication yes\n'
+                            'ChallengeResponseAuthentication no\n'
+                            'UsePAM yes\nX11Forwarding yes\n'
+                            'Subsystem sftp /usr/libexec/openssh/sftp-server\n',
+    '/etc/ssh/ssh_config': 'Host *\n    GSSAPIAuthentication yes\n'
+                           '    ForwardX11Trusted yes\n',
+    '/etc/sysctl.conf': '# sysctl settings\nnet.ipv4.ip_forward = 0\n'
+                        'kernel.sysrq = 0\n',
+    '/etc/sysctl.d/99-sysctl.conf': 'net.ipv4.conf.all.rp_filter = 1\n',
+    '/etc/fstab': '/dev/mapper/root / xfs defaults 0 0\n'
+                  'UUID=0d9a8b7c /boot xfs defaults 0 0\n'
+                  '/dev/mapper/home /home xfs defaults 0 0\n'
+                  'tmpfs /dev/shm tmpfs defaults 0 0\n',
+    '/etc/modprobe.d/blacklist.conf': 'blacklist usb-storage\n',
+    '/etc/audit/auditd.conf': 'log_file = /var/log/audit/audit.log\n'
+                              'max_log_file = 8\nspace_left_action = SYSLOG\n',
+    '/etc/audit/rules.d/audit.rules': '-D\n-b 8192\n-f 1\n',
+    '/etc/default/grub': 'GRUB_TIMEOUT=5\nGRUB_DEFAULT=saved\n'
+                         'GRUB_CMDLINE_LINUX="crashkernel=auto rhgb quiet"\n',
+    '/etc/profile': 'umask 022\n',
+    '/etc/bashrc': 'umask 022\n',
+    '/etc/securetty': 'console\ntty1\ntty2\n',
+    '/etc/sudoers': 'Defaults !visiblepw\nroot ALL=(ALL) ALL\n'
+                    '%wheel ALL=(ALL) ALL\n',
+    '/etc/rsyslog.conf': '*.info;mail.none;authpriv.none;cron.none '
+                         '/var/log/messages\nauthpriv.* /var/log/secure\n',
+    '/etc/logrotate.conf': 'weekly\nrotate 4\ncreate\n',
+    '/etc/postfix/main.cf': 'inet_interfaces = all\n'
+                            'myhostname = bench.example.com\n',
+    '/etc/selinux/config': 'SELINUX=permissive\nSELINUXTYPE=targeted\n',
+    '/etc/chrony.conf': 'server 0.pool.ntp.org iburst\n',
+    '/etc/issue': '\\S\nKernel \\r on an \\m\n',
+    '/etc/cron.allow': '',
+    '/etc/shells': '/bin/sh\n/bin/bash\n/sbin/nologin\n',
+    '/etc/aliases': 'postmaster: root\n'}
+
+# units of the canned service table: name, unit file state, active state
+SERVICES = [('sshd.service', 'enabled', 'active'),
+            ('rsyslog.service', 'enabled', 'active'),
+            ('auditd.service', 'enabled', 'active'),
+            ('crond.service', 'enabled', 'active'),
+            ('chronyd.service', 'enabled', 'active'),
+            ('postfix.service', 'enabled', 'active'),
+            ('firewalld.service', 'enabled', 'active'),
+            ('avahi-daemon.service', 'enabled', 'active'),
+            ('cups.service', 'enabled', 'active'),
+            ('bluetooth.service', 'enabled', 'inactive'),
+            ('rpcbind.service', 'disabled', 'inactive'),
+            ('nfs-server.service', 'disabled', 'inactive'),
+            ('xinetd.service', 'disabled', 'inactive'),
+            ('kdump.service', 'enabled', 'inactive'),
+            ('getty@.service', 'enabled', 'inactive'),
+            ('systemd-journald.service', 'static', 'active'),
+            ('dbus.service', 'static', 'active'),
+            ('ctrl-alt-del.target', 'enabled', 'inactive'),
+            ('graphical.target', 'static', 'inactive'),
+            ('multi-user.target', 'static', 'active')]
+
+
+class FakeRoot(object):
+    '''Builds the directory tree the rules see as / while being benchmarked
+    '''
+
+    def __init__(self, path, profile='rhel7', files=1000, users=20,
+                 packages=300, seed=0):
+        '''
+        :param path: string - directory to build the fake root in
+        :param profile: string - key of PROFILES
+        :param files: int - number of files in the synthetic filesystem
+        :param users: int - number of login accounts
+        :param packages: int - number of installed packages besides the
+            ones named by the profile
+        :param seed: int - seed of the generator, the same arguments always
+            build the same tree
+        '''
+        self.path = os.path.abspath(path)
+        self.profile = profile
+        self.files = files
+        self.users = users
+        self.packages = packages
+        self.random = random.Random(seed)
+        self.stubdir = os.path.join(self.path, '.stubs', 'bin')
+        self.datadir = os.path.join(self.path, '.stubs', 'data')
+
+    def realpath(self, path):
+        '''Return the location of an absolute path inside the fake root
+
+        :param path: string
+        :returns: string
+        '''
+        return os.path.join(self.path, path.lstrip('/'))
+
+    def writefile(self, path, contents, mode=0o644):
+        '''Write a file at an absolute path of the fake root
+
+        :param path: string
+        :param contents: string
+        :param mode: int
+        '''
+        realpath = self.realpath(path)
+        if not os.path.isdir(os.path.dirname(realpath)):
+            os.makedirs(os.path.dirname(realpath))
+        with open(realpath, 'w') as outfile:
+            outfile.write(contents)
+        os.chmod(realpath, mode)
+
+    def build(self):
+        '''Build the fake root
+
+        :returns: self
+        '''
+        if self.profile not in PROFILES:
+            raise ValueError('Unknown benchmark profile ' + str(self.profile))
+        profile = PROFILES[self.profile]
+        for directory in ['/tmp', '/var/tmp', '/var/log', '/var/db/stonix',
+                          '/var/spool/mail', '/usr/share/doc', '/home',
+                          '/root', '/boot', '/usr/bin', '/usr/sbin', '/bin',
+                          '/sbin', '/usr/lib/systemd/system']:
+            if not os.path.isdir(self.realpath(directory)):
+                os.makedirs(self.realpath(directory))
+        os.chmod(self.realpath('/tmp'), 0o1777)
+        os.chmod(self.realpath('/var/tmp'), 0o1777)
+        for path, contents in ETCFILES.items():
+            self.writefile(path, contents)
+        for path, contents in profile['files'].items():
+            self.writefile(path, contents)
+        self.buildaccounts()
+        self.buildstubs(profile)
+        self.buildfilesystem()
+        return self
+
+    def buildaccounts(self):
+        '''Write passwd, shadow and group with the system accounts and the
+        login accounts, and create the home directories'''
+        passwd = ['root:x:0:0:root:/root:/bin/bash',
+                  'bin:x:1:1:bin:/bin:/sbin/nologin',
+                  'daemon:x:2:2:daemon:/sbin:/sbin/nologin',
+                  'adm:x:3:4:adm:/var/adm:/sbin/nologin',
+                  'lp:x:4:7:lp:/var/spool/lpd:/sbin/nologin',
+                  'sync:x:5:0:sync:/sbin:/bin/sync',
+                  'games:x:12:100:games:/usr/games:/sbin/nologin',
+                  'nobody:x:99:99:Nobody:/:/sbin/nologin',
+                  'sshd:x:74:74:sshd:/var/empty/sshd:/sbin/nologin',
+                  'postfix:x:89:89::/var/spool/postfix:/sbin/nologin']
+        shadow = ['root:$6$bench$hash:18000:0:99999:7:::']
+        shadow.extend([line.split(':')[0] + ':*:18000:0:99999:7:::'
+                       for line in passwd[1:]])
+        group = ['root:x:0:', 'bin:x:1:', 'daemon:x:2:', 'adm:x:4:',
+                 'lp:x:7:', 'wheel:x:10:', 'users:x:100:', 'nobody:x:99:',
+                 'sshd:x:74:', 'postfix:x:89:']
+        for num in range(self.users):
+            name = 'user%03d' % num
+            uid = 1000 + num
+            home = '/home/' + name
+            passwd.append('%s:x:%d:%d:User %d:%s:/bin/bash' %
+                          (name, uid, uid, num, home))
+            shadow.append('%s:$6$bench$hash:18000:0:99999:7:::' % name)
+            group.append('%s:x:%d:' % (name, uid))
+            self.writefile(home + '/.bashrc', 'umask 022\n')
+            self.writefile(home + '/.bash_profile', 'PATH=$PATH:.\n')
+            if num % 5 == 0:
+                self.writefile(home + '/.netrc', 'machine example.com\n',
+                               0o644)
+            os.chmod(self.realpath(home), 0o755 if num % 3 else 0o700)
+        self.writefile('/etc/passwd', '\n'.join(passwd) + '\n')
+        self.writefile('/etc/shadow', '\n'.join(shadow) + '\n', 0o600)
+        self.writefile('/etc/group', '\n'.join(group) + '\n')
+
+    def buildstubs(self, profile):
+        '''Write the command stand-ins and their tables, and put the
+        commands of the profile where the rules look for them'''
+        for directory in [self.stubdir, self.datadir]:
+            if not os.path.isdir(directory):
+                os.makedirs(directory)
+        for name, script in STUBS.items():
+            path = os.path.join(self.stubdir, name)
+            with open(path, 'w') as outfile:
+                outfile.write(script)
+            os.chmod(path, 0o755)
+        for alias, name in STUBALIASES.items():
+            shutil.copy(os.path.join(self.stubdir, name),
+                        os.path.join(self.stubdir, alias))
+        for path, name in profile['commands'].items():
+            self.writefile(path, STUBS[STUBALIASES.get(name, name)], 0o755)
+
+        packages = []
+        for name in profile['packages']:
+            packages.append('%s 1.0 1.el7 x86_64' % name)
+        for num in range(self.packages):
+            packages.append('benchpkg%04d %d.%d %d x86_64' %
+                            (num, num % 7, num % 13, num % 3 + 1))
+        available = ['benchavail%04d 2.0 1 noarch' % num
+                     for num in range(self.packages // 3)]
+        with open(os.path.join(self.datadir, 'packages'), 'w') as outfile:
+            outfile.write('\n'.join(packages) + '\n')
+        with open(os.path.join(self.datadir, 'available'), 'w') as outfile:
+            outfile.write('\n'.join(packages + available) + '\n')
+        with open(os.path.join(self.datadir, 'services'), 'w') as outfile:
+            for unit in SERVICES:
+                outfile.write(' '.join(unit) + '\n')
+        with open(os.path.join(self.datadir, 'lsb_release'), 'w') as outfile:
+            outfile.write(profile['lsb_release'] or '')
+        for name, filestate, _ in SERVICES:
+            self.writefile('/usr/lib/systemd/system/' + name,
+                           '[Unit]\nDescription=' + name + '\n')
+
+    def buildfilesystem(self):
+        '''Spread self.files files over /usr/share/doc, /var/log, /opt and
+        the home directories. A few of them are world writable, setuid,
+        unowned by a package or dangling symlinks, as on a lived in
+        system.'''
+        directories = ['/usr/share/doc/benchpkg%04d' % num
+                       for num in range(max(1, self.files // 50))]
+        directories.extend(['/var/log/bench', '/opt/bench/lib',
+                            '/opt/bench/bin'])
+        directories.extend(['/home/user%03d/work' % num
+                            for num in range(self.users)])
+        for num in range(self.files):
+            directory = self.random.choice(directories)
+            path = '%s/file%05d' % (directory, num)
+            mode = 0o644
+            kind = self.random.random()
+            if kind < 0.01:
+                mode = 0o666
+            elif kind < 0.02:
+                mode = 0o4755
+            elif kind < 0.03:
+                mode = 0o777
+            if kind > 0.995:
+                realpath = self.realpath(path)
+                if not os.path.isdir(os.path.dirname(realpath)):
+                    os.makedirs(os.path.dirname(realpath))
+                os.symlink('/nonexistent/' + os.path.basename(path), realpath)
+                continue
+            self.writefile(path, 'benchmark file %d\n' % num, mode)
+
+
+class PathRedirector(object):
+    '''Context manager that points absolute paths at a FakeRoot and runs
+    subprocesses through its command stand-ins
+    '''
+
+    def __init__(self, fakeroot):
+        '''
+        :param fakeroot: FakeRoot instance, already built
+        '''
+        self.fakeroot = fakeroot
+        self.root = fakeroot.path
+        self.stubdir = fakeroot.stubdir
+        passthrough = [self.root] + PASSTHROUGH + [RESOURCES]
+        for path in sys.path:
+            # the source tree root and the current directory are not
+            # trusted, only the directories modules are loaded from
+            if path and os.path.isabs(path) and os.path.isdir(path) and \
+               path.count('/') > 2:
+                passthrough.append(os.path.normpath(path))
+        self.passthrough = [path for path in set(passthrough)
+                            if path != '/']
+        self.saved = {}
+        self.commands = []
+
+    def mappath(self, path):
+        '''Return the path to use for path while redirecting
+
+        :param path: string, bytes, path like object or file descriptor
+        :returns: same type as path
+        '''
+        if isinstance(path, int):
+            return path
+        try:
+            fspath = os.fspath(path)
+        except TypeError:
+            return path
+        isbytes = isinstance(fspath, bytes)
+        if isbytes:
+            fspath = os.fsdecode(fspath)
+        if not fspath.startswith('/'):
+            return path
+        for prefix in self.passthrough:
+            if fspath == prefix or fspath.startswith(prefix + '/'):
+                return path
+        mapped = self.root + fspath
+        if isbytes:
+            return os.fsencode(mapped)
+        return mapped
+
+    def stubcommand(self, name):
+        '''Return the path of the stand-in for a command name
+
+        :param name: string
+        :returns: string
+        '''
+        stub = os.path.join(self.stubdir, os.path.basename(name))
+        if os.path.basename(name) and self.saved['exists'](stub):
+            return stub
+        return None
+
+    def stubargs(self, args, shell):
+        '''Rewrite the arguments of a subprocess to use the stand-ins
+
+        :param args: string or list
+        :param shell: bool
+        :returns: string or list
+        '''
+        if shell:
+            if not isinstance(args, str):
+                args = ' '.join(args)
+            self.commands.append(args)
+
+            def replace(match):
+                return match.group(1) + match.group(2) + \
+                    os.path.join(self.stubdir, match.group(4))
+            # the stand-ins are inside the fake root, mappath leaves them
+            args = SHELLCOMMAND.sub(replace, args)
+            return SHELLPATH.sub(lambda match: self.mappath(match.group(1)),
+                                 args)
+        if isinstance(args, (str, bytes)) or hasattr(args, '__fspath__'):
+            args = [os.fsdecode(args)]
+        args = [os.fsdecode(arg) if isinstance(arg, bytes) else arg
+                for arg in args]
+        self.commands.append(' '.join(str(arg) for arg in args))
+        stub = self.stubcommand(str(args[0]))
+        if stub is not None:
+            return [stub] + args[1:]
+        return [os.path.join(self.stubdir, 'missing')] + args
+
+    def __enter__(self):
+        redirector = self
+        self.saved['open'] = builtins.open
+        self.saved['ioopen'] = io.open
+        self.saved['Popen'] = subprocess.Popen
+        self.saved['system'] = os.system
+        self.saved['exists'] = os.path.exists
+        for name in PATHFUNCTIONS + PAIRFUNCTIONS:
+            self.saved['os.' + name] = getattr(os, name)
+
+        def wrapone(function):
+            def redirected(path='.', *args, **kwargs):
+                return function(redirector.mappath(path), *args, **kwargs)
+            return redirected
+
+        def wraptwo(function):
+            def redirected(src, dst, *args, **kwargs):
+                return function(redirector.mappath(src),
+                                redirector.mappath(dst), *args, **kwargs)
+            return redirected
+
+        def redirectedopen(file, *args, **kwargs):
+            return redirector.saved['open'](redirector.mappath(file), *args,
+                                            **kwargs)
+
+        class StubPopen(self.saved['Popen']):
+            def __init__(self, args, *popenargs, **kwargs):
+                shell = kwargs.get('shell', False)
+                if len(popenargs) >= 8:
+                    shell = popenargs[7]
+                args = redirector.stubargs(args, shell)
+                kwargs.pop('executable', None)
+                if shell:
+                    env = dict(kwargs.get('env') or os.environ)
+                    env['PATH'] = redirector.stubdir
+                    kwargs['env'] = env
+                if 'cwd' in kwargs and kwargs['cwd'] is not None:
+                    kwargs['cwd'] = redirector.mappath(kwargs['cwd'])
+                super(StubPopen, self).__init__(args, *popenargs, **kwargs)
+
+        def redirectedsystem(command):
+            return StubPopen(command, shell=True).wait() << 8
+
+        for name in PATHFUNCTIONS:
+            setattr(os, name, wrapone(self.saved['os.' + name]))
+        for name in PAIRFUNCTIONS:
+            setattr(os, name, wraptwo(self.saved['os.' + name]))
+        builtins.open = redirectedopen
+        io.open = redirectedopen
+        subprocess.Popen = StubPopen
+        os.system = redirectedsystem
+        return self
+
+    def __exit__(self, exctype, excvalue, trace):
+        for name in PATHFUNCTIONS + PAIRFUNCTIONS:
+            setattr(os, name, self.saved['os.' + name])
+        builtins.open = self.saved['open']
+        io.open = self.saved['ioopen']
+        subprocess.Popen = self.saved['Popen']
+        os.system = self.saved['system']
+        return False
+
+
+class LogCounter(object):
+    '''Passes log calls on to a LogDispatcher and counts them for the rule
+    profiler, which the test log dispatcher does not do itself'''
+
+    def __init__(self, logger):
+        self.logger = logger
+
+    def log(self, priority, msg_data):
+        recordlog()
+        return self.logger.log(priority, msg_data)
+
+    def __getattr__(self, name):
+        return getattr(self.logger, name)
+
+
+def resetcaches():
+    '''Forget the process wide caches of the stonix framework so that every
+    rule is benchmarked from a cold start. The rules import the framework
+    both as stonix_resources.X and as X, so both copies are reset.'''
+    for prefix in ['stonix_resources.', 'src.stonix_resources.', '']:
+        module = sys.modules.get(prefix + 'environment')
+        if module is not None and hasattr(module, 'clearfactcache'):
+            module.clearfactcache()
+        for name, attribute in [('AccountDatabase', '_accounts'),
+                                ('Sysctl', '_sysctl'),
+                                ('FilesystemInventory', '_inventory'),
+                                ('RpmVerifier', '_verifier'),
+                                ('ModprobePolicy', '_modprobe'),
+                                ('BootLoader', '_bootloader'),
+                                ('AuditRules', '_auditrules')]:
+            module = sys.modules.get(prefix + name)
+            if module is not None and hasattr(module, attribute):
+                setattr(module, attribute, None)
+        for name, attribute in [('KVACache', '_documents'),
+                                ('pkghelper', '_snapshots'),
+                                ('pkghelper', '_managers'),
+                                ('ServiceHelper', '_probe'),
+                                ('ServiceHelperTemplate', '_statetables'),
+                                ('PackageLock', '_locks'),
+                                ('CheckApplicable', '_results')]:
+            module = sys.modules.get(prefix + name)
+            if module is not None and hasattr(module, attribute):
+                getattr(module, attribute).clear()
+
+
+class RuleBenchmark(object):
+    '''Runs rule reports inside a fake root and compares the results with a
+    baseline
+    '''
+
+    def __init__(self, fakeroot, repeat=3):
+        '''
+        :param fakeroot: FakeRoot instance, already built
+        :param repeat: int - number of timed runs of each report, the
+            fastest one is kept
+        '''
+        self.fakeroot = fakeroot
+        self.repeat = max(1, int(repeat))
+        self.redirector = PathRedirector(fakeroot)
+        self.environ = None
+        self.config = None
+        self.logger = None
+        self.statechglogger = None
+
+    def setup(self):
+        '''Create the environment, configuration and state change logger the
+        rules are given, reading the fake root. Must be called while
+        redirecting.'''
+        resetcaches()
+        self.environ = environment.Environment()
+        self.environ.factcache = None
+        self.environ.setverbosemode(False)
+        self.environ.setdebugmode(False)
+        self.config = Configuration(self.environ)
+        self.logger = LogCounter(LogDispatcher(self.environ))
+        self.statechglogger = StateChgLogger(self.logger, self.environ)
+
+    def loadrule(self, rulename):
+        '''Return an instance of a rule
+
+        :param rulename: string - name of the rule module and class
+        :returns: rule object
+        '''
+        module = importlib.import_module('stonix_resources.rules.' + rulename)
+        return getattr(module, rulename)(self.config, self.environ,
+                                         self.logger, self.statechglogger)
+
+    def runrule(self, rulename):
+        '''Benchmark the report of one rule
+
+        :param rulename: string
+        :returns: dict of measurements
+        '''
+        profiler = RuleProfiler()
+        result = {'rule': rulename, 'error': None}
+        try:
+            # rules may remember that their report already ran, so every
+            # run gets a new instance
+            self.redirector.commands = []
+            for _ in range(self.repeat):
+                rule = self.loadrule(rulename)
+                resetcaches()
+                profiler.runphase(rulename, 'report', rule.report)
+            commands = len(self.redirector.commands)
+            record = profiler.getrecords()[0]
+            result.update({'compliant': bool(rule.iscompliant()),
+                           'subprocesses': record.subprocesses //
+                           self.repeat,
+                           'commands': commands // self.repeat,
+                           'log_calls': record.logcalls // self.repeat,
+                           'cpu_seconds': record.cpu / self.repeat})
+            # the fastest run is the least disturbed by the rest of the box
+            wall = []
+            for _ in range(self.repeat):
+                rule = self.loadrule(rulename)
+                resetcaches()
+                start = time.time()
+                rule.report()
+                wall.append(time.time() - start)
+            result['wall_seconds'] = min(wall)
+
+            rule = self.loadrule(rulename)
+            resetcaches()
+            tracemalloc.start()
+            try:
+                before = tracemalloc.take_snapshot()
+                rule.report()
+                after = tracemalloc.take_snapshot()
+                peak = tracemalloc.get_traced_memory()[1]
+            finally:
+                tracemalloc.stop()
+            stats = after.compare_to(before, 'filename')
+            result['peak_bytes'] = peak
+            result['allocations'] = sum(max(0, stat.count_diff)
+                                        for stat in stats)
+        except Exception:
+            result['error'] = traceback.format_exc()
+        return result
+
+    def run(self, rulenames):
+        '''Benchmark the reports of a list of rules
+
+        :param rulenames: list of strings
+        :returns: dict of rule name: measurements
+        '''
+        results = {}
+        with self.redirector:
+            self.setup()
+            for rulename in rulenames:
+                results[rulename] = self.runrule(rulename)
+        resetcaches()
+        return results
+
+
+def loadbaseline(path):
+    '''Return the stored baseline, an empty one if there is none
+
+    :param path: string
+    :returns: dict
+    '''
+    try:
+        with open(path) as infile:
+            return json.load(infile)
+    except (IOError, OSError, ValueError):
+        return {'rules': {}}
+
+
+def savebaseline(path, results, fakeroot):
+    '''Store results as the baseline
+
+    :param path: string
+    :param results: dict returned by RuleBenchmark.run
+    :param fakeroot: FakeRoot the results were measured against
+    '''
+    baseline = {'profile': fakeroot.profile, 'files': fakeroot.files,
+                'users': fakeroot.users, 'packages': fakeroot.packages,
+                'python': sys.version.split()[0],
+                'rules': dict((name, result) for name, result in
+                              results.items() if not result['error'])}
+    with open(path, 'w') as outfile:
+        json.dump(baseline, outfile, indent=1, sort_keys=True)
+        outfile.write('\n')
+
+
+def comparebaseline(results, baseline, timetolerance=1.5,
+                    memorytolerance=1.5):
+    '''Compare results with a baseline. Times and memory may grow by the
+    tolerance factors, plus a small absolute allowance for noise; the number
+    of subprocesses and commands may not grow at all.
+
+    :param results: dict returned by RuleBenchmark.run
+    :param baseline: dict returned by loadbaseline
+    :param timetolerance: float
+    :param memorytolerance: float
+    :returns: list of strings describing regressions
+    '''
+    regressions = []
+    for name, result in sorted(results.items()):
+        if result['error']:
+            regressions.append(name + ': report failed\n' + result['error'])
+            continue
+        base = baseline.get('rules', {}).get(name)
+        if base is None:
+            continue
+        checks = [('wall_seconds', base['wall_seconds'] * timetolerance +
+                   0.05),
+                  ('peak_bytes', base['peak_bytes'] * memorytolerance +
+                   262144),
+                  ('subprocesses', base['subprocesses']),
+                  ('commands', base['commands'])]
+        for key, limit in checks:
+            if result[key] > limit:
+                regressions.append('%s: %s is %s, the baseline allows %s' %
+                                   (name, key, result[key], limit))
+    return regressions
@@ -70,16 +70,13 @@ class zzzTestRuleRestrictAccessToKernelMessageBuffer(RuleTest):
         '''test initobjs method of RestrictAccessToKernelMessageBuffer'''
 
         self.rule.initobjs()
-        self.assertFalse(self.rule.ch == None, "initobjs method should successfully initialize the command helper object self.ch within the rule.")
+        self.assertFalse(self.rule.sysctl == None, "initobjs method should successfully initialize the sysctl object self.sysctl within the rule.")
 
     def test_localize(self):
         '''test localize method of RestrictAccessToKernelMessageBuffer'''
 
         self.rule.localize()
-        self.assertFalse(self.rule.fixcommand == "", "localize should set the fixcommand variable to the correct command string.")
-        self.assertFalse(self.rule.fixcommand == None, "localize should set the fixcommand variable to the correct command string.")
-        self.assertFalse(self.rule.reportcommand == "", "localize should set the reportcommand variable to the correct command string.")
-        self.assertFalse(self.rule.reportcommand == None, "localize should set the reportcommand variable to the correct command string.")
+        self.assertEqual(self.rule.directives, {"kernel.dmesg_restrict": "1"}, "localize should set the directives variable to the correct kernel parameters.")
 
     def test_reportFalse(self):
         '''test report return value in case of non compliant state'''